@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Benchmark cold-session latency and memory per session for the Streamlit app,
+with an agent per session against one shared agent.
+
+``--users`` simulated sessions start ``--concurrency`` at a time, and each
+sends ``--turns`` grocery requests. The model is ``ScriptedChatModel`` with
+``--latency-ms`` per call. "per-session" is what the app did before: every
+session compiles the graph and opens its own ``SqliteStore``, and history
+lives in the session. "shared" is the app now: one agent (what
+``st.cache_resource`` holds) with a ``SqliteSaver``, and a thread ID per
+session. Cold-session latency is the time from session start to the
+first answer. Memory per session is the ``tracemalloc`` growth while the
+sessions are alive, divided by ``--users``.
+
+    python benchmarks/bench_app_sessions.py --users 50 --concurrency 10
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from langchain_core.messages import HumanMessage
+
+import email_assistant.recipe_maker as recipe_maker
+from email_assistant.fakes import ScriptedChatModel
+from email_assistant.persistence import SqliteStore, sqlite_persistence
+
+def per_session(db, args):
+    def session(user):
+        start = time.perf_counter()
+        agent = recipe_maker.create_triage_agent(SqliteStore(db))
+        history, first = [], None
+        for turn in range(args.turns):
+            history.append(HumanMessage(content=f"What should I buy this week, round {turn}?"))
+            history = agent.invoke({"messages": history})["messages"]
+            first = first or time.perf_counter() - start
+        return first, (agent, history)
+
+    return session
+
+def shared(db, args):
+    checkpointer, store = sqlite_persistence(db)
+    agent = recipe_maker.create_triage_agent(store, checkpointer=checkpointer)
+
+    def session(user):
+        start = time.perf_counter()
+        config, first = {"configurable": {"thread_id": str(uuid.uuid4())}}, None
+        for turn in range(args.turns):
+            agent.invoke({"messages": [HumanMessage(content=f"What should I buy this week, round {turn}?")]}, config)
+            first = first or time.perf_counter() - start
+        return first, config
+
+    return session
+
+def run(name, factory, db, args):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    session = factory(db, args)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(session, range(args.users)))
+    elapsed = time.perf_counter() - start
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    first = sorted(first for first, _ in results)
+    print(
+        f"  {name:<12} cold session p50 {statistics.median(first) * 1000:7.1f} ms   p95 {first[int(len(first) * 0.95)] * 1000:7.1f} ms"
+        f"   memory/session {retained / args.users / 1024:7.1f} KiB   total {elapsed:5.1f} s"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-session agents against one shared agent")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    model = ScriptedChatModel(respond=lambda messages, schema: "=== Grocery List === Rice, beans, greens", latency_s=args.latency_ms / 1000)
+    recipe_maker.init_chat_model = lambda *a, **kw: model
+    print(f"{args.users} sessions, {args.concurrency} at a time, {args.turns} turns each, {args.latency_ms:.0f} ms per model call")
+    with tempfile.TemporaryDirectory() as tmp:
+        run("per-session", per_session, Path(tmp) / "per_session.sqlite", args)
+        run("shared", shared, Path(tmp) / "shared.sqlite", args)
+
+if __name__ == "__main__":
+    main()
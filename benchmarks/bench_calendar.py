@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Benchmark calendar availability over 30-day ranges.
+
+Compares the per-day approach (one ``events.list`` call and one free-slot loop
+per date) with the availability engine (one ``freebusy.query`` and a single
+interval sweep), against an in-memory calendar with simulated API latency.
+
+    python benchmarks/bench_calendar.py --days 30 --events-per-day 8 --latency-ms 80
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from email_assistant.tools.gmail.calendar_availability import (
+    WorkingHours,
+    get_availability,
+    merge_intervals,
+    parse_datetime,
+    subtract_intervals,
+)
+from email_assistant.tools.gmail.fakes import FakeCalendarService
+
+def build_calendar(start: date, days: int, events_per_day: int, tz: ZoneInfo, latency_s: float) -> FakeCalendarService:
+    rng = random.Random(0)
+    service = FakeCalendarService(latency_s=latency_s)
+    for d in range(days):
+        day = start + timedelta(days=d)
+        for _ in range(events_per_day):
+            begin = datetime(day.year, day.month, day.day, rng.randint(7, 18), rng.choice((0, 15, 30, 45)), tzinfo=tz)
+            service.add_event(begin, begin + timedelta(minutes=rng.choice((15, 30, 60, 90))))
+    return service
+
+def per_day(service: FakeCalendarService, days: list, hours: WorkingHours) -> int:
+    """One events.list per date, free slots computed day by day."""
+    slots = 0
+    for day in days:
+        start = datetime.combine(day, datetime.min.time(), tzinfo=hours.tzinfo)
+        end = start + timedelta(days=1)
+        items = service.events().list(calendarId="primary", timeMin=start.isoformat(), timeMax=end.isoformat()).execute()["items"]
+        busy = merge_intervals((parse_datetime(e["start"]["dateTime"]), parse_datetime(e["end"]["dateTime"])) for e in items)
+        slots += len(subtract_intervals([hours.window(day)], busy))
+    return slots
+
+def engine(service: FakeCalendarService, days: list, hours: WorkingHours) -> int:
+    """One freebusy.query for the whole range, one sweep over all days."""
+    availability = get_availability(service, [d.strftime("%d-%m-%Y") for d in days], hours)
+    return sum(len(d.free) for d in availability.days)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark calendar availability lookups")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--events-per-day", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    hours = WorkingHours(timezone="America/Los_Angeles")
+    start = date(2025, 6, 2)
+    days = [start + timedelta(days=d) for d in range(args.days)]
+    service = build_calendar(start, args.days, args.events_per_day, hours.tzinfo, args.latency_ms / 1000)
+
+    print(f"{args.days} days, {args.events_per_day} events/day, {args.latency_ms:.0f} ms simulated latency")
+    for name, fn in [("per-day events.list", per_day), ("freebusy engine", engine)]:
+        service.calls.clear()
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            slots = fn(service, days, hours)
+            timings.append(time.perf_counter() - t0)
+        calls = sum(service.calls.values()) // args.repeat
+        print(f"  {name:<22} best {min(timings) * 1000:8.1f} ms  {calls:>3} API calls  {slots} free slots")
+
+if __name__ == "__main__":
+    main()
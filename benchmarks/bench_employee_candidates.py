@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Measure recall at k and prompt size for the candidate stage ahead of the
+employee matcher's LLM call (``EmployeeIndex.candidates``).
+
+For the cases in ``session0/test_employee_matcher.py`` (with every
+plausible answer for the ambiguous ones), recall at k is the share of
+expected employees found in the top k candidates. Targets are also derived
+from employees of a synthetic roster of ``--size``: unmarked abbreviations
+("jco"), misspelt last names, swapped letters in a first name, and misspelt
+full names. Only targets the index flags as ambiguous are kept, since
+only those reach the model. Synthetic names repeat, and a misspelt last name cannot tell
+apart the employees who share it. For those targets, a hit is any
+candidate with the intended name: the same last name, the same first name,
+the same full name, or for abbreviations the same initial and last-name
+prefix. Prompt tokens (about four characters per token) compare the whole
+roster with the top ``MAX_CANDIDATES`` rows.
+
+    PYTHONPATH=.:benchmarks python benchmarks/bench_employee_candidates.py --size 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from bench_employee_index import roster
+from session0.employee_index import EmployeeIndex
+from session0.employee_matcher import MAX_CANDIDATES, SYSTEM_PROMPT, _USER_TEMPLATE
+from session0.test_employee_matcher import _EMPLOYEES_CSV, _TOP_MATCH_CASES
+
+KS = [1, 3, 5, 10, 25, 50]
+TEST_CASES = [(target, {expected}) for target, expected in _TOP_MATCH_CASES] + [
+    ("jco", {1, 4}),
+    ("che", {3}),
+    ("john", {1, 2}),
+]
+
+def recall(index, cases, k):
+    found = [len(expected & {emp_id for emp_id, _ in index.candidates(target, k=k)}) / len(expected) for target, expected in cases]
+    return statistics.mean(found)
+
+def hit_rate(index, cases, k):
+    rows = {emp_id: row for row, emp_id in enumerate(index.ids)}
+    return statistics.mean(
+        any(intended(index, rows[emp_id]) for emp_id, _ in index.candidates(target, k=k)) for target, intended in cases
+    )
+
+def misspell(word, rng):
+    i = rng.randrange(1, len(word))
+    return word[:i] + rng.choice("aeiou") + word[i + 1:]
+
+def synthetic_cases(index, count, rng):
+    cases = {"abbreviation": [], "misspelt last": [], "swapped first": [], "misspelt full": []}
+    for row in rng.sample(range(len(index)), count):
+        first, last = index.first[row], index.last[row]
+        swap = rng.randrange(len(first) - 1)
+        cases["abbreviation"].append(
+            (first[0] + last[:2], lambda ix, r, first=first, last=last: ix.first[r][:1] == first[0] and ix.last[r][:2] == last[:2])
+        )
+        cases["misspelt last"].append((misspell(last, rng), lambda ix, r, last=last: ix.last[r] == last))
+        cases["swapped first"].append(
+            (first[:swap] + first[swap + 1] + first[swap] + first[swap + 2:], lambda ix, r, first=first: ix.first[r] == first)
+        )
+        cases["misspelt full"].append(
+            (f"{first} {misspell(last, rng)}", lambda ix, r, first=first, last=last: (ix.first[r], ix.last[r]) == (first, last))
+        )
+    return cases
+
+def prompt_tokens(employees_csv):
+    return (len(SYSTEM_PROMPT) + len(_USER_TEMPLATE.format(employees_csv=employees_csv, target="jco"))) / 4
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall at k and token savings of employee candidate pruning")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    index = EmployeeIndex.from_csv(_EMPLOYEES_CSV)
+    print("Recall at k, session0 test cases")
+    print("  " + "   ".join(f"k={k:<3} {recall(index, TEST_CASES, k):5.2f}" for k in KS))
+
+    rng = random.Random(0)
+    csv_text = roster(args.size, rng)
+    index = EmployeeIndex.from_csv(csv_text)
+    cases = synthetic_cases(index, args.queries, rng)
+    index.candidates("warm up the lazy indexes", k=MAX_CANDIDATES)
+    print(f"\nIntended name in the top k, {args.size:,} synthetic employees, {args.queries} targets per kind before filtering")
+    for kind, kind_cases in cases.items():
+        kind_cases = [case for case in kind_cases if index.match(case[0], limit=1).ambiguous]
+        if not kind_cases:
+            continue
+        start = time.perf_counter()
+        for target, _ in kind_cases:
+            index.candidates(target, k=MAX_CANDIDATES)
+        latency = (time.perf_counter() - start) / len(kind_cases)
+        scores = "   ".join(f"k={k:<3} {hit_rate(index, kind_cases, k):5.2f}" for k in KS)
+        print(f"  {kind:<14} {len(kind_cases):4d} targets   {scores}   {latency * 1000:6.1f} ms/query at k={MAX_CANDIDATES}")
+
+    sample = index.candidates(cases["misspelt full"][0][0], k=MAX_CANDIDATES)
+    full, pruned = prompt_tokens(csv_text), prompt_tokens(index.to_csv(sample))
+    print(f"\nPrompt tokens per LLM call: whole roster {full:,.0f}, top {MAX_CANDIDATES} {pruned:,.0f} ({full / pruned:,.0f}x fewer)")
+
+if __name__ == "__main__":
+    main()
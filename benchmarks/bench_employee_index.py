@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Benchmark the local employee index (``session0/employee_index.py``) at
+several roster sizes.
+
+Rosters of synthetic "Last, First" names are built as CSV text. For each
+size the benchmark reports the parse + index time and the mean latency of
+initials, partial-name, initial + last-name, full-name and fuzzy
+(misspelt) queries, returning every match and only the top ``--limit``. The fuzzy query's first run also builds the trigram
+index. The CSV's size in tokens (about four characters per token) shows
+what one LLM lookup used to send.
+
+    PYTHONPATH=. python benchmarks/bench_employee_index.py --sizes 1000 100000 1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from session0.employee_index import EmployeeIndex
+
+SYLLABLES = ["an", "ba", "ce", "dor", "el", "fa", "gri", "han", "is", "jo", "ka", "lin", "mo", "ne", "or", "pa", "qui", "ro", "sa", "ta", "ul", "ve", "wen", "ya", "zo"]
+
+def roster(size, rng):
+    def name(parts):
+        return "".join(rng.choice(SYLLABLES) for _ in range(parts)).capitalize()
+
+    rows = [f'{emp_id},"{name(rng.randint(2, 4))}, {name(rng.randint(1, 3))}"' for emp_id in range(1, size + 1)]
+    return "empId,empName\n" + "\n".join(rows) + "\n"
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.mean(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local employee index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20, help="Result cap for the limited queries")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for size in args.sizes:
+        csv_text = roster(size, rng)
+        start = time.perf_counter()
+        index = EmployeeIndex.from_csv(csv_text)
+        build = time.perf_counter() - start
+        sample = index.names[size // 2]
+        last, first = [part.strip() for part in sample.split(",")]
+        queries = {
+            "initials": f"{first[0]}{last[0]}",
+            "partial": last[:4].lower(),
+            "initial+last": f"{first[0]}{last[:3]}",
+            "full name": f"{first} {last}",
+            "fuzzy": f"{first} {last[:-2]}x",
+        }
+        start = time.perf_counter()
+        index.match(queries["fuzzy"])
+        trigram_build = time.perf_counter() - start
+        print(f"\n{size:,} employees: CSV {len(csv_text) / 4:,.0f} tokens, index built in {build:.2f} s (+{trigram_build:.2f} s trigrams on first fuzzy query)")
+        for kind, query in queries.items():
+            matches = len(index.match(query).matches)
+            repeats = args.repeats if kind != "fuzzy" else max(1, args.repeats // 20)
+            mean = timed(lambda: index.match(query), repeats)
+            top = timed(lambda: index.match(query, limit=args.limit), repeats)
+            print(
+                f"  {kind:<13} {query!r:<20} {matches:7,d} matches   all {mean * 1e6:10.1f} us"
+                f"   top {args.limit} {top * 1e6:10.1f} us"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Benchmark ``fetch_group_emails`` against an in-memory Gmail mailbox.
+
+Runs the fetch loop at several log levels so the cost of logging on the hot
+path is visible, and prints the ``gmail.fetch`` stage metrics for the last run.
+
+    python benchmarks/bench_fetch.py --threads 2000 --messages-per-thread 3
+"""
+
+import argparse
+import io
+import logging
+import time
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail import gmail_tools
+from email_assistant.tools.gmail.fakes import FakeGmailService
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler
+
+USER_EMAIL = "me@example.com"
+
+# The fake mailbox has no quota, so measure the loop itself rather than throttling
+UNTHROTTLED = RequestScheduler(units_per_second=None)
+
+def run_once(service: FakeGmailService, level: int) -> float:
+    """Drain ``fetch_group_emails`` once with the module logger at ``level``."""
+    gmail_tools.logger.setLevel(level)
+    get_metrics("gmail.fetch").reset()
+    start = time.perf_counter()
+    count = sum(1 for _ in gmail_tools.fetch_group_emails(USER_EMAIL, minutes_since=60, service=service, scheduler=UNTHROTTLED))
+    elapsed = time.perf_counter() - start
+    assert count > 0
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Gmail fetch loop")
+    parser.add_argument("--threads", type=int, default=1000)
+    parser.add_argument("--messages-per-thread", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = FakeGmailService.with_mailbox(USER_EMAIL, args.threads, args.messages_per_thread)
+    total = args.threads * args.messages_per_thread
+
+    # Send log output to an in-memory sink so terminal I/O does not dominate
+    sink = logging.StreamHandler(io.StringIO())
+    logging.getLogger().handlers[:] = [sink]
+
+    print(f"Mailbox: {args.threads} threads, {total} messages")
+    for name, level in [("WARNING", logging.WARNING), ("INFO", logging.INFO), ("DEBUG", logging.DEBUG)]:
+        best = min(run_once(service, level) for _ in range(args.repeat))
+        print(f"  level={name:<8} best of {args.repeat}: {best * 1000:8.1f} ms  ({total / best:,.0f} msg/s)")
+
+    print("Stage metrics (last run):")
+    for stage, timing in get_metrics("gmail.fetch").snapshot()["timings"].items():
+        print(f"  {stage:<12} {timing['count']:>7}x  {timing['total_s'] * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
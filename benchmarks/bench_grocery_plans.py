@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Benchmark grocery plan latency for a repeat request, a settings change and a
+fresh plan.
+
+The model is ``ScriptedChatModel`` with ``--latency-ms`` per call plus
+``--ms-per-word`` for each word it writes, so a diff that returns two
+sections costs less than a full plan. The store is a ``SqliteStore`` in a
+temporary file. Each round asks for a fresh plan ("full"), asks again with
+the same settings ("cache"), then raises the budget ("diff").
+
+    python benchmarks/bench_grocery_plans.py --rounds 10 --latency-ms 300
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import email_assistant.recipe_maker as recipe_maker
+from email_assistant.fakes import ScriptedChatModel
+from email_assistant.persistence import SqliteStore
+from email_assistant.streaming import TokenStream
+
+SECTIONS = ["Produce", "Proteins", "Grains", "Dairy", "Pantry", "Frozen"]
+PLAN = "\n\n".join([
+    "=== Grocery List ===\n" + "\n".join(f"{name}:\n" + "\n".join(f"- {name} item {i} $3" for i in range(6)) for name in SECTIONS),
+    "=== Estimated Cost Summary ===\n" + "\n".join(f"{name} subtotal: $18" for name in SECTIONS) + "\nTotal estimated cost: $108",
+    "=== Meal Ideas ===\n" + "\n".join(f"• Meal idea {i} with a short description of how to cook it" for i in range(10)),
+])
+DIFF = "=== Grocery List ===\nProteins:\n- Salmon $12\n- Tofu $3\n\n=== Estimated Cost Summary ===\nTotal estimated cost: $117"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cached and incremental grocery plans")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--ms-per-word", type=float, default=5.0)
+    args = parser.parse_args()
+
+    def respond(messages, schema):
+        reply = DIFF if "Return ONLY the parts that change" in messages[-1].content else PLAN
+        time.sleep(len(reply.split()) * args.ms_per_word / 1000)
+        return reply
+
+    model = ScriptedChatModel(respond=respond, latency_s=args.latency_ms / 1000)
+    recipe_maker.init_chat_model = lambda *a, **kw: model
+    samples = {"full": [], "cache": [], "diff": []}
+    with tempfile.TemporaryDirectory() as tmp, SqliteStore(Path(tmp) / "plans.sqlite") as store:
+        agent = recipe_maker.create_triage_agent(store)
+        for round_ in range(args.rounds):
+            budget = 100 + 10 * round_
+            for message, settings in [
+                ("Give me a new grocery list for this week", {"store": "Costco", "budget": budget}),
+                ("What groceries should I buy this week?", {"store": "Costco", "budget": budget}),
+                ("What groceries should I buy this week?", {"store": "Costco", "budget": budget + 5}),
+            ]:
+                start = time.perf_counter()
+                stream = TokenStream(agent, {"messages": [("user", message)], "grocery_settings": settings}, nodes={"generate_recipe"})
+                for _ in stream:
+                    pass
+                samples[stream.final_state["plan_source"]].append(time.perf_counter() - start)
+
+    print(f"{args.rounds} rounds, {args.latency_ms:.0f} ms per model call + {args.ms_per_word:.0f} ms per word")
+    for source, times in samples.items():
+        print(f"  {source:<6} {len(times):3d} requests   mean {statistics.mean(times) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Benchmark in-process ingestion against ingestion through a LangGraph server.
+
+The server path is simulated with ``FakeLangGraphClient`` (each SDK call
+costs ``--latency-ms``, and the graph itself is not run), so this measures
+the per-email overhead that ``LocalIngestor`` removes. The local path runs a
+small graph with a store write and a ``--model-latency-ms`` sleep (standing
+in for the LLM call) per email, loaded from a temporary ``langgraph.json``.
+
+    python benchmarks/bench_local_ingest.py --emails 2000 --threads 500 --latency-ms 5 --model-latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+
+from email_assistant.tools.gmail.fakes import FakeLangGraphClient
+from email_assistant.tools.gmail.local_ingest import LocalIngestor
+from email_assistant.tools.gmail.run_ingest import ingest_email_to_langgraph
+
+GRAPH = textwrap.dedent('''
+    import time
+    from langgraph.graph import END, START, StateGraph
+    from langgraph.store.base import BaseStore
+    from typing import TypedDict
+
+    class State(TypedDict):
+        email_input: dict
+
+    def triage(state: State, store: BaseStore):
+        time.sleep({model_latency_s})
+        store.put(("senders",), state["email_input"]["from"], {{"subject": state["email_input"]["subject"]}})
+        return {{}}
+
+    graph = StateGraph(State).add_node(triage).add_edge(START, "triage").add_edge("triage", END).compile()
+''')
+
+def make_emails(count, threads):
+    return [
+        {
+            "id": f"msg-{i:07d}",
+            "thread_id": f"thread-{i % threads:06d}",
+            "from_email": f"sender{i % 97}@example.com",
+            "to_email": "me@example.com",
+            "subject": f"Subject {i}",
+            "page_content": "Hello",
+            "send_time": "",
+        }
+        for i in range(count)
+    ]
+
+async def through_server(emails, latency_s):
+    client = FakeLangGraphClient(latency_s)
+    for email_data in emails:
+        await ingest_email_to_langgraph(email_data, "toy", client=client)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local vs server ingestion")
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--model-latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    emails = make_emails(args.emails, args.threads)
+
+    start = time.perf_counter()
+    asyncio.run(through_server(emails, args.latency_ms / 1000))
+    server = time.perf_counter() - start
+    print(f"{args.emails} emails in {args.threads} threads, {args.model_latency_ms:.0f} ms per model call")
+    print(f"  server ({args.latency_ms:.0f} ms/call, graph not run): {server:7.2f} s  ({args.emails / server:8,.0f} emails/s)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "toy_graph.py").write_text(GRAPH.format(model_latency_s=args.model_latency_ms / 1000))
+        config = Path(tmp) / "langgraph.json"
+        config.write_text(json.dumps({"graphs": {"toy": "./toy_graph.py:graph"}}))
+        for workers in (1, 8, 32):
+            with LocalIngestor("toy", max_workers=workers, config_path=config) as ingestor:
+                start = time.perf_counter()
+                ingestor.ingest_all(emails)
+                elapsed = time.perf_counter() - start
+            print(f"  local ({workers} workers):    {elapsed:7.2f} s  ({args.emails / elapsed:8,.0f} emails/s)")
+
+if __name__ == "__main__":
+    main()
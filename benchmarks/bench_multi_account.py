@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Benchmark multi-account ingestion against in-memory Gmail mailboxes.
+
+Compares polling every account one after the other (a LangGraph client per
+email, as the single-account cron does) with ``MultiAccountIngestor``, then
+simulates a day of cron runs to show how many polls volume-adaptive
+scheduling saves when most accounts are quiet.
+
+    python benchmarks/bench_multi_account.py --accounts 100 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from langgraph.store.memory import InMemoryStore
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail import request_scheduler
+from email_assistant.tools.gmail.fakes import FakeGmailService, FakeLangGraphClient
+from email_assistant.tools.gmail.multi_account import AccountStateStore, MultiAccountIngestor, PollPolicy
+from email_assistant.tools.gmail.run_ingest import (
+    build_search_query,
+    get_email_data,
+    ingest_email_to_langgraph,
+    list_messages,
+)
+
+GRAPH = "email_assistant_hitl_memory_gmail"
+
+def make_accounts(count, busy_fraction, emails_per_busy, latency_s):
+    """Mailboxes where ``busy_fraction`` of accounts have mail waiting."""
+    services = {}
+    busy = max(1, int(count * busy_fraction))
+    for a in range(count):
+        email = f"user{a:04d}@example.com"
+        service = FakeGmailService(latency_s=latency_s)
+        for i in range(emails_per_busy if a < busy else 0):
+            service.add_message(f"{email}-thread-{i}", from_email="sender@example.com", to_email=email, subject=f"Email {i}", body="Hi")
+        services[email] = service
+    return services
+
+async def sequential(services, latency_s):
+    """Poll accounts one at a time, connecting to LangGraph for each email."""
+    for email, service in services.items():
+        scheduler = request_scheduler.get_request_scheduler("gmail", email)
+        for m in list_messages(service, build_search_query(email, 60), scheduler):
+            email_data = get_email_data(service, m["id"], scheduler)
+            await ingest_email_to_langgraph(email_data, GRAPH, client=FakeLangGraphClient(latency_s))
+
+async def shared(services, latency_s, max_workers):
+    ingestor = MultiAccountIngestor(
+        list(services),
+        GRAPH,
+        client=FakeLangGraphClient(latency_s),
+        service_factory=lambda account: services[account.email],
+        state_store=AccountStateStore(InMemoryStore()),
+        max_workers=max_workers,
+    )
+    try:
+        return await ingestor.run_once()
+    finally:
+        ingestor.close()
+
+def simulate_day(services, busy, runs, interval_s):
+    """Run the ingestor every ``interval_s`` on a simulated clock and count polls.
+
+    Each run, the ``busy`` accounts receive a new email and everything already
+    ingested is marked read.
+    """
+    now = [0.0]
+    ingestor = MultiAccountIngestor(
+        list(services),
+        GRAPH,
+        client=FakeLangGraphClient(),
+        service_factory=lambda account: services[account.email],
+        state_store=AccountStateStore(InMemoryStore()),
+        policy=PollPolicy(min_interval_s=interval_s, max_interval_s=6 * interval_s),
+        clock=lambda: now[0],
+    )
+    polled = 0
+    for r in range(runs):
+        for email, service in services.items():
+            for message in service.mailbox.values():
+                message["labelIds"] = [label for label in message["labelIds"] if label != "UNREAD"]
+            if email in busy:
+                service.add_message(f"run-{r}", from_email="sender@example.com", to_email=email, subject=f"Run {r}", body="Hi")
+        polled += asyncio.run(ingestor.run_once())["polled"]
+        now[0] += interval_s
+    ingestor.close()
+    return polled
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-account Gmail ingestion")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--busy-fraction", type=float, default=0.2)
+    parser.add_argument("--emails-per-busy", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--max-workers", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=144, help="Cron runs to simulate (144 = a day every 10 minutes)")
+    args = parser.parse_args()
+    latency_s = args.latency_ms / 1000
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    services = make_accounts(args.accounts, args.busy_fraction, args.emails_per_busy, latency_s)
+    busy = {email for email, service in services.items() if service.mailbox}
+    emails = sum(len(s.mailbox) for s in services.values())
+    print(f"{args.accounts} accounts, {emails} emails waiting, {args.latency_ms:.0f} ms per API call")
+
+    start = time.perf_counter()
+    asyncio.run(sequential(services, latency_s))
+    baseline = time.perf_counter() - start
+    print(f"  sequential:          {baseline:7.2f} s  ({args.accounts / baseline:6.1f} accounts/s)")
+
+    get_metrics("gmail.multi_account").reset()
+    start = time.perf_counter()
+    summary = asyncio.run(shared(services, latency_s, args.max_workers))
+    elapsed = time.perf_counter() - start
+    assert summary["emails"] == emails
+    print(f"  shared pool ({args.max_workers:>2}):    {elapsed:7.2f} s  ({args.accounts / elapsed:6.1f} accounts/s, {baseline / elapsed:.1f}x)")
+
+    for service in services.values():
+        service.latency_s = 0.0
+    polled = simulate_day(services, busy, args.runs, 600)
+    naive = args.runs * args.accounts
+    print(f"Polls over {args.runs} runs: {polled} adaptive vs {naive} every run ({1 - polled / naive:.0%} fewer)")
+
+if __name__ == "__main__":
+    main()
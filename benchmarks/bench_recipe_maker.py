@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Benchmark the recipe maker's latency per grocery request before and after
+folding preference extraction into the triage call.
+
+The model is ``ScriptedChatModel`` with ``--latency-ms`` per call, and the
+store is a ``SqliteStore`` in a temporary file. "Before" replays the old
+pipeline's sequence of calls: a text triage call, a blocking preference
+update, the grocery list, and another blocking preference update. "After"
+runs the current graph. There the request's grocery keywords decide the
+route without a triage call (``--ambiguous`` uses a request that needs the
+one structured triage call instead), and preferences are extracted and
+written in the background. Cached grocery plans are dropped before each
+request so every run generates its list (see ``bench_grocery_plans.py`` for
+the cache itself).
+
+    python benchmarks/bench_recipe_maker.py --requests 20 --latency-ms 300
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from langchain_core.messages import HumanMessage
+
+import email_assistant.recipe_maker as recipe_maker
+from email_assistant.fakes import ScriptedChatModel
+from email_assistant.persistence import SqliteStore
+from email_assistant.streaming import TokenStream
+
+REQUEST = "I'm trying to eat more fish. What groceries should I buy this week?"
+# No grocery keywords, so the triage model call is needed
+AMBIGUOUS_REQUEST = "Fish twice a week from now on. Plan what I pick up at the store?"
+
+def respond(messages, schema):
+    if schema is recipe_maker.TriageDecision:
+        return {"category": "grocery_list_request", "analysis": "Weekly groceries", "food_preferences": "Pescatarian"}
+    if schema is recipe_maker.FoodPreferences:
+        return {"chain_of_thought": "Likes fish", "food_preferences": "Pescatarian"}
+    return "Category: grocery_list_request" if "Category:" in messages[-1].content else "=== Grocery List === Salmon, rice, greens"
+
+def before(store, model):
+    """The old pipeline: four model calls, two of them blocking store writes."""
+    start = time.perf_counter()
+    preferences = recipe_maker.get_food_preferences(store)
+    model.invoke([HumanMessage(content=f"Respond with:\nCategory: ...\nUser Input: {REQUEST}")])
+    recipe_maker.update_food_preferences(store, recipe_maker.PREFERENCES_NAMESPACE, [{"role": "user", "content": REQUEST}], preferences)
+    first_token = None
+    for _ in model.stream([HumanMessage(content=REQUEST)]):
+        first_token = first_token or time.perf_counter() - start
+    recipe_maker.update_food_preferences(store, recipe_maker.PREFERENCES_NAMESPACE, [{"role": "user", "content": REQUEST}], preferences)
+    return first_token, time.perf_counter() - start
+
+def after(agent, store, request):
+    for item in store.search(recipe_maker.PLANS_NAMESPACE, limit=1000):
+        store.delete(recipe_maker.PLANS_NAMESPACE, item.key)
+    start = time.perf_counter()
+    stream = TokenStream(agent, {"messages": [("user", request)]}, nodes={"generate_recipe"})
+    for _ in stream:
+        pass
+    return stream.time_to_first_token, time.perf_counter() - start
+
+def report(name, samples, calls):
+    first_tokens, totals = zip(*samples)
+    print(
+        f"  {name:<7} {calls} model calls   first token {statistics.mean(first_tokens) * 1000:7.0f} ms"
+        f"   total {statistics.mean(totals) * 1000:7.0f} ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recipe maker latency per request")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--ambiguous", action="store_true", help="Use a request the keyword rules cannot route")
+    args = parser.parse_args()
+
+    model = ScriptedChatModel(respond=respond, latency_s=args.latency_ms / 1000)
+    recipe_maker.init_chat_model = lambda *a, **kw: model
+    print(f"{args.requests} grocery requests, {args.latency_ms:.0f} ms per model call")
+    with tempfile.TemporaryDirectory() as tmp:
+        with SqliteStore(Path(tmp) / "before.sqlite") as store:
+            samples = [before(store, model) for _ in range(args.requests)]
+            report("before", samples, len(model.calls) // args.requests)
+        model._calls.clear()
+        with SqliteStore(Path(tmp) / "after.sqlite") as store:
+            agent = recipe_maker.create_triage_agent(store)
+            request = AMBIGUOUS_REQUEST if args.ambiguous else REQUEST
+            samples = [after(agent, store, request) for _ in range(args.requests)]
+            recipe_maker.preference_store(store).flush()
+            report("after", samples, len(model.calls) // args.requests)
+
+if __name__ == "__main__":
+    main()
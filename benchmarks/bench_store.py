@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Benchmark put/get/search latency of ``SqliteStore`` against ``InMemoryStore``
+and LangChain's ``LocalFileStore`` (one file per key, as the recipe maker
+used to keep its memory).
+
+``--keys`` items are spread over ``--namespaces`` namespaces. Each store is
+timed on single puts and gets of random keys, on batched ``mget``/``mset``
+of ``--batch`` keys, and on a filtered search within one namespace.
+``LocalFileStore`` has no namespaces or search, so it gets composed flat keys
+and its search row is left empty.
+
+    python benchmarks/bench_store.py --keys 100000 --namespaces 100
+"""
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from langchain.storage import LocalFileStore
+from langgraph.store.memory import InMemoryStore
+
+from email_assistant.persistence import SqliteStore
+
+class FileStoreAdapter:
+    """Gives ``LocalFileStore`` the namespace + key calls the benchmark makes."""
+
+    def __init__(self, path):
+        self.store = LocalFileStore(path)
+
+    def put(self, namespace, key, value):
+        self.store.mset([("/".join([*namespace, key]), json.dumps(value).encode())])
+
+    def get(self, namespace, key):
+        return self.store.mget(["/".join([*namespace, key])])[0]
+
+    def mset(self, namespace, items):
+        self.store.mset([("/".join([*namespace, key]), json.dumps(value).encode()) for key, value in items.items()])
+
+    def mget(self, namespace, keys):
+        return self.store.mget(["/".join([*namespace, key]) for key in keys])
+
+class MemoryStoreAdapter:
+    """Batched calls on ``InMemoryStore`` through its ``batch`` API."""
+
+    def __init__(self):
+        self.store = InMemoryStore()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def mset(self, namespace, items):
+        for key, value in items.items():
+            self.store.put(namespace, key, value)
+
+    def mget(self, namespace, keys):
+        return [self.store.get(namespace, key) for key in keys]
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return statistics.mean(ordered) * 1e6, ordered[int(len(ordered) * 0.99)] * 1e6
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def run(name, store, args, rng):
+    namespaces = [("users", f"u{n}", "prefs") for n in range(args.namespaces)]
+    per_namespace = args.keys // args.namespaces
+
+    def value(i):
+        return {"cuisine": rng.choice(["thai", "italian", "mexican"]), "spice": i % 5, "notes": "x" * 200}
+
+    start = time.perf_counter()
+    for namespace in namespaces:
+        items = {f"k{i}": value(i) for i in range(per_namespace)}
+        for begin in range(0, per_namespace, args.batch):
+            store.mset(namespace, dict(list(items.items())[begin:begin + args.batch]))
+    load = time.perf_counter() - start
+
+    def random_key():
+        return rng.choice(namespaces), f"k{rng.randrange(per_namespace)}"
+
+    rows = {
+        "put": timed(lambda: store.put(*random_key(), value(0)), args.repeats),
+        "get": timed(lambda: store.get(*random_key()), args.repeats),
+        f"mset x{args.batch}": timed(
+            lambda: store.mset(rng.choice(namespaces), {f"k{rng.randrange(per_namespace)}": value(0) for _ in range(args.batch)}),
+            max(1, args.repeats // 10),
+        ),
+        f"mget x{args.batch}": timed(
+            lambda: store.mget(rng.choice(namespaces), [f"k{rng.randrange(per_namespace)}" for _ in range(args.batch)]),
+            max(1, args.repeats // 10),
+        ),
+    }
+    if hasattr(store, "search"):
+        rows["search"] = timed(
+            lambda: store.search(rng.choice(namespaces), filter={"cuisine": "thai"}, limit=10),
+            max(1, args.repeats // 10),
+        )
+    print(f"\n{name}: loaded {args.keys:,} keys in {load:.1f} s ({args.keys / load:,.0f} keys/s)")
+    for operation, samples in rows.items():
+        mean, p99 = percentiles(samples)
+        print(f"  {operation:<12} mean {mean:9.1f} us   p99 {p99:9.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SqliteStore against InMemoryStore and LocalFileStore")
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--namespaces", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--skip-file-store", action="store_true", help="Skip LocalFileStore, which is slow to load")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run("InMemoryStore", MemoryStoreAdapter(), args, random.Random(0))
+        with SqliteStore(Path(tmp) / "store.sqlite") as store:
+            run("SqliteStore (WAL)", store, args, random.Random(0))
+        if not args.skip_file_store:
+            run("LocalFileStore", FileStoreAdapter(Path(tmp) / "files"), args, random.Random(0))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Benchmark the recipe maker's keyword rules: the old per-keyword substring
+scans against the compiled ``route_by_rules`` matcher, and how often the
+rules decide the route so the triage model call is skipped.
+
+Messages come from ``--corpus`` (one chat message per line) or are generated
+from templates mixing grocery requests, preference statements and small talk.
+
+    python benchmarks/bench_triage_router.py --messages 100000
+    python benchmarks/bench_triage_router.py --corpus chat_log.txt
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+
+from email_assistant.recipe_maker import (
+    _PREFERENCE_PATTERN,
+    _RECIPE_PATTERN,
+    PREFERENCE_UPDATE_PHRASES,
+    RECIPE_KEYWORDS,
+    route_by_rules,
+)
+
+TEMPLATES = [
+    "Can you make me a grocery list for the week?",
+    "What should I buy at Costco for {n} people on a ${n}0 budget?",
+    "Plan my meals for the week, I'm trying to hit {n}00 calories a day",
+    "I'm allergic to {item}, keep that in mind",
+    "I love {item} and I hate {item2}",
+    "I prefer quick weeknight dinners with {item}",
+    "Thanks, that looks good!",
+    "How are you today?",
+    "Can you summarize what we talked about?",
+    "Swap the {item} for {item2} please",
+    "My favorite cuisine is Thai",
+    "What's a good wine for a party of {n}?",
+]
+ITEMS = ["peanuts", "lemons", "tofu", "salmon", "cilantro", "mushrooms", "oat milk", "chickpeas"]
+
+def make_corpus(count, rng):
+    return [
+        rng.choice(TEMPLATES).format(n=rng.randint(2, 9), item=rng.choice(ITEMS), item2=rng.choice(ITEMS))
+        for _ in range(count)
+    ]
+
+def substring_rules(message):
+    lower = message.lower()
+    return any(k in lower for k in RECIPE_KEYWORDS), any(p in lower for p in PREFERENCE_UPDATE_PHRASES)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recipe maker's keyword router")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--corpus", type=str, help="File with one chat message per line")
+    args = parser.parse_args()
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = [line.strip() for line in f if line.strip()]
+    else:
+        corpus = make_corpus(args.messages, random.Random(0))
+
+    start = time.perf_counter()
+    old = [substring_rules(message) for message in corpus]
+    old_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for message in corpus:
+        lower = message.lower()
+        _RECIPE_PATTERN.findall(lower), _PREFERENCE_PATTERN.findall(lower)
+    scan_s = time.perf_counter() - start
+    start = time.perf_counter()
+    new = [route_by_rules(message) for message in corpus]
+    new_s = time.perf_counter() - start
+
+    disagreements = sum(
+        (d.category is not None, bool(d.preference_terms)) != o for d, o in zip(new, old)
+    )
+    fast = sum(d.category is not None and not d.mentions_preferences for d in new)
+    terms = Counter(term for d in new for term in d.recipe_terms)
+    print(f"{len(corpus):,} messages")
+    print(f"  substring scans:  {old_s * 1e6 / len(corpus):6.2f} us/message")
+    print(f"  compiled scans:   {scan_s * 1e6 / len(corpus):6.2f} us/message (matching only)")
+    print(f"  route_by_rules:   {new_s * 1e6 / len(corpus):6.2f} us/message (with provenance), {disagreements} disagreements")
+    print(f"  decided by rules: {fast / len(corpus):6.1%} of messages skip the triage model call")
+    print(f"  top matched terms: {', '.join(f'{t} ({c:,})' for t, c in terms.most_common(5))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+"""Local name matching over an employee roster.
+
+``EmployeeIndex`` parses the *empId,empName* CSV once into parallel column
+arrays and answers initials ("JC"), partial-name ("che"), initial plus
+last-name ("JCo") and full-name ("john corn", "Corn, John") queries from
+sorted prefix indexes, without a model call. Results are ``(empId, empName)``
+tuples, best first, with ties kept in roster order.
+
+A query is flagged ``ambiguous`` when the index cannot settle it on its own:
+nothing matches exactly or by prefix (only the trigram/fuzzy reading, if
+any), or the only reading is an initial-plus-last-name abbreviation that the
+query's capitalisation does not mark ("jco" rather than "JCo").
+``find_employee_matches`` sends only those queries to the LLM.
+"""
+
+import csv
+import heapq
+import io
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bound for prefix range scans on the sorted keys
+_MAX_CHAR = "\U0010ffff"
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['-][^\W_]+)*")
+# "JCo": the capitals mark where the first-name initial ends
+_MARKED_ABBREVIATION = re.compile(r"^[A-Z][A-Z][a-z'-]*$")
+
+# Match tiers, best first
+EXACT_NAME, INITIALS, FIRST_NAME, LAST_NAME, NAME_PREFIX, INITIAL_LAST_PREFIX, FIRST_PREFIX, LAST_PREFIX = range(8)
+
+@dataclass
+class MatchResult:
+    """Matches for one query.
+
+    Attributes
+    ----------
+    matches : List[Tuple[int, str]]
+        ``(empId, empName)`` tuples, best first
+    ambiguous : bool
+        ``True`` when the index could not settle the query (see module docs)
+    fuzzy : bool
+        ``True`` when the matches come from trigram similarity only
+    """
+
+    matches: List[Tuple[int, str]] = field(default_factory=list)
+    ambiguous: bool = False
+    fuzzy: bool = False
+
+class _SortedKeys:
+    """Sorted string keys with the roster row of each, for prefix lookups."""
+
+    __slots__ = ("keys", "rows")
+
+    def __init__(self, keys: Sequence[str]):
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[i] for i in order]
+        self.rows = array("i", order)
+
+    def prefix(self, prefix: str) -> array:
+        start = bisect_left(self.keys, prefix)
+        return self.rows[start:bisect_left(self.keys, prefix + _MAX_CHAR, start)]
+
+    def exact(self, key: str) -> array:
+        start = bisect_left(self.keys, key)
+        return self.rows[start:bisect_left(self.keys, key + "\0", start)]
+
+def _split_name(name: str) -> Tuple[str, str]:
+    """Split "Last, First" into lower-cased ``(first, last)``."""
+    last, _, first = name.partition(",")
+    return " ".join(first.lower().split()), " ".join(last.lower().split())
+
+def _trigrams(text: str) -> set:
+    """Trigrams of each word, padded so word starts and ends count."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+_SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(["aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"]) for letter in letters}
+# Rows taken from each initials or Soundex bucket before ranking candidates
+_CANDIDATE_POOL_FACTOR = 40
+# Longest single word read as initials ("jco")
+_MAX_ABBREVIATION = 4
+
+def _soundex(word: str) -> str:
+    """American Soundex code of *word* ("" for no letters)."""
+    letters = [c for c in word.lower() if c in _SOUNDEX_CODES]
+    if not letters:
+        return ""
+    code, previous = [letters[0].upper()], _SOUNDEX_CODES[letters[0]]
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES[letter]
+        if digit != "0" and digit != previous:
+            code.append(digit)
+        # "h" and "w" do not separate letters with the same code
+        if letter not in "hw":
+            previous = digit
+    return "".join(code + ["0", "0", "0"])[:4]
+
+def _edit_distance(a: str, b: str) -> int:
+    """Edit distance between *a* and *b*, counting a swap of adjacent letters as one edit."""
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        before, previous = previous, current
+    return previous[-1]
+
+def _initial_pairs(tokens: Sequence[str]) -> List[str]:
+    """Initials readings of a target: for a short abbreviation, its first letter with each of the others."""
+    if len(tokens) > 1:
+        return [tokens[0][:1] + tokens[-1][:1], tokens[-1][:1] + tokens[0][:1]]
+    token = tokens[0]
+    if len(token) > _MAX_ABBREVIATION:
+        return []
+    return list(dict.fromkeys(token[0] + letter for letter in token[1:]))
+
+class EmployeeIndex:
+    """Column arrays and name indexes for one roster.
+
+    Parameters
+    ----------
+    ids : Sequence[int]
+        Employee IDs, in roster order
+    names : Sequence[str]
+        Employee names in "Last, First" format, in roster order
+    """
+
+    def __init__(self, ids: Sequence[int], names: Sequence[str]):
+        self.ids = array("q", ids)
+        self.names = list(names)
+        self.first, self.last = map(list, zip(*map(_split_name, self.names))) if self.names else ([], [])
+
+        initials: Dict[str, array] = {}
+        for row, (first, last) in enumerate(zip(self.first, self.last)):
+            initials.setdefault(first[:1] + last[:1], array("i")).append(row)
+        self._initials = initials
+        self._by_first = _SortedKeys(self.first)
+        self._by_last = _SortedKeys(self.last)
+        # "j|corn" for initial + last-name lookups
+        self._by_initial_last = _SortedKeys([f"{first[:1]}|{last}" for first, last in zip(self.first, self.last)])
+        # Built on the first fuzzy or candidate query only
+        self._trigram_postings: Optional[Dict[str, array]] = None
+        self._trigram_counts: Optional[array] = None
+        self._soundex_postings: Optional[Dict[str, array]] = None
+
+    @classmethod
+    def from_csv(cls, employees_csv: str) -> "EmployeeIndex":
+        """Parse an *empId,empName* CSV (header optional, names "Last, First")."""
+        ids: List[int] = []
+        names: List[str] = []
+        for record in csv.reader(io.StringIO(employees_csv)):
+            if len(record) < 2:
+                continue
+            try:
+                emp_id = int(record[0])
+            except ValueError:
+                # Header row
+                continue
+            ids.append(emp_id)
+            names.append(",".join(record[1:]).strip())
+        return cls(ids, names)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def match(self, target: str, limit: Optional[int] = None, fuzzy_limit: int = 10) -> MatchResult:
+        """Match *target* against the roster.
+
+        Parameters
+        ----------
+        target : str
+            Initials, a partial name or a full name ("First Last" or "Last, First")
+        limit : Optional[int]
+            Most matches returned (all if ``None``); a short prefix can match
+            a large share of a big roster
+        fuzzy_limit : int
+            Most trigram matches returned when nothing matches by prefix
+
+        Returns
+        -------
+        MatchResult
+            Matches best first, and whether the query needs a model to settle
+        """
+        rows, ambiguous, fuzzy = self._match_rows(target, limit, fuzzy_limit)
+        return MatchResult(self._rows_to_matches(rows), ambiguous=ambiguous, fuzzy=fuzzy)
+
+    def candidates(self, target: str, k: int = 25) -> List[Tuple[int, str]]:
+        """Return the *k* roster entries most plausibly meant by *target*.
+
+        This is the retrieval stage ahead of the LLM: index matches come
+        first, then rows found by other readings of the target (any pair of
+        its leading letters as initials, Soundex codes of its words, trigram
+        similarity), ranked by edit distance to the closest name part.
+
+        Parameters
+        ----------
+        target : str
+            The query, as passed to ``match``
+        k : int
+            Number of candidates
+
+        Returns
+        -------
+        List[Tuple[int, str]]
+            ``(empId, empName)`` tuples, most plausible first
+        """
+        tokens = [token.lower() for token in _TOKEN_PATTERN.findall(target)]
+        if not tokens:
+            return []
+        # Cap each source so a common key on a big roster stays cheap to rank
+        cap = k * _CANDIDATE_POOL_FACTOR
+        matched, _, fuzzy = self._match_rows(target, limit=k, fuzzy_limit=cap)
+        # Trigram matches are only suggestions; they are ranked with the rest
+        ranked = [] if fuzzy else list(matched)
+        if len(ranked) < k:
+            seen = set(ranked)
+            pool: List[int] = list(matched) if fuzzy else []
+            for key in _initial_pairs(tokens):
+                pool.extend(self._initials.get(key, ())[:cap])
+            soundex = self._soundex_index()
+            for token in tokens:
+                pool.extend(soundex.get(_soundex(token), ())[:cap])
+            if not fuzzy and (not matched or len(tokens) > 1):
+                pool.extend(row for row, _ in self.fuzzy(" ".join(tokens), limit=cap, min_similarity=0.25))
+            pairs = set(_initial_pairs(tokens))
+            distances = {}
+            for row in pool:
+                if row not in seen and row not in distances:
+                    distances[row] = self._distance(tokens, row, pairs)
+            ranked += heapq.nsmallest(k - len(ranked), distances, key=lambda row: (distances[row], row))
+        return self._rows_to_matches(ranked[:k])
+
+    def to_csv(self, matches: Sequence[Tuple[int, str]]) -> str:
+        """Render ``(empId, empName)`` tuples as an *empId,empName* CSV."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(["empId", "empName"])
+        writer.writerows(matches)
+        return buffer.getvalue()
+
+    def _distance(self, tokens: Sequence[str], row: int, pairs: set) -> float:
+        """Edit distance from the target to the closest reading of *row*'s name."""
+        first, last = self.first[row], self.last[row]
+        if len(tokens) > 1:
+            query = " ".join(tokens)
+            return min(_edit_distance(query, f"{first} {last}"), _edit_distance(query, f"{last} {first}"))
+        token = tokens[0]
+        best = min(
+            _edit_distance(token, first[:len(token)]),
+            _edit_distance(token, last[:len(token)]),
+            _edit_distance(token, (first + last)[:len(token)]),
+        )
+        # An initials reading ranks just behind a one-letter slip
+        return min(best, 1.5) if first[:1] + last[:1] in pairs else best
+
+    def _match_rows(self, target: str, limit: Optional[int], fuzzy_limit: int) -> Tuple[List[int], bool, bool]:
+        tokens = [token.lower() for token in _TOKEN_PATTERN.findall(target)]
+        if not tokens:
+            return [], False, False
+
+        tiers: List[Tuple[int, Sequence[int]]] = []
+        abbreviation_only = False
+        if len(tokens) >= 2:
+            first, last = (tokens[-1], tokens[0]) if "," in target else (tokens[0], tokens[-1])
+            candidates = [
+                (first, last),
+                # "Corn John" typed in roster order
+                (last, first),
+            ]
+            for first, last in candidates:
+                rows = self._intersect(self._by_first.prefix(first), self._by_last.prefix(last))
+                exact = [row for row in rows if self.first[row] == first and self.last[row] == last]
+                tiers += [(EXACT_NAME, exact), (NAME_PREFIX, rows)]
+                if rows:
+                    break
+        else:
+            token = tokens[0]
+            if len(token) == 2:
+                tiers.append((INITIALS, self._initials.get(token, ())))
+            tiers += [(FIRST_NAME, self._by_first.exact(token)), (LAST_NAME, self._by_last.exact(token))]
+            abbreviation = self._by_initial_last.prefix(f"{token[0]}|{token[1:]}") if len(token) >= 3 else ()
+            tiers += [
+                (INITIAL_LAST_PREFIX, abbreviation),
+                (FIRST_PREFIX, self._by_first.prefix(token)),
+                (LAST_PREFIX, self._by_last.prefix(token)),
+            ]
+            abbreviation_only = bool(abbreviation) and not any(rows for tier, rows in tiers if tier != INITIAL_LAST_PREFIX)
+            abbreviation_only = abbreviation_only and not _MARKED_ABBREVIATION.match(target.strip())
+
+        rows = self._ranked(tiers, limit)
+        if rows:
+            return rows, abbreviation_only, False
+        fuzzy = [row for row, _ in self.fuzzy(" ".join(tokens), limit=fuzzy_limit)]
+        return fuzzy, True, bool(fuzzy)
+
+    def fuzzy(self, text: str, limit: int = 10, min_similarity: float = 0.4) -> List[Tuple[int, float]]:
+        """Return ``(row, similarity)`` for names sharing the most trigrams with *text*.
+
+        Similarity is the share of the trigrams of *text* found in the name,
+        so a misspelt last name alone can still match "First Last"; ties go
+        to the shorter name, then roster order. Rows below *min_similarity*
+        are dropped.
+        """
+        postings, counts = self._trigram_index()
+        query = _trigrams(text.lower())
+        overlap: Counter = Counter()
+        for gram in query:
+            overlap.update(postings.get(gram, ()))
+        threshold = min_similarity * len(query)
+        scored = [(row, shared) for row, shared in overlap.items() if shared >= threshold]
+        scored.sort(key=lambda item: (-item[1], counts[item[0]], item[0]))
+        return [(row, shared / len(query)) for row, shared in scored[:limit]]
+
+    def _soundex_index(self) -> Dict[str, array]:
+        if self._soundex_postings is None:
+            postings: Dict[str, array] = {}
+            for row, (first, last) in enumerate(zip(self.first, self.last)):
+                for code in {_soundex(first), _soundex(last)}:
+                    postings.setdefault(code, array("i")).append(row)
+            self._soundex_postings = postings
+        return self._soundex_postings
+
+    def _trigram_index(self) -> Tuple[Dict[str, array], array]:
+        if self._trigram_postings is None:
+            postings: Dict[str, array] = {}
+            counts = array("H")
+            for row, (first, last) in enumerate(zip(self.first, self.last)):
+                grams = _trigrams(f"{first} {last}")
+                counts.append(min(len(grams), 0xFFFF))
+                for gram in grams:
+                    postings.setdefault(gram, array("i")).append(row)
+            self._trigram_postings, self._trigram_counts = postings, counts
+        return self._trigram_postings, self._trigram_counts
+
+    @staticmethod
+    def _intersect(left: Sequence[int], right: Sequence[int]) -> List[int]:
+        if len(left) > len(right):
+            left, right = right, left
+        smaller = set(left)
+        return [row for row in right if row in smaller]
+
+    @staticmethod
+    def _ranked(tiers: Sequence[Tuple[int, Sequence[int]]], limit: Optional[int] = None) -> List[int]:
+        """Rows ordered by best tier, then roster order, stopping after *limit*."""
+        ranked: List[int] = []
+        seen: set = set()
+        for _, rows in sorted(tiers, key=lambda item: item[0]):
+            remaining = None if limit is None else limit - len(ranked)
+            if remaining is not None and remaining <= 0:
+                break
+            new = [row for row in rows if row not in seen] if seen else rows
+            new = sorted(new) if remaining is None else heapq.nsmallest(remaining, new)
+            ranked.extend(new)
+            seen.update(new)
+        return ranked
+
+    def _rows_to_matches(self, rows) -> List[Tuple[int, str]]:
+        ids, names = self.ids, self.names
+        return [(ids[row], names[row]) for row in rows]
+
+@lru_cache(maxsize=4)
+def load_index(employees_csv: str) -> EmployeeIndex:
+    """Return the index for *employees_csv*, parsing each roster only once."""
+    return EmployeeIndex.from_csv(employees_csv)
+
+__all__ = ["EmployeeIndex", "MatchResult", "load_index"]
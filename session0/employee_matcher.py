@@ -7,13 +7,15 @@ is provided so that the unit tests in ``session0/test_employee_matcher.py`` can
 run without any modifications.
 """
 
-from typing import List, Tuple
+from typing import Dict, List, Sequence, Tuple
 import os
 import textwrap
 import json
 
 import openai
 
+from session0.employee_index import load_index
+
 # -------------------------------------------------------------------------------------
 # Participants –– replace the string below with your carefully-crafted system prompt.
 # -------------------------------------------------------------------------------------
@@ -50,6 +52,28 @@ _USER_TEMPLATE = textwrap.dedent(
     """
 )
 
+# Batch lookups: one <User input> block per ambiguous target, answered in one call
+_BATCH_USER_TEMPLATE = textwrap.dedent(
+    """
+    <Queries>
+{queries}
+    </Queries>
+    """
+)
+
+_BATCH_INSTRUCTIONS: str = """
+
+You will receive several <User input> blocks, each with its own id, employee list and
+target string. Match each target ONLY against the employees listed in its own block,
+using the rules above, and return one entry per block:
+{"results": [{"id": 0, "matches": [{"empId": 27, "empName": "Bacon, Patrick"}]}, ...]}
+"""
+
+# Roster rows sent to the model per query: the most plausible candidates from the
+# local index rather than the whole CSV, so the prompt size does not grow with the
+# company
+MAX_CANDIDATES: int = 25
+
 # -------------------------------------------------------------------------------------
 # Internal helpers – nothing to change below this line
 # -------------------------------------------------------------------------------------
@@ -119,6 +143,61 @@ def _call_llm(employees_csv: str, target: str, model: str = "gpt-4.1") -> str:
     return response.choices[0].message.content  # type: ignore[attr-defined]
 
 
+_BATCH_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer", "description": "Id of the <User input> block"},
+                    "matches": _RESPONSE_SCHEMA["properties"]["matches"],
+                },
+                "required": ["id", "matches"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+
+
+def _call_llm_batch(queries: Sequence[Tuple[str, str]], model: str = "gpt-4.1") -> str:
+    """Send several ``(employees_csv, target)`` lookups in one request.
+
+    Each lookup becomes a ``<User input id="...">`` block numbered by its
+    position in *queries*; the reply holds one result per id.
+    """
+    _initialise_openai()
+
+    blocks = "\n".join(
+        _USER_TEMPLATE.format(employees_csv=employees_csv, target=target).replace(
+            "<User input>", f'<User input id="{i}">', 1
+        )
+        for i, (employees_csv, target) in enumerate(queries)
+    )
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT + _BATCH_INSTRUCTIONS},
+        {"role": "user", "content": _BATCH_USER_TEMPLATE.format(queries=blocks)},
+    ]
+
+    response = openai.chat.completions.create(
+        model=model,
+        messages=messages,  # type: ignore[arg-type]
+        temperature=0,
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": "employee_matches_batch",
+                "schema": _BATCH_RESPONSE_SCHEMA,
+            },
+        },
+    )
+    return response.choices[0].message.content  # type: ignore[attr-defined]
+
+
 # -----------------------------------------------------------------------------
 # JSON helper
 # -----------------------------------------------------------------------------
@@ -166,6 +245,31 @@ def _parse_json_output(text: str) -> List[Tuple[int, str]]:
     return results
 
 
+def _parse_batch_json_output(text: str, count: int) -> List[List[Tuple[int, str]]]:
+    """Parse a batch response into one list of ``(empId, empName)`` tuples per query.
+
+    Queries the model left out, or answered with no valid matches, get an
+    empty list rather than failing the whole batch.
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise ValueError("Response was not valid JSON:\n" + text) from exc
+
+    if not isinstance(data, dict) or not isinstance(data.get("results"), list):
+        raise ValueError("JSON does not contain a 'results' list: " + text)
+
+    results: List[List[Tuple[int, str]]] = [[] for _ in range(count)]
+    for item in data["results"]:
+        if not isinstance(item, dict) or not isinstance(item.get("id"), int) or not 0 <= item["id"] < count:
+            continue
+        try:
+            results[item["id"]] = _parse_json_output(json.dumps({"matches": item.get("matches")}))
+        except ValueError:
+            continue
+    return results
+
+
 # -------------------------------------------------------------------------------------
 # Public API – this is what the tests import.
 # -------------------------------------------------------------------------------------
@@ -183,11 +287,64 @@ def find_employee_matches(target: str, employees_csv: str) -> List[Tuple[int, st
     Returns
     -------
     List[Tuple[int, str]]
-        Ordered best-to-worst candidate matches as parsed from the LLM's JSON
-        structured output.
+        Ordered best-to-worst candidate matches. Initials, partial and full
+        names are matched by the local ``EmployeeIndex`` (the roster is parsed
+        once per CSV); only targets it flags as ambiguous are parsed from the
+        LLM's JSON structured output. The model only sees the
+        ``MAX_CANDIDATES`` roster rows the index finds most plausible.
     """
-    raw_response = _call_llm(employees_csv=employees_csv, target=target)
+    index = load_index(employees_csv)
+    result = index.match(target)
+    if not result.ambiguous:
+        return result.matches
+    candidates = index.candidates(target, k=MAX_CANDIDATES)
+    if not candidates:
+        return []
+    raw_response = _call_llm(employees_csv=index.to_csv(candidates), target=target)
     return _parse_json_output(raw_response)
 
 
-__all__ = ["find_employee_matches", "SYSTEM_PROMPT"] 
\ No newline at end of file
+def find_employee_matches_batch(targets: Sequence[str], employees_csv: str) -> List[List[Tuple[int, str]]]:
+    """Return candidate (empId, empName) tuples for each of *targets*.
+
+    Parameters
+    ----------
+    targets : Sequence[str]
+        Free-form inputs, e.g. every attendee on a meeting invite
+    employees_csv : str
+        CSV string containing *empId,empName* records – one per line.
+
+    Returns
+    -------
+    List[List[Tuple[int, str]]]
+        One ordered best-to-worst list per target, in the order of *targets*.
+        The roster is indexed once; targets the index settles are answered
+        locally, and the ambiguous ones (each distinct target once, with its
+        own ``MAX_CANDIDATES`` candidates) share a single structured-output
+        LLM call.
+    """
+    index = load_index(employees_csv)
+    results: List[List[Tuple[int, str]]] = []
+    pending: Dict[str, List[int]] = {}
+    for position, target in enumerate(targets):
+        result = index.match(target)
+        results.append(result.matches)
+        if result.ambiguous:
+            pending.setdefault(target, []).append(position)
+
+    queries = []
+    for target, positions in pending.items():
+        candidates = index.candidates(target, k=MAX_CANDIDATES)
+        if candidates:
+            queries.append((index.to_csv(candidates), target))
+        for position in positions:
+            results[position] = []
+    if queries:
+        raw_response = _call_llm_batch(queries)
+        for (_, target), matches in zip(queries, _parse_batch_json_output(raw_response, len(queries))):
+            for position in pending[target]:
+                results[position] = list(matches)
+    return results
+
+
+__all__ = ["find_employee_matches", "find_employee_matches_batch", "SYSTEM_PROMPT", "MAX_CANDIDATES"] 
\ No newline at end of file
@@ -0,0 +1,112 @@
+from typing import List, Tuple
+
+import pytest
+
+import session0.employee_matcher as employee_matcher
+from session0.employee_index import EmployeeIndex, load_index
+from session0.test_employee_matcher import _EMPLOYEES_CSV, _TOP_MATCH_CASES
+
+# -----------------------------------------------------------------------------
+# Runs offline: these targets never reach the LLM
+# -----------------------------------------------------------------------------
+_LOCAL_CASES: List[Tuple[str, List[int]]] = [
+    ("JC", [1, 3]),
+    ("JCo", [1]),
+    ("che", [3]),
+    ("john", [1, 2]),
+    ("Corn, John", [1]),
+    ("john corn", [1]),
+    ("  Casey   Johnson ", [2]),
+]
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    def fail(**kwargs):
+        raise AssertionError(f"Unexpected LLM call for {kwargs['target']!r}")
+
+    monkeypatch.setattr(employee_matcher, "_call_llm", fail)
+
+
+@pytest.mark.parametrize("target,expected_id", _TOP_MATCH_CASES)
+def test_top_match_locally(no_llm, target: str, expected_id: int):
+    assert employee_matcher.find_employee_matches(target, _EMPLOYEES_CSV)[0][0] == expected_id
+
+
+@pytest.mark.parametrize("target,expected_ids", _LOCAL_CASES)
+def test_local_match_order(no_llm, target: str, expected_ids: List[int]):
+    matches = employee_matcher.find_employee_matches(target, _EMPLOYEES_CSV)
+    assert [emp_id for emp_id, _ in matches] == expected_ids
+    assert all(isinstance(name, str) and "," in name for _, name in matches)
+
+
+def test_ambiguous_targets_fall_back_to_the_llm(monkeypatch):
+    calls = []
+
+    def fake_llm(employees_csv: str, target: str, model: str = "gpt-4.1") -> str:
+        calls.append((target, employees_csv))
+        return '{"matches": [{"empId": 1, "empName": "Corn, John"}, {"empId": 4, "empName": "Oliver, Jacen"}]}'
+
+    monkeypatch.setattr(employee_matcher, "_call_llm", fake_llm)
+    assert [emp_id for emp_id, _ in employee_matcher.find_employee_matches("jco", _EMPLOYEES_CSV)] == [1, 4]
+    employee_matcher.find_employee_matches("JCo", _EMPLOYEES_CSV)
+    assert [target for target, _ in calls] == ["jco"]
+    # Only the candidates are sent, not the roster
+    monkeypatch.setattr(employee_matcher, "MAX_CANDIDATES", 2)
+    employee_matcher.find_employee_matches("jco", _EMPLOYEES_CSV)
+    assert calls[-1][1] == 'empId,empName\n1,"Corn, John"\n3,"Cheddar, Joe"\n'
+    assert employee_matcher.find_employee_matches("xq", _EMPLOYEES_CSV) == []
+
+
+def test_fuzzy_candidates_for_misspellings():
+    index = EmployeeIndex.from_csv(_EMPLOYEES_CSV)
+    result = index.match("chedar")
+    assert result.ambiguous and result.fuzzy and result.matches[0] == (3, "Cheddar, Joe")
+    assert index.match("zzz").matches == []
+    assert load_index(_EMPLOYEES_CSV) is load_index(_EMPLOYEES_CSV)
+
+
+# Every plausible answer from the live test cases, and the k that must find them
+_RECALL_CASES: List[Tuple[str, List[int], int]] = [
+    *[(target, [expected_id], 1) for target, expected_id in _TOP_MATCH_CASES],
+    ("jco", [1, 4], 3),
+    ("che", [3], 1),
+    ("john", [1, 2], 2),
+    ("jhon", [1], 1),
+    ("Casy Jonson", [2], 1),
+]
+
+
+@pytest.mark.parametrize("target,expected_ids,k", _RECALL_CASES)
+def test_candidates_recall(target: str, expected_ids: List[int], k: int):
+    candidates = [emp_id for emp_id, _ in load_index(_EMPLOYEES_CSV).candidates(target, k=k)]
+    assert set(expected_ids) <= set(candidates)
+
+
+def test_batch_answers_locally_and_groups_ambiguous_targets(no_llm, monkeypatch):
+    calls = []
+
+    def fake_batch(queries, model: str = "gpt-4.1") -> str:
+        calls.append([target for _, target in queries])
+        return (
+            '{"results": [{"id": 1, "matches": [{"empId": 3, "empName": "Cheddar, Joe"}]},'
+            ' {"id": 0, "matches": [{"empId": 1, "empName": "Corn, John"}, {"empId": 4, "empName": "Oliver, Jacen"}]}]}'
+        )
+
+    monkeypatch.setattr(employee_matcher, "_call_llm_batch", fake_batch)
+    results = employee_matcher.find_employee_matches_batch(["JC", "jco", "chedar", "jco", "xq", "che"], _EMPLOYEES_CSV)
+
+    assert calls == [["jco", "chedar"]]
+    assert [[emp_id for emp_id, _ in matches] for matches in results] == [[1, 3], [1, 4], [3], [1, 4], [], [3]]
+    # Nothing ambiguous: no model call at all
+    assert employee_matcher.find_employee_matches_batch(["pb", "john"], _EMPLOYEES_CSV) == [
+        [(5, "Bacon, Patrick")],
+        [(1, "Corn, John"), (2, "Johnson, Casey")],
+    ]
+    assert len(calls) == 1
+
+
+def test_batch_tolerates_missing_results():
+    assert employee_matcher._parse_batch_json_output('{"results": [{"id": 1, "matches": []}, {"id": 7}]}', 2) == [[], []]
+    with pytest.raises(ValueError):
+        employee_matcher._parse_batch_json_output("not json", 1)
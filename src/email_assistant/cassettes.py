@@ -0,0 +1,213 @@
+"""
+Record and replay chat-model calls.
+
+A ``Cassette`` is a JSON file of recorded model responses keyed on a hash of
+the normalized request: the model name and settings, the prompt messages
+(role, content and tool calls, with whitespace collapsed and ISO dates
+masked so the "Today's date" line in the prompts doesn't change the key),
+the bound tools and the structured-output schema. ``Cassette.init_chat_model``
+is a drop-in for ``langchain.chat_models.init_chat_model`` whose models answer
+from the file, so a suite that runs the agent graphs against a cassette is
+deterministic and needs no network or credentials.
+
+Modes:
+
+* ``replay``: answer from the cassette; a request that isn't recorded raises
+  ``CassetteMiss``. The live model is never constructed.
+* ``record``: answer from the cassette and call the live model only for
+  requests that aren't recorded yet.
+* ``rerecord``: call the live model for every request and replace the
+  cassette with what this run made, dropping stale entries.
+
+``save`` writes the file; it is a no-op in ``replay`` mode.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain.chat_models import init_chat_model as init_live_chat_model
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, PrivateAttr
+
+MODES = ("replay", "record", "rerecord")
+CASSETTE_VERSION = 1
+
+_WHITESPACE = re.compile(r"\s+")
+_ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+
+class CassetteMiss(KeyError):
+    """A request has no recorded response and the cassette is in ``replay`` mode."""
+
+def _normalize_text(text: str) -> str:
+    return _ISO_DATE.sub("<date>", _WHITESPACE.sub(" ", text).strip())
+
+def normalize_message(message: BaseMessage) -> dict:
+    """The parts of a message that identify a request.
+
+    Message and tool-call ids are left out: they are generated per run.
+    """
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+    entry: Dict[str, Any] = {"role": message.type, "content": _normalize_text(content)}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        entry["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in tool_calls]
+    return entry
+
+def request_key(request: dict) -> str:
+    """Hash of a normalized request."""
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+class Cassette:
+    """Recorded model responses in a JSON file.
+
+    Args:
+        path: Cassette file
+        mode: ``replay``, ``record`` or ``rerecord``
+        live_model: ``init_chat_model``-style factory for the live model,
+            used when recording
+    """
+
+    def __init__(self, path: str, mode: str = "replay", live_model: Callable[..., BaseChatModel] = init_live_chat_model):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.path = Path(path)
+        self.mode = mode
+        self.live_model = live_model
+        self.hits = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        if mode != "rerecord" and self.path.exists():
+            self._entries = json.loads(self.path.read_text())["interactions"]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def fetch(self, request: dict, call_live: Callable[[], dict]) -> dict:
+        """The recorded response to ``request``, calling ``call_live`` to record it if needed."""
+        key = request_key(request)
+        with self._lock:
+            # In rerecord mode the entries are only those recorded by this run
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+        if entry is not None:
+            return entry["response"]
+        if self.mode == "replay":
+            raise CassetteMiss(
+                f"No recorded response for request {key} ({self.path}); re-record the cassette with an API key"
+            )
+        response = call_live()
+        with self._lock:
+            self._entries[key] = {"request": _describe(request), "response": response}
+            self.recorded += 1
+        return response
+
+    def save(self) -> None:
+        """Write the cassette, with entries sorted by key so re-records diff cleanly.
+
+        Responses keep their key order: tool-call args are replayed as recorded.
+        """
+        if self.mode == "replay":
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {"version": CASSETTE_VERSION, "interactions": dict(sorted(self._entries.items()))}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2) + "\n")
+        tmp.replace(self.path)
+
+    def init_chat_model(self, model: Optional[str] = None, **kwargs: Any) -> "CassetteChatModel":
+        """Drop-in for ``init_chat_model`` that answers from this cassette."""
+        return CassetteChatModel(cassette=self, model_name=model or "", model_kwargs=kwargs)
+
+def _describe(request: dict) -> dict:
+    """A short, readable summary of a request stored next to its response."""
+    last = request["messages"][-1] if request["messages"] else {"role": "", "content": ""}
+    return {
+        "model": request["model"],
+        "schema": request.get("schema", {}).get("name"),
+        "last_message": f"{last['role']}: {last['content'][:120]}",
+    }
+
+class CassetteChatModel(BaseChatModel):
+    """A chat model that answers from a ``Cassette``.
+
+    Supports the calls the agent graphs make: ``invoke``, ``bind_tools`` and
+    ``with_structured_output``.
+    """
+
+    cassette: Any
+    model_name: str
+    model_kwargs: Dict[str, Any] = {}
+    tools: List[Any] = []
+    tool_choice: Optional[Any] = None
+    _live: Optional[BaseChatModel] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def _live_model(self) -> BaseChatModel:
+        if self._live is None:
+            self._live = self.cassette.live_model(self.model_name or None, **self.model_kwargs)
+        return self._live
+
+    def _request(self, messages: Sequence[BaseMessage], **extra: Any) -> dict:
+        return {
+            "model": self.model_name,
+            "model_kwargs": self.model_kwargs,
+            "messages": [normalize_message(message) for message in messages],
+            **extra,
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        request = self._request(messages)
+        if self.tools:
+            request["tools"] = [convert_to_openai_tool(tool) for tool in self.tools]
+            request["tool_choice"] = self.tool_choice
+
+        def call_live() -> dict:
+            live = self._live_model()
+            if self.tools:
+                live = live.bind_tools(self.tools, tool_choice=self.tool_choice)
+            message = live.invoke(messages, stop=stop)
+            return {"content": message.content, "tool_calls": message.tool_calls}
+
+        response = self.cassette.fetch(request, call_live)
+        message = AIMessage(content=response["content"], tool_calls=response.get("tool_calls", []))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Optional[Any] = None, **kwargs: Any) -> "CassetteChatModel":
+        return self.model_copy(update={"tools": list(tools), "tool_choice": tool_choice})
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:
+        name = getattr(schema, "__name__", "structured")
+
+        def call(prompt: Any) -> Any:
+            messages = self._convert_input(prompt).to_messages()
+            request = self._request(messages, schema=convert_to_openai_tool(schema)["function"])
+
+            def call_live() -> dict:
+                result = self._live_model().with_structured_output(schema, **kwargs).invoke(messages)
+                return {"parsed": result.model_dump() if isinstance(result, BaseModel) else result}
+
+            parsed = self.cassette.fetch(request, call_live)["parsed"]
+            return schema(**parsed) if isinstance(schema, type) and issubclass(schema, BaseModel) else parsed
+
+        return RunnableLambda(call, name=f"cassette_{name}")
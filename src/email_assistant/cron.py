@@ -1,15 +1,29 @@
 import os
 import sys
 import asyncio
-from typing import Dict, Any, TypedDict
+from typing import Dict, Any, List, Optional, TypedDict, Union
 from dataclasses import dataclass, field
 from langgraph.graph import StateGraph, START, END
+from langgraph.store.base import BaseStore
+from langgraph_sdk import get_client
+from email_assistant.tools.gmail.multi_account import AccountStateStore, MultiAccountIngestor, PollPolicy
 from email_assistant.tools.gmail.run_ingest import fetch_and_process_emails
 
 @dataclass(kw_only=True)
 class JobKickoff:
-    """State for the email ingestion cron job"""
-    email: str
+    """State for the email ingestion cron job
+    
+    Set ``email`` to ingest one mailbox, or ``accounts`` to serve several from
+    one job. Each account is an email address or a dict with ``email`` and
+    where to find its Gmail token (``token_env``/``token_path``).
+    """
+    email: Optional[str] = None
+    accounts: List[Union[str, Dict[str, Any]]] = field(default_factory=list)
+    max_workers: int = 8
+    # How often the cron runs; busy accounts are polled every run, quiet ones
+    # back off to max_interval_minutes
+    schedule_minutes: int = 10
+    max_interval_minutes: int = 60
     minutes_since: int = 60
     graph_name: str = "email_assistant_hitl_memory_gmail"
     url: str = "http://127.0.0.1:2024"
@@ -18,8 +32,35 @@ class JobKickoff:
     early: bool = False
     skip_filters: bool = False
 
-async def main(state: JobKickoff):
+async def run_accounts(state: JobKickoff, store: Optional[BaseStore] = None):
+    """Ingest every due account with one worker pool and one LangGraph client"""
+    ingestor = MultiAccountIngestor(
+        state.accounts,
+        graph_name=state.graph_name,
+        client=get_client(url=state.url),
+        state_store=AccountStateStore(store),
+        policy=PollPolicy(
+            min_interval_s=state.schedule_minutes * 60,
+            max_interval_s=state.max_interval_minutes * 60,
+        ),
+        max_workers=state.max_workers,
+        minutes_since=state.minutes_since,
+        include_read=state.include_read,
+    )
+    try:
+        summary = await ingestor.run_once()
+    finally:
+        ingestor.close()
+    # One bad account should not fail the job for everyone else
+    all_failed = summary["polled"] > 0 and summary["failed"] == summary["polled"]
+    return {"status": "error" if all_failed else "success", **summary}
+
+async def main(state: JobKickoff, store: Optional[BaseStore] = None):
     """Run the email ingestion process"""
+    if state.accounts:
+        print(f"Kicking off job for {len(state.accounts)} accounts")
+        return await run_accounts(state, store)
+    
     print(f"Kicking off job to fetch emails from the past {state.minutes_since} minutes")
     print(f"Email: {state.email}")
     print(f"URL: {state.url}")
@@ -4,9 +4,9 @@ from langchain.chat_models import init_chat_model
 
 from email_assistant.tools import get_tools, get_tools_by_name
 from email_assistant.tools.default.prompt_templates import AGENT_TOOLS_PROMPT
-from email_assistant.prompts import triage_system_prompt, triage_user_prompt, agent_system_prompt, default_background, default_triage_instructions, default_response_preferences, default_cal_preferences
+from email_assistant.prompts import agent_system_prompt, default_background, default_response_preferences, default_cal_preferences
 from email_assistant.schemas import State, RouterSchema, StateInput
-from email_assistant.utils import parse_email, format_email_markdown
+from email_assistant.utils import parse_email, format_email_markdown, triage_messages
 
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Command
@@ -100,25 +100,12 @@ def triage_router(state: State) -> Command[Literal["response_agent", "__end__"]]
     - Messages meant for other teams
     """
     author, to, subject, email_thread = parse_email(state["email_input"])
-    system_prompt = triage_system_prompt.format(
-        background=default_background,
-        triage_instructions=default_triage_instructions
-    )
-
-    user_prompt = triage_user_prompt.format(
-        author=author, to=to, subject=subject, email_thread=email_thread
-    )
 
     # Create email markdown for Agent Inbox in case of notification  
     email_markdown = format_email_markdown(subject, author, to, email_thread)
 
-    # Run the router LLM
-    result = llm_router.invoke(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
-    )
+    # Run the router LLM (the same prompt the triage evaluation uses)
+    result = llm_router.invoke(triage_messages(state["email_input"]))
 
     # Decision
     classification = result.classification
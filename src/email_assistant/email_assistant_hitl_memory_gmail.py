@@ -8,7 +8,7 @@ from langgraph.types import interrupt, Command
 
 from email_assistant.tools import get_tools, get_tools_by_name
 from email_assistant.tools.gmail.prompt_templates import GMAIL_TOOLS_PROMPT
-from email_assistant.tools.gmail.gmail_tools import mark_as_read
+from email_assistant.tools.gmail.gmail_tools import queue_mark_as_read
 from email_assistant.prompts import triage_system_prompt, triage_user_prompt, agent_system_prompt_hitl_memory, default_triage_instructions, default_background, default_response_preferences, default_cal_preferences, MEMORY_UPDATE_INSTRUCTIONS, MEMORY_UPDATE_INSTRUCTIONS_REINFORCEMENT
 from email_assistant.schemas import State, RouterSchema, StateInput, UserPreferences
 from email_assistant.utils import parse_gmail, format_for_display, format_gmail_markdown
@@ -17,7 +17,7 @@ from dotenv import load_dotenv
 load_dotenv(".env")
 
 # Get tools with Gmail tools
-tools = get_tools(["send_email_tool", "schedule_meeting_tool", "check_calendar_tool", "Question", "Done"], include_gmail=True)
+tools = get_tools(["send_email_tool", "schedule_meeting_tool", "check_calendar_tool", "find_meeting_slots_tool", "Question", "Done"], include_gmail=True)
 tools_by_name = get_tools_by_name(tools)
 
 # Initialize the LLM for use with router / structured output
@@ -265,10 +265,11 @@ def interrupt_handler(state: State, store: BaseStore) -> Command[Literal["llm_ca
         # If tool is not in our HITL list, execute it directly without interruption
         if tool_call["name"] not in hitl_tools:
 
-            # Execute search_memory and other tools without interruption
+            # Execute search_memory and other tools without interruption. Invoking
+            # with the whole tool call returns a ToolMessage, which keeps the
+            # artifact of content_and_artifact tools such as check_calendar_tool
             tool = tools_by_name[tool_call["name"]]
-            observation = tool.invoke(tool_call["args"])
-            result.append({"role": "tool", "content": observation, "tool_call_id": tool_call["id"]})
+            result.append(tool.invoke(tool_call))
             continue
             
         # Get original email from email_input in state
@@ -472,7 +473,10 @@ def should_continue(state: State, store: BaseStore) -> Literal["interrupt_handle
 def mark_as_read_node(state: State):
     email_input = state["email_input"]
     author, to, subject, email_thread, email_id = parse_gmail(email_input)
-    mark_as_read(email_id)
+    # Batched with other emails' label changes into a single batchModify request,
+    # along with earlier unread messages from the thread ingested in the same run
+    for message_id in [email_id, *email_input.get("earlier_ids", [])]:
+        queue_mark_as_read(message_id)
 
 # Build workflow
 agent_builder = StateGraph(State)
@@ -1,42 +1,146 @@
-from langsmith import Client
-from langsmith import testing as t
+"""Evaluate the email assistant's triage decisions.
 
+By default only the router is evaluated: each example's email goes through the
+same prompt as ``triage_router`` and one structured model call, instead of the
+whole ``email_assistant`` graph (which would also draft replies for "respond"
+emails). Results are cached in a local JSONL file keyed on (example hash,
+prompt hash, model), so re-running an unchanged prompt costs nothing and only
+edited prompts or new examples reach the model.
+
+    # LangSmith experiment (creates the dataset if needed)
+    python src/email_assistant/eval/evaluate_triage.py --concurrency 16
+
+    # No LangSmith: results to local JSON or Parquet
+    python src/email_assistant/eval/evaluate_triage.py --offline --output eval/results/triage.json
+
+``--target graph`` evaluates the full graph as before.
+"""
+
+import argparse
+import hashlib
+import json
 import os
-import matplotlib.pyplot as plt
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
-from email_assistant.eval.email_dataset import examples_triage
-
-from email_assistant.email_assistant import email_assistant
+from langchain.chat_models import init_chat_model
 
-# Client 
-client = Client()
+from email_assistant.eval.email_dataset import examples_triage
+from email_assistant.schemas import RouterSchema
+from email_assistant.utils import triage_messages
 
 # Dataset name
 dataset_name = "Interrupt Workshop: E-mail Triage Dataset"
 
-# If the dataset doesn't exist, create it
-if not client.has_dataset(dataset_name=dataset_name):
+TRIAGE_MODEL = "openai:gpt-4.1"
+DEFAULT_CACHE = "eval/results/triage_cache.jsonl"
 
-    # Create the dataset
-    dataset = client.create_dataset(
-        dataset_name=dataset_name, 
-        description="A dataset of e-mails and their triage decisions."
-    )
+## Evaluator
+feedback_key = "classification" # Key saved to langsmith
+
+def classification_evaluator(outputs: dict, reference_outputs: dict) -> bool:
+    """Check if the answer exactly matches the expected answer."""
+    return outputs["classification_decision"].lower() == reference_outputs["classification"].lower()
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def example_hash(inputs: dict) -> str:
+    """Hash of an example's inputs."""
+    return _digest(inputs)
+
+def prompt_hash() -> str:
+    """Hash of the router prompt, so editing it invalidates cached results.
+
+    The prompt is rendered for a placeholder email, which covers the system
+    prompt, background, triage instructions and user template.
+    """
+    placeholder = {"author": "{author}", "to": "{to}", "subject": "{subject}", "email_thread": "{email_thread}"}
+    return _digest(triage_messages(placeholder))
+
+class TriageCache:
+    """Triage results in a JSONL file, keyed on (example hash, prompt hash, model).
+
+    Args:
+        path: File to load from and append to; ``None`` keeps results in memory
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        if self.path is not None and self.path.exists():
+            with self.path.open() as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    @staticmethod
+    def key(example: str, prompt: str, model: str) -> str:
+        return f"{example}:{prompt}:{model}"
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, output: dict) -> None:
+        entry = {"key": key, "output": output}
+        with self._lock:
+            self._entries[key] = entry
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+def make_triage_target(model: str = TRIAGE_MODEL, cache: Optional[TriageCache] = None, router: Any = None) -> Callable[[dict], dict]:
+    """Build a target that classifies an example's email with the router only.
+
+    Args:
+        model: Chat model for the router
+        cache: Result cache; ``None`` always calls the model
+        router: Structured-output runnable to use instead of ``model``
+
+    Returns:
+        ``target(inputs) -> {"classification_decision": ..., "cached": ...}``
+    """
+    router = router or init_chat_model(model, temperature=0.0).with_structured_output(RouterSchema)
+    prompt = prompt_hash()
 
-    # Add examples to the dataset
-    client.create_examples(dataset_id=dataset.id, examples=examples_triage)
+    def target(inputs: dict) -> dict:
+        key = TriageCache.key(example_hash(inputs), prompt, model)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            return {**cached["output"], "cached": True}
+        try:
+            result = router.invoke(triage_messages(inputs["email_input"]))
+        except Exception as e:
+            # Failures are reported but never cached
+            print(f"Error in triage router: {e}")
+            return {"classification_decision": "unknown", "cached": False}
+        output = {"classification_decision": result.classification}
+        if cache is not None:
+            cache.put(key, output)
+        return {**output, "cached": False}
+
+    return target
 
 # Target functions that run our email assistants
 def target_email_assistant(inputs: dict) -> dict:
     """Process an email through the workflow-based email assistant.
-    
+
     Args:
         inputs: A dictionary containing the email_input field from the dataset
-        
+
     Returns:
         A formatted dictionary with the assistant's response messages
     """
+    from email_assistant.email_assistant import email_assistant
+
     try:
         response = email_assistant.invoke({"email_input": inputs["email_input"]})
         if "classification_decision" in response:
@@ -48,67 +152,147 @@ def target_email_assistant(inputs: dict) -> dict:
         print(f"Error in workflow agent: {e}")
         return {"classification_decision": "unknown"}
 
-## Evaluator 
-feedback_key = "classification" # Key saved to langsmith
+def run_offline(target: Callable[[dict], dict], examples: Sequence[dict] = examples_triage, concurrency: int = 16) -> List[dict]:
+    """Run *target* over *examples* locally, ``concurrency`` at a time.
 
-def classification_evaluator(outputs: dict, reference_outputs: dict) -> bool:
-    """Check if the answer exactly matches the expected answer."""
-    return outputs["classification_decision"].lower() == reference_outputs["classification"].lower()
+    Returns:
+        One row per example, in order: example hash, expected and predicted
+        classification, whether they match, whether the result was cached,
+        and the latency in seconds
+    """
+    def run(example: dict) -> dict:
+        start = time.perf_counter()
+        outputs = target(example["inputs"])
+        return {
+            "example": example_hash(example["inputs"]),
+            "subject": example["inputs"]["email_input"].get("subject", ""),
+            "expected": example["outputs"]["classification"],
+            "predicted": outputs["classification_decision"],
+            "correct": classification_evaluator(outputs, example["outputs"]),
+            "cached": bool(outputs.get("cached")),
+            "latency_s": round(time.perf_counter() - start, 4),
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(pool.map(run, examples))
+
+def write_results(rows: List[dict], output: str) -> str:
+    """Write rows to JSON, or to Parquet when *output* ends in ``.parquet``."""
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    if output.endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("Writing Parquet requires pandas and pyarrow (pip install pandas pyarrow)") from e
+        pd.DataFrame(rows).to_parquet(output, index=False)
+    else:
+        with open(output, "w") as f:
+            json.dump(rows, f, indent=2)
+    return output
+
+def run_langsmith(target: Callable[[dict], dict], concurrency: int, experiment_prefix: str) -> float:
+    """Run the experiment on LangSmith and return the mean score."""
+    from langsmith import Client
+
+    # Client
+    client = Client()
+
+    # If the dataset doesn't exist, create it
+    if not client.has_dataset(dataset_name=dataset_name):
+
+        # Create the dataset
+        dataset = client.create_dataset(
+            dataset_name=dataset_name,
+            description="A dataset of e-mails and their triage decisions."
+        )
+
+        # Add examples to the dataset
+        client.create_examples(dataset_id=dataset.id, examples=examples_triage)
+
+    experiment_results = client.evaluate(
+        # Run agent
+        target,
+        # Dataset name
+        data=dataset_name,
+        # Evaluator
+        evaluators=[
+            classification_evaluator
+        ],
+        # Name of the experiment
+        experiment_prefix=experiment_prefix,
+        # Number of concurrent evaluations
+        max_concurrency=concurrency,
+    )
+
+    # Convert evaluation results to pandas dataframes
+    df = experiment_results.to_pandas()
+
+    # Calculate mean scores (values are on a 0-1 scale)
+    return df['feedback.classification_evaluator'].mean() if 'feedback.classification_evaluator' in df.columns else 0.0
+
+def plot_score(score: float, label: str) -> str:
+    """Save a bar plot of the score under eval/results and return its path."""
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    models = [label]
+    scores = [score]
+
+    # Create bars with distinct colors
+    plt.bar(models, scores, color=['#5DA5DA', '#FAA43A'][:len(models)], width=0.5)
+
+    # Add labels and title
+    plt.xlabel('Agent Type')
+    plt.ylabel('Average Score')
+    plt.title(f'Email Triage Performance Comparison - {feedback_key.capitalize()} Score')
+
+    # Add score values on top of bars
+    for i, value in enumerate(scores):
+        plt.text(i, value + 0.02, f'{value:.2f}', ha='center', fontweight='bold')
+
+    # Set y-axis limit
+    plt.ylim(0, 1.1)
+
+    # Add grid lines for better readability
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+
+    # Ensure the output directory exists
+    os.makedirs('eval/results', exist_ok=True)
+
+    # Save the plot with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    plot_path = f'eval/results/triage_comparison_{timestamp}.png'
+    plt.savefig(plot_path)
+    plt.close()
+    return plot_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate email triage decisions")
+    parser.add_argument("--target", choices=["triage", "graph"], default="triage", help="Router only, or the full email_assistant graph")
+    parser.add_argument("--model", default=TRIAGE_MODEL, help="Router model (triage target)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="Result cache file (triage target)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model")
+    parser.add_argument("--offline", action="store_true", help="Run locally without LangSmith")
+    parser.add_argument("--output", default=None, help="Offline results file (.json or .parquet)")
+    args = parser.parse_args()
+
+    if args.target == "triage":
+        cache = None if args.no_cache else TriageCache(args.cache)
+        target, label, prefix = make_triage_target(args.model, cache), "Triage Router", "E-mail assistant triage router"
+    else:
+        target, label, prefix = target_email_assistant, "Agentic Workflow", "E-mail assistant workflow"
 
-experiment_results_workflow = client.evaluate(
-    # Run agent 
-    target_email_assistant,
-    # Dataset name   
-    data=dataset_name,
-    # Evaluator
-    evaluators=[
-        classification_evaluator
-    ],
-    # Name of the experiment
-    experiment_prefix="E-mail assistant workflow", 
-    # Number of concurrent evaluations
-    max_concurrency=2, 
-)
-
-## Add visualization
-# Convert evaluation results to pandas dataframes
-df_workflow = experiment_results_workflow.to_pandas()
-
-# Calculate mean scores (values are on a 0-1 scale)
-workflow_score = df_workflow[f'feedback.classification_evaluator'].mean() if f'feedback.classification_evaluator' in df_workflow.columns else 0.0
-
-# Create a bar plot comparing the two models
-plt.figure(figsize=(10, 6))
-models = ['Agentic Workflow']
-scores = [workflow_score]
-
-# Create bars with distinct colors
-plt.bar(models, scores, color=['#5DA5DA', '#FAA43A'], width=0.5)
-
-# Add labels and title
-plt.xlabel('Agent Type')
-plt.ylabel('Average Score')
-plt.title(f'Email Triage Performance Comparison - {feedback_key.capitalize()} Score')
-
-# Add score values on top of bars
-for i, score in enumerate(scores):
-    plt.text(i, score + 0.02, f'{score:.2f}', ha='center', fontweight='bold')
-
-# Set y-axis limit
-plt.ylim(0, 1.1)
-
-# Add grid lines for better readability
-plt.grid(axis='y', linestyle='--', alpha=0.7)
-
-# Ensure the output directory exists
-os.makedirs('eval/results', exist_ok=True)
-
-# Save the plot with timestamp
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-plot_path = f'eval/results/triage_comparison_{timestamp}.png'
-plt.savefig(plot_path)
-plt.close()
-
-print(f"\nEvaluation visualization saved to: {plot_path}")
-print(f"Agent With Router Score: {workflow_score:.2f}")
+    if args.offline:
+        rows = run_offline(target, concurrency=args.concurrency)
+        score = sum(row["correct"] for row in rows) / len(rows)
+        output = args.output or f"eval/results/triage_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        print(f"Results written to: {write_results(rows, output)}")
+        print(f"{sum(row['cached'] for row in rows)}/{len(rows)} results from cache")
+    else:
+        score = run_langsmith(target, args.concurrency, prefix)
+        print(f"\nEvaluation visualization saved to: {plot_score(score, label)}")
+    print(f"{label} Score: {score:.2f}")
 
+if __name__ == "__main__":
+    main()
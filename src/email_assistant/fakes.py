@@ -0,0 +1,93 @@
+"""
+In-memory stand-in for a chat model.
+
+``ScriptedChatModel`` answers from a Python callable instead of a provider
+API, with an optional fixed latency per call, so tests and benchmarks can run
+the agent graphs without credentials or network access. It supports the
+calls the graphs make: ``invoke`` (and streaming, one chunk per word),
+``bind_tools`` and ``with_structured_output``.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Iterator, List, Optional, Type
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel, PrivateAttr
+
+class ScriptedChatModel(BaseChatModel):
+    """A chat model whose replies come from ``respond``.
+
+    Args:
+        respond: Called with the prompt messages and the requested schema
+            (``None`` for plain text). Returns the reply text (or an
+            ``AIMessage``, e.g. with tool calls), or for structured output an
+            instance of the schema or a dict of its fields
+        latency_s: Seconds each call takes
+
+    ``calls`` records the schema name (or ``"text"``) of every call made.
+    """
+
+    respond: Callable[[List[BaseMessage], Optional[Type[BaseModel]]], Any]
+    latency_s: float = 0.0
+    _calls: List[str] = PrivateAttr(default_factory=list)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def calls(self) -> List[str]:
+        with self._lock:
+            return list(self._calls)
+
+    def _record(self, name: str) -> None:
+        with self._lock:
+            self._calls.append(name)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._record("text")
+        reply = self.respond(messages, None)
+        message = reply if isinstance(reply, AIMessage) else AIMessage(content=str(reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        self._record("text")
+        words = str(self.respond(messages, None)).split(" ")
+        for i, word in enumerate(words):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        # ``respond`` decides which tools to call
+        return self
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:
+        def call(prompt: Any) -> Any:
+            messages = self._convert_input(prompt).to_messages()
+            self._record(getattr(schema, "__name__", "structured"))
+            result = self.respond(messages, schema)
+            return schema(**result) if isinstance(result, dict) else result
+
+        return RunnableLambda(call, name=f"scripted_{getattr(schema, '__name__', 'structured')}")
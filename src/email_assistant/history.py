@@ -0,0 +1,104 @@
+"""Bounded chat history for long conversations.
+
+``ChatWindow`` keeps the most recent messages verbatim and folds older turns
+into a running summary, so the history a UI holds and sends to an agent stays
+the same size however long the session runs. Turns are folded in batches
+(``fold_batch`` messages at a time) so the summarization call is made once per
+few turns rather than on every message, and the window always starts at a
+user turn.
+
+``trim_messages`` is the graph-side counterpart: it returns the
+``RemoveMessage`` updates that cap a ``MessagesState`` thread at a fixed
+number of messages.
+
+Summaries are recorded as the ``summarize`` stage of the ``chat.history``
+metrics.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, List, Sequence
+
+from langchain.chat_models import init_chat_model
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
+
+from email_assistant.metrics import get_metrics
+
+HISTORY_METRICS = "chat.history"
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and a grocery planning assistant.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Keep what later turns may refer back to: requests, decisions, changes the user asked for and
+anything they liked or rejected. Leave out full grocery lists, prices and meal descriptions.
+Reply with the updated summary only, in at most 150 words."""
+
+def render_turns(messages: Sequence[BaseMessage]) -> str:
+    """Render messages as ``User:``/``Assistant:`` lines for a prompt."""
+    return "\n".join(
+        f"{'User' if isinstance(message, HumanMessage) else 'Assistant'}: {message.content}" for message in messages
+    )
+
+def summarize_messages(summary: str, messages: Sequence[BaseMessage]) -> str:
+    """Fold ``messages`` into ``summary`` with one model call."""
+    llm = init_chat_model("gpt-4.1", temperature=0).with_config(tags=["nostream"])
+    prompt = SUMMARY_PROMPT.format(summary=summary or "(none yet)", turns=render_turns(messages))
+    return str(llm.invoke([HumanMessage(content=prompt)]).content).strip()
+
+@dataclass
+class ChatWindow:
+    """The last ``max_messages`` messages of a conversation plus a summary of the rest.
+
+    Args:
+        max_messages: Most messages kept verbatim
+        fold_batch: Messages folded into the summary at a time once the
+            window is full
+        summarize: ``(summary, messages) -> summary``; defaults to
+            ``summarize_messages``
+    """
+
+    max_messages: int = 12
+    fold_batch: int = 6
+    summarize: Callable[[str, Sequence[BaseMessage]], str] = summarize_messages
+    messages: List[BaseMessage] = field(default_factory=list)
+    summary: str = ""
+    folded: int = 0
+
+    def __post_init__(self):
+        if not 0 < self.fold_batch <= self.max_messages:
+            raise ValueError("fold_batch must be between 1 and max_messages")
+
+    def append(self, message: BaseMessage, fold: bool = True) -> None:
+        """Add a message, folding the oldest turns into the summary if the window is full.
+
+        Pass ``fold=False`` to defer the summarization call, e.g. until a
+        response has been shown; the next ``append`` catches up.
+        """
+        self.messages.append(message)
+        if fold and len(self.messages) > self.max_messages:
+            self.compact()
+
+    def compact(self) -> None:
+        """Fold at least ``fold_batch`` of the oldest messages into the summary."""
+        cut = len(self.messages) - self.max_messages + self.fold_batch
+        # Start the window at a user turn so no answer is left without its question
+        while cut < len(self.messages) - 1 and not isinstance(self.messages[cut], HumanMessage):
+            cut += 1
+        old, self.messages = self.messages[:cut], self.messages[cut:]
+        with get_metrics(HISTORY_METRICS).time("summarize"):
+            self.summary = self.summarize(self.summary, old)
+        self.folded += len(old)
+
+    def agent_input(self) -> dict:
+        """The state to send to an agent: the window and the summary."""
+        return {"messages": list(self.messages), "conversation_summary": self.summary}
+
+def trim_messages(messages: Sequence[BaseMessage], keep: int) -> List[RemoveMessage]:
+    """Return the updates that drop all but the last ``keep`` messages of a thread."""
+    if len(messages) <= keep:
+        return []
+    return [RemoveMessage(id=message.id) for message in messages[: len(messages) - keep] if message.id]
@@ -0,0 +1,144 @@
+"""Lightweight structured logging and metrics for the ingest and agent paths.
+
+The Gmail fetch loop and the ingest scripts touch every message in a mailbox, so
+they should not build an f-string (or print to stdout) per message. Instead they
+bump per-stage counters and timers here, log with lazy ``%``-style arguments,
+and emit a single summary line at the end of a batch. Counters and timers are
+cumulative for the process; the summary line reports what changed since the
+previous summary, i.e. the batch it ends.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+class StageMetrics:
+    """Thread-safe counters and timers for one pipeline, e.g. ``"gmail.fetch"``."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        # stage -> [count, total seconds, max seconds]
+        self._timings: Dict[str, list] = {}
+        # Counters and timings as of the last log_summary
+        self._summarized: Dict[str, Any] = {"counters": {}, "timings": {}}
+
+    def incr(self, counter: str, value: int = 1) -> None:
+        """Increment ``counter`` by ``value``."""
+        with self._lock:
+            self._counters[counter] += value
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one duration sample for ``stage``."""
+        with self._lock:
+            timing = self._timings.get(stage)
+            if timing is None:
+                self._timings[stage] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                if seconds > timing[2]:
+                    timing[2] = seconds
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time the body of a ``with`` block as one sample of ``stage``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def get(self, counter: str) -> int:
+        """Return the current value of ``counter``."""
+        with self._lock:
+            return self._counters.get(counter, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable copy of all counters and timings."""
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {
+            "counters": dict(self._counters),
+            "timings": {
+                stage: {"count": count, "total_s": total, "max_s": max_s}
+                for stage, (count, total, max_s) in self._timings.items()
+            },
+        }
+
+    def reset(self) -> None:
+        """Clear all counters and timings."""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+            self._summarized = {"counters": {}, "timings": {}}
+
+    def log_summary(self, logger: logging.Logger, level: int = logging.INFO) -> None:
+        """Emit one structured summary line with the counts since the previous summary.
+
+        Counters and timings that didn't change are left out.
+        """
+        if not logger.isEnabledFor(level):
+            return
+        with self._lock:
+            snap, previous = self._snapshot(), self._summarized
+            self._summarized = snap
+        counters = {
+            counter: value - previous["counters"].get(counter, 0)
+            for counter, value in snap["counters"].items()
+            if value != previous["counters"].get(counter, 0)
+        }
+        timings = {}
+        for stage, t in snap["timings"].items():
+            before = previous["timings"].get(stage, {"count": 0, "total_s": 0.0})
+            if t["count"] != before["count"]:
+                timings[stage] = f"{t['count'] - before['count']}x/{(t['total_s'] - before['total_s']) * 1000:.1f}ms"
+        logger.log(level, "%s metrics since last summary: counters=%s timings=%s", self.name, counters, timings)
+
+_REGISTRY: Dict[str, StageMetrics] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+def get_metrics(name: str) -> StageMetrics:
+    """Return the process-wide ``StageMetrics`` registered under ``name``."""
+    with _REGISTRY_LOCK:
+        metrics = _REGISTRY.get(name)
+        if metrics is None:
+            metrics = _REGISTRY[name] = StageMetrics(name)
+        return metrics
+
+class SampledLogger:
+    """Logger wrapper that only emits every ``sample_every``-th record per key.
+
+    Records are formatted lazily by ``logging`` and the level check happens
+    before any sampling bookkeeping, so a disabled level costs one method call.
+    """
+
+    def __init__(self, logger: logging.Logger, sample_every: int = 100):
+        self.logger = logger
+        self.sample_every = max(1, sample_every)
+        self._seen: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def log(self, level: int, key: str, msg: str, *args: Any) -> None:
+        """Log ``msg % args`` at ``level`` if this is a sampled occurrence of ``key``."""
+        if not self.logger.isEnabledFor(level):
+            return
+        with self._lock:
+            seen = self._seen[key]
+            self._seen[key] = seen + 1
+        if seen % self.sample_every == 0:
+            self.logger.log(level, msg, *args)
+
+    def debug(self, key: str, msg: str, *args: Any) -> None:
+        """Sampled ``logger.debug``."""
+        self.log(logging.DEBUG, key, msg, *args)
+
+    def info(self, key: str, msg: str, *args: Any) -> None:
+        """Sampled ``logger.info``."""
+        self.log(logging.INFO, key, msg, *args)
@@ -0,0 +1,556 @@
+"""SQLite persistence for running the graphs outside a LangGraph server.
+
+``SqliteSaver`` (a checkpointer) and ``SqliteStore`` (a ``BaseStore``) keep
+thread state and long-term memory in a single database file in WAL mode, so
+state survives restarts and readers never block the writer. They replace
+``InMemorySaver``/``InMemoryStore`` and the one-file-per-key
+``LocalFileStore`` for local and dev deployments:
+
+    checkpointer, store = sqlite_persistence("assistant.sqlite")
+    graph = builder.compile(checkpointer=checkpointer, store=store)
+
+Graphs served by ``langgraph dev`` or LangGraph Platform get their
+persistence from the server and don't need these.
+"""
+
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping, Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.types import TASKS, ChannelProtocol
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    Item,
+    ListNamespacesOp,
+    Op,
+    PutOp,
+    Result,
+    SearchItem,
+    SearchOp,
+)
+from langgraph.store.memory import _compare_values, _does_match
+
+# SQLite's default limit on host parameters is 32766 since 3.32; stay well below
+# it (and below the old 999) so an IN list always fits in one statement
+_MAX_PARAMS = 900
+
+def connect(path: Union[str, Path]) -> sqlite3.Connection:
+    """Open a SQLite database in WAL mode, shared across threads.
+
+    Callers serialise access to the connection with their own lock and
+    group writes with ``with conn:``, which commits them as one transaction.
+    """
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Durable across application crashes; only an OS crash can lose the last commits
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+def sqlite_persistence(path: Union[str, Path]) -> Tuple["SqliteSaver", "SqliteStore"]:
+    """Open a checkpointer and a store backed by the same database file."""
+    return SqliteSaver(path), SqliteStore(path)
+
+class _Database:
+    """One connection plus the lock that serialises it."""
+
+    _schema: str = ""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        self.conn = connect(path)
+        self.lock = threading.RLock()
+        with self.lock:
+            self.conn.executescript(self._schema)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self.lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+# ===============================
+# CHECKPOINTER
+# ===============================
+
+class SqliteSaver(_Database, BaseCheckpointSaver[str]):
+    """A checkpointer that keeps checkpoints in a SQLite database.
+
+    Like ``InMemorySaver``, channel values are stored once per version, so a
+    checkpoint only writes the channels that changed since the last one.
+
+    Args:
+        path: Database file; created if missing
+    """
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            checkpoint_id TEXT NOT NULL,
+            parent_checkpoint_id TEXT,
+            type TEXT,
+            checkpoint BLOB,
+            metadata_type TEXT,
+            metadata BLOB,
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            channel TEXT NOT NULL,
+            version TEXT NOT NULL,
+            type TEXT NOT NULL,
+            blob BLOB,
+            PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS checkpoint_writes (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            checkpoint_id TEXT NOT NULL,
+            task_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            channel TEXT NOT NULL,
+            type TEXT,
+            value BLOB,
+            task_path TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        BaseCheckpointSaver.__init__(self)
+        _Database.__init__(self, path)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get the checkpoint in ``config``, or the thread's latest if it names none."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        with self.lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+                    " FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+                    " FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._load_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first, optionally filtered by metadata."""
+        where, params = [], []
+        if config is not None:
+            configurable = config["configurable"]
+            where.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if "checkpoint_ns" in configurable:
+                where.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+            " FROM checkpoints" + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY checkpoint_id DESC"
+        )
+        if limit is not None and not filter:
+            query += f" LIMIT {int(limit)}"
+        # Build every tuple under the lock and yield after releasing it: a
+        # consumer that stops early or iterates slowly must not hold the
+        # connection other threads (and sessions) share
+        tuples = []
+        with self.lock:
+            for thread_id, checkpoint_ns, *row in self.conn.execute(query, params).fetchall():
+                if limit is not None and len(tuples) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[4], row[5]))
+                    if not all(value == metadata.get(key) for key, value in filter.items()):
+                        continue
+                tuples.append(self._load_tuple(thread_id, checkpoint_ns, row))
+        yield from tuples
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint and the channel values that changed with it."""
+        c = checkpoint.copy()
+        c.pop("pending_sends", None)  # type: ignore[misc]
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version), *(
+                self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            ))
+            for channel, version in new_versions.items()
+        ]
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(c)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)", blobs
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                    checkpoint_type, checkpoint_blob, metadata_type, metadata_blob,
+                ),
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Save a task's pending writes for a checkpoint."""
+        configurable = config["configurable"]
+        rows = [
+            (
+                configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"],
+                task_id, WRITES_IDX_MAP.get(channel, idx), channel, *self.serde.dumps_typed(value), task_path,
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        # Special writes (errors, interrupts) replace earlier ones; regular
+        # writes are kept from the first attempt, as in InMemorySaver
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self.lock, self.conn:
+            self.conn.executemany(f"{verb} INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes of a thread."""
+        with self.lock, self.conn:
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async version of ``get_tuple``."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async version of ``list``."""
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async version of ``put``."""
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async version of ``put_writes``."""
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async version of ``delete_thread``."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: ChannelProtocol) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def _load_tuple(self, thread_id: str, checkpoint_ns: str, row: Sequence[Any]) -> CheckpointTuple:
+        """Assemble a checkpoint tuple; the caller holds the lock."""
+        checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint = self.serde.loads_typed((checkpoint_type, checkpoint_blob))
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM checkpoint_writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        sends = []
+        if parent_checkpoint_id:
+            sends = self.conn.execute(
+                "SELECT type, value FROM checkpoint_writes"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? AND channel = ?"
+                " ORDER BY task_path, task_id, idx",
+                (thread_id, checkpoint_ns, parent_checkpoint_id, TASKS),
+            ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+                "pending_sends": [self.serde.loads_typed(send) for send in sends],
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        """Load the channel values at the given versions in one query."""
+        if not versions:
+            return {}
+        pairs = [(channel, str(version)) for channel, version in versions.items()]
+        values = ", ".join("(?, ?)" for _ in pairs)
+        rows = self.conn.execute(
+            f"SELECT channel, type, blob FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ?"
+            f" AND (channel, version) IN (VALUES {values})",
+            [thread_id, checkpoint_ns, *(p for pair in pairs for p in pair)],
+        ).fetchall()
+        return {channel: self.serde.loads_typed((type_, blob)) for channel, type_, blob in rows if type_ != "empty"}
+
+# ===============================
+# STORE
+# ===============================
+
+def _prefix(namespace: Tuple[str, ...]) -> str:
+    # Namespace labels can't contain periods, so the joined form is unambiguous
+    return ".".join(namespace)
+
+def _prefix_clause(namespace_prefix: Tuple[str, ...]) -> Tuple[str, List[str]]:
+    """SQL matching a namespace and everything below it, as a primary key range."""
+    if not namespace_prefix:
+        return "1", []
+    prefix = _prefix(namespace_prefix)
+    # "/" sorts right after ".", so the range covers exactly "<prefix>.*"
+    return "(prefix = ? OR (prefix > ? AND prefix < ?))", [prefix, prefix + ".", prefix + "/"]
+
+def _timestamp(value: float) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+class SqliteStore(_Database, BaseStore):
+    """A ``BaseStore`` that keeps items in a SQLite database.
+
+    Items live in one table keyed by ``(namespace, key)``, so namespace and
+    namespace-prefix lookups are primary key range scans. ``batch`` groups
+    its operations: gets for the same namespace become one ``IN`` query and
+    all puts and deletes are applied in one transaction. As in
+    ``InMemoryStore``, reads in a batch see the state from before its writes.
+
+    Search supports namespace prefixes and value filters, but not semantic
+    ``query`` ranking (there is no vector index); results are the most
+    recently updated items first.
+
+    Args:
+        path: Database file; created if missing
+    """
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS store (
+            prefix TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (prefix, key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS store_prefix_updated_at ON store (prefix, updated_at DESC);
+    """
+
+    def batch(self, ops: Iterable[Op]) -> List[Result]:
+        ops = list(ops)
+        results: List[Result] = [None] * len(ops)
+        gets: Dict[Tuple[str, ...], List[int]] = {}
+        puts: Dict[Tuple[Tuple[str, ...], str], PutOp] = {}
+        with self.lock:
+            for i, op in enumerate(ops):
+                if isinstance(op, GetOp):
+                    gets.setdefault(op.namespace, []).append(i)
+                elif isinstance(op, SearchOp):
+                    results[i] = self._search(op)
+                elif isinstance(op, ListNamespacesOp):
+                    results[i] = self._list_namespaces(op)
+                elif isinstance(op, PutOp):
+                    # The last write to a key wins
+                    puts[(op.namespace, op.key)] = op
+                else:
+                    raise ValueError(f"Unknown operation type: {type(op)}")
+            for namespace, indexes in gets.items():
+                items = self._get_many(namespace, {ops[i].key for i in indexes})
+                for i in indexes:
+                    results[i] = items.get(ops[i].key)
+            if puts:
+                self._apply_puts(puts.values())
+        return results
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        return await asyncio.to_thread(self.batch, list(ops))
+
+    def mget(self, namespace: Tuple[str, ...], keys: Sequence[str]) -> List[Optional[Item]]:
+        """Get several items of a namespace with one query.
+
+        Returns:
+            One item (or ``None`` if missing) per key, in the order given
+        """
+        return self.batch([GetOp(namespace, key) for key in keys])  # type: ignore[return-value]
+
+    def mset(self, namespace: Tuple[str, ...], items: Mapping[str, Optional[Dict[str, Any]]]) -> None:
+        """Put several items of a namespace in one transaction; ``None`` deletes."""
+        self.batch([PutOp(namespace, key, value) for key, value in items.items()])
+
+    def _get_many(self, namespace: Tuple[str, ...], keys: Iterable[str]) -> Dict[str, Item]:
+        keys = list(keys)
+        items: Dict[str, Item] = {}
+        for start in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[start:start + _MAX_PARAMS]
+            rows = self.conn.execute(
+                f"SELECT key, value, created_at, updated_at FROM store"
+                f" WHERE prefix = ? AND key IN ({', '.join('?' * len(chunk))})",
+                [_prefix(namespace), *chunk],
+            )
+            for key, value, created_at, updated_at in rows:
+                items[key] = Item(
+                    value=json.loads(value), key=key, namespace=namespace,
+                    created_at=_timestamp(created_at), updated_at=_timestamp(updated_at),
+                )
+        return items
+
+    def _apply_puts(self, puts: Iterable[PutOp]) -> None:
+        now = datetime.now(timezone.utc).timestamp()
+        upserts, deletes = [], []
+        for op in puts:
+            if op.value is None:
+                deletes.append((_prefix(op.namespace), op.key))
+            else:
+                upserts.append((_prefix(op.namespace), op.key, json.dumps(op.value), now, now))
+        with self.conn:
+            if deletes:
+                self.conn.executemany("DELETE FROM store WHERE prefix = ? AND key = ?", deletes)
+            if upserts:
+                self.conn.executemany(
+                    "INSERT INTO store VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (prefix, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    upserts,
+                )
+
+    def _search(self, op: SearchOp) -> List[SearchItem]:
+        clause, params = _prefix_clause(op.namespace_prefix)
+        query = f"SELECT prefix, key, value, created_at, updated_at FROM store WHERE {clause} ORDER BY updated_at DESC"
+        if not op.filter:
+            query += " LIMIT ? OFFSET ?"
+            params += [op.limit, op.offset]
+        results: List[SearchItem] = []
+        skipped = 0
+        for prefix, key, value, created_at, updated_at in self.conn.execute(query, params):
+            value = json.loads(value)
+            if op.filter:
+                if not all(_compare_values(value.get(k), v) for k, v in op.filter.items()):
+                    continue
+                if skipped < op.offset:
+                    skipped += 1
+                    continue
+            results.append(SearchItem(
+                namespace=tuple(prefix.split(".")), key=key, value=value,
+                created_at=_timestamp(created_at), updated_at=_timestamp(updated_at),
+            ))
+            if len(results) >= op.limit:
+                break
+        return results
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> List[Tuple[str, ...]]:
+        # A plain prefix condition narrows the scan; the rest are checked per namespace
+        leading = next(
+            (c for c in op.match_conditions or () if c.match_type == "prefix" and "*" not in c.path), None
+        )
+        clause, params = _prefix_clause(tuple(leading.path) if leading else ())
+        namespaces = [
+            tuple(prefix.split("."))
+            for (prefix,) in self.conn.execute(f"SELECT DISTINCT prefix FROM store WHERE {clause}", params)
+        ]
+        if op.match_conditions:
+            namespaces = [ns for ns in namespaces if all(_does_match(c, ns) for c in op.match_conditions)]
+        if op.max_depth is not None:
+            namespaces = {ns[: op.max_depth] for ns in namespaces}
+        return sorted(namespaces)[op.offset : op.offset + op.limit]
@@ -5,15 +5,30 @@ This agent takes user input and uses an LLM to determine if it's a food recipe r
 It also maintains memory of user food preferences.
 """
 
-from typing import Literal, List, Dict, Any, Optional, cast
+import hashlib
+import json
+import logging
+import re
+import threading
+import weakref
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence, Tuple
 from pydantic import BaseModel, Field
 
 from langchain.chat_models import init_chat_model
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.runnables import RunnableConfig
 
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, START, END, MessagesState
-from langgraph.store.base import BaseStore
-from langchain.storage import LocalFileStore  # NEW: lightweight on-disk store persisting to folder
+from langgraph.store.base import BaseStore, GetOp, PutOp
+
+from email_assistant.history import trim_messages
+from email_assistant.metrics import get_metrics
+from email_assistant.persistence import SqliteStore
+
+logger = logging.getLogger(__name__)
 
 # ===============================
 # SCHEMAS AND STATE
@@ -24,32 +39,184 @@ class FoodPreferences(BaseModel):
     chain_of_thought: str = Field(description="Reasoning about which food preferences need to add/update if required")
     food_preferences: str = Field(description="Updated user food preferences including dietary restrictions, favorite cuisines, ingredients they like/dislike, cooking skill level, etc.")
 
+class TriageDecision(BaseModel):
+    """Classification of a user message plus any food preferences it reveals."""
+    category: Literal["grocery_list_request", "preference_update", "not_grocery_list_request"] = Field(
+        description="grocery_list_request for grocery/shopping list or meal planning requests, "
+        "preference_update for messages that only state preferences, otherwise not_grocery_list_request"
+    )
+    analysis: str = Field(description="Brief explanation of the classification")
+    food_preferences: Optional[str] = Field(
+        default=None,
+        description="The full updated food preference profile if the message reveals new preferences, "
+        "dietary restrictions, goals or a preferred store; null if it reveals nothing new",
+    )
+
 class TriageState(MessagesState):
     """State for the triage workflow."""
     classification: str
     user_input: str  
     triage_result: str
+    food_preferences: str
+    triage_provenance: Dict[str, Any]
+    # Structured settings from the app (store, budget, calories, likes, ...)
+    grocery_settings: Dict[str, Any]
+    plan_source: str
+    # Summary of turns the app no longer sends (see ``ChatWindow``)
+    conversation_summary: str
+
+# Most messages a thread keeps; older ones are removed by triage
+MAX_STATE_MESSAGES = 20
 
 # ===============================
 # MEMORY MANAGEMENT
 # ===============================
 
-def _compose_key(namespace: tuple, key: str) -> str:
-    """Convert a namespace tuple + key into the flat string format expected by
-    `LocalFileStore` (and other `BaseStore` implementations that operate on
-    simple string keys). For example, `(\"recipe_assistant\", \"prefs\")` and
-    ``food_preferences`` becomes ``recipe_assistant/prefs/food_preferences``.
+# Default food preferences
+DEFAULT_FOOD_PREFERENCES = """
+User food preferences: Not yet established. 
+Dietary restrictions: None specified.
+Favorite cuisines: None specified.
+Cooking skill level: Not specified.
+Preferred meal types: Not specified.
+"""
+
+# Namespace and key of the user's food preference profile
+PREFERENCES_NAMESPACE = ("recipe_assistant", "food_preferences")
+PREFERENCES_KEY = "food_preferences"
+
+class PreferenceStore:
+    """Typed access to preference profiles kept in a ``BaseStore``.
+
+    Reads go through an in-memory cache, so the nodes of one run (and later
+    runs in this process) read a profile from the backend at most once.
+    Writes go to the backend first and update the cache only once they have
+    been stored, so the cache never holds a value the backend lacks. The
+    cache assumes this process is the only writer of the namespace.
+
+    Backend failures are logged and counted in the ``recipe.preferences``
+    metrics: a failed read falls back to the default profile, a failed write
+    raises.
+
+    Use ``preference_store(store)`` to get the adapter shared by every node
+    using the same backend.
+
+    Args:
+        store: Persistent backend, e.g. ``SqliteStore``
+        namespace: Namespace the profiles are kept in
+        default: Profile returned for keys that have never been written
     """
-    if isinstance(namespace, (list, tuple)):
-        return "/".join([*namespace, key])
-    # Fallback – if the caller passed a single string as the namespace
-    return f"{namespace}/{key}"
 
-def get_food_preferences(store: BaseStore, namespace, default_content=None):
-    """Get food preferences from the store or initialize with default if it doesn't exist.
+    def __init__(self, store: BaseStore, namespace: Tuple[str, ...] = PREFERENCES_NAMESPACE, default: str = ""):
+        self.store = store
+        self.namespace = namespace
+        self.default = default
+        self._cache: Dict[str, str] = {}
+        # Writes queued by put_later that have not reached the backend yet
+        self._pending: Dict[str, str] = {}
+        self._futures: "set[Future]" = set()
+        self._lock = threading.Lock()
+        self._metrics = get_metrics("recipe.preferences")
+
+    def get(self, key: str = PREFERENCES_KEY) -> str:
+        """Return the profile stored under ``key``."""
+        return self.get_many([key])[key]
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """Return several profiles, fetching all cache misses in one batch."""
+        with self._lock:
+            found = {key: self._pending.get(key, self._cache.get(key)) for key in keys if key in self._pending or key in self._cache}
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        self._metrics.incr("cache_hits", len(keys) - len(missing))
+        if not missing:
+            return found
+        self._metrics.incr("cache_misses", len(missing))
+        try:
+            with self._metrics.time("read"):
+                items = self.store.batch([GetOp(self.namespace, key) for key in missing])
+        except Exception:
+            self._metrics.incr("read_errors")
+            logger.warning("Reading preferences %s failed; using the default", missing, exc_info=True)
+            return {**found, **{key: self.default for key in missing}}
+        with self._lock:
+            for key, item in zip(missing, items):
+                value = item.value["content"] if item is not None else self.default
+                # A write that landed while we were reading is newer
+                found[key] = self._cache.setdefault(key, value)
+        return found
+
+    def put(self, content: str, key: str = PREFERENCES_KEY) -> None:
+        """Store a profile, then update the cache."""
+        with self._lock:
+            try:
+                with self._metrics.time("write"):
+                    self.store.put(self.namespace, key, {"content": content})
+            except Exception:
+                self._metrics.incr("write_errors")
+                logger.error("Writing preferences %r failed", key, exc_info=True)
+                raise
+            self._cache[key] = content
+        self._metrics.incr("writes")
+
+    def put_later(self, content: str, key: str = PREFERENCES_KEY) -> None:
+        """Store a profile from a background thread, off the caller's critical path.
+
+        Reads see the new profile straight away. Queued writes are applied
+        one at a time, in order; a failed one is logged and counted like a
+        failed ``put``.
+        """
+        with self._lock:
+            self._pending[key] = content
+            self.submit(self._write_pending, key, content)
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Run ``fn`` on the background writer, after the writes queued so far."""
+        future = _writer.submit(fn, *args)
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait for the writes and jobs queued by ``put_later`` and ``submit``."""
+        wait(list(self._futures), timeout=timeout)
+
+    def _write_pending(self, key: str, content: str) -> None:
+        try:
+            self.put(content, key)
+        except Exception:
+            pass  # Logged and counted by put
+        finally:
+            with self._lock:
+                # A newer queued write keeps its pending value
+                if self._pending.get(key) == content:
+                    del self._pending[key]
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop ``key`` (or everything) from the cache, e.g. after an outside write."""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+# One writer thread for every adapter keeps queued writes in order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recipe-preferences")
+_adapters: "weakref.WeakKeyDictionary[BaseStore, PreferenceStore]" = weakref.WeakKeyDictionary()
+_adapters_lock = threading.Lock()
+
+def preference_store(store: BaseStore) -> PreferenceStore:
+    """Return the ``PreferenceStore`` shared by all users of ``store``."""
+    with _adapters_lock:
+        adapter = _adapters.get(store)
+        if adapter is None:
+            adapter = _adapters[store] = PreferenceStore(store, default=DEFAULT_FOOD_PREFERENCES)
+        return adapter
+
+def get_food_preferences(store: Optional[BaseStore], namespace=PREFERENCES_NAMESPACE, default_content=None):
+    """Get food preferences from the store, or the default if none are stored yet.
     
     Args:
-        store: LangGraph BaseStore instance to search for existing memory
+        store: LangGraph BaseStore instance holding the memory
         namespace: Tuple defining the memory namespace, e.g. ("recipe_assistant", "food_preferences")
         default_content: Default content to use if memory doesn't exist
         
@@ -58,54 +225,9 @@ def get_food_preferences(store: BaseStore, namespace, default_content=None):
     """
     if store is None:
         return default_content or ""
-
-    # ------------------------------------------------------------------
-    # Try the modern BaseStore API (mget/mset) first.  If the store happens
-    # to expose the legacy `get`/`put` helpers we fall back to those so that
-    # other store implementations (e.g. RedisStore) keep working unchanged.
-    # ------------------------------------------------------------------
-    full_key = _compose_key(namespace, "food_preferences")
-
-    user_food_prefs = None
-
-    if hasattr(store, "mget"):
-        try:
-            result_bytes = store.mget([full_key])[0]  # type: ignore[attr-defined]
-            if result_bytes is not None:
-                user_food_prefs = result_bytes.decode()
-        except Exception:
-            # Silent failure – we'll handle by initialising below
-            user_food_prefs = None
-    elif hasattr(store, "get"):
-        # Legacy two-argument API
-        try:
-            pref_obj = store.get(namespace, "food_preferences")
-            if pref_obj:
-                user_food_prefs = pref_obj.value if hasattr(pref_obj, "value") else str(pref_obj)
-        except Exception:
-            user_food_prefs = None
-
-    # If found, return it immediately
-    if user_food_prefs is not None:
-        return user_food_prefs
-
-    # ------------------------------------------------------------------
-    # Preference not found – initialise using the provided default.
-    # ------------------------------------------------------------------
-    initial = default_content or ""
-
-    if hasattr(store, "mset"):
-        try:
-            store.mset([(full_key, initial.encode())])  # type: ignore[attr-defined]
-        except Exception:
-            pass  # Non-critical – continue without persistence
-    elif hasattr(store, "put"):
-        try:
-            store.put(namespace, "food_preferences", initial)  # type: ignore[arg-type]
-        except Exception:
-            pass
-
-    return initial
+    if namespace == PREFERENCES_NAMESPACE and default_content in (None, DEFAULT_FOOD_PREFERENCES):
+        return preference_store(store).get()
+    return PreferenceStore(store, namespace, default_content or "").get()
 
 def update_food_preferences(store: BaseStore, namespace, messages, current_preferences):
     """Update food preferences in the store.
@@ -140,8 +262,8 @@ def update_food_preferences(store: BaseStore, namespace, messages, current_prefe
     Return the updated food preferences as a comprehensive profile.
     """
     
-    # Update the memory using structured output
-    llm = init_chat_model("gpt-4.1", temperature=0.0).with_structured_output(FoodPreferences)
+    # Update the memory using structured output (internal, so never streamed to the user)
+    llm = init_chat_model("gpt-4.1", temperature=0.0).with_structured_output(FoodPreferences).with_config(tags=["nostream"])
     result = llm.invoke(
         [
             {"role": "system", "content": memory_update_prompt},
@@ -156,46 +278,122 @@ def update_food_preferences(store: BaseStore, namespace, messages, current_prefe
     else:
         updated_preferences = str(result)
     
-    # Persist the updated preferences – tolerate stores that only implement
-    # the modern `mset` API.
-    full_key = _compose_key(namespace, "food_preferences")
+    # Persist the updated preferences (and keep the shared cache current)
+    if namespace == PREFERENCES_NAMESPACE:
+        preference_store(store).put(updated_preferences)
+    else:
+        PreferenceStore(store, namespace).put(updated_preferences)
 
-    if hasattr(store, "mset"):
-        try:
-            store.mset([(full_key, updated_preferences.encode())])  # type: ignore[attr-defined]
-        except Exception:
-            pass
-    elif hasattr(store, "put"):
-        try:
-            store.put(namespace, "food_preferences", updated_preferences)  # type: ignore[arg-type]
-        except Exception:
-            pass
+# ===============================
+# FAST-PATH ROUTER
+# ===============================
 
-# Default food preferences
-DEFAULT_FOOD_PREFERENCES = """
-User food preferences: Not yet established. 
-Dietary restrictions: None specified.
-Favorite cuisines: None specified.
-Cooking skill level: Not specified.
-Preferred meal types: Not specified.
-"""
+# Keywords indicating a grocery/shopping list request or meal planning
+RECIPE_KEYWORDS = [
+    'grocery', 'shopping list', 'shopping', 'grocery list', 'store list', 'buy', 'purchase',
+    # Keywords retained from recipe/meal context to capture broader food planning phrasing
+    'ingredients', 'meal plan', 'meal', 'dish', 'food', 'kitchen', 'eat', 'dinner',
+    'lunch', 'breakfast', 'vegetarian', 'vegan', 'gluten-free', 'allergic', 'diet', 'cuisine'
+]
+
+# Explicit preference updates, e.g. "I like lemons", "I'm allergic to peanuts"
+PREFERENCE_UPDATE_PHRASES = [
+    "i like", "i love", "i prefer", "my favorite", "i hate", "i don't like",
+    "i dislike", "i am allergic", "i'm allergic", "allergic to", "i cannot eat",
+    "i can't eat", "i am vegan", "i'm vegan", "i am vegetarian", "i'm vegetarian",
+    "gluten-free", "dairy-free", "nut-free", "egg-free"
+]
+
+# Grocery keywords that also describe the user's diet
+DIET_KEYWORDS = {'vegetarian', 'vegan', 'gluten-free', 'allergic', 'diet'}
+
+def _compile_terms(terms: Sequence[str]) -> "re.Pattern[str]":
+    """Compile terms into one regex shaped like a prefix trie.
+
+    Shared prefixes are factored out (``g(?:luten-free|rocery(?: list)?)``),
+    so each position of the message is checked against a handful of first
+    characters rather than every term. Optional suffixes are greedy, so the
+    longest term wins ("grocery list" rather than "grocery").
+    """
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return re.compile(build(trie))
+
+_RECIPE_PATTERN = _compile_terms(RECIPE_KEYWORDS)
+_PREFERENCE_PATTERN = _compile_terms(PREFERENCE_UPDATE_PHRASES)
+
+@dataclass(slots=True)
+class RouteDecision:
+    """Outcome of the keyword rules for one message.
+
+    ``category`` is set when the rules alone decide the route, so the triage
+    model call can be skipped; ``None`` leaves the decision to the model.
+    """
+    category: Optional[str]
+    recipe_terms: List[str] = field(default_factory=list)
+    preference_terms: List[str] = field(default_factory=list)
+
+    @property
+    def mentions_preferences(self) -> bool:
+        """Whether the message may reveal preferences worth extracting."""
+        return bool(self.preference_terms) or any(term in DIET_KEYWORDS for term in self.recipe_terms)
+
+    def provenance(self, source: str, reason: str) -> Dict[str, Any]:
+        """Describe how the final classification was reached, for the run state."""
+        return {
+            "source": source,
+            "reason": reason,
+            "recipe_terms": self.recipe_terms,
+            "preference_terms": self.preference_terms,
+        }
+
+def route_by_rules(user_message: str) -> RouteDecision:
+    """Apply the keyword rules with two compiled scans of the message.
+
+    Any grocery keyword makes the message a grocery request, whatever the
+    model would say, so the rules are conclusive then. Preference phrases
+    alone are not: the model is still needed to extract the preferences.
+    """
+    text = user_message.lower()
+    recipe_terms = _RECIPE_PATTERN.findall(text)
+    preference_terms = _PREFERENCE_PATTERN.findall(text)
+    # Report each term once
+    if len(recipe_terms) > 1:
+        recipe_terms = list(dict.fromkeys(recipe_terms))
+    if len(preference_terms) > 1:
+        preference_terms = list(dict.fromkeys(preference_terms))
+    return RouteDecision(
+        category="grocery_list_request" if recipe_terms else None,
+        recipe_terms=recipe_terms,
+        preference_terms=preference_terms,
+    )
 
 # ===============================
 # TRIAGE NODE
 # ===============================
 
 def triage_request(state: TriageState, store: BaseStore):
-    """Analyze user input and determine if it's a weekly grocery list request or a food preference."""
-    
-    # Initialize the LLM
-    llm = init_chat_model("gpt-4.1", temperature=0)
+    """Classify the user input and extract any new food preferences in one LLM call.
+
+    Updated preferences are stored in the background, so the answer does not
+    wait for the write; the rest of the run reads them from the state.
+    """
     
     # Get food preferences from memory
-    food_preferences = get_food_preferences(
-        store, 
-        ("recipe_assistant", "food_preferences"), 
-        DEFAULT_FOOD_PREFERENCES
-    )
+    preferences = preference_store(store)
+    food_preferences = preferences.get()
     
     user_message = None
     for message in reversed(state["messages"]):
@@ -207,19 +405,43 @@ def triage_request(state: TriageState, store: BaseStore):
         return {
             "classification": "not_grocery_list_request",
             "triage_result": "No user input found",
+            "food_preferences": food_preferences,
+        }
+    
+    logger.debug("User message: %s", user_message)
+    metrics = get_metrics("recipe.triage")
+    
+    # Keyword rules first: when they decide the route, skip the model call.
+    # A message that may also change the preferences still takes the one
+    # model call below, since the plan must be made for the new preferences
+    rules = route_by_rules(str(user_message))
+    if rules.category is not None and not rules.mentions_preferences:
+        metrics.incr("fast_path")
+        reason = f"Matched grocery keywords: {', '.join(rules.recipe_terms)}"
+        return {
+            "classification": rules.category,
+            "user_input": user_message,
+            "triage_result": reason,
+            "food_preferences": food_preferences,
+            "triage_provenance": rules.provenance("rules", reason),
+            "messages": trim_messages(state["messages"], MAX_STATE_MESSAGES)
+            + [AIMessage(content=f"Triage complete. Category: {rules.category}\n\nAnalysis: {reason}")],
         }
+    metrics.incr("model_path")
     
-    print(f"DEBUG: User message: {user_message}")
-    print(f"DEBUG: Current food preferences: {food_preferences}")
+    # Initialize the LLM (the classification is internal, so never streamed to the user)
+    llm = init_chat_model("gpt-4.1", temperature=0).with_structured_output(TriageDecision).with_config(tags=["nostream"])
     
     # Create triage prompt with food preferences context
     triage_prompt = f"""
-    Analyze the following user input and determine if it is a weekly grocery list request (rather than a single recipe request).
+    Analyze the following user input. Decide if it is a weekly grocery list request (rather than a single recipe request), and update the user's food preference profile with anything new it reveals.
 
     User Input: "{user_message}"
 
     User's Food Preferences: {food_preferences}
 
+    Earlier in the conversation: {state.get("conversation_summary") or "Nothing yet"}
+
     Treat the following as a grocery list request:
     - Asking for a grocery or shopping list for the week
     - Requesting ingredients to buy for upcoming meals
@@ -227,100 +449,300 @@ def triage_request(state: TriageState, store: BaseStore):
     - Any question focused on compiling ingredients rather than cooking instructions
     - Expressing food preferences or dietary needs and asking what to buy
 
-    Respond with:
-    Category: grocery_list_request OR not_grocery_list_request
-    Analysis: [brief explanation of why you classified it this way]
+    Treat a message that only states preferences (e.g. "I'm allergic to peanuts") as a preference update.
+
+    If the input reveals new food preferences, return the full updated profile, keeping existing preferences unless they are contradicted. Include:
+    - Favorite cuisines and dishes
+    - Dietary restrictions or allergies
+    - Ingredients they like or dislike
+    - Cooking skill level and preferences
+    - Meal types they prefer (quick meals, elaborate dishes, etc.)
+    - Their preferred grocery store, if mentioned
     """
     
-    # Get LLM response
-    response = llm.invoke([HumanMessage(content=triage_prompt)])
-    
-    # Convert response content to string
-    response_text = str(response.content)
-    print(f"DEBUG: LLM triage response: {response_text}")
-    
-    # Extract category from response - improved logic
-    category = "not_grocery_list_request"  # Default to not a grocery list request
-    
-    # More robust classification - check for recipe-related keywords
-    recipe_keywords = [
-        # Keywords indicating a grocery/shopping list request or meal planning
-        'grocery', 'shopping list', 'shopping', 'grocery list', 'store list', 'buy', 'purchase',
-        # Keywords retained from recipe/meal context to capture broader food planning phrasing
-        'ingredients', 'meal plan', 'meal', 'dish', 'food', 'kitchen', 'eat', 'dinner',
-        'lunch', 'breakfast', 'vegetarian', 'vegan', 'gluten-free', 'allergic', 'diet', 'cuisine'
-    ]
-    
-    # Check the user message directly for recipe keywords
-    user_lower = str(user_message).lower() if user_message else ""
-    has_recipe_keywords = any(keyword in user_lower for keyword in recipe_keywords)
-    
-    # Also check the LLM response
-    response_lower = response_text.lower()
-    llm_says_recipe = 'grocery_list_request' in response_lower and 'not_grocery_list_request' not in response_lower
-    
-    # Detect explicit preference updates, e.g. "I like lemons", "I'm allergic to peanuts"
-    preference_update_phrases = [
-        "i like", "i love", "i prefer", "my favorite", "i hate", "i don't like",
-        "i dislike", "i am allergic", "i'm allergic", "allergic to", "i cannot eat",
-        "i can't eat", "i am vegan", "i'm vegan", "i am vegetarian", "i'm vegetarian",
-        "gluten-free", "dairy-free", "nut-free", "egg-free"
-    ]
-    has_preference_update = any(phrase in user_lower for phrase in preference_update_phrases)
-    
-    # Classify request
-    if has_recipe_keywords or llm_says_recipe:
-        category = "grocery_list_request"
-        # Update food preferences if this is a grocery list request
-        update_food_preferences(
-            store,
-            ("recipe_assistant", "food_preferences"),
-            [{"role": "user", "content": user_message}],
-            food_preferences
-        )
-    elif has_preference_update:
-        category = "preference_update"
-        # Directly update user preferences from this statement
-        update_food_preferences(
-            store,
-            ("recipe_assistant", "food_preferences"),
-            [{"role": "user", "content": user_message}],
-            food_preferences
-        )
+    # One structured call both classifies and extracts preferences
+    decision = llm.invoke([HumanMessage(content=triage_prompt)])
+    response_text = decision.analysis
+    logger.debug("Triage decision: %s", decision)
+    
+    # Grocery keywords are conclusive; otherwise the model decides, but an
+    # explicit preference phrase makes anything else a preference update
+    if rules.category is not None:
+        category, source = rules.category, "rules"
+        reason = f"Matched grocery keywords: {', '.join(rules.recipe_terms)}"
+    elif decision.category != "grocery_list_request" and rules.preference_terms:
+        category, source = "preference_update", "rules"
+        reason = f"Matched preference phrases: {', '.join(rules.preference_terms)}"
     else:
-        category = "not_grocery_list_request"
+        category, source = decision.category, "model"
+        reason = "Model classification"
     
-    print(f"DEBUG: Has recipe keywords: {has_recipe_keywords}")
-    print(f"DEBUG: LLM says recipe: {llm_says_recipe}")
-    print(f"DEBUG: Has preference update: {has_preference_update}")
-    print(f"DEBUG: Final classification: {category}")
+    # Persist new preferences off the critical path
+    if decision.food_preferences and decision.food_preferences != food_preferences:
+        food_preferences = decision.food_preferences
+        preferences.put_later(food_preferences)
+    
+    logger.debug("Final classification: %s", category)
     
     return {
         "classification": category,
         "user_input": user_message,
         "triage_result": response_text,
-        "messages": [AIMessage(content=f"Triage complete. Category: {category}\n\nAnalysis: {response_text}")]
+        "food_preferences": food_preferences,
+        "triage_provenance": rules.provenance(source, reason),
+        "messages": trim_messages(state["messages"], MAX_STATE_MESSAGES)
+            + [AIMessage(content=f"Triage complete. Category: {category}\n\nAnalysis: {response_text}")],
     }
 
+# ===============================
+# GROCERY PLAN CACHE
+# ===============================
+
+PLANS_NAMESPACE = ("recipe_assistant", "grocery_plans")
+# Plan the next change is diffed against, one per conversation thread
+LATEST_PLAN_KEY = "latest"
+
+# Phrases asking for a fresh plan rather than the cached one
+_REGENERATE_PATTERN = re.compile(r"\b(?:new|different|another|fresh|regenerate|start over)\b", re.IGNORECASE)
+# Words a bare request for the plan is made of; anything else may be a constraint
+_REPEAT_WORDS = frozenset(
+    "a an the me my i we our you can could would will please make give get show send what which should "
+    "do to for this next week weekly list plan again same usual grocery groceries shopping store buy "
+    "purchase ingredients need want up pick at just it is some thanks".split()
+)
+_SECTION_PATTERN = re.compile(r"^=== (.+?) ===[ \t]*$", re.MULTILINE)
+_SUBSECTION_PATTERN = re.compile(r"^[A-Z][^:\n]{0,60}:[ \t]*$")
+
+def is_repeat_request(user_message: str, provenance: Optional[Dict[str, Any]]) -> bool:
+    """Whether a message only asks for the plan again, so a cached plan answers it.
+
+    The cache key covers the preferences and settings, not the message, so
+    a message with preference cues or any other words (e.g. "with more
+    protein") must reach the model.
+    """
+    provenance = provenance or {}
+    if provenance.get("preference_terms") or any(term in DIET_KEYWORDS for term in provenance.get("recipe_terms", [])):
+        return False
+    words = re.findall(r"[a-z]+", str(user_message).lower().replace("'", ""))
+    return all(word in _REPEAT_WORDS for word in words)
+
+def normalize_preferences(text: str) -> str:
+    """Normalize a preference profile so rewordings of layout don't change it.
+
+    Case, whitespace, line order and the order of comma-separated items
+    are ignored.
+    """
+    lines = []
+    for line in text.lower().splitlines():
+        label, sep, items = line.partition(":")
+        if sep:
+            items = ", ".join(sorted(filter(None, (" ".join(i.split()) for i in items.split(",")))))
+            line = f"{' '.join(label.split())}: {items}"
+        line = " ".join(line.split()).strip(" .-•*")
+        if line:
+            lines.append(line)
+    return "\n".join(sorted(set(lines)))
+
+def normalize_settings(settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalize the app's grocery settings; unset budgets and goals become ``None``."""
+    settings = settings or {}
+
+    def amount(name: str) -> Optional[int]:
+        value = settings.get(name)
+        return int(round(float(value))) if value else None
+
+    return {
+        "store": re.sub(r"[^a-z0-9]+", " ", str(settings.get("store") or "").lower().replace("'", "")).strip() or None,
+        "budget": amount("budget"),
+        "calories": amount("calories"),
+        **{k: normalize_preferences(str(settings.get(k) or "")) or None for k in ("likes", "dislikes", "dietary")},
+    }
+
+def describe_settings(settings: Optional[Dict[str, Any]]) -> str:
+    """Render grocery settings for a prompt."""
+    settings = settings or {}
+    parts = [
+        f"Preferred grocery store: {settings['store']}" if settings.get("store") else "",
+        f"Weekly budget: ${int(settings['budget'])}" if settings.get("budget") else "",
+        f"Daily caloric goal: {int(settings['calories'])} kcal" if settings.get("calories") else "",
+        f"Likes: {settings['likes']}" if settings.get("likes") else "",
+        f"Dislikes: {settings['dislikes']}" if settings.get("dislikes") else "",
+        f"Dietary restrictions: {settings['dietary']}" if settings.get("dietary") else "",
+    ]
+    return "\n".join(part for part in parts if part) or "None given"
+
+def parse_plan(plan: str) -> List[Tuple[str, List[Tuple[str, str]]]]:
+    """Split a plan into ``=== Section ===`` blocks and their ``Subsection:`` parts.
+
+    Returns:
+        ``(section, [(subsection, text), ...])`` in order; text before the
+        first subsection has subsection ``""``, text before the first
+        section has section ``""``
+    """
+    sections: List[Tuple[str, List[Tuple[str, str]]]] = []
+    headers = list(_SECTION_PATTERN.finditer(plan))
+    bounds = [("", 0, headers[0].start() if headers else len(plan))] + [
+        (h.group(1).strip(), h.end(), headers[i + 1].start() if i + 1 < len(headers) else len(plan))
+        for i, h in enumerate(headers)
+    ]
+    for name, start, end in bounds:
+        parts: List[Tuple[str, List[str]]] = [("", [])]
+        for line in plan[start:end].strip("\n").splitlines():
+            if _SUBSECTION_PATTERN.match(line):
+                parts.append((line.strip()[:-1], []))
+            else:
+                parts[-1][1].append(line)
+        subsections = [(sub, "\n".join(lines).strip("\n")) for sub, lines in parts if sub or "\n".join(lines).strip()]
+        if name or subsections:
+            sections.append((name, subsections))
+    return sections
+
+def render_plan(sections: List[Tuple[str, List[Tuple[str, str]]]]) -> str:
+    """Inverse of ``parse_plan``."""
+    blocks = []
+    for name, subsections in sections:
+        lines = [f"=== {name} ==="] if name else []
+        for sub, text in subsections:
+            if sub:
+                lines.append(f"{sub}:")
+            if text:
+                lines.append(text)
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+def merge_plan(plan: str, changes: str) -> str:
+    """Apply the sections (or subsections) in ``changes`` to ``plan``.
+
+    A changed section replaces only the subsections it lists, so a diff can
+    touch "Proteins" without repeating the rest of the grocery list. A
+    section header on its own (nothing under it) is ignored.
+    """
+    merged = parse_plan(plan)
+    for name, changed in parse_plan(changes):
+        if not name:
+            continue
+        index = next((i for i, (existing, _) in enumerate(merged) if existing.lower() == name.lower()), None)
+        if index is None:
+            merged.append((name, changed))
+            continue
+        subsections = list(merged[index][1])
+        for sub, text in changed:
+            position = next((i for i, (existing, _) in enumerate(subsections) if existing.lower() == sub.lower()), None)
+            if position is None:
+                subsections.append((sub, text))
+            else:
+                subsections[position] = (sub, text)
+        merged[index] = (merged[index][0], subsections)
+    return render_plan(merged)
+
+class GroceryPlanCache:
+    """Grocery plans in a ``BaseStore``, keyed on what the plan depends on.
+
+    The key is the normalized preference profile plus the normalized store,
+    budget, caloric goal and likes/dislikes/dietary settings; the latest
+    plan is also kept so a change can be applied to it as a diff. The store
+    may be shared by many sessions, so the latest plan is kept per thread.
+
+    Args:
+        store: Persistent backend, e.g. ``SqliteStore``
+        thread_id: Conversation whose latest plan to read and write
+    """
+
+    def __init__(self, store: BaseStore, namespace: Tuple[str, ...] = PLANS_NAMESPACE, thread_id: Optional[str] = None):
+        self.store = store
+        self.namespace = namespace
+        self.latest_key = f"{LATEST_PLAN_KEY}:{thread_id}" if thread_id else LATEST_PLAN_KEY
+
+    @staticmethod
+    def key(preferences: str, settings: Optional[Dict[str, Any]]) -> str:
+        """Cache key for a normalized profile and settings."""
+        payload = json.dumps([normalize_preferences(preferences), normalize_settings(settings)], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for ``key``."""
+        item = self.store.get(self.namespace, key)
+        return item.value if item is not None else None
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Return the most recently generated plan in this thread."""
+        return self.get(self.latest_key)
+
+    def put(self, key: str, plan: str, preferences: str, settings: Optional[Dict[str, Any]]) -> None:
+        """Cache a plan and make it this thread's latest, in one batch."""
+        entry = {"key": key, "plan": plan, "preferences": preferences, "settings": normalize_settings(settings)}
+        self.store.batch([PutOp(self.namespace, key, entry), PutOp(self.namespace, self.latest_key, entry)])
+
 # ===============================
 # RECIPE GENERATION NODE
 # ===============================
 
-def generate_recipe(state: TriageState, store: BaseStore):
-    """Generate a weekly grocery list based on the user's request, food preferences, and dietary goals."""
-    
-    # Initialize the LLM
-    llm = init_chat_model("gpt-4.1", temperature=0)
+def generate_recipe(state: TriageState, config: RunnableConfig, store: BaseStore):
+    """Generate a weekly grocery list based on the user's request, food preferences, and dietary goals.
+
+    Plans are cached on the normalized preferences and settings: a bare
+    repeat request is answered from the cache without a model call, and a
+    change (or a request with anything more to say) asks the model only for
+    the sections of the latest plan it affects.
+    """
+    metrics = get_metrics("recipe.plans")
     
     # Get the user's original message
     user_message = state.get("user_input", "")
     
-    # Get food preferences from memory
-    food_preferences = get_food_preferences(
-        store, 
-        ("recipe_assistant", "food_preferences"), 
-        DEFAULT_FOOD_PREFERENCES
-    )
+    # Preferences as updated by triage (falling back to memory)
+    food_preferences = state.get("food_preferences") or preference_store(store).get()
+    settings = state.get("grocery_settings") or {}
+    
+    plans = GroceryPlanCache(store, thread_id=config.get("configurable", {}).get("thread_id"))
+    key = plans.key(food_preferences, settings)
+    regenerate = bool(_REGENERATE_PATTERN.search(str(user_message)))
+    repeat = not regenerate and is_repeat_request(user_message, state.get("triage_provenance"))
+    cached = plans.get(key) if repeat else None
+    if cached is not None:
+        metrics.incr("cache_hits")
+        plans.put(key, cached["plan"], food_preferences, settings)
+        return {"plan_source": "cache", "messages": [AIMessage(content=cached["plan"])]}
+    
+    latest = None if regenerate else plans.latest()
+    if latest is not None:
+        # Only the affected sections are generated, and merged locally; the
+        # partial output is not meant for the user, so it isn't streamed
+        metrics.incr("diffs")
+        llm = init_chat_model("gpt-4.1", temperature=0).with_config(tags=["nostream"])
+        diff_prompt = f"""
+    Here is the user's current weekly grocery plan:
+
+    {latest["plan"]}
+
+    It was made for these food preferences: {latest["preferences"]}
+    and these settings: {json.dumps(latest["settings"])}
+
+    The preferences and settings are now:
+    Food preferences: {food_preferences}
+    Settings:
+    {describe_settings(settings)}
+
+    User Request: "{user_message}"
+
+    Earlier in the conversation: {state.get("conversation_summary") or "Nothing yet"}
+
+    Update the plan for the new preferences and settings, changing as little as possible.
+    Return ONLY the parts that change, in the plan's format: each changed section starts with its
+    header line exactly as in the plan (e.g. "=== Estimated Cost Summary ==="), followed by only the
+    changed subsections (e.g. "Proteins:") in full. Omit everything that stays the same. If prices
+    change, include the updated "=== Estimated Cost Summary ===".
+    """
+        with metrics.time("diff"):
+            changes = str(llm.invoke([HumanMessage(content=diff_prompt)]).content)
+        plan = merge_plan(latest["plan"], changes)
+        plans.put(key, plan, food_preferences, settings)
+        return {"plan_source": "diff", "messages": [AIMessage(content=plan)]}
+    
+    metrics.incr("full_generations")
+    
+    # Initialize the LLM
+    llm = init_chat_model("gpt-4.1", temperature=0)
     
     # Create grocery list generation prompt with personalized preferences and meal-building framework
     recipe_prompt = f"""
@@ -330,6 +752,11 @@ def generate_recipe(state: TriageState, store: BaseStore):
 
     User's Food Preferences & Dietary Info: {food_preferences}
 
+    Settings:
+    {describe_settings(settings)}
+
+    Earlier in the conversation: {state.get("conversation_summary") or "Nothing yet"}
+
     Use Ethan Chlebowski's Meal-Building Framework as guidance for ingredient selection:
     1. Base (grains, noodles, breads, greens)
     2. Protein (animal, plant, eggs)
@@ -343,7 +770,7 @@ def generate_recipe(state: TriageState, store: BaseStore):
     • Organize the grocery list by supermarket section (Produce, Proteins, Pantry, Dairy & Eggs, Frozen, Miscellaneous).
     • Provide quantities appropriate for ONE WEEK (assume ~14 meals). Adjust based on any dietary goals or household size mentioned by the user.
     • Where possible, suggest batch-prep tactics (e.g., bulk-cook grains, freeze portions of sauce, prep proteins in advance).
-    • For each ingredient, include an estimated price in USD. If the user has specified a preferred grocery store (e.g., "My preferred grocery store is Costco"), base your estimate on typical prices for that store; otherwise use a reasonable U.S. national average price.
+    • For each ingredient, include an estimated price in USD. If the user has specified a preferred grocery store (e.g., Costco), base your estimate on typical prices for that store; otherwise use a reasonable U.S. national average price.
     • After the grocery list, add an "=== Estimated Cost Summary ===" section that lists a subtotal for every grocery section and a final total estimated cost for the entire week.
 
     Output format:
@@ -367,23 +794,15 @@ def generate_recipe(state: TriageState, store: BaseStore):
     (List at least 5 flexible meal ideas that only rely on ingredients from the grocery list.)
     """
     
-    # Get LLM response
-    response = llm.invoke([HumanMessage(content=recipe_prompt)])
-    print(response)
-    
-    # Update food preferences based on the recipe interaction
-    update_food_preferences(
-        store,
-        ("recipe_assistant", "food_preferences"),
-        [
-            {"role": "user", "content": user_message},
-            {"role": "assistant", "content": str(response.content)}
-        ],
-        food_preferences
-    )
+    # Get LLM response (preferences were already extracted during triage)
+    with metrics.time("generate"):
+        response = llm.invoke([HumanMessage(content=recipe_prompt)])
+    plans.put(key, str(response.content), food_preferences, settings)
     
+    # Keep the streamed message's ID so stream_mode="messages" does not emit it twice
     return {
-        "messages": [AIMessage(content=str(response.content))]
+        "plan_source": "full",
+        "messages": [AIMessage(content=str(response.content), id=response.id)]
     }
 
 # ===============================
@@ -407,11 +826,7 @@ def route_after_triage(state: TriageState) -> Literal["generate_recipe", "acknow
 
 def acknowledge_preferences(state: TriageState, store: BaseStore):
     """Simple acknowledgement after updating user preferences."""
-    food_preferences = get_food_preferences(
-        store,
-        ("recipe_assistant", "food_preferences"),
-        DEFAULT_FOOD_PREFERENCES,
-    )
+    food_preferences = state.get("food_preferences") or preference_store(store).get()
     return {
         "messages": [
             AIMessage(
@@ -427,21 +842,24 @@ def acknowledge_preferences(state: TriageState, store: BaseStore):
 # WORKFLOW CONSTRUCTION
 # ===============================
 
-def create_triage_agent(store: BaseStore | None = None):
+def create_triage_agent(store: BaseStore | None = None, checkpointer: BaseCheckpointSaver | None = None):
     """Create and compile the triage agent.
 
     Args:
         store: Optional persistent ``BaseStore`` implementation.  If ``None``
-            (the default) we fall back to a lightweight on-disk
-            ``LocalFileStore`` located in the current working directory.  This
-            gives you out-of-the-box persistence without running an external
-            database server.
+            (the default) we fall back to a single-file ``SqliteStore``
+            located in the current working directory.  This gives you
+            out-of-the-box persistence without running an external database
+            server.
+        checkpointer: Optional checkpointer. With one, each ``thread_id``
+            keeps its own conversation, so one compiled agent can serve many
+            sessions.
     """
 
-    # If no store was supplied, keep a single folder-based store alongside the
+    # If no store was supplied, keep a single SQLite file alongside the
     # project so memory survives interpreter restarts.
     if store is None:
-        store = cast(BaseStore, LocalFileStore(".recipe_assistant_store"))  # type: ignore[arg-type]
+        store = SqliteStore(".recipe_assistant.sqlite")
 
     # Build the graph
     workflow = StateGraph(TriageState)
@@ -467,8 +885,22 @@ def create_triage_agent(store: BaseStore | None = None):
     workflow.add_edge("acknowledge_preferences", END)
 
     # Compile with memory support
-    return workflow.compile(store=store)
+    return workflow.compile(store=store, checkpointer=checkpointer)
+
+_default_agent = None
+_default_agent_lock = threading.Lock()
 
-# Create the agent instance for LangGraph dev
-email_assistant = create_triage_agent()
+def __getattr__(name: str):
+    """Build the agent instance for LangGraph dev on first use.
+
+    Importing the module for its helpers neither compiles the graph nor opens
+    the default store.
+    """
+    global _default_agent
+    if name != "email_assistant":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _default_agent_lock:
+        if _default_agent is None:
+            _default_agent = create_triage_agent()
+        return _default_agent
 
@@ -0,0 +1,108 @@
+"""Token streaming for the agent graphs.
+
+``TokenStream`` runs a graph with ``stream_mode=["messages", "values"]`` and
+yields the text of the user-facing model output as it is generated, so a UI
+can render a response while it is still being written (for example with
+``st.write_stream``). Model calls that are internal to a node (routing,
+memory updates) should be tagged ``"nostream"`` so their tokens are never
+captured.
+
+Time to first token is recorded as the ``time_to_first_token`` stage of the
+``agent.stream`` metrics, alongside the total ``stream`` time.
+"""
+
+import time
+from typing import Any, Collection, Dict, Iterator, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from email_assistant.metrics import get_metrics
+
+STREAM_METRICS = "agent.stream"
+
+class TokenStream:
+    """Iterates over the text tokens of one graph run.
+
+    Args:
+        graph: Compiled graph to run
+        input: Graph input
+        config: Run config (e.g. ``{"configurable": {"thread_id": ...}}``)
+        nodes: Only stream messages produced by these nodes (all if ``None``)
+        subgraphs: Stream with ``subgraphs=True`` so events are tagged with
+            their namespace (tokens from nodes of a subgraph node, such as the
+            email assistant's ``llm_call`` in ``response_agent``, are streamed
+            either way; only the parent graph's state is kept)
+        include_tool_calls: Also yield tool-call argument fragments, for
+            models that answer through tool calls (such as the email
+            assistant's ``write_email``)
+
+    After iteration, ``final_state`` holds the graph's final state and
+    ``time_to_first_token`` the seconds until the first token (``None`` if
+    nothing was streamed).
+    """
+
+    def __init__(
+        self,
+        graph: Any,
+        input: Any,
+        config: Optional[Dict[str, Any]] = None,
+        nodes: Optional[Collection[str]] = None,
+        subgraphs: bool = False,
+        include_tool_calls: bool = False,
+    ):
+        self.graph = graph
+        self.input = input
+        self.config = config
+        self.nodes = set(nodes) if nodes is not None else None
+        self.subgraphs = subgraphs
+        self.include_tool_calls = include_tool_calls
+        self.final_state: Optional[Dict[str, Any]] = None
+        self.time_to_first_token: Optional[float] = None
+        self.text = ""
+        self._metrics = get_metrics(STREAM_METRICS)
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        stream = self.graph.stream(
+            self.input, self.config, stream_mode=["messages", "values"], subgraphs=self.subgraphs
+        )
+        try:
+            for event in stream:
+                namespace, mode, data = event if self.subgraphs else ((), *event)
+                if mode == "values":
+                    # Subgraph states are intermediate; keep the parent's
+                    if not namespace:
+                        self.final_state = data
+                    continue
+                message, metadata = data
+                if self.nodes is not None and metadata.get("langgraph_node") not in self.nodes:
+                    continue
+                token = self._token(message)
+                if not token:
+                    continue
+                if self.time_to_first_token is None:
+                    self.time_to_first_token = time.perf_counter() - start
+                    self._metrics.observe("time_to_first_token", self.time_to_first_token)
+                self._metrics.incr("chunks")
+                self.text += token
+                yield token
+        finally:
+            self._metrics.observe("stream", time.perf_counter() - start)
+            self._metrics.incr("runs")
+
+    @property
+    def last_message(self) -> Optional[BaseMessage]:
+        """The last AI message in the final state, e.g. when nothing was streamed."""
+        for message in reversed((self.final_state or {}).get("messages", [])):
+            if isinstance(message, AIMessage):
+                return message
+        return None
+
+    def _token(self, message: BaseMessage) -> str:
+        content = message.content
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        if self.include_tool_calls:
+            for chunk in getattr(message, "tool_call_chunks", None) or []:
+                content += chunk.get("args") or ""
+        return content
@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+"""
+Historical mailbox backfill.
+
+Ingests months of existing mail, e.g. when onboarding a new user. The date
+range is split into shards that are worked on concurrently; each shard pages
+through every ``messages.list`` result and ingests its messages. Progress is
+checkpointed to a JSON file after every page, so an interrupted backfill
+resumes where it stopped. Messages from a page that was in flight during a
+crash are ingested again, which is harmless because ingestion is idempotent.
+
+Gmail lists newest first, and each ingest supersedes the thread's previous
+run, so a page's messages are grouped by thread and each thread is ingested
+once, as its newest message with the others attached (``collapse_threads``).
+A thread is only ingested by one shard at a time, and a message older than
+one already ingested into its thread (say from a newer shard) is not run
+again, so every thread ends in the state of its newest message.
+
+    python src/email_assistant/tools/gmail/backfill.py --email you@example.com --since 2025-01-01
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail.request_scheduler import get_request_scheduler
+from email_assistant.tools.gmail.run_ingest import (
+    _SECRETS_DIR,
+    LOCAL_DB,
+    build_search_query,
+    collapse_threads,
+    get_email_data,
+    iter_message_pages,
+    load_gmail_credentials,
+)
+
+logger = logging.getLogger(__name__)
+
+Shard = Tuple[datetime, datetime]
+
+def date_shards(start: datetime, end: datetime, shard_days: float = 1.0) -> List[Shard]:
+    """Split ``[start, end)`` into consecutive ranges of ``shard_days``, oldest first."""
+    step = timedelta(days=shard_days)
+    shards = []
+    while start < end:
+        shards.append((start, min(start + step, end)))
+        start += step
+    return shards
+
+def shard_key(shard: Shard) -> str:
+    return f"{int(shard[0].timestamp())}-{int(shard[1].timestamp())}"
+
+def build_backfill_query(email_address: str, shard: Shard, include_read: bool = True) -> str:
+    """Gmail search query for the messages to or from ``email_address`` in ``shard``."""
+    query = build_search_query(email_address, include_read=include_read)
+    return f"{query} after:{int(shard[0].timestamp())} before:{int(shard[1].timestamp())}"
+
+class BackfillCheckpoint:
+    """Per-shard backfill progress, optionally persisted to a JSON file.
+
+    For each shard it records the page token to resume from, how many
+    messages were ingested, Gmail's estimate of the shard's size and whether
+    the shard is done. Message IDs that failed to ingest are kept too, so a
+    later run can retry them, as is the date of the newest message ingested
+    into each thread. The file is replaced atomically on every update so a
+    crash never leaves it half written.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {"shards": {}, "failed": [], "threads": {}}
+        if self.path and self.path.exists():
+            self._data = json.loads(self.path.read_text())
+            self._data.setdefault("threads", {})
+
+    def get(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._data["shards"].get(key, {"page_token": None, "ingested": 0, "estimate": None, "done": False}))
+
+    def update(self, key: str, **fields: Any) -> None:
+        with self._lock:
+            state = self._data["shards"].setdefault(key, {"page_token": None, "ingested": 0, "estimate": None, "done": False})
+            state.update(fields)
+            self._save()
+
+    def add_failed(self, message_id: str) -> None:
+        with self._lock:
+            if message_id not in self._data["failed"]:
+                self._data["failed"].append(message_id)
+                self._save()
+
+    def newest_ingested(self, thread_id: str) -> Optional[int]:
+        """``internal_date`` of the newest message ingested into ``thread_id``."""
+        with self._lock:
+            return self._data["threads"].get(thread_id)
+
+    def set_newest_ingested(self, thread_id: str, internal_date: int) -> None:
+        """Record a thread's newest ingested message; saved with the next update."""
+        with self._lock:
+            self._data["threads"][thread_id] = internal_date
+
+    def pop_failed(self) -> List[str]:
+        with self._lock:
+            failed, self._data["failed"] = self._data["failed"], []
+            self._save()
+            return failed
+
+    def _save(self) -> None:
+        if self.path:
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(self._data, indent=2))
+            os.replace(tmp, self.path)
+
+class BackfillProgress:
+    """Counts ingested messages and estimates throughput and time remaining.
+
+    The total is extrapolated from Gmail's size estimates for the shards
+    listed so far.
+    """
+
+    def __init__(self, shards: int, clock: Callable[[], float] = time.monotonic):
+        self.shards = shards
+        self.shards_done = 0
+        self.ingested = 0
+        self.failed = 0
+        self._estimates: Dict[str, int] = {}
+        self._resumed = 0
+        self._clock = clock
+        self._started = clock()
+        self._lock = threading.Lock()
+
+    def resume(self, key: str, ingested: int, estimate: Optional[int], done: bool) -> None:
+        """Count work a previous run already finished."""
+        with self._lock:
+            self._resumed += ingested
+            if estimate is not None:
+                self._estimates[key] = estimate
+            self.shards_done += done
+
+    def estimate(self, key: str, estimate: int) -> None:
+        with self._lock:
+            self._estimates[key] = estimate
+
+    def record(self, ingested: int = 0, failed: int = 0, shard_done: bool = False) -> None:
+        with self._lock:
+            self.ingested += ingested
+            self.failed += failed
+            self.shards_done += shard_done
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = self._clock() - self._started
+            done = self._resumed + self.ingested + self.failed
+            if self._estimates:
+                per_shard = sum(self._estimates.values()) / len(self._estimates)
+                total = max(done, round(sum(self._estimates.values()) + per_shard * (self.shards - len(self._estimates))))
+            else:
+                total = None
+            rate = (self.ingested + self.failed) / elapsed if elapsed > 0 else 0.0
+            eta = (total - done) / rate if total is not None and rate > 0 else None
+            return {
+                "ingested": self._resumed + self.ingested,
+                "failed": self.failed,
+                "estimated_total": total,
+                "shards_done": self.shards_done,
+                "shards": self.shards,
+                "elapsed_s": elapsed,
+                "messages_per_s": rate,
+                "eta_s": eta,
+            }
+
+    def describe(self) -> str:
+        s = self.snapshot()
+        done = s["ingested"] + s["failed"]
+        total = f"/~{s['estimated_total']:,}" if s["estimated_total"] else ""
+        eta = f", ETA {timedelta(seconds=round(s['eta_s']))}" if s["eta_s"] is not None else ""
+        return (
+            f"{done:,}{total} messages ({s['failed']} failed), {s['shards_done']}/{s['shards']} shards, "
+            f"{s['messages_per_s']:.1f} msg/s{eta}"
+        )
+
+class Backfill:
+    """Ingests all mail to or from an address between two dates.
+
+    Args:
+        service_factory: Returns a Gmail service; called once per worker
+            thread since a service's HTTP connection is not thread-safe
+        ingest: Called once per thread in each page with the newest
+            message's email data (see ``extract_email_data``), the thread's
+            other messages attached as ``earlier_messages``
+        email_address: Address whose mail to backfill
+        start: Oldest time to include
+        end: Newest time to include (defaults to now)
+        shard_days: Length of each date shard
+        concurrency: Shards worked on at once
+        checkpoint: Where progress is kept; pass one with a path to resume
+        scheduler: Gmail request scheduler
+        include_read: Include messages that are already read
+        page_size: Messages to list per page (Gmail allows up to 500)
+        report_interval_s: How often to log progress
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable[[], Any],
+        ingest: Callable[[Dict[str, Any]], Any],
+        email_address: str,
+        start: datetime,
+        end: Optional[datetime] = None,
+        shard_days: float = 1.0,
+        concurrency: int = 8,
+        checkpoint: Optional[BackfillCheckpoint] = None,
+        scheduler: Any = None,
+        include_read: bool = True,
+        page_size: int = 500,
+        report_interval_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.service_factory = service_factory
+        self.ingest = ingest
+        self.email_address = email_address
+        self.shards = date_shards(start, end or datetime.now(timezone.utc), shard_days)
+        self.concurrency = concurrency
+        self.checkpoint = checkpoint or BackfillCheckpoint()
+        self.scheduler = scheduler or get_request_scheduler("gmail")
+        self.include_read = include_read
+        self.page_size = page_size
+        self.report_interval_s = report_interval_s
+        self.progress = BackfillProgress(len(self.shards), clock=clock)
+        self._clock = clock
+        self._last_report = clock()
+        self._local = threading.local()
+        self._thread_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._metrics = get_metrics("gmail.backfill")
+
+    def run(self) -> Dict[str, Any]:
+        """Work through every unfinished shard, retrying previously failed messages first.
+
+        Returns:
+            The final progress snapshot
+        """
+        pending = []
+        for shard in self.shards:
+            state = self.checkpoint.get(shard_key(shard))
+            self.progress.resume(shard_key(shard), state["ingested"], state["estimate"], state["done"])
+            if not state["done"]:
+                pending.append(shard)
+        logger.info(
+            "Backfilling %s: %d shards (%d already done), %d workers",
+            self.email_address, len(self.shards), len(self.shards) - len(pending), self.concurrency,
+        )
+
+        failed = self.checkpoint.pop_failed()
+        if failed:
+            retried = self._ingest_messages(failed)
+            self.progress.record(ingested=retried, failed=len(failed) - retried)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill") as pool:
+            for future in [pool.submit(self._run_shard, shard) for shard in pending]:
+                future.result()
+
+        logger.info("Backfill finished: %s", self.progress.describe())
+        self._metrics.log_summary(logger)
+        return self.progress.snapshot()
+
+    def _service(self) -> Any:
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = self.service_factory()
+        return service
+
+    def _run_shard(self, shard: Shard) -> None:
+        key = shard_key(shard)
+        state = self.checkpoint.get(key)
+        query = build_backfill_query(self.email_address, shard, self.include_read)
+        pages = iter_message_pages(self._service(), query, self.scheduler, state["page_token"], self.page_size)
+        for messages, next_page_token, estimate in pages:
+            if state["estimate"] is None:
+                state["estimate"] = estimate
+                self.progress.estimate(key, estimate)
+            ingested = self._ingest_messages([m["id"] for m in messages])
+            state["ingested"] += ingested
+            self.progress.record(ingested=ingested, failed=len(messages) - ingested)
+            # Only now is the page done; a crash before this point redoes it
+            self.checkpoint.update(key, page_token=next_page_token, ingested=state["ingested"], estimate=state["estimate"])
+            self._maybe_report()
+        self.checkpoint.update(key, done=True)
+        self.progress.record(shard_done=True)
+        self._metrics.incr("shards_done")
+
+    def _thread_lock(self, thread_id: str) -> threading.Lock:
+        with self._locks_lock:
+            lock = self._thread_locks.get(thread_id)
+            if lock is None:
+                lock = self._thread_locks[thread_id] = threading.Lock()
+            return lock
+
+    def _ingest_messages(self, message_ids: List[str]) -> int:
+        """Fetch the messages and ingest one run per thread; return how many messages succeeded."""
+        emails = []
+        for message_id in message_ids:
+            try:
+                with self._metrics.time("fetch"):
+                    emails.append(get_email_data(self._service(), message_id, self.scheduler))
+            except Exception as e:
+                logger.warning("Fetching message %s failed: %s", message_id, e)
+                self._fail([message_id])
+        ingested = 0
+        for email_data in collapse_threads(emails)[0]:
+            ids = [email_data["id"]] + [m["id"] for m in email_data.get("earlier_messages", [])]
+            thread_id = email_data["thread_id"]
+            with self._thread_lock(thread_id):
+                newest = self.checkpoint.newest_ingested(thread_id)
+                if newest is not None and email_data["internal_date"] < newest:
+                    # A newer message of the thread is already in; running this one would replace it
+                    self._metrics.incr("messages_superseded", len(ids))
+                    ingested += len(ids)
+                    continue
+                try:
+                    with self._metrics.time("ingest"):
+                        self.ingest(email_data)
+                except Exception as e:
+                    logger.warning("Backfilling thread %s (messages %s) failed: %s", thread_id, ", ".join(ids), e)
+                    self._fail(ids)
+                    continue
+                self.checkpoint.set_newest_ingested(thread_id, email_data["internal_date"])
+            self._metrics.incr("messages_ingested", len(ids))
+            ingested += len(ids)
+        return ingested
+
+    def _fail(self, message_ids: List[str]) -> None:
+        for message_id in message_ids:
+            self.checkpoint.add_failed(message_id)
+        self._metrics.incr("messages_failed", len(message_ids))
+
+    def _maybe_report(self) -> None:
+        now = self._clock()
+        if now - self._last_report >= self.report_interval_s:
+            self._last_report = now
+            logger.info("Backfill progress: %s", self.progress.describe())
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Backfill a Gmail mailbox into LangGraph")
+    parser.add_argument("--email", type=str, required=True, help="Email address to backfill mail to and from")
+    parser.add_argument("--since", type=str, required=True, help="Oldest date to backfill (YYYY-MM-DD)")
+    parser.add_argument("--until", type=str, help="Backfill up to this date (YYYY-MM-DD, default: now)")
+    parser.add_argument("--shard-days", type=float, default=1.0, help="Days of mail per shard")
+    parser.add_argument("--concurrency", type=int, default=8, help="Shards to work on at once")
+    parser.add_argument("--checkpoint", type=str, help="Progress file (default: .secrets/backfill_<email>.json)")
+    parser.add_argument("--unread-only", action="store_true", help="Only backfill unread messages")
+    parser.add_argument("--graph-name", type=str, default="email_assistant_hitl_memory_gmail", help="Name of the LangGraph to use")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:2024", help="URL of the LangGraph deployment")
+    parser.add_argument("--local", action="store_true", help="Run the graph in this process instead of on the LangGraph server")
+    parser.add_argument("--db", type=str, default=LOCAL_DB, help="SQLite file keeping thread state and memory with --local")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    credentials = load_gmail_credentials()
+    if not credentials:
+        print("Failed to load Gmail credentials")
+        return 1
+    from googleapiclient.discovery import build
+
+    if args.local:
+        from email_assistant.tools.gmail.local_ingest import LocalIngestor
+        ingestor = LocalIngestor(args.graph_name, db_path=args.db)
+        ingest = ingestor.ingest
+    else:
+        from email_assistant.tools.gmail.push_ingest import langgraph_ingest
+        ingestor = ingest = langgraph_ingest(args.graph_name, args.url)
+
+    def parse_date(value: str) -> datetime:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+    checkpoint_path = Path(args.checkpoint) if args.checkpoint else _SECRETS_DIR / f"backfill_{args.email}.json"
+    backfill = Backfill(
+        lambda: build("gmail", "v1", credentials=credentials),
+        ingest,
+        args.email,
+        start=parse_date(args.since),
+        end=parse_date(args.until) if args.until else None,
+        shard_days=args.shard_days,
+        concurrency=args.concurrency,
+        checkpoint=BackfillCheckpoint(checkpoint_path),
+        include_read=not args.unread_only,
+    )
+    try:
+        summary = backfill.run()
+    finally:
+        # Sweeps the remaining stale runs (or closes the local database)
+        ingestor.close()
+    print(f"Backfilled {summary['ingested']} messages ({summary['failed']} failed); progress saved to {checkpoint_path}")
+    if args.local and ingestor.interrupted:
+        print(f"{len(ingestor.interrupted)} of them are waiting for review")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    exit(main())
@@ -0,0 +1,309 @@
+"""
+Calendar availability engine.
+
+Fetches busy time for every requested date with a single Calendar
+``freebusy.query`` call and computes free slots with one sorted interval sweep
+over all days at once. All datetimes are timezone-aware; working hours are
+interpreted in the configured timezone.
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from email_assistant.tools.gmail.request_scheduler import get_request_scheduler
+
+logger = logging.getLogger(__name__)
+
+Interval = Tuple[datetime, datetime]
+
+# freebusy.query rejects very long ranges, so longer requests are split
+MAX_FREEBUSY_SPAN = timedelta(days=60)
+
+_DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+def parse_weekdays(value: str) -> Tuple[int, ...]:
+    """Parse a comma-separated list of days, as numbers (Monday=0) or names ("mon", "Tuesday")."""
+    days = []
+    for part in value.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if part.isdigit() and int(part) < 7:
+            days.append(int(part))
+        elif part[:3] in _DAY_NAMES:
+            days.append(_DAY_NAMES.index(part[:3]))
+        else:
+            raise ValueError(f"Unknown day {part!r} in {value!r}; use Monday=0 ... Sunday=6 or day names")
+    return tuple(sorted(set(days)))
+
+@dataclass(kw_only=True)
+class WorkingHours:
+    """Daily working window used to compute availability."""
+    start: time = time(9, 0)
+    end: time = time(17, 0)
+    timezone: str = "America/Los_Angeles"
+    # Days of the week (Monday=0) that count as working days
+    weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4)
+
+    @classmethod
+    def from_env(cls) -> "WorkingHours":
+        """Read ``CALENDAR_WORK_START``/``CALENDAR_WORK_END`` (HH:MM), ``CALENDAR_TIMEZONE`` and
+        ``CALENDAR_WORKDAYS`` (e.g. ``mon,tue,wed,thu,fri`` or ``0,1,2,3,4``)."""
+        values: Dict[str, Any] = {}
+        if start := os.getenv("CALENDAR_WORK_START"):
+            values["start"] = time.fromisoformat(start)
+        if end := os.getenv("CALENDAR_WORK_END"):
+            values["end"] = time.fromisoformat(end)
+        if tz := os.getenv("CALENDAR_TIMEZONE"):
+            values["timezone"] = tz
+        if workdays := os.getenv("CALENDAR_WORKDAYS"):
+            values["weekdays"] = parse_weekdays(workdays)
+        return cls(**values)
+
+    @property
+    def tzinfo(self) -> ZoneInfo:
+        return ZoneInfo(self.timezone)
+
+    def window(self, day: date) -> Optional[Interval]:
+        """Return the working window for ``day``, or None if it is not a working day."""
+        if day.weekday() not in self.weekdays:
+            return None
+        tz = self.tzinfo
+        return (
+            datetime.combine(day, self.start, tzinfo=tz),
+            datetime.combine(day, self.end, tzinfo=tz),
+        )
+
+@dataclass
+class DayAvailability:
+    """Busy and free intervals for one calendar day."""
+    day: date
+    busy: List[Interval] = field(default_factory=list)
+    free: List[Interval] = field(default_factory=list)
+    working_day: bool = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "date": self.day.isoformat(),
+            "working_day": self.working_day,
+            "busy": [{"start": s.isoformat(), "end": e.isoformat()} for s, e in self.busy],
+            "free": [{"start": s.isoformat(), "end": e.isoformat()} for s, e in self.free],
+        }
+
+@dataclass
+class Availability:
+    """Availability across a set of days, as structured data and as text."""
+    days: List[DayAvailability]
+    working_hours: WorkingHours
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timezone": self.working_hours.timezone,
+            "working_hours": {
+                "start": self.working_hours.start.isoformat("minutes"),
+                "end": self.working_hours.end.isoformat("minutes"),
+            },
+            "days": [day.to_dict() for day in self.days],
+        }
+
+    def to_text(self) -> str:
+        """Format availability the way the calendar tool reports it to the LLM."""
+        fmt = "%I:%M %p"
+        result = f"Calendar availability ({self.working_hours.timezone}):\n\n"
+        for day in self.days:
+            result += f"Events for {day.day.strftime('%d-%m-%Y')}:\n"
+            if not day.busy:
+                result += "  No events found for this day\n"
+            for start, end in day.busy:
+                result += f"  - Busy {start.strftime(fmt)} - {end.strftime(fmt)}\n"
+            if not day.working_day:
+                result += "  Available: Not a working day\n\n"
+            elif day.free:
+                slots = ", ".join(f"{s.strftime(fmt)} - {e.strftime(fmt)}" for s, e in day.free)
+                result += f"  Available: {slots}\n\n"
+            else:
+                result += "  Available: No availability during working hours\n\n"
+        return result
+
+def parse_date(date_str: str) -> date:
+    """Parse a DD-MM-YYYY date string."""
+    day, month, year = date_str.split("-")
+    return date(int(year), int(month), int(day))
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an RFC 3339 timestamp from the Calendar API into an aware datetime."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def _event_datetime(value: Dict[str, Any], tz: ZoneInfo) -> datetime:
+    """Parse an event start/end, applying its ``timeZone`` if the timestamp has no offset."""
+    parsed = parse_datetime(value["dateTime"])
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=ZoneInfo(value["timeZone"]) if value.get("timeZone") else tz)
+    return parsed
+
+def event_interval(event: Dict[str, Any], tz: ZoneInfo) -> Optional[Interval]:
+    """Return the busy interval of a Calendar event resource, or None if it does not block time.
+
+    Cancelled, transparent ("show as available") and declined events are
+    ignored, as ``freebusy.query`` does; all-day events block whole days in ``tz``.
+    """
+    if event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+        return None
+    if any(a.get("self") and a.get("responseStatus") == "declined" for a in event.get("attendees", [])):
+        return None
+    start, end = event.get("start", {}), event.get("end", {})
+    if "dateTime" in start:
+        return _event_datetime(start, tz), _event_datetime(end, tz)
+    if "date" in start:
+        return (
+            datetime.combine(date.fromisoformat(start["date"]), time.min, tzinfo=tz),
+            datetime.combine(date.fromisoformat(end["date"]), time.min, tzinfo=tz),
+        )
+    return None
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort and merge overlapping or touching intervals."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def subtract_intervals(windows: Sequence[Interval], busy: Sequence[Interval]) -> List[Interval]:
+    """Return the parts of sorted ``windows`` not covered by sorted, merged ``busy``.
+
+    A single two-pointer sweep, so the cost is linear in the number of windows
+    plus busy intervals regardless of how many days they span.
+    """
+    free: List[Interval] = []
+    i = 0
+    for window_start, window_end in windows:
+        # Skip busy intervals that end before this window
+        while i < len(busy) and busy[i][1] <= window_start:
+            i += 1
+        cursor = window_start
+        j = i
+        while j < len(busy) and busy[j][0] < window_end:
+            if busy[j][0] > cursor:
+                free.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if cursor < window_end:
+            free.append((cursor, window_end))
+    return free
+
+def query_freebusy(
+    service: Any,
+    time_min: datetime,
+    time_max: datetime,
+    calendar_ids: Sequence[str] = ("primary",),
+    timezone: str = "UTC",
+) -> Dict[str, List[Interval]]:
+    """Fetch busy intervals for ``calendar_ids`` with one ``freebusy.query`` call.
+
+    Calendars the API reports errors for (unknown or not shared with us) are
+    left out of the result.
+    """
+    request = service.freebusy().query(body={
+        "timeMin": time_min.isoformat(),
+        "timeMax": time_max.isoformat(),
+        "timeZone": timezone,
+        "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+    })
+    response = get_request_scheduler("calendar").execute(request, "freebusy.query")
+    busy: Dict[str, List[Interval]] = {}
+    for calendar_id, calendar in response.get("calendars", {}).items():
+        if calendar.get("errors"):
+            logger.warning("No free/busy information for %s: %s", calendar_id, calendar["errors"])
+            continue
+        busy[calendar_id] = [
+            (parse_datetime(b["start"]), parse_datetime(b["end"]))
+            for b in calendar.get("busy", [])
+        ]
+    return busy
+
+def fetch_busy(
+    service: Any,
+    time_min: datetime,
+    time_max: datetime,
+    calendar_ids: Sequence[str] = ("primary",),
+    timezone: str = "UTC",
+) -> Dict[str, List[Interval]]:
+    """Like ``query_freebusy``, splitting ranges longer than ``MAX_FREEBUSY_SPAN``."""
+    busy: Dict[str, List[Interval]] = {}
+    while time_min < time_max:
+        span_end = min(time_max, time_min + MAX_FREEBUSY_SPAN)
+        for calendar_id, intervals in query_freebusy(service, time_min, span_end, calendar_ids, timezone).items():
+            busy.setdefault(calendar_id, []).extend(intervals)
+        time_min = span_end
+    return busy
+
+def compute_availability(
+    days: Sequence[date],
+    busy: Iterable[Interval],
+    working_hours: WorkingHours,
+) -> Availability:
+    """Compute per-day busy and free intervals from raw busy intervals."""
+    tz = working_hours.tzinfo
+    days = sorted(set(days))
+    merged = merge_intervals((s.astimezone(tz), e.astimezone(tz)) for s, e in busy)
+
+    # Free time: subtract busy from every working window in one sweep
+    windows = [w for d in days if (w := working_hours.window(d)) is not None]
+    free = subtract_intervals(windows, merged)
+
+    # Bucket busy and free intervals back into their days, clipping busy time
+    # that spans midnight to each day it touches
+    by_day = {d: DayAvailability(day=d, working_day=working_hours.window(d) is not None) for d in days}
+    i = 0
+    for d in days:
+        day_start = datetime.combine(d, time.min, tzinfo=tz)
+        day_end = day_start + timedelta(days=1)
+        while i < len(merged) and merged[i][1] <= day_start:
+            i += 1
+        j = i
+        while j < len(merged) and merged[j][0] < day_end:
+            by_day[d].busy.append((max(merged[j][0], day_start), min(merged[j][1], day_end)))
+            j += 1
+    for start, end in free:
+        by_day[start.date()].free.append((start, end))
+
+    return Availability(days=[by_day[d] for d in days], working_hours=working_hours)
+
+def get_availability(
+    service: Any,
+    dates: Sequence[str],
+    working_hours: Optional[WorkingHours] = None,
+    calendar_ids: Sequence[str] = ("primary",),
+    cache: Any = None,
+) -> Availability:
+    """Fetch and compute availability for DD-MM-YYYY ``dates`` in a single API request.
+
+    Busy time from every calendar in ``calendar_ids`` is combined, so the free
+    slots are the times when all of them are free. If a ``cache`` (see
+    ``calendar_cache.CalendarCache``) is given and covers the range, busy time
+    is served from it instead of querying the API.
+    """
+    working_hours = working_hours or WorkingHours.from_env()
+    tz = working_hours.tzinfo
+    days = sorted({parse_date(d) for d in dates})
+    if not days:
+        return Availability(days=[], working_hours=working_hours)
+
+    time_min = datetime.combine(days[0], time.min, tzinfo=tz)
+    time_max = datetime.combine(days[-1] + timedelta(days=1), time.min, tzinfo=tz)
+    if cache is not None:
+        cached = cache.busy_intervals(time_min, time_max)
+        if cached is not None:
+            return compute_availability(days, cached, working_hours)
+
+    busy_by_calendar = fetch_busy(service, time_min, time_max, calendar_ids, working_hours.timezone)
+    busy = [interval for intervals in busy_by_calendar.values() for interval in intervals]
+    return compute_availability(days, busy, working_hours)
@@ -0,0 +1,208 @@
+"""
+Local calendar cache kept fresh with Calendar ``syncToken`` incremental sync.
+
+The response agent often checks the same days several times while handling one
+email, and across emails in the same cron batch. ``CalendarCache`` mirrors the
+primary calendar in memory: the first lookup does a full sync, later lookups are
+served from memory and, once the mirror is older than ``max_age_s`` (or after
+``invalidate()``), refreshed by fetching only the changes since the last sync.
+
+The mirror covers a bounded window, from ``lookback`` before the full sync to
+``horizon`` after it. ``events.list`` expands recurring events into instances
+(``singleEvents``), so without an end a series with no end date would page
+forever. Events starting past the window are not kept, lookups outside it are
+reported as not covered, and a full sync moves the window forward once less
+than half of the horizon is left.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail.calendar_availability import Interval, event_interval
+from email_assistant.tools.gmail.request_scheduler import get_request_scheduler
+
+logger = logging.getLogger(__name__)
+
+class CalendarCache:
+    """In-memory mirror of one calendar's events, refreshed with sync tokens.
+
+    Args:
+        service_factory: Zero-argument callable returning a Calendar ``v3`` service
+        calendar_id: Calendar to mirror
+        max_age_s: How long a synced mirror is served without an incremental sync
+        lookback: How far before "now" the initial full sync starts; lookups for
+            earlier times are reported as not covered
+        horizon: How far after "now" the full sync reaches; lookups for later
+            times are reported as not covered
+        timezone: Timezone used for all-day events until the API reports the
+            calendar's own timezone
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable[[], Any],
+        calendar_id: str = "primary",
+        max_age_s: float = 30.0,
+        lookback: timedelta = timedelta(days=7),
+        horizon: timedelta = timedelta(days=90),
+        timezone: str = "UTC",
+    ):
+        self._service_factory = service_factory
+        self._service = None
+        self.calendar_id = calendar_id
+        self.max_age_s = max_age_s
+        self.lookback = lookback
+        self.horizon = horizon
+        self.timezone = timezone
+        self._lock = threading.RLock()
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._sync_token: Optional[str] = None
+        self._synced_from: Optional[datetime] = None
+        self._synced_until: Optional[datetime] = None
+        self._last_sync = 0.0
+        self._stale = True
+        self._metrics = get_metrics("calendar.cache")
+
+    @property
+    def service(self) -> Any:
+        if self._service is None:
+            self._service = self._service_factory()
+        return self._service
+
+    def invalidate(self) -> None:
+        """Force an incremental sync before the next lookup is served."""
+        with self._lock:
+            self._stale = True
+
+    def record_event(self, event: Dict[str, Any]) -> None:
+        """Write an event we just created through to the mirror and mark it stale.
+
+        The next lookup sees the event immediately and the incremental sync
+        picks up whatever the server changed about it.
+        """
+        with self._lock:
+            if event.get("id"):
+                self._events[event["id"]] = event
+            self._stale = True
+
+    def busy_intervals(self, time_min: datetime, time_max: datetime) -> Optional[List[Interval]]:
+        """Return busy intervals overlapping ``[time_min, time_max)``.
+
+        Returns None if the range is not inside the mirrored window, so the
+        caller can fall back to a direct query.
+        """
+        with self._lock:
+            self._refresh_if_needed()
+            if self._synced_from is None or time_min < self._synced_from or time_max > self._synced_until:
+                self._metrics.incr("not_covered")
+                return None
+            self._metrics.incr("hits")
+            tz = ZoneInfo(self.timezone)
+            busy = []
+            for event in self._events.values():
+                interval = event_interval(event, tz)
+                if interval is not None and interval[1] > time_min and interval[0] < time_max:
+                    busy.append(interval)
+            return busy
+
+    def refresh(self) -> None:
+        """Bring the mirror up to date now (incremental if possible)."""
+        with self._lock:
+            if self._sync_token is None:
+                self._full_sync()
+            else:
+                self._incremental_sync()
+
+    def _refresh_if_needed(self) -> None:
+        if self._synced_until is not None and self._synced_until - datetime.now(timezone.utc) < self.horizon / 2:
+            # Move the window forward
+            self._sync_token = None
+            self.refresh()
+        elif self._stale or time.monotonic() - self._last_sync > self.max_age_s:
+            self.refresh()
+
+    def _list_all(self, **params: Any) -> Optional[str]:
+        """Page through ``events.list`` applying every item; return the next sync token."""
+        page_token = None
+        while True:
+            request = self.service.events().list(
+                calendarId=self.calendar_id, singleEvents=True, pageToken=page_token, **params
+            )
+            response = get_request_scheduler("calendar").execute(request, "events.list")
+            self._metrics.incr("api_pages")
+            self.timezone = response.get("timeZone", self.timezone)
+            tz = ZoneInfo(self.timezone)
+            for event in response.get("items", []):
+                interval = event_interval(event, tz)
+                # Incremental syncs aren't bounded by timeMax; keep the mirror to the window
+                if event.get("status") == "cancelled" or (interval is not None and interval[0] >= self._synced_until):
+                    self._events.pop(event["id"], None)
+                else:
+                    self._events[event["id"]] = event
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return response.get("nextSyncToken")
+
+    def _full_sync(self) -> None:
+        now = datetime.now(timezone.utc)
+        self._events.clear()
+        self._synced_from, self._synced_until = now - self.lookback, now + self.horizon
+        self._sync_token = self._list_all(timeMin=self._synced_from.isoformat(), timeMax=self._synced_until.isoformat())
+        self._mark_synced()
+        self._metrics.incr("full_syncs")
+        logger.debug("Full calendar sync of %s: %d events", self.calendar_id, len(self._events))
+
+    def _incremental_sync(self) -> None:
+        try:
+            self._sync_token = self._list_all(syncToken=self._sync_token)
+        except Exception as e:
+            # 410 Gone: the sync token expired, start over with a full sync
+            if getattr(getattr(e, "resp", None), "status", None) == 410:
+                logger.info("Calendar sync token expired, doing a full sync")
+                self._sync_token = None
+                self._full_sync()
+                return
+            raise
+        self._mark_synced()
+        self._metrics.incr("incremental_syncs")
+
+    def _mark_synced(self) -> None:
+        self._last_sync = time.monotonic()
+        self._stale = False
+
+_caches: Dict[str, CalendarCache] = {}
+_caches_lock = threading.Lock()
+
+def get_calendar_cache(service_factory: Callable[[], Any], calendar_id: str = "primary") -> CalendarCache:
+    """Return the process-wide cache for ``calendar_id``, creating it on first use.
+
+    The cache can be tuned with ``CALENDAR_CACHE_MAX_AGE`` (seconds).
+    """
+    with _caches_lock:
+        cache = _caches.get(calendar_id)
+        if cache is None:
+            cache = _caches[calendar_id] = CalendarCache(
+                service_factory,
+                calendar_id=calendar_id,
+                max_age_s=float(os.getenv("CALENDAR_CACHE_MAX_AGE", "30")),
+            )
+        return cache
+
+def record_created_event(event: Dict[str, Any], calendar_id: str = "primary") -> None:
+    """Write a newly created event through to the process-wide cache, if there is one."""
+    with _caches_lock:
+        cache = _caches.get(calendar_id)
+    if cache is not None:
+        cache.record_event(event)
+
+def invalidate_calendar_caches() -> None:
+    """Mark every process-wide calendar cache stale."""
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.invalidate()
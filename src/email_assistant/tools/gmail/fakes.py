@@ -0,0 +1,581 @@
+"""
+In-memory stand-ins for the Gmail and Calendar API services and the LangGraph client.
+
+These mirror the small subset of the ``googleapiclient`` resource interface that
+the Gmail tools use (``service.users().messages().list(...).execute()`` etc.),
+and of the LangGraph SDK client that ingestion uses, so that tests and
+benchmarks can exercise the real code paths without credentials or network
+access.
+"""
+
+import asyncio
+import base64
+import itertools
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import httplib2
+import httpx
+from googleapiclient.errors import HttpError
+
+from email_assistant.tools.gmail.calendar_availability import event_interval
+
+class FakeRequest:
+    """A deferred call, executed by ``.execute()`` like an ``HttpRequest``.
+
+    ``latency_s`` simulates the network round trip of the real API.
+    """
+
+    def __init__(self, fn: Callable[[], Any], latency_s: float = 0.0):
+        self._fn = fn
+        self._latency_s = latency_s
+
+    def execute(self, num_retries: int = 0, http: Any = None) -> Any:
+        if self._latency_s:
+            time.sleep(self._latency_s)
+        return self._fn()
+
+def make_message(
+    message_id: str,
+    thread_id: str,
+    from_email: str,
+    to_email: str,
+    subject: str,
+    body: str,
+    sent_at: datetime,
+    label_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Build a message resource shaped like ``users.messages.get`` output."""
+    return {
+        "id": message_id,
+        "threadId": thread_id,
+        "labelIds": list(label_ids if label_ids is not None else ["INBOX", "UNREAD"]),
+        "internalDate": str(int(sent_at.timestamp() * 1000)),
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": "From", "value": from_email},
+                {"name": "To", "value": to_email},
+                {"name": "Subject", "value": subject},
+                {"name": "Date", "value": format_datetime(sent_at)},
+            ],
+            "body": {"data": base64.urlsafe_b64encode(body.encode("utf-8")).decode("ascii")},
+        },
+    }
+
+class FakeGmailService:
+    """In-memory Gmail ``v1`` service for a single mailbox.
+
+    Every API call is counted in ``calls`` (keyed by ``"messages.list"``,
+    ``"threads.get"``, ...) so callers can assert on request volume. Added
+    messages are recorded in a mailbox history, served by ``history().list``
+    from a ``startHistoryId`` like the real API.
+    """
+
+    def __init__(self, page_size: int = 100, latency_s: float = 0.0):
+        self.page_size = page_size
+        self.latency_s = latency_s
+        self.mailbox: Dict[str, Dict[str, Any]] = {}
+        self.thread_index: Dict[str, List[str]] = {}
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._failures: Dict[str, List[int]] = {}
+        self.history_id = 1000
+        self._history: List[Dict[str, Any]] = []
+        self._oldest_history_id = 0
+
+    @classmethod
+    def with_mailbox(
+        cls,
+        user_email: str,
+        threads: int,
+        messages_per_thread: int = 1,
+        page_size: int = 100,
+    ) -> "FakeGmailService":
+        """Create a service preloaded with ``threads`` unread threads addressed to ``user_email``."""
+        service = cls(page_size=page_size)
+        start = datetime.now(timezone.utc) - timedelta(minutes=5)
+        for t in range(threads):
+            thread_id = f"thread-{t:06d}"
+            for m in range(messages_per_thread):
+                service.add_message(
+                    thread_id=thread_id,
+                    from_email=f"sender{t}@example.com",
+                    to_email=user_email,
+                    subject=f"Subject {t}",
+                    body=f"Message {m} of thread {t}.",
+                    sent_at=start + timedelta(seconds=m),
+                )
+        return service
+
+    def add_message(self, thread_id: str, sent_at: Optional[datetime] = None, **fields: Any) -> Dict[str, Any]:
+        """Add a message to the mailbox and return its resource."""
+        message_id = f"msg-{next(self._ids):08d}"
+        message = make_message(
+            message_id=message_id,
+            thread_id=thread_id,
+            sent_at=sent_at or datetime.now(timezone.utc),
+            **fields,
+        )
+        self.mailbox[message_id] = message
+        self.thread_index.setdefault(thread_id, []).append(message_id)
+        self.history_id += 1
+        summary = {"id": message_id, "threadId": thread_id, "labelIds": list(message["labelIds"])}
+        self._history.append({"id": str(self.history_id), "messages": [summary], "messagesAdded": [{"message": summary}]})
+        return message
+
+    def expire_history(self) -> None:
+        """Drop all history records so older ``startHistoryId`` values get a 404."""
+        self._oldest_history_id = self.history_id
+        self._history.clear()
+
+    def fail_next(self, method: str, status: int = 503, times: int = 1) -> None:
+        """Make the next ``times`` calls to ``method`` (e.g. ``"messages.batchModify"``) fail with ``status``."""
+        self._failures.setdefault(method, []).extend([status] * times)
+
+    def _record_call(self, method: str) -> None:
+        with self._lock:
+            self.calls[method] += 1
+            pending = self._failures.get(method)
+            status = pending.pop(0) if pending else None
+        if status is not None:
+            raise HttpError(
+                httplib2.Response({"status": str(status)}),
+                f'{{"error": {{"code": {status}, "message": "Injected failure"}}}}'.encode(),
+            )
+
+    # Resource accessors, mirroring ``build("gmail", "v1")``
+    def users(self) -> "FakeGmailService":
+        return self
+
+    def messages(self) -> "_FakeMessages":
+        return _FakeMessages(self)
+
+    def threads(self) -> "_FakeThreads":
+        return _FakeThreads(self)
+
+    def history(self) -> "_FakeHistory":
+        return _FakeHistory(self)
+
+    def watch(self, userId: str, body: Dict[str, Any]) -> FakeRequest:
+        def run():
+            self._record_call("watch")
+            expiration = datetime.now(timezone.utc) + timedelta(days=7)
+            return {"historyId": str(self.history_id), "expiration": str(int(expiration.timestamp() * 1000))}
+        return FakeRequest(run, self.latency_s)
+
+    def _ordered_ids(self, query: str = "") -> List[str]:
+        unread_only = "is:unread" in (query or "")
+        after = re.search(r"\bafter:(\d+)", query or "")
+        before = re.search(r"\bbefore:(\d+)", query or "")
+        after_ms = int(after.group(1)) * 1000 if after else 0
+        before_ms = int(before.group(1)) * 1000 if before else float("inf")
+        ids = [
+            message_id
+            for message_id, message in self.mailbox.items()
+            if (not unread_only or "UNREAD" in message["labelIds"])
+            and after_ms <= int(message["internalDate"]) < before_ms
+        ]
+        # Gmail lists newest first
+        ids.sort(key=lambda i: int(self.mailbox[i]["internalDate"]), reverse=True)
+        return ids
+
+class _FakeMessages:
+    def __init__(self, service: FakeGmailService):
+        self._service = service
+
+    def list(self, userId: str, q: str = "", pageToken: Optional[str] = None, maxResults: Optional[int] = None) -> FakeRequest:
+        def run():
+            service = self._service
+            service._record_call("messages.list")
+            ids = service._ordered_ids(q)
+            start = int(pageToken or 0)
+            # page_size caps pages like the real API's 500-result limit
+            size = min(maxResults or service.page_size, service.page_size)
+            page = ids[start:start + size]
+            result: Dict[str, Any] = {"resultSizeEstimate": len(ids)}
+            if page:
+                result["messages"] = [
+                    {"id": i, "threadId": service.mailbox[i]["threadId"]} for i in page
+                ]
+            if start + size < len(ids):
+                result["nextPageToken"] = str(start + size)
+            return result
+        return FakeRequest(run, self._service.latency_s)
+
+    def get(self, userId: str, id: str, format: Optional[str] = None) -> FakeRequest:
+        def run():
+            self._service._record_call("messages.get")
+            return self._service.mailbox[id]
+        return FakeRequest(run, self._service.latency_s)
+
+    def modify(self, userId: str, id: str, body: Dict[str, Any]) -> FakeRequest:
+        def run():
+            self._service._record_call("messages.modify")
+            labels = self._service.mailbox[id]["labelIds"]
+            for label in body.get("removeLabelIds", []):
+                if label in labels:
+                    labels.remove(label)
+            for label in body.get("addLabelIds", []):
+                if label not in labels:
+                    labels.append(label)
+            return self._service.mailbox[id]
+        return FakeRequest(run, self._service.latency_s)
+
+    def batchModify(self, userId: str, body: Dict[str, Any]) -> FakeRequest:
+        def run():
+            service = self._service
+            service._record_call("messages.batchModify")
+            ids = body.get("ids", [])
+            if len(ids) > 1000:
+                raise HttpError(
+                    httplib2.Response({"status": "400"}),
+                    b'{"error": {"code": 400, "message": "Too many ids in request"}}',
+                )
+            for message_id in ids:
+                labels = service.mailbox[message_id]["labelIds"]
+                for label in body.get("removeLabelIds", []):
+                    if label in labels:
+                        labels.remove(label)
+                for label in body.get("addLabelIds", []):
+                    if label not in labels:
+                        labels.append(label)
+            # batchModify returns an empty body
+            return ""
+        return FakeRequest(run, self._service.latency_s)
+
+class _FakeThreads:
+    def __init__(self, service: FakeGmailService):
+        self._service = service
+
+    def get(self, userId: str, id: str, format: Optional[str] = None) -> FakeRequest:
+        def run():
+            self._service._record_call("threads.get")
+            message_ids = self._service.thread_index.get(id, [])
+            return {"id": id, "messages": [dict(self._service.mailbox[i]) for i in message_ids]}
+        return FakeRequest(run, self._service.latency_s)
+
+class _FakeHistory:
+    def __init__(self, service: FakeGmailService):
+        self._service = service
+
+    def list(
+        self,
+        userId: str,
+        startHistoryId: str,
+        historyTypes: Optional[List[str]] = None,
+        labelId: Optional[str] = None,
+        pageToken: Optional[str] = None,
+        maxResults: Optional[int] = None,
+    ) -> FakeRequest:
+        def run():
+            service = self._service
+            service._record_call("history.list")
+            start = int(startHistoryId)
+            if start < service._oldest_history_id:
+                raise HttpError(
+                    httplib2.Response({"status": "404"}),
+                    b'{"error": {"code": 404, "message": "Requested entity was not found.", "errors": [{"reason": "notFound"}]}}',
+                )
+            records = [
+                record for record in service._history
+                if int(record["id"]) > start
+                and (labelId is None or any(labelId in m["message"]["labelIds"] for m in record["messagesAdded"]))
+            ]
+            offset = int(pageToken or 0)
+            # page_size caps pages like the real API's 500-result limit
+            size = min(maxResults or service.page_size, service.page_size)
+            result: Dict[str, Any] = {"historyId": str(service.history_id)}
+            if records[offset:offset + size]:
+                result["history"] = records[offset:offset + size]
+            if offset + size < len(records):
+                result["nextPageToken"] = str(offset + size)
+            return result
+        return FakeRequest(run, self._service.latency_s)
+
+class FakeCalendarService:
+    """In-memory Calendar ``v3`` service.
+
+    Events are stored per calendar ID; ``freebusy().query`` derives busy time
+    from them the same way the real API does (cancelled, transparent and
+    declined events are ignored, all-day events block the whole day in
+    ``timezone``).
+    ``events().list`` supports ``syncToken`` incremental sync: every change
+    bumps a version counter and a sync token is the version it was issued at.
+    """
+
+    def __init__(self, timezone: str = "UTC", latency_s: float = 0.0, page_size: int = 250):
+        self.timezone = timezone
+        self.latency_s = latency_s
+        self.page_size = page_size
+        self.events_by_calendar: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.calls: Counter = Counter()
+        self._ids = itertools.count(1)
+        self._version = 0
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._oldest_valid_sync_token = 0
+
+    def _store(self, calendar_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        self._version += 1
+        self._versions[(calendar_id, event["id"])] = self._version
+        self.events_by_calendar.setdefault(calendar_id, {})[event["id"]] = event
+        return event
+
+    def add_event(
+        self,
+        start: datetime,
+        end: datetime,
+        summary: str = "Busy",
+        calendar_id: str = "primary",
+        **fields: Any,
+    ) -> Dict[str, Any]:
+        """Add a timed event and return its resource."""
+        return self._store(calendar_id, {
+            "id": f"evt{next(self._ids):08d}",
+            "status": "confirmed",
+            "summary": summary,
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": end.isoformat()},
+            **fields,
+        })
+
+    def add_all_day_event(self, day: date, summary: str = "Out of office", calendar_id: str = "primary") -> Dict[str, Any]:
+        """Add an all-day event on ``day``."""
+        return self._store(calendar_id, {
+            "id": f"evt{next(self._ids):08d}",
+            "status": "confirmed",
+            "summary": summary,
+            "start": {"date": day.isoformat()},
+            "end": {"date": (day + timedelta(days=1)).isoformat()},
+        })
+
+    def cancel_event(self, event_id: str, calendar_id: str = "primary") -> None:
+        """Cancel (delete) an event; incremental syncs report it as ``cancelled``."""
+        event = dict(self.events_by_calendar[calendar_id][event_id], status="cancelled")
+        self._store(calendar_id, event)
+
+    def expire_sync_tokens(self) -> None:
+        """Make every previously issued sync token invalid (the API answers 410 Gone)."""
+        self._oldest_valid_sync_token = self._version
+
+    def events(self) -> "_FakeEvents":
+        return _FakeEvents(self)
+
+    def freebusy(self) -> "_FakeFreeBusy":
+        return _FakeFreeBusy(self)
+
+    def _event_interval(self, event: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+        return event_interval(event, ZoneInfo(self.timezone))
+
+class _FakeEvents:
+    def __init__(self, service: FakeCalendarService):
+        self._service = service
+
+    def list(
+        self,
+        calendarId: str,
+        timeMin: Optional[str] = None,
+        timeMax: Optional[str] = None,
+        syncToken: Optional[str] = None,
+        pageToken: Optional[str] = None,
+        maxResults: Optional[int] = None,
+        **kwargs: Any,
+    ) -> FakeRequest:
+        def run():
+            service = self._service
+            service.calls["events.list"] += 1
+            calendar = service.events_by_calendar.get(calendarId, {})
+            if syncToken is not None:
+                since = int(syncToken)
+                if since < service._oldest_valid_sync_token:
+                    raise HttpError(
+                        httplib2.Response({"status": "410"}),
+                        b'{"error": {"code": 410, "message": "Sync token is no longer valid, a full sync is required.", "errors": [{"reason": "fullSyncRequired"}]}}',
+                    )
+                # Deleted events are always included in incremental results
+                items = [
+                    event for event_id, event in calendar.items()
+                    if service._versions[(calendarId, event_id)] > since
+                ]
+            else:
+                lo = datetime.fromisoformat(timeMin.replace("Z", "+00:00")) if timeMin else None
+                hi = datetime.fromisoformat(timeMax.replace("Z", "+00:00")) if timeMax else None
+                items = []
+                for event in calendar.values():
+                    interval = service._event_interval(event)
+                    if interval is None:
+                        continue
+                    if (lo and interval[1] <= lo) or (hi and interval[0] >= hi):
+                        continue
+                    items.append(event)
+                items.sort(key=lambda e: service._event_interval(e)[0])
+            start = int(pageToken or 0)
+            # page_size caps pages like the real API's 500-result limit
+            size = min(maxResults or service.page_size, service.page_size)
+            result: Dict[str, Any] = {"items": [dict(e) for e in items[start:start + size]]}
+            if start + size < len(items):
+                result["nextPageToken"] = str(start + size)
+            else:
+                result["nextSyncToken"] = str(service._version)
+            return result
+        return FakeRequest(run, self._service.latency_s)
+
+    def insert(self, calendarId: str, body: Dict[str, Any], **kwargs: Any) -> FakeRequest:
+        def run():
+            service = self._service
+            service.calls["events.insert"] += 1
+            event = {"id": f"evt{next(service._ids):08d}", "status": "confirmed", **body}
+            event["htmlLink"] = f"https://calendar.example.com/event?eid={event['id']}"
+            return dict(service._store(calendarId, event))
+        return FakeRequest(run, self._service.latency_s)
+
+class _FakeFreeBusy:
+    def __init__(self, service: FakeCalendarService):
+        self._service = service
+
+    def query(self, body: Dict[str, Any]) -> FakeRequest:
+        def run():
+            service = self._service
+            service.calls["freebusy.query"] += 1
+            lo = datetime.fromisoformat(body["timeMin"].replace("Z", "+00:00"))
+            hi = datetime.fromisoformat(body["timeMax"].replace("Z", "+00:00"))
+            calendars: Dict[str, Any] = {}
+            for item in body.get("items", []):
+                calendar_id = item["id"]
+                if calendar_id not in service.events_by_calendar:
+                    calendars[calendar_id] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                    continue
+                busy = []
+                for event in service.events_by_calendar[calendar_id].values():
+                    interval = service._event_interval(event)
+                    if interval is None or interval[1] <= lo or interval[0] >= hi:
+                        continue
+                    start, end = max(interval[0], lo), min(interval[1], hi)
+                    busy.append((start, end))
+                busy.sort()
+                calendars[calendar_id] = {
+                    "busy": [
+                        {"start": s.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"),
+                         "end": e.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")}
+                        for s, e in busy
+                    ]
+                }
+            return {"kind": "calendar#freeBusy", "timeMin": body["timeMin"], "timeMax": body["timeMax"], "calendars": calendars}
+        return FakeRequest(run, self._service.latency_s)
+
+def _not_found(path: str) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", f"http://langgraph.local{path}")
+    return httpx.HTTPStatusError("404 Not Found", request=request, response=httpx.Response(404, request=request))
+
+class FakeLangGraphClient:
+    """In-memory LangGraph SDK client covering the threads and runs calls ingestion makes.
+
+    Every call is counted in ``calls`` (``"threads.get"``, ``"runs.create"``,
+    ...) and awaits ``latency_s`` to simulate the round trip to the server.
+    Runs complete as soon as they are created.
+    """
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.calls: Counter = Counter()
+        self.thread_store: Dict[str, Dict[str, Any]] = {}
+        self.run_store: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self.threads = _FakeThreadsClient(self)
+        self.runs = _FakeRunsClient(self)
+
+    async def _call(self, name: str) -> None:
+        self.calls[name] += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+class _FakeThreadsClient:
+    def __init__(self, client: FakeLangGraphClient):
+        self._client = client
+
+    async def get(self, thread_id: str, **kwargs: Any) -> Dict[str, Any]:
+        await self._client._call("threads.get")
+        if thread_id not in self._client.thread_store:
+            raise _not_found(f"/threads/{thread_id}")
+        return dict(self._client.thread_store[thread_id])
+
+    async def create(
+        self,
+        *,
+        metadata: Optional[Dict[str, Any]] = None,
+        thread_id: Optional[str] = None,
+        if_exists: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        client = self._client
+        await client._call("threads.create")
+        thread_id = thread_id or f"thread-{next(client._ids):08d}"
+        if thread_id in client.thread_store:
+            if if_exists == "do_nothing":
+                return dict(client.thread_store[thread_id])
+            request = httpx.Request("POST", "http://langgraph.local/threads")
+            raise httpx.HTTPStatusError("409 Conflict", request=request, response=httpx.Response(409, request=request))
+        client.thread_store[thread_id] = {"thread_id": thread_id, "metadata": dict(metadata or {}), "status": "idle"}
+        client.run_store[thread_id] = {}
+        return dict(client.thread_store[thread_id])
+
+    async def update(self, thread_id: str, *, metadata: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        await self._client._call("threads.update")
+        if thread_id not in self._client.thread_store:
+            raise _not_found(f"/threads/{thread_id}")
+        self._client.thread_store[thread_id]["metadata"].update(metadata)
+        return dict(self._client.thread_store[thread_id])
+
+class _FakeRunsClient:
+    def __init__(self, client: FakeLangGraphClient):
+        self._client = client
+
+    async def create(
+        self,
+        thread_id: str,
+        assistant_id: str,
+        *,
+        input: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        multitask_strategy: Optional[str] = None,
+        if_not_exists: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        client = self._client
+        await client._call("runs.create")
+        if thread_id not in client.thread_store:
+            if if_not_exists != "create":
+                raise _not_found(f"/threads/{thread_id}/runs")
+            client.thread_store[thread_id] = {"thread_id": thread_id, "metadata": {}, "status": "idle"}
+            client.run_store[thread_id] = {}
+        run_id = f"run-{next(client._ids):08d}"
+        run = {
+            "run_id": run_id,
+            "thread_id": thread_id,
+            "assistant_id": assistant_id,
+            "status": "success",
+            "metadata": dict(metadata or {}),
+            "multitask_strategy": multitask_strategy,
+            "input": input,
+        }
+        client.run_store[thread_id][run_id] = run
+        return dict(run)
+
+    async def list(self, thread_id: str, *, limit: int = 10, offset: int = 0, status: Optional[str] = None, **kwargs: Any) -> List[Dict[str, Any]]:
+        await self._client._call("runs.list")
+        runs = [r for r in self._client.run_store.get(thread_id, {}).values() if status is None or r["status"] == status]
+        # Newest first, like the server
+        return [dict(r) for r in reversed(runs)][offset:offset + limit]
+
+    async def delete(self, thread_id: str, run_id: str, **kwargs: Any) -> None:
+        await self._client._call("runs.delete")
+        if run_id not in self._client.run_store.get(thread_id, {}):
+            raise _not_found(f"/threads/{thread_id}/runs/{run_id}")
+        del self._client.run_store[thread_id][run_id]
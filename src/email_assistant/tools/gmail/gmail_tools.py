@@ -9,12 +9,20 @@ import base64
 import email.utils
 import json
 import logging
-from datetime import datetime
-from typing import List, Optional, Dict, Any, Iterator
+from datetime import datetime, timedelta
+from concurrent.futures import Future
+from typing import List, Optional, Dict, Any, Callable, Iterator, Tuple
 from pathlib import Path
 from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 
+from email_assistant.metrics import SampledLogger, get_metrics
+from email_assistant.tools.gmail.calendar_availability import WorkingHours, get_availability
+from email_assistant.tools.gmail.calendar_cache import get_calendar_cache, record_created_event
+from email_assistant.tools.gmail.label_buffer import flush_label_buffer, get_label_buffer
+from email_assistant.tools.gmail.meeting_slots import find_meeting_slots
+from email_assistant.tools.gmail.request_scheduler import authorized_http_factory, get_request_scheduler, is_rate_limit_error
+
 # Setup basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -145,6 +153,38 @@ except ImportError:
     GMAIL_API_AVAILABLE = False
     logger = logging.getLogger(__name__)
 
+# Per-message debug lines are sampled so DEBUG stays usable on large mailboxes
+_sampled_logger = SampledLogger(logger, sample_every=int(os.getenv("GMAIL_LOG_SAMPLE_EVERY", "100")))
+
+def _prefetch_messages(
+    service: Any,
+    scheduler: Any,
+    messages: List[Dict[str, Any]],
+    http_factory: Optional[Callable[[], Any]],
+) -> Iterator[Tuple[Dict[str, Any], Future, Future]]:
+    """Yield each listed message with futures for its full message and its thread.
+
+    With an ``http_factory`` the requests for the next few messages run
+    concurrently on the scheduler's pool; each thread is fetched once per
+    window however many of its messages are listed. Without one, requests
+    run inline one message at a time.
+    """
+    window = scheduler.max_workers * 4 if http_factory is not None else 1
+    for start in range(0, len(messages), window):
+        chunk = messages[start:start + window]
+        threads: Dict[str, Future] = {}
+        for message in chunk:
+            if message["threadId"] not in threads:
+                threads[message["threadId"]] = scheduler.submit(
+                    service.users().threads().get(userId="me", id=message["threadId"]), "threads.get", http_factory=http_factory
+                )
+        gets = [
+            scheduler.submit(service.users().messages().get(userId="me", id=message["id"]), "messages.get", http_factory=http_factory)
+            for message in chunk
+        ]
+        for message, get in zip(chunk, gets):
+            yield message, get, threads[message["threadId"]]
+
 # Helper function that is used by the tool and can be imported elsewhere
 def fetch_group_emails(
     email_address: str,
@@ -153,6 +193,9 @@ def fetch_group_emails(
     gmail_secret: Optional[str] = None,
     include_read: bool = False,
     skip_filters: bool = False,
+    service: Any = None,
+    scheduler: Any = None,
+    http_factory: Optional[Callable[[], Any]] = None,
 ) -> Iterator[Dict[str, Any]]:
     """
     Fetch recent emails from Gmail that involve the specified email address.
@@ -161,6 +204,16 @@ def fetch_group_emails(
     or recipient, processes them, and returns them in a format suitable for the
     email assistant to process.
     
+    Per-message work is counted in the ``"gmail.fetch"`` metrics rather than
+    logged line by line; a single summary is logged once the batch is done.
+    
+    API calls go through the Gmail request scheduler, which keeps them under
+    the per-user quota and retries rate-limited requests. If the mailbox stays
+    rate-limited after those retries, the error is raised rather than masked
+    with mock data. With a per-thread connection factory, the messages and
+    their threads are fetched concurrently on the scheduler's worker pool, a
+    few pages of workers ahead of the messages being processed.
+    
     Args:
         email_address: Email address to fetch messages for
         minutes_since: Only retrieve emails newer than this many minutes
@@ -168,6 +221,10 @@ def fetch_group_emails(
         gmail_secret: Optional credentials for Gmail API authentication
         include_read: Whether to include already read emails (default: False)
         skip_filters: Skip thread and sender filtering (return all messages, default: False)
+        service: Optional pre-built Gmail service (skips credential loading)
+        scheduler: Optional ``RequestScheduler`` (default: the process-wide Gmail scheduler)
+        http_factory: Optional per-thread connection factory for concurrent
+            fetches; built from the credentials when ``service`` is not given
         
     Yields:
         Dict objects containing processed email information
@@ -175,17 +232,17 @@ def fetch_group_emails(
     use_mock = False
     
     # Check if we need to use mock implementation
-    if not GMAIL_API_AVAILABLE:
+    if service is None and not GMAIL_API_AVAILABLE:
         logger.info("Gmail API not available, using mock implementation")
         use_mock = True
     
     # Check if required credential files exist
-    if not use_mock and not gmail_token and not gmail_secret:
+    if service is None and not use_mock and not gmail_token and not gmail_secret:
         token_path = str(_SECRETS_DIR / "token.json")
         secrets_path = str(_SECRETS_DIR / "secrets.json")
         
         if not os.path.exists(token_path) and not os.path.exists(secrets_path):
-            logger.warning(f"No Gmail API credentials found. Looking for token.json or secrets.json in .secrets directory")
+            logger.warning("No Gmail API credentials found. Looking for token.json or secrets.json in .secrets directory")
             logger.warning("Using mock implementation instead")
             use_mock = True
     
@@ -205,27 +262,33 @@ def fetch_group_emails(
         yield mock_email
         return
     
+    metrics = get_metrics("gmail.fetch")
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    scheduler = scheduler or get_request_scheduler("gmail")
+    
     try:
-        # Get Gmail API credentials from parameters, environment variables, or local files
-        creds = get_credentials(gmail_token, gmail_secret)
-        
-        # Check if credentials are valid
-        if not creds or not hasattr(creds, 'authorize'):
-            logger.warning("Invalid Gmail credentials, using mock implementation")
-            logger.warning("Ensure GMAIL_TOKEN environment variable is set or token.json file exists")
-            mock_email = {
-                "from_email": "sender@example.com",
-                "to_email": email_address,
-                "subject": "Sample Email Subject - Invalid Credentials",
-                "page_content": "This is a mock email because the Gmail credentials are invalid.",
-                "id": "mock-email-id-123",
-                "thread_id": "mock-thread-id-123",
-                "send_time": datetime.now().isoformat()
-            }
-            yield mock_email
-            return
+        if service is None:
+            # Get Gmail API credentials from parameters, environment variables, or local files
+            creds = get_credentials(gmail_token, gmail_secret)
             
-        service = build("gmail", "v1", credentials=creds)
+            # Check if credentials are valid
+            if not creds or not hasattr(creds, 'authorize'):
+                logger.warning("Invalid Gmail credentials, using mock implementation")
+                logger.warning("Ensure GMAIL_TOKEN environment variable is set or token.json file exists")
+                mock_email = {
+                    "from_email": "sender@example.com",
+                    "to_email": email_address,
+                    "subject": "Sample Email Subject - Invalid Credentials",
+                    "page_content": "This is a mock email because the Gmail credentials are invalid.",
+                    "id": "mock-email-id-123",
+                    "thread_id": "mock-thread-id-123",
+                    "send_time": datetime.now().isoformat()
+                }
+                yield mock_email
+                return
+                
+            service = build("gmail", "v1", credentials=creds)
+            http_factory = http_factory or authorized_http_factory(creds)
         
         # Calculate timestamp for filtering
         after = int((datetime.now() - timedelta(minutes=minutes_since)).timestamp())
@@ -242,11 +305,9 @@ def fetch_group_emails(
         # Only include unread emails unless include_read is True
         if not include_read:
             query += " is:unread"
-        else:
-            logger.info("Including read emails in search")
             
         # Log the final query for debugging
-        logger.info(f"Gmail search query: {query}")
+        logger.info("Gmail search query: %s", query)
             
         # Additional filter options (commented out by default)
         # If you want to include emails from specific categories, use:
@@ -255,33 +316,31 @@ def fetch_group_emails(
         # Retrieve all matching messages (handling pagination)
         messages = []
         nextPageToken = None
-        logger.info(f"Fetching emails for {email_address} from last {minutes_since} minutes")
-        
-        while True:
-            results = (
-                service.users()
-                .messages()
-                .list(userId="me", q=query, pageToken=nextPageToken)
-                .execute()
-            )
-            if "messages" in results:
-                new_messages = results["messages"]
-                messages.extend(new_messages)
-                logger.info(f"Found {len(new_messages)} messages in this page")
-            else:
-                logger.info("No messages found in this page")
-                
-            nextPageToken = results.get("nextPageToken")
-            if not nextPageToken:
-                logger.info(f"Total messages found: {len(messages)}")
-                break
+        
+        with metrics.time("list"):
+            while True:
+                results = scheduler.execute(
+                    service.users()
+                    .messages()
+                    .list(userId="me", q=query, pageToken=nextPageToken),
+                    "messages.list",
+                )
+                metrics.incr("pages")
+                messages.extend(results.get("messages", []))
+                    
+                nextPageToken = results.get("nextPageToken")
+                if not nextPageToken:
+                    break
+        metrics.incr("messages_listed", len(messages))
+        logger.info("Fetching emails for %s from last %d minutes: %d messages found", email_address, minutes_since, len(messages))
 
         # Process each message
         count = 0
-        for message in messages:
+        for message, message_future, thread_future in _prefetch_messages(service, scheduler, messages, http_factory):
             try:
                 # Get full message details
-                msg = service.users().messages().get(userId="me", id=message["id"]).execute()
+                with metrics.time("get_message"):
+                    msg = message_future.result()
                 thread_id = msg["threadId"]
                 payload = msg["payload"]
                 headers = payload.get("headers", [])
@@ -289,30 +348,31 @@ def fetch_group_emails(
                 # Get thread details to determine conversation context
                 # Directly fetch the complete thread without any format restriction
                 # This matches the exact approach in the test code that successfully gets all messages
-                thread = service.users().threads().get(userId="me", id=thread_id).execute()
+                with metrics.time("get_thread"):
+                    thread = thread_future.result()
                 messages_in_thread = thread["messages"]
-                logger.info(f"Retrieved thread {thread_id} with {len(messages_in_thread)} messages")
+                metrics.incr("thread_messages", len(messages_in_thread))
                 
                 # Sort messages by internalDate to ensure proper chronological ordering
                 # This ensures we correctly identify the latest message
                 if all("internalDate" in msg for msg in messages_in_thread):
                     messages_in_thread.sort(key=lambda m: int(m.get("internalDate", 0)))
-                    logger.info(f"Sorted {len(messages_in_thread)} messages by internalDate")
                 else:
                     # Fallback to ID-based sorting if internalDate is missing
                     messages_in_thread.sort(key=lambda m: m["id"])
-                    logger.info(f"Sorted {len(messages_in_thread)} messages by ID (internalDate missing)")
-                
-                # Log details about the messages in the thread for debugging
-                for idx, msg in enumerate(messages_in_thread):
-                    headers = msg["payload"]["headers"]
-                    subject = next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject")
-                    from_email = next((h["value"] for h in headers if h["name"] == "From"), "Unknown")
-                    date = next((h["value"] for h in headers if h["name"] == "Date"), "Unknown")
-                    logger.info(f"  Message {idx+1}/{len(messages_in_thread)}: ID={msg['id']}, Date={date}, From={from_email}")
                 
-                # Log thread information for debugging
-                logger.info(f"Thread {thread_id} has {len(messages_in_thread)} messages")
+                # Log details about the messages in the thread for debugging; the
+                # header scans only run when DEBUG is actually enabled
+                if debug_enabled:
+                    for idx, thread_msg in enumerate(messages_in_thread):
+                        thread_headers = thread_msg["payload"]["headers"]
+                        date = next((h["value"] for h in thread_headers if h["name"] == "Date"), "Unknown")
+                        from_email = next((h["value"] for h in thread_headers if h["name"] == "From"), "Unknown")
+                        _sampled_logger.debug(
+                            "thread_message",
+                            "Thread %s message %d/%d: ID=%s, Date=%s, From=%s",
+                            thread_id, idx + 1, len(messages_in_thread), thread_msg["id"], date, from_email,
+                        )
                 
                 # Analyze the last message in the thread to determine if we need to process it
                 last_message = messages_in_thread[-1]
@@ -331,6 +391,7 @@ def fetch_group_emails(
                 # If the last message was sent by the user, mark this as a user response
                 # and don't process it further (assistant doesn't need to respond to user's own emails)
                 if email_address in last_from_header:
+                    metrics.incr("user_responded")
                     yield {
                         "id": message["id"],
                         "thread_id": message["threadId"],
@@ -349,17 +410,12 @@ def fetch_group_emails(
                 
                 if not should_process:
                     if is_from_user:
-                        logger.debug(f"Skipping message {message['id']}: sent by the user")
+                        metrics.incr("skipped_from_user")
                     elif not is_latest_in_thread:
-                        logger.debug(f"Skipping message {message['id']}: not the latest in thread")
+                        metrics.incr("skipped_not_latest")
                 
                 # Process the message if it passes our filters (or if filters are skipped)
                 if should_process:
-                    # Log detailed information about this message
-                    logger.info(f"Processing message {message['id']} from thread {thread_id}")
-                    logger.info(f"  Is latest in thread: {is_latest_in_thread}")
-                    logger.info(f"  Skip filters enabled: {skip_filters}")
-                    
                     # If the user wants to process the latest message in the thread,
                     # use the last_message from the thread API call instead of the original message
                     # that matched the search query
@@ -373,7 +429,12 @@ def fetch_group_emails(
                         process_message = last_message
                         process_payload = last_message["payload"]
                         process_headers = process_payload.get("headers", [])
-                        logger.info(f"Using latest message in thread: {process_message['id']}")
+                    
+                    _sampled_logger.debug(
+                        "process_message",
+                        "Processing message %s from thread %s (latest in thread: %s, skip filters: %s)",
+                        process_message["id"], thread_id, is_latest_in_thread, skip_filters,
+                    )
                     
                     # Extract email metadata from headers
                     subject = next(
@@ -406,7 +467,8 @@ def fetch_group_emails(
                     parsed_time = parse_time(send_time)
                     
                     # Extract email body content
-                    body = extract_message_part(process_payload)
+                    with metrics.time("extract"):
+                        body = extract_message_part(process_payload)
                     
                     # Yield the processed email data
                     yield {
@@ -418,15 +480,25 @@ def fetch_group_emails(
                         "thread_id": process_message["threadId"],
                         "send_time": parsed_time.isoformat(),
                     }
+                    metrics.incr("emails_yielded")
                     count += 1
                     
             except Exception as e:
-                logger.warning(f"Failed to process message {message['id']}: {str(e)}")
+                if is_rate_limit_error(e):
+                    raise
+                metrics.incr("failed")
+                logger.warning("Failed to process message %s: %s", message["id"], e)
 
-        logger.info(f"Found {count} emails to process out of {len(messages)} total messages.")
+        logger.info("Found %d emails to process out of %d total messages.", count, len(messages))
+        metrics.log_summary(logger)
     
     except Exception as e:
-        logger.error(f"Error accessing Gmail API: {str(e)}")
+        if is_rate_limit_error(e):
+            # Still rate-limited after backing off: surface it instead of
+            # handing a fake email to the caller
+            logger.error("Gmail API rate limit exceeded for %s: %s", email_address, e)
+            raise
+        logger.error("Error accessing Gmail API: %s", e)
         # Fall back to mock implementation
         mock_email = {
             "from_email": "sender@example.com",
@@ -536,10 +608,11 @@ def send_email(
             gmail_secret=os.getenv("GMAIL_SECRET")
         )
         service = build("gmail", "v1", credentials=creds)
+        scheduler = get_request_scheduler("gmail")
         
         try:
             # Try to get the original message to extract headers
-            message = service.users().messages().get(userId="me", id=email_id).execute()
+            message = scheduler.execute(service.users().messages().get(userId="me", id=email_id), "messages.get")
             headers = message["payload"]["headers"]
             
             # Extract subject with Re: prefix if not already present
@@ -579,14 +652,15 @@ def send_email(
             body["threadId"] = thread_id
             
         # Send the message
-        sent_message = (
+        sent_message = scheduler.execute(
             service.users()
             .messages()
             .send(
                 userId="me",
                 body=body,
-            )
-            .execute()
+            ),
+            "messages.send",
+            idempotent=False,
         )
         
         logger.info(f"Email sent: Message ID {sent_message['id']}")
@@ -638,154 +712,70 @@ class CheckCalendarInput(BaseModel):
         description="List of dates to check in DD-MM-YYYY format"
     )
 
-def get_calendar_events(dates: List[str]) -> str:
+_MOCK_CALENDAR_EVENTS = (
+    "  - 9:00 AM - 10:00 AM: Team Meeting\n"
+    "  - 2:00 PM - 3:00 PM: Project Review\n"
+    "Available slots: 10:00 AM - 2:00 PM, after 3:00 PM\n\n"
+)
+
+def _build_calendar_service():
+    """Build a Calendar service from environment variables or local credential files."""
+    creds = get_credentials(
+        gmail_token=os.getenv("GMAIL_TOKEN"),
+        gmail_secret=os.getenv("GMAIL_SECRET")
+    )
+    return build("calendar", "v3", credentials=creds)
+
+def check_calendar(
+    dates: List[str],
+    working_hours: Optional[WorkingHours] = None,
+    service: Any = None,
+    cache: Any = None,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
     """
-    Check Google Calendar for events on specified dates.
+    Check Google Calendar availability on the specified dates.
+    
+    All dates are fetched with a single freebusy query and free slots are
+    computed against the configured working hours (see ``WorkingHours.from_env``).
+    Without an explicit ``service``, lookups go through the process-wide
+    calendar cache, which is refreshed incrementally with sync tokens.
     
     Args:
         dates: List of dates to check in DD-MM-YYYY format
+        working_hours: Optional working hours/timezone to compute free slots against
+        service: Optional pre-built Calendar service (skips credential loading)
+        cache: Optional ``CalendarCache`` to serve busy time from
         
     Returns:
-        Formatted calendar events for the specified dates
+        Tuple of the formatted availability text and the structured availability
+        (None when mock data is returned)
     """
-    if not GMAIL_API_AVAILABLE:
+    if service is None and not GMAIL_API_AVAILABLE:
         logger.info("Gmail API not available, simulating calendar check")
         # Fallback: Return mock calendar data for demo/testing purposes
         # In production, this should use the real Google Calendar API
         result = "Calendar events:\n\n"
         for date in dates:
-            result += f"Events for {date}:\n"
-            result += "  - 9:00 AM - 10:00 AM: Team Meeting\n"
-            result += "  - 2:00 PM - 3:00 PM: Project Review\n"
-            result += "Available slots: 10:00 AM - 2:00 PM, after 3:00 PM\n\n"
-        return result
+            result += f"Events for {date}:\n" + _MOCK_CALENDAR_EVENTS
+        return result, None
         
     try:
-        # Get Gmail API credentials from environment variables or local files
-        creds = get_credentials(
-            gmail_token=os.getenv("GMAIL_TOKEN"),
-            gmail_secret=os.getenv("GMAIL_SECRET")
-        )
-        service = build("calendar", "v3", credentials=creds)
-        
-        result = "Calendar events:\n\n"
-        
-        for date_str in dates:
-            # Parse date string (DD-MM-YYYY)
-            day, month, year = date_str.split("-")
-            
-            # Format start and end times for the API
-            start_time = f"{year}-{month}-{day}T00:00:00Z"
-            end_time = f"{year}-{month}-{day}T23:59:59Z"
-            
-            # Call the Calendar API
-            events_result = (
-                service.events()
-                .list(
-                    calendarId="primary",
-                    timeMin=start_time,
-                    timeMax=end_time,
-                    singleEvents=True,
-                    orderBy="startTime",
-                )
-                .execute()
-            )
-            
-            events = events_result.get("items", [])
-            
-            result += f"Events for {date_str}:\n"
-            
-            if not events:
-                result += "  No events found for this day\n"
-                result += "  Available all day\n\n"
-                continue
-                
-            # Process events
-            busy_slots = []
-            for event in events:
-                start = event["start"].get("dateTime", event["start"].get("date"))
-                end = event["end"].get("dateTime", event["end"].get("date"))
-                
-                # Convert to datetime objects
-                if "T" in start:  # dateTime format
-                    start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
-                    end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
-                    
-                    # Format for display
-                    start_display = start_dt.strftime("%I:%M %p")
-                    end_display = end_dt.strftime("%I:%M %p")
-                    
-                    result += f"  - {start_display} - {end_display}: {event['summary']}\n"
-                    busy_slots.append((start_dt, end_dt))
-                else:  # all-day event
-                    result += f"  - All day: {event['summary']}\n"
-                    busy_slots.append(("all-day", "all-day"))
-            
-            # Calculate available slots
-            if "all-day" in [slot[0] for slot in busy_slots]:
-                result += "  Available: No availability (all-day events)\n\n"
-            else:
-                # Sort busy slots by start time
-                busy_slots.sort(key=lambda x: x[0])
-                
-                # Define working hours (9 AM to 5 PM)
-                # Note: Working hours are currently hardcoded for simplicity
-                # In production, this could be made configurable per user/organization
-                work_start = datetime(
-                    year=int(year), 
-                    month=int(month), 
-                    day=int(day), 
-                    hour=9, 
-                    minute=0
-                )
-                work_end = datetime(
-                    year=int(year), 
-                    month=int(month), 
-                    day=int(day), 
-                    hour=17, 
-                    minute=0
-                )
-                
-                # Calculate available slots
-                available_slots = []
-                current = work_start
-                
-                for start, end in busy_slots:
-                    if current < start:
-                        available_slots.append((current, start))
-                    current = max(current, end)
-                
-                if current < work_end:
-                    available_slots.append((current, work_end))
-                
-                # Format available slots
-                if available_slots:
-                    result += "  Available: "
-                    for i, (start, end) in enumerate(available_slots):
-                        start_display = start.strftime("%I:%M %p")
-                        end_display = end.strftime("%I:%M %p")
-                        result += f"{start_display} - {end_display}"
-                        if i < len(available_slots) - 1:
-                            result += ", "
-                    result += "\n\n"
-                else:
-                    result += "  Available: No availability during working hours\n\n"
+        if service is None:
+            cache = cache or get_calendar_cache(_build_calendar_service)
+            service = cache.service
         
-        return result
+        availability = get_availability(service, dates, working_hours, cache=cache)
+        return availability.to_text(), availability.to_dict()
         
     except Exception as e:
-        logger.error(f"Error checking calendar: {str(e)}")
+        logger.error("Error checking calendar: %s", e)
         # Return mock data in case of error
         result = "Calendar events (mock due to error):\n\n"
         for date in dates:
-            result += f"Events for {date}:\n"
-            result += "  - 9:00 AM - 10:00 AM: Team Meeting\n"
-            result += "  - 2:00 PM - 3:00 PM: Project Review\n"
-            result += "Available slots: 10:00 AM - 2:00 PM, after 3:00 PM\n\n"
-        return result
+            result += f"Events for {date}:\n" + _MOCK_CALENDAR_EVENTS
+        return result, None
 
-@tool(args_schema=CheckCalendarInput)
-def check_calendar_tool(dates: List[str]) -> str:
+def get_calendar_events(dates: List[str]) -> str:
     """
     Check Google Calendar for events on specified dates.
     
@@ -793,13 +783,135 @@ def check_calendar_tool(dates: List[str]) -> str:
         dates: List of dates to check in DD-MM-YYYY format
         
     Returns:
-        Formatted calendar events for the specified dates
+        Formatted calendar availability for the specified dates
+    """
+    return check_calendar(dates)[0]
+
+@tool(args_schema=CheckCalendarInput, response_format="content_and_artifact")
+def check_calendar_tool(dates: List[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Check Google Calendar for events on specified dates.
+    
+    Args:
+        dates: List of dates to check in DD-MM-YYYY format
+        
+    Returns:
+        Formatted calendar availability for the specified dates, with the
+        structured busy/free intervals attached as the tool message artifact
+    """
+    try:
+        return check_calendar(dates)
+    except Exception as e:
+        return f"Failed to check calendar: {str(e)}", None
+
+class FindMeetingSlotsInput(BaseModel):
+    """
+    Input schema for the find_meeting_slots_tool.
+    """
+    attendees: List[str] = Field(
+        description="Email addresses of meeting attendees"
+    )
+    duration_minutes: int = Field(
+        default=30,
+        description="Meeting length in minutes"
+    )
+    start_date: str = Field(
+        description="First day to search in DD-MM-YYYY format"
+    )
+    end_date: str = Field(
+        description="Last day to search (inclusive) in DD-MM-YYYY format"
+    )
+    max_results: int = Field(
+        default=5,
+        description="Maximum number of candidate slots to return"
+    )
+
+def find_meeting_times(
+    attendees: List[str],
+    duration_minutes: int,
+    start_date: str,
+    end_date: str,
+    max_results: int = 5,
+    working_hours: Optional[WorkingHours] = None,
+    service: Any = None,
+    not_before: Optional[datetime] = None,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Find ranked meeting slots when the organizer and all attendees are free.
+    
+    Busy time for everyone is fetched with a single freebusy query; slots in
+    the past are skipped.
+    
+    Args:
+        attendees: Email addresses of meeting attendees
+        duration_minutes: Meeting length in minutes
+        start_date: First day to search in DD-MM-YYYY format
+        end_date: Last day to search (inclusive) in DD-MM-YYYY format
+        max_results: Maximum number of candidate slots to return
+        working_hours: Optional working hours/timezone to search within
+        service: Optional pre-built Calendar service (skips credential loading)
+        not_before: Ignore slots starting earlier (default: now)
+        
+    Returns:
+        Tuple of the formatted candidate slots and the structured result
+        (None when mock data is returned)
+    """
+    if service is None and not GMAIL_API_AVAILABLE:
+        logger.info("Gmail API not available, simulating meeting slot search")
+        return (
+            f"Candidate {duration_minutes}-minute meeting slots (mock):\n\n"
+            f"  1. {start_date} 10:00 AM\n"
+            f"  2. {start_date} 03:00 PM\n"
+        ), None
+    
+    try:
+        if service is None:
+            service = _build_calendar_service()
+        working_hours = working_hours or WorkingHours.from_env()
+        search = find_meeting_slots(
+            service,
+            attendees,
+            timedelta(minutes=duration_minutes),
+            start_date,
+            end_date,
+            working_hours,
+            not_before=not_before or datetime.now(working_hours.tzinfo),
+            max_results=max_results,
+        )
+        return search.to_text(), search.to_dict()
+    
+    except Exception as e:
+        logger.error("Error finding meeting slots: %s", e)
+        return f"Failed to find meeting slots: {str(e)}", None
+
+@tool(args_schema=FindMeetingSlotsInput, response_format="content_and_artifact")
+def find_meeting_slots_tool(
+    attendees: List[str],
+    start_date: str,
+    end_date: str,
+    duration_minutes: int = 30,
+    max_results: int = 5
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Find the best times for a meeting when you and all attendees are free.
+    
+    Args:
+        attendees: Email addresses of meeting attendees
+        start_date: First day to search in DD-MM-YYYY format
+        end_date: Last day to search (inclusive) in DD-MM-YYYY format
+        duration_minutes: Meeting length in minutes
+        max_results: Maximum number of candidate slots to return
+        
+    Returns:
+        Ranked candidate slots with start/end times ready for
+        schedule_meeting_tool, with the structured slots attached as the
+        tool message artifact. Attendees whose calendars could not be
+        checked are listed; the slots may conflict with their meetings.
     """
     try:
-        events = get_calendar_events(dates)
-        return events
+        return find_meeting_times(attendees, duration_minutes, start_date, end_date, max_results)
     except Exception as e:
-        return f"Failed to check calendar: {str(e)}"
+        return f"Failed to find meeting slots: {str(e)}", None
 
 class ScheduleMeetingInput(BaseModel):
     """
@@ -831,11 +943,15 @@ def send_calendar_invite(
     start_time: str,
     end_time: str,
     organizer_email: str,
-    timezone: str = "America/Los_Angeles"
+    timezone: str = "America/Los_Angeles",
+    service: Any = None,
 ) -> bool:
     """
     Schedule a meeting with Google Calendar and send invites.
     
+    The created event is written through to the calendar cache so the next
+    availability check sees it without waiting for the cache to expire.
+    
     Args:
         attendees: Email addresses of meeting attendees
         title: Meeting title/subject
@@ -843,23 +959,20 @@ def send_calendar_invite(
         end_time: Meeting end time in ISO format (YYYY-MM-DDTHH:MM:SS)
         organizer_email: Email address of the meeting organizer
         timezone: Timezone for the meeting
+        service: Optional pre-built Calendar service (skips credential loading)
         
     Returns:
         Success flag (True if meeting was scheduled)
     """
-    if not GMAIL_API_AVAILABLE:
+    if service is None and not GMAIL_API_AVAILABLE:
         logger.info("Gmail API not available, simulating calendar invite")
         logger.info(f"Would schedule: {title} from {start_time} to {end_time}")
         logger.info(f"Attendees: {', '.join(attendees)}")
         return True
         
     try:
-        # Get Gmail API credentials from environment variables or local files
-        creds = get_credentials(
-            gmail_token=os.getenv("GMAIL_TOKEN"),
-            gmail_secret=os.getenv("GMAIL_SECRET")
-        )
-        service = build("calendar", "v3", credentials=creds)
+        if service is None:
+            service = _build_calendar_service()
         
         # Create event details
         event = {
@@ -884,9 +997,12 @@ def send_calendar_invite(
         }
         
         # Create the event
-        event = service.events().insert(calendarId="primary", body=event).execute()
+        event = get_request_scheduler("calendar").execute(
+            service.events().insert(calendarId="primary", body=event), "events.insert", idempotent=False
+        )
+        record_created_event(event)
         
-        logger.info(f"Meeting created: {event.get('htmlLink')}")
+        logger.info("Meeting created: %s", event.get("htmlLink"))
         return True
         
     except Exception as e:
@@ -933,14 +1049,38 @@ def schedule_meeting_tool(
     except Exception as e:
         return f"Error scheduling meeting: {str(e)}"
     
-def mark_as_read(
-    message_id,
-    gmail_token: str | None = None,
-    gmail_secret: str | None = None,
-):
-    creds = get_credentials(gmail_token, gmail_secret)
+def _build_gmail_service():
+    """Build a Gmail service from environment variables or local credential files."""
+    creds = get_credentials(
+        gmail_token=os.getenv("GMAIL_TOKEN"),
+        gmail_secret=os.getenv("GMAIL_SECRET")
+    )
+    return build("gmail", "v1", credentials=creds)
+
+def queue_mark_as_read(message_id: str) -> None:
+    """
+    Queue an email to be marked as read.
+    
+    Changes are collected by the process-wide label buffer and applied with
+    ``batchModify`` (up to 1,000 emails per request) after
+    ``GMAIL_LABEL_FLUSH_INTERVAL`` seconds, on ``flush_label_changes()`` or at exit,
+    reusing a single Gmail service.
+    
+    Args:
+        message_id: Gmail message ID
+    """
+    if not GMAIL_API_AVAILABLE:
+        logger.info("Gmail API not available, simulating mark as read for %s", message_id)
+        return
+    get_label_buffer(_build_gmail_service).mark_as_read([message_id])
 
-    service = build("gmail", "v1", credentials=creds)
-    service.users().messages().modify(
-        userId="me", id=message_id, body={"removeLabelIds": ["UNREAD"]}
-    ).execute()
\ No newline at end of file
+def flush_label_changes() -> int:
+    """
+    Apply all queued label changes now, e.g. at the end of a batch.
+    
+    Returns:
+        Number of batchModify requests made
+    """
+    if not GMAIL_API_AVAILABLE:
+        return 0
+    return flush_label_buffer()
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Buffered Gmail label mutations.
+
+Marking emails as read one ``messages.modify`` call at a time costs a request
+(and a service build) per email. ``LabelMutationBuffer``
+accumulates label changes and applies them with ``users.messages.batchModify``,
+up to 1,000 message IDs per request, when a batch ends or a timer fires.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler, get_request_scheduler, is_retryable_error
+
+logger = logging.getLogger(__name__)
+
+# batchModify accepts at most this many message IDs per request
+MAX_BATCH_IDS = 1000
+# Flushes a change may fail in before it is dropped
+MAX_FLUSH_ATTEMPTS = 5
+
+class LabelMutationBuffer:
+    """Accumulates label changes and flushes them with ``batchModify``.
+
+    Changes are tracked per message and label, so a later change to the same
+    label overrides an earlier one; messages with the same net change are sent
+    together. Pending changes are flushed after ``flush_interval_s``, once
+    ``max_pending`` messages are waiting, on ``flush()`` or on ``close()``.
+
+    Args:
+        service_factory: Zero-argument callable returning a Gmail ``v1`` service;
+            called once and the service reused for every flush
+        user_id: Gmail user ID for the requests
+        flush_interval_s: Delay after the first pending change before a
+            background flush; None disables the timer
+        max_pending: Flush as soon as this many messages have pending changes
+        scheduler: Request scheduler that throttles and retries the requests;
+            batchModify is idempotent, so retrying a request that had in fact
+            succeeded is harmless. Defaults to the process-wide Gmail scheduler
+        max_attempts: Flushes a message's changes may fail in before they
+            are dropped
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable[[], Any],
+        user_id: str = "me",
+        flush_interval_s: Optional[float] = 5.0,
+        max_pending: int = MAX_BATCH_IDS,
+        scheduler: Optional[RequestScheduler] = None,
+        max_attempts: int = MAX_FLUSH_ATTEMPTS,
+    ):
+        self._service_factory = service_factory
+        self._service = None
+        self.user_id = user_id
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max_pending
+        self.scheduler = scheduler or get_request_scheduler("gmail", user_id)
+        self.max_attempts = max_attempts
+        # Guards the pending changes; never held during network I/O
+        self._lock = threading.RLock()
+        # Serializes flushes, so changes to a message are applied in order
+        self._flush_lock = threading.Lock()
+        # message ID -> {label ID: True to add, False to remove}
+        self._pending: Dict[str, Dict[str, bool]] = {}
+        # message ID -> flushes its changes have failed in
+        self._attempts: Dict[str, int] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._metrics = get_metrics("gmail.labels")
+
+    @property
+    def service(self) -> Any:
+        if self._service is None:
+            self._service = self._service_factory()
+        return self._service
+
+    @property
+    def pending(self) -> int:
+        """Number of messages with changes waiting to be flushed."""
+        with self._lock:
+            return len(self._pending)
+
+    def modify(
+        self,
+        message_ids: Iterable[str],
+        add_label_ids: Iterable[str] = (),
+        remove_label_ids: Iterable[str] = (),
+    ) -> None:
+        """Queue label changes for ``message_ids``."""
+        add_label_ids, remove_label_ids = list(add_label_ids), list(remove_label_ids)
+        with self._lock:
+            for message_id in message_ids:
+                changes = self._pending.setdefault(message_id, {})
+                changes.update({label: True for label in add_label_ids})
+                changes.update({label: False for label in remove_label_ids})
+                self._metrics.incr("mutations_queued")
+            full = len(self._pending) >= self.max_pending
+            if not full:
+                self._schedule_flush()
+        if full:
+            self.flush()
+
+    def mark_as_read(self, message_ids: Iterable[str]) -> None:
+        """Queue removal of the ``UNREAD`` label."""
+        self.modify(message_ids, remove_label_ids=["UNREAD"])
+
+    def flush(self) -> int:
+        """Send every pending change now and return the number of requests made.
+
+        The pending changes are taken under the lock and sent outside it, so
+        callers can keep queueing changes during a flush. Changes whose
+        request failed with a transient error (after the scheduler's
+        retries), or could not be built, are put back for the next flush, up
+        to ``max_attempts`` flushes; other failures, such as invalid IDs or a
+        permission error, drop them.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._cancel_timer()
+                pending, self._pending = self._pending, {}
+            requests = 0
+            for (add, remove), ids in self._group(pending).items():
+                for i in range(0, len(ids), MAX_BATCH_IDS):
+                    chunk = ids[i:i + MAX_BATCH_IDS]
+                    retry = self._send(chunk, add, remove)
+                    if retry is None:
+                        requests += 1
+                        self._metrics.incr("messages_modified", len(chunk))
+                        self._metrics.incr("requests_saved", len(chunk) - 1)
+                        with self._lock:
+                            for message_id in chunk:
+                                self._attempts.pop(message_id, None)
+                    else:
+                        self._requeue(chunk, pending, retry)
+            with self._lock:
+                self._schedule_flush()
+            return requests
+
+    def close(self) -> None:
+        """Flush pending changes and stop the timer."""
+        self.flush()
+        self._cancel_timer()
+
+    def __enter__(self) -> "LabelMutationBuffer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @staticmethod
+    def _group(pending: Dict[str, Dict[str, bool]]) -> Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], List[str]]:
+        groups: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], List[str]] = {}
+        for message_id, changes in pending.items():
+            add = tuple(sorted(label for label, added in changes.items() if added))
+            remove = tuple(sorted(label for label, added in changes.items() if not added))
+            groups.setdefault((add, remove), []).append(message_id)
+        return groups
+
+    def _send(self, ids: List[str], add: Tuple[str, ...], remove: Tuple[str, ...]) -> Optional[bool]:
+        """Apply one batch of changes.
+
+        Returns:
+            ``None`` on success, otherwise whether the failure is worth
+            retrying: a transient error, or one raised before the request
+            was sent (building the service, refreshing credentials)
+        """
+        body: Dict[str, Any] = {"ids": ids}
+        if add:
+            body["addLabelIds"] = list(add)
+        if remove:
+            body["removeLabelIds"] = list(remove)
+        try:
+            request = self.service.users().messages().batchModify(userId=self.user_id, body=body)
+        except Exception as e:
+            self._metrics.incr("failed_requests")
+            logger.error("Could not build batchModify for %d messages: %s", len(ids), e)
+            return True
+        try:
+            with self._metrics.time("batch_modify"):
+                self.scheduler.execute(request, "messages.batchModify")
+        except Exception as e:
+            self._metrics.incr("failed_requests")
+            logger.error("batchModify of %d messages failed: %s", len(ids), e)
+            return is_retryable_error(e)
+        self._metrics.incr("requests")
+        return None
+
+    def _requeue(self, ids: List[str], pending: Dict[str, Dict[str, bool]], retry: bool) -> None:
+        """Put failed changes back for the next flush, or drop them."""
+        dropped = 0
+        with self._lock:
+            for message_id in ids:
+                attempts = self._attempts.get(message_id, 0) + 1
+                if retry and attempts < self.max_attempts:
+                    self._attempts[message_id] = attempts
+                    # Keep anything queued for these messages meanwhile
+                    self._pending[message_id] = {**pending[message_id], **self._pending.get(message_id, {})}
+                else:
+                    self._attempts.pop(message_id, None)
+                    dropped += 1
+        if dropped:
+            self._metrics.incr("messages_dropped", dropped)
+            logger.error("Dropped label changes for %d messages", dropped)
+
+    def _schedule_flush(self) -> None:
+        if self.flush_interval_s is None or self._timer is not None or not self._pending:
+            return
+        self._timer = threading.Timer(self.flush_interval_s, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self) -> None:
+        with self._lock:
+            if self._timer is threading.current_thread():
+                self._timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("Background label flush failed: %s", e)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+_buffer: Optional[LabelMutationBuffer] = None
+_buffer_lock = threading.Lock()
+
+def get_label_buffer(service_factory: Callable[[], Any]) -> LabelMutationBuffer:
+    """Return the process-wide label buffer, creating it on first use.
+
+    The flush delay can be tuned with ``GMAIL_LABEL_FLUSH_INTERVAL`` (seconds).
+    Pending changes are flushed when the process exits.
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = LabelMutationBuffer(
+                service_factory,
+                flush_interval_s=float(os.getenv("GMAIL_LABEL_FLUSH_INTERVAL", "5")),
+            )
+            atexit.register(_buffer.close)
+        return _buffer
+
+def flush_label_buffer() -> int:
+    """Flush the process-wide label buffer now, if one has been created.
+
+    Returns:
+        Number of batchModify requests made
+    """
+    with _buffer_lock:
+        buffer = _buffer
+    return buffer.flush() if buffer is not None else 0
@@ -0,0 +1,197 @@
+"""
+In-process email ingestion that bypasses the LangGraph server.
+
+Loads a graph listed in ``langgraph.json``, recompiles it with a local
+checkpointer and store, and runs emails through it directly from a worker
+pool. There is no HTTP round trip or server queue per email, so a single box
+can work through a mailbox backlog at local speed. Thread IDs match the ones
+``run_ingest.py`` uses with a server.
+"""
+
+import importlib
+import importlib.util
+import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.store.base import BaseStore
+from langgraph.store.memory import InMemoryStore
+
+from email_assistant.metrics import get_metrics
+from email_assistant.persistence import sqlite_persistence
+from email_assistant.tools.gmail.gmail_tools import flush_label_changes
+from email_assistant.tools.gmail.run_ingest import build_run_input, ingest_run_key, langgraph_thread_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = Path(__file__).resolve().parents[4] / "langgraph.json"
+
+# Store namespace recording which emails have been ingested
+INGESTED_NAMESPACE = ("gmail_ingest", "runs")
+
+def _import_file(path: Path, fallback_name: str) -> Any:
+    # Import files inside an importable package by module name, so the
+    # package's modules are not loaded a second time under another name
+    parts = [path.stem]
+    parent = path.parent
+    while (parent / "__init__.py").exists():
+        parts.insert(0, parent.name)
+        parent = parent.parent
+    if len(parts) > 1:
+        try:
+            spec = importlib.util.find_spec(".".join(parts))
+        except ImportError:
+            spec = None
+        if spec is not None and spec.origin and Path(spec.origin).resolve() == path:
+            return importlib.import_module(".".join(parts))
+    spec = importlib.util.spec_from_file_location(fallback_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def load_graph(graph_name: str, config_path: Path = DEFAULT_CONFIG) -> Any:
+    """Load the compiled graph registered as ``graph_name`` in ``langgraph.json``."""
+    config_path = Path(config_path)
+    with open(config_path) as f:
+        graphs = json.load(f)["graphs"]
+    if graph_name not in graphs:
+        raise ValueError(f"Graph {graph_name!r} not found in {config_path} (available: {', '.join(graphs)})")
+    file_part, _, attribute = graphs[graph_name].partition(":")
+    module = _import_file((config_path.parent / file_part).resolve(), f"local_graph_{graph_name}")
+    graph = getattr(module, attribute)
+    if not hasattr(graph, "builder"):
+        raise TypeError(f"{graphs[graph_name]} is not a compiled graph")
+    return graph
+
+class LocalIngestor:
+    """Runs emails through a graph in-process with a local checkpointer and store.
+
+    Like ``ingest_email_to_langgraph``, ingesting an email already recorded
+    in the store is a no-op unless ``rerun`` is set. A run that stops at a
+    human-in-the-loop interrupt is recorded as ``"interrupted"`` rather than
+    ``"completed"``, counted as ``runs_interrupted`` and listed in
+    ``interrupted``: its thread still waits for a response.
+
+    Args:
+        graph_name: Graph to load from ``langgraph.json``
+        checkpointer: Where thread state is kept; defaults to ``db_path``,
+            or in memory
+        store: Long-term memory store for the graph; defaults to
+            ``db_path``, or in memory
+        max_workers: Threads processed concurrently. Emails in the same
+            thread always run one at a time, in the order given
+        config_path: Path to ``langgraph.json``
+        db_path: SQLite file to keep thread state, memory and the record of
+            ingested emails in across runs
+    """
+
+    def __init__(
+        self,
+        graph_name: str,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+        store: Optional[BaseStore] = None,
+        max_workers: int = 4,
+        config_path: Path = DEFAULT_CONFIG,
+        db_path: Optional[Path] = None,
+    ):
+        self.graph_name = graph_name
+        self._owned = sqlite_persistence(db_path) if db_path is not None else ()
+        if self._owned:
+            checkpointer = checkpointer or self._owned[0]
+            store = store if store is not None else self._owned[1]
+        self.checkpointer = checkpointer or InMemorySaver()
+        self.store = store if store is not None else InMemoryStore()
+        self.graph = load_graph(graph_name, config_path).builder.compile(
+            checkpointer=self.checkpointer, store=self.store
+        )
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="local-ingest")
+        self._thread_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        # (thread ID, email ID) of runs waiting at an interrupt
+        self.interrupted: List[Tuple[str, str]] = []
+        self._metrics = get_metrics("gmail.local_ingest")
+
+    def ingest(self, email_data: Dict[str, Any], rerun: bool = False) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Run one email through the graph.
+
+        Returns:
+            The thread ID and the graph's output (``None`` if the email had
+            already been ingested)
+        """
+        thread_id = langgraph_thread_id(email_data["thread_id"])
+        run_key = ingest_run_key(thread_id, email_data["id"])
+        with self._thread_lock(thread_id):
+            if not rerun and self.store.get(INGESTED_NAMESPACE, run_key) is not None:
+                self._metrics.incr("duplicates_skipped")
+                return thread_id, None
+            config = {
+                "configurable": {"thread_id": thread_id},
+                "metadata": {"ingest_key": run_key, "email_id": email_data["id"]},
+            }
+            with self._metrics.time("run"):
+                result = self.graph.invoke(build_run_input(email_data), config)
+            # A run paused for a human has work left: the state says which node is next
+            status = "interrupted" if self.graph.get_state(config).next else "completed"
+            self.store.put(
+                INGESTED_NAMESPACE, run_key, {"thread_id": thread_id, "email_id": email_data["id"], "status": status}
+            )
+        if status == "interrupted":
+            self._metrics.incr("runs_interrupted")
+            with self._locks_lock:
+                self.interrupted.append((thread_id, email_data["id"]))
+            logger.info("Email %s is waiting for review on thread %s", email_data["id"], thread_id)
+        else:
+            self._metrics.incr("runs_completed")
+        return thread_id, result
+
+    def ingest_all(self, emails: Iterable[Dict[str, Any]], rerun: bool = False) -> List[Optional[Tuple[str, Optional[Dict[str, Any]]]]]:
+        """Run many emails through the graph from the worker pool.
+
+        A failed email is logged and its result is ``None``; the rest still run.
+        The label changes the runs queued (emails marked as read) are applied
+        at the end.
+
+        Returns:
+            One result per email, in the order given
+        """
+        emails = list(emails)
+        by_thread: "OrderedDict[str, List[int]]" = OrderedDict()
+        for i, email_data in enumerate(emails):
+            by_thread.setdefault(email_data["thread_id"], []).append(i)
+
+        results: List[Optional[Tuple[str, Optional[Dict[str, Any]]]]] = [None] * len(emails)
+
+        def run_thread(indexes: List[int]) -> None:
+            for i in indexes:
+                try:
+                    results[i] = self.ingest(emails[i], rerun=rerun)
+                except Exception as e:
+                    self._metrics.incr("runs_failed")
+                    logger.warning("Ingesting email %s failed: %s", emails[i]["id"], e)
+
+        for future in [self._pool.submit(run_thread, indexes) for indexes in by_thread.values()]:
+            future.result()
+        flush_label_changes()
+        return results
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        flush_label_changes()
+        for database in self._owned:
+            database.close()
+
+    def __enter__(self) -> "LocalIngestor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _thread_lock(self, thread_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._thread_locks.setdefault(thread_id, threading.Lock())
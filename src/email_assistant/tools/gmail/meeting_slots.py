@@ -0,0 +1,196 @@
+"""
+Deterministic meeting slot finder.
+
+Given attendees, a meeting length and a date range, fetches busy time for the
+organizer and every attendee with a single ``freebusy.query`` call, intersects
+their free time within working hours and returns ranked candidate slots.
+Calendars whose free/busy can't be read add no busy time; they are listed in
+the result as unchecked, since the slots may clash with them. The
+agent gets bookable times from one tool call instead of checking calendars and
+reasoning about them over several turns.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from email_assistant.tools.gmail.calendar_availability import (
+    Interval,
+    WorkingHours,
+    fetch_busy,
+    merge_intervals,
+    parse_date,
+    subtract_intervals,
+)
+
+@dataclass
+class MeetingSlot:
+    """A candidate meeting time, free on every calendar that could be checked."""
+    start: datetime
+    end: datetime
+    # True if the slot starts right after or ends right before someone's meeting
+    back_to_back: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "back_to_back": self.back_to_back,
+        }
+
+@dataclass
+class SlotSearch:
+    """Ranked candidate slots for a meeting, as structured data and as text."""
+    slots: List[MeetingSlot]
+    attendees: List[str]
+    duration: timedelta
+    working_hours: WorkingHours
+    # Calendars whose free/busy could not be read. They add no busy time, so
+    # the slots may clash with them
+    unchecked: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timezone": self.working_hours.timezone,
+            "duration_minutes": int(self.duration.total_seconds() // 60),
+            "attendees": self.attendees,
+            "unchecked": self.unchecked,
+            "slots": [slot.to_dict() for slot in self.slots],
+        }
+
+    def to_text(self) -> str:
+        """Format the candidates so they can be passed straight to schedule_meeting_tool."""
+        minutes = int(self.duration.total_seconds() // 60)
+        who = ", ".join(self.attendees) if self.attendees else "no other attendees"
+        result = f"Candidate {minutes}-minute meeting slots with {who} ({self.working_hours.timezone}):\n\n"
+        if not self.slots:
+            result += "  No slot in the requested range is free for everyone\n"
+        for rank, slot in enumerate(self.slots, 1):
+            result += (
+                f"  {rank}. {slot.start.strftime('%a %d-%m-%Y %I:%M %p')} - {slot.end.strftime('%I:%M %p')}"
+                f" (start_time={slot.start.strftime('%Y-%m-%dT%H:%M:%S')},"
+                f" end_time={slot.end.strftime('%Y-%m-%dT%H:%M:%S')})"
+            )
+            result += " back-to-back\n" if slot.back_to_back else "\n"
+        if self.unchecked:
+            result += (
+                f"\nCould not check free/busy for: {', '.join(self.unchecked)}."
+                " These slots may conflict with their calendars; confirm with them before scheduling.\n"
+            )
+        return result
+
+def _round_up(moment: datetime, step: timedelta) -> datetime:
+    """Round ``moment`` up to the next multiple of ``step`` after local midnight."""
+    midnight = datetime.combine(moment.date(), time.min, tzinfo=moment.tzinfo)
+    steps = -((midnight - moment) // step)
+    return midnight + steps * step
+
+def candidate_slots(
+    free: Sequence[Interval],
+    busy: Sequence[Interval],
+    duration: timedelta,
+    granularity: timedelta,
+) -> List[MeetingSlot]:
+    """Enumerate every ``duration`` slot starting on a ``granularity`` boundary inside ``free``."""
+    edges: Set[datetime] = {start for start, _ in busy} | {end for _, end in busy}
+    slots = []
+    for window_start, window_end in free:
+        start = _round_up(window_start, granularity)
+        while start + duration <= window_end:
+            end = start + duration
+            slots.append(MeetingSlot(start=start, end=end, back_to_back=start in edges or end in edges))
+            start += granularity
+    return slots
+
+def rank_slots(slots: Sequence[MeetingSlot], max_results: int, max_per_day: int) -> List[MeetingSlot]:
+    """Pick the best slots: earliest days first, avoiding back-to-back slots.
+
+    At most ``max_per_day`` non-overlapping slots are taken from each day so the
+    suggestions are spread over the range rather than clustered in one morning.
+    """
+    by_day: Dict[date, List[MeetingSlot]] = {}
+    for slot in slots:
+        by_day.setdefault(slot.start.date(), []).append(slot)
+
+    ranked: List[MeetingSlot] = []
+    for day in sorted(by_day):
+        chosen: List[MeetingSlot] = []
+        for slot in sorted(by_day[day], key=lambda s: (s.back_to_back, s.start)):
+            if len(chosen) == max_per_day:
+                break
+            if all(slot.end <= c.start or slot.start >= c.end for c in chosen):
+                chosen.append(slot)
+        ranked.extend(sorted(chosen, key=lambda s: (s.back_to_back, s.start)))
+        if len(ranked) >= max_results:
+            break
+    return ranked[:max_results]
+
+def find_meeting_slots(
+    service: Any,
+    attendees: Sequence[str],
+    duration: timedelta,
+    start_date: str,
+    end_date: str,
+    working_hours: Optional[WorkingHours] = None,
+    include_organizer: bool = True,
+    granularity: timedelta = timedelta(minutes=30),
+    buffer: timedelta = timedelta(0),
+    not_before: Optional[datetime] = None,
+    max_results: int = 5,
+    max_per_day: int = 2,
+) -> SlotSearch:
+    """Find ranked times between DD-MM-YYYY ``start_date`` and ``end_date`` when everyone is free.
+
+    Only calendars that ``freebusy.query`` can read are checked. The others
+    add no busy time and are returned in ``SlotSearch.unchecked``.
+
+    Args:
+        service: Calendar ``v3`` service
+        attendees: Attendee email addresses; their calendars must be visible to us
+        duration: Meeting length
+        start_date: First day to search, DD-MM-YYYY
+        end_date: Last day to search (inclusive), DD-MM-YYYY
+        working_hours: Working window and timezone; defaults to ``WorkingHours.from_env()``
+        include_organizer: Also check the ``primary`` calendar
+        granularity: Slots start on multiples of this after midnight
+        buffer: Minimum gap to keep between the meeting and anyone's other meetings
+        not_before: Ignore slots starting before this time (e.g. now)
+        max_results: Number of slots to return
+        max_per_day: Maximum number of slots suggested per day
+
+    Returns:
+        The ranked candidate slots and the calendars that could not be checked
+    """
+    working_hours = working_hours or WorkingHours.from_env()
+    tz = working_hours.tzinfo
+    first, last = parse_date(start_date), parse_date(end_date)
+    days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+    calendar_ids = (["primary"] if include_organizer else []) + [a for a in attendees if a != "primary"]
+    calendar_ids = list(dict.fromkeys(calendar_ids))
+    unchecked: List[str] = []
+    busy: List[Interval] = []
+    if days and calendar_ids:
+        time_min = datetime.combine(days[0], time.min, tzinfo=tz)
+        time_max = datetime.combine(days[-1] + timedelta(days=1), time.min, tzinfo=tz)
+        busy_by_calendar = fetch_busy(service, time_min, time_max, calendar_ids, working_hours.timezone)
+        unchecked = [c for c in calendar_ids if c not in busy_by_calendar]
+        busy = merge_intervals(
+            (s.astimezone(tz), e.astimezone(tz)) for intervals in busy_by_calendar.values() for s, e in intervals
+        )
+
+    # Everyone's busy time (padded by the buffer) removed from the working windows
+    blocked = merge_intervals((s - buffer, e + buffer) for s, e in busy) if buffer else busy
+    windows = [w for d in days if (w := working_hours.window(d)) is not None]
+    if not_before is not None:
+        windows = [(max(s, not_before), e) for s, e in windows if e > not_before]
+    free = subtract_intervals(windows, blocked)
+
+    slots = candidate_slots(free, busy, duration, granularity)
+    return SlotSearch(
+        slots=rank_slots(slots, max_results, max_per_day),
+        attendees=list(attendees),
+        duration=duration,
+        working_hours=working_hours,
+        unchecked=unchecked,
+    )
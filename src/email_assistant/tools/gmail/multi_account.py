@@ -0,0 +1,299 @@
+"""
+Multi-account Gmail ingestion.
+
+One job serves many mailboxes: every account is polled from a shared worker
+pool and ingested through one LangGraph client. Each account keeps its own
+Gmail credentials, request scheduler (quotas are per user) and polling state.
+Accounts are polled according to their observed mail volume: an exponentially
+weighted average of emails found per poll sets how long to wait before the
+next poll, so busy inboxes are checked on every run while quiet ones back off.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from langgraph.store.base import BaseStore
+from langgraph.store.memory import InMemoryStore
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail.request_scheduler import get_request_scheduler
+from email_assistant.tools.gmail.run_ingest import (
+    build_search_query,
+    collapse_threads,
+    get_email_data,
+    ingest_email_to_langgraph,
+    list_messages,
+    load_gmail_credentials,
+)
+from email_assistant.tools.gmail.run_janitor import StaleRunCollector
+
+logger = logging.getLogger(__name__)
+
+@dataclass(kw_only=True)
+class AccountConfig:
+    """A mailbox to ingest and where to find its Gmail token.
+
+    The token (the JSON written by ``setup_gmail.py``) is read from the
+    environment variable ``token_env``, else from the file ``token_path``,
+    else from the default ``GMAIL_TOKEN``/``.secrets/token.json`` locations.
+    """
+    email: str
+    token_env: Optional[str] = None
+    token_path: Optional[str] = None
+
+    @classmethod
+    def parse(cls, value: Union[str, Dict[str, Any], "AccountConfig"]) -> "AccountConfig":
+        """Accept an email address, a dict of fields or an ``AccountConfig``."""
+        if isinstance(value, AccountConfig):
+            return value
+        if isinstance(value, str):
+            return cls(email=value)
+        return cls(**value)
+
+@dataclass
+class AccountState:
+    """Polling state kept per account between runs."""
+    email: str
+    # Exponentially weighted average of emails found per poll
+    volume: float = 0.0
+    interval_s: float = 0.0
+    next_poll_at: float = 0.0
+    last_polled_at: Optional[float] = None
+    failures: int = 0
+    # "unknown", "ok", "missing" (no token found) or "invalid" (refresh failed)
+    credentials: str = "unknown"
+    last_error: Optional[str] = None
+
+@dataclass(kw_only=True)
+class PollPolicy:
+    """Maps an account's mail volume to how long to wait before polling it again.
+
+    An account averaging one or more emails per poll is polled every
+    ``min_interval_s`` (the job's own schedule); one averaging 0.1 emails per
+    poll waits ten times as long, up to ``max_interval_s``. Failures back off
+    exponentially up to the same cap.
+    """
+    min_interval_s: float = 600.0
+    max_interval_s: float = 3600.0
+    # Weight of the latest poll in the volume average
+    alpha: float = 0.3
+    # Poll accounts that become due within this fraction of min_interval_s,
+    # so schedule jitter does not push them to the next run
+    slack: float = 0.1
+
+    def interval(self, volume: float) -> float:
+        floor = self.min_interval_s / self.max_interval_s
+        return self.min_interval_s / min(1.0, max(volume, floor))
+
+    def is_due(self, state: AccountState, now: float) -> bool:
+        return state.next_poll_at <= now + self.slack * self.min_interval_s
+
+    def after_poll(self, state: AccountState, found: int, now: float) -> None:
+        state.volume = found if state.last_polled_at is None else self.alpha * found + (1 - self.alpha) * state.volume
+        state.interval_s = self.interval(state.volume)
+        state.next_poll_at = now + state.interval_s
+        state.last_polled_at = now
+        state.failures = 0
+        state.credentials = "ok"
+        state.last_error = None
+
+    def after_failure(self, state: AccountState, error: Exception, now: float) -> None:
+        state.failures += 1
+        state.interval_s = min(self.max_interval_s, self.min_interval_s * 2 ** (state.failures - 1))
+        state.next_poll_at = now + state.interval_s
+        state.last_error = str(error)
+
+class AccountStateStore:
+    """Keeps ``AccountState`` in a LangGraph store so it survives between job runs.
+
+    Args:
+        store: The store to use, e.g. the one LangGraph Platform injects into
+            the cron graph; defaults to a process-wide in-memory store
+        namespace: Store namespace for the account states
+    """
+
+    _default_store: Optional[BaseStore] = None
+
+    def __init__(self, store: Optional[BaseStore] = None, namespace: Sequence[str] = ("gmail_ingest", "accounts")):
+        if store is None:
+            if AccountStateStore._default_store is None:
+                AccountStateStore._default_store = InMemoryStore()
+            store = AccountStateStore._default_store
+        self.store = store
+        self.namespace = tuple(namespace)
+
+    async def load(self, email: str) -> AccountState:
+        item = await self.store.aget(self.namespace, email)
+        return AccountState(**item.value) if item is not None else AccountState(email=email)
+
+    async def save(self, state: AccountState) -> None:
+        await self.store.aput(self.namespace, state.email, asdict(state))
+
+class MissingCredentialsError(Exception):
+    """No Gmail token could be found for an account."""
+
+_services: Dict[str, Any] = {}
+_services_lock = threading.Lock()
+
+def build_account_service(account: AccountConfig) -> Any:
+    """Build (once per process) a Gmail service from the account's own token."""
+    with _services_lock:
+        if account.email in _services:
+            return _services[account.email]
+
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
+    token_data = None
+    if account.token_env and os.getenv(account.token_env):
+        token_data = json.loads(os.environ[account.token_env])
+    elif account.token_path and os.path.exists(account.token_path):
+        with open(account.token_path) as f:
+            token_data = json.load(f)
+    if token_data is not None:
+        credentials = Credentials(
+            token=token_data.get("token"),
+            refresh_token=token_data.get("refresh_token"),
+            token_uri=token_data.get("token_uri", "https://oauth2.googleapis.com/token"),
+            client_id=token_data.get("client_id"),
+            client_secret=token_data.get("client_secret"),
+            scopes=token_data.get("scopes", ["https://www.googleapis.com/auth/gmail.modify"]),
+        )
+    elif not (account.token_env or account.token_path):
+        credentials = load_gmail_credentials()
+    else:
+        credentials = None
+    if credentials is None:
+        raise MissingCredentialsError(f"No Gmail token found for {account.email}")
+
+    service = build("gmail", "v1", credentials=credentials)
+    with _services_lock:
+        return _services.setdefault(account.email, service)
+
+def _is_credentials_error(error: Exception) -> bool:
+    from google.auth.exceptions import RefreshError
+    return isinstance(error, RefreshError) or getattr(getattr(error, "resp", None), "status", None) == 401
+
+class MultiAccountIngestor:
+    """Polls many Gmail accounts from one worker pool and ingests through one LangGraph client.
+
+    Args:
+        accounts: Accounts to serve (email addresses, dicts or ``AccountConfig``)
+        graph_name: LangGraph graph to run for each email
+        client: Shared LangGraph client
+        service_factory: Returns the Gmail service for an account
+        state_store: Where polling state is kept between runs
+        policy: Polling policy
+        max_workers: Worker threads for Gmail requests; each account's
+            requests run on one thread at a time since a service's HTTP
+            connection is not thread-safe
+        minutes_since: Search window for an account's first poll
+        include_read: Also ingest emails that are already read
+    """
+
+    def __init__(
+        self,
+        accounts: Sequence[Union[str, Dict[str, Any], AccountConfig]],
+        graph_name: str,
+        client: Any,
+        service_factory: Callable[[AccountConfig], Any] = build_account_service,
+        state_store: Optional[AccountStateStore] = None,
+        policy: Optional[PollPolicy] = None,
+        max_workers: int = 8,
+        minutes_since: int = 60,
+        include_read: bool = False,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.accounts = [AccountConfig.parse(a) for a in accounts]
+        self.graph_name = graph_name
+        self.client = client
+        self.service_factory = service_factory
+        self.state_store = state_store or AccountStateStore()
+        self.policy = policy or PollPolicy()
+        self.minutes_since = minutes_since
+        self.include_read = include_read
+        self._clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gmail-account")
+        self._metrics = get_metrics("gmail.multi_account")
+        self._collector = StaleRunCollector()
+
+    async def run_once(self) -> Dict[str, int]:
+        """Poll every due account once, busiest first, and ingest what they have.
+
+        Returns:
+            Counts of accounts polled, skipped (not due) and failed, and of
+            emails ingested
+        """
+        now = self._clock()
+        states = await asyncio.gather(*(self.state_store.load(a.email) for a in self.accounts))
+        due = [(a, s) for a, s in zip(self.accounts, states) if self.policy.is_due(s, now)]
+        due.sort(key=lambda pair: pair[1].volume, reverse=True)
+        summary = {"polled": len(due), "skipped": len(self.accounts) - len(due), "failed": 0, "emails": 0}
+        self._metrics.incr("accounts_skipped", summary["skipped"])
+
+        results = await asyncio.gather(*(self._poll(account, state, now) for account, state in due))
+        # Delete the runs superseded during this run in one pass
+        await self._collector.sweep(self.client)
+        for found in results:
+            if found is None:
+                summary["failed"] += 1
+            else:
+                summary["emails"] += found
+        logger.info(
+            "Polled %d/%d accounts (%d failed), ingested %d emails",
+            summary["polled"], len(self.accounts), summary["failed"], summary["emails"],
+        )
+        return summary
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    async def _poll(self, account: AccountConfig, state: AccountState, now: float) -> Optional[int]:
+        loop = asyncio.get_running_loop()
+        # Look back to the previous poll (plus a little overlap) rather than a fixed window
+        if state.last_polled_at is None:
+            window = self.minutes_since
+        else:
+            window = math.ceil((now - state.last_polled_at) / 60) + 2
+        try:
+            with self._metrics.time("fetch"):
+                emails = await loop.run_in_executor(self._pool, self._fetch, account, window)
+            for email_data in collapse_threads(emails)[0]:
+                with self._metrics.time("ingest"):
+                    await ingest_email_to_langgraph(
+                        email_data, self.graph_name, client=self.client, collector=self._collector
+                    )
+        except Exception as e:
+            if isinstance(e, MissingCredentialsError):
+                state.credentials = "missing"
+            elif _is_credentials_error(e):
+                state.credentials = "invalid"
+                # Drop the cached service so a fixed token is picked up next time
+                with _services_lock:
+                    _services.pop(account.email, None)
+            self.policy.after_failure(state, e, now)
+            await self.state_store.save(state)
+            self._metrics.incr("account_failures")
+            logger.warning("Polling %s failed (%s credentials): %s", account.email, state.credentials, e)
+            return None
+
+        self.policy.after_poll(state, len(emails), now)
+        await self.state_store.save(state)
+        self._metrics.incr("accounts_polled")
+        self._metrics.incr("emails_ingested", len(emails))
+        return len(emails)
+
+    def _fetch(self, account: AccountConfig, window: int) -> List[Dict[str, Any]]:
+        """List and fetch an account's new emails; runs on a pool thread."""
+        service = self.service_factory(account)
+        scheduler = get_request_scheduler("gmail", account.email)
+        query = build_search_query(account.email, window, self.include_read)
+        return [get_email_data(service, m["id"], scheduler) for m in list_messages(service, query, scheduler)]
@@ -0,0 +1,523 @@
+#!/usr/bin/env python
+"""
+Event-driven Gmail ingestion from Pub/Sub push notifications.
+
+Instead of polling on a cron schedule, Gmail can publish a notification to a
+Pub/Sub topic whenever the mailbox changes (see ``users.watch``). A push
+subscription delivers each notification as an HTTP POST whose base64 payload
+is ``{"emailAddress": ..., "historyId": ...}``. This module runs a small HTTP
+endpoint for those pushes; for each one it reads the mailbox history since the
+last historyId it processed for that account and ingests just the new messages
+into LangGraph, so emails are picked up seconds after they arrive.
+
+    python -m email_assistant.tools.gmail.push_ingest --port 8080 --graph-name email_assistant_hitl_memory_gmail
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from langgraph_sdk import get_client
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail.request_scheduler import get_request_scheduler
+from email_assistant.tools.gmail.run_ingest import (
+    _SECRETS_DIR,
+    extract_email_data,
+    ingest_email_to_langgraph,
+    load_gmail_credentials,
+)
+from email_assistant.tools.gmail.run_janitor import StaleRunCollector
+
+logger = logging.getLogger(__name__)
+
+def decode_notification(body: bytes) -> Dict[str, Any]:
+    """Decode a Pub/Sub push request body carrying a Gmail notification.
+
+    Returns:
+        Dict with ``email_address``, ``history_id`` (int), ``message_id``
+        (the Pub/Sub message ID) and ``publish_time`` (str or None)
+
+    Raises:
+        ValueError: If the body is not a Gmail push notification
+    """
+    try:
+        envelope = json.loads(body)
+        message = envelope["message"]
+        data = json.loads(base64.b64decode(message["data"]))
+        return {
+            "email_address": data["emailAddress"],
+            "history_id": int(data["historyId"]),
+            "message_id": message.get("messageId") or message.get("message_id"),
+            "publish_time": message.get("publishTime") or message.get("publish_time"),
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Not a Gmail push notification: {e}") from e
+
+class HistoryCursorStore:
+    """Last processed historyId per account, optionally persisted to a JSON file.
+
+    Cursors only move forward, and the file is replaced atomically so a crash
+    never leaves it half written.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, int] = {}
+        if self.path and self.path.exists():
+            self._cursors = {k: int(v) for k, v in json.loads(self.path.read_text()).items()}
+
+    def get(self, email_address: str) -> Optional[int]:
+        with self._lock:
+            return self._cursors.get(email_address)
+
+    def set(self, email_address: str, history_id: int) -> None:
+        with self._lock:
+            if history_id <= self._cursors.get(email_address, 0):
+                return
+            self._cursors[email_address] = history_id
+            if self.path:
+                tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+                tmp.write_text(json.dumps(self._cursors, indent=2))
+                os.replace(tmp, self.path)
+
+def list_added_messages(
+    service: Any,
+    start_history_id: int,
+    scheduler: Any = None,
+    label_id: Optional[str] = "INBOX",
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Page through ``history.list`` and collect messages added after ``start_history_id``.
+
+    Returns:
+        The added messages (``id``, ``threadId``, ``labelIds``) in history
+        order without duplicates, and the mailbox's current historyId
+
+    Raises:
+        HttpError: 404 if ``start_history_id`` is too old for Gmail to serve
+    """
+    scheduler = scheduler or get_request_scheduler("gmail")
+    messages: Dict[str, Dict[str, Any]] = {}
+    page_token = None
+    latest = start_history_id
+    while True:
+        params: Dict[str, Any] = {"userId": "me", "startHistoryId": str(start_history_id), "historyTypes": ["messageAdded"]}
+        if label_id:
+            params["labelId"] = label_id
+        if page_token:
+            params["pageToken"] = page_token
+        response = scheduler.execute(service.users().history().list(**params), "history.list")
+        get_metrics("gmail.push").incr("history_pages")
+        latest = max(latest, int(response.get("historyId", latest)))
+        for record in response.get("history", []):
+            for added in record.get("messagesAdded", []):
+                messages.setdefault(added["message"]["id"], added["message"])
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return list(messages.values()), latest
+
+class PushIngestor:
+    """Turns Gmail notifications into incremental fetches and ingests the new messages.
+
+    Notifications for the same account are processed one at a time; different
+    accounts run in parallel on a small worker pool. Pub/Sub delivers
+    at-least-once and history ranges can overlap, so recently ingested message
+    IDs are remembered and skipped.
+
+    Args:
+        service_factory: Callable returning a Gmail ``v1`` service for an email
+            address; called once per account
+        ingest: Called with each new email (as ``run_ingest.extract_email_data``
+            returns it)
+        cursors: Where to keep each account's last processed historyId
+        include_read: Also ingest messages that are already read (by default
+            only unread messages are ingested, like the cron job)
+        fallback_minutes: How far back to search when there is no usable
+            cursor (first notification, or history older than Gmail keeps)
+        max_workers: Worker threads for ``submit``
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable[[str], Any],
+        ingest: Callable[[Dict[str, Any]], Any],
+        cursors: Optional[HistoryCursorStore] = None,
+        scheduler: Any = None,
+        include_read: bool = False,
+        fallback_minutes: int = 60,
+        max_workers: int = 4,
+        seen_cache_size: int = 10_000,
+    ):
+        self._service_factory = service_factory
+        self.ingest = ingest
+        self.cursors = cursors or HistoryCursorStore()
+        self.scheduler = scheduler or get_request_scheduler("gmail")
+        self.include_read = include_read
+        self.fallback_minutes = fallback_minutes
+        self._services: Dict[str, Any] = {}
+        self._account_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._seen_cache_size = seen_cache_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gmail-push")
+        self._futures: List[Future] = []
+        self._metrics = get_metrics("gmail.push")
+
+    def submit(self, email_address: str, history_id: int, publish_time: Optional[str] = None) -> Future:
+        """Process a notification on the worker pool."""
+        future = self._executor.submit(self._handle_logged, email_address, history_id, publish_time)
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()] + [future]
+        return future
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait until every submitted notification has been processed."""
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.exception(timeout=timeout)
+
+    def close(self) -> None:
+        """Finish the submitted notifications, then close ``ingest`` if it can be closed."""
+        self._executor.shutdown(wait=True)
+        close_ingest = getattr(self.ingest, "close", None)
+        if callable(close_ingest):
+            close_ingest()
+
+    def handle(self, email_address: str, history_id: int) -> int:
+        """Fetch and ingest everything new for ``email_address``; return how many emails were ingested."""
+        self._metrics.incr("notifications")
+        with self._account_lock(email_address):
+            start = self.cursors.get(email_address)
+            if start is not None and history_id <= start:
+                # Redelivered, or already covered by a later notification
+                self._metrics.incr("stale_notifications")
+                return 0
+
+            service = self._service(email_address)
+            if start is None:
+                messages, latest = self._recent_messages(service, email_address), history_id
+            else:
+                try:
+                    with self._metrics.time("history"):
+                        messages, latest = list_added_messages(service, start, self.scheduler)
+                except Exception as e:
+                    if getattr(getattr(e, "resp", None), "status", None) != 404:
+                        raise
+                    logger.info("History for %s expired at %s, searching recent mail instead", email_address, start)
+                    messages, latest = self._recent_messages(service, email_address), history_id
+
+            ingested = 0
+            for summary in messages:
+                if self._ingest_message(service, summary):
+                    ingested += 1
+            # Only move the cursor once everything up to it has been ingested,
+            # so a failure is retried by the next notification
+            self.cursors.set(email_address, max(latest, history_id))
+            return ingested
+
+    def _handle_logged(self, email_address: str, history_id: int, publish_time: Optional[str]) -> int:
+        try:
+            with self._metrics.time("notification"):
+                count = self.handle(email_address, history_id)
+        except Exception as e:
+            self._metrics.incr("failed_notifications")
+            logger.error("Failed to process notification for %s at history %s: %s", email_address, history_id, e)
+            raise
+        if count and publish_time:
+            try:
+                published = datetime.fromisoformat(publish_time.replace("Z", "+00:00"))
+                self._metrics.observe("publish_to_ingest", time.time() - published.timestamp())
+            except ValueError:
+                pass
+        logger.info("Ingested %d new emails for %s (history %s)", count, email_address, history_id)
+        return count
+
+    def _ingest_message(self, service: Any, summary: Dict[str, Any]) -> bool:
+        message_id = summary["id"]
+        if message_id in self._seen:
+            self._metrics.incr("duplicate_messages")
+            return False
+        if not self.include_read and "labelIds" in summary and "UNREAD" not in summary["labelIds"]:
+            # Sent mail and messages already read elsewhere
+            self._metrics.incr("skipped_read")
+            return False
+        with self._metrics.time("get_message"):
+            message = self.scheduler.execute(service.users().messages().get(userId="me", id=message_id), "messages.get")
+        if not self.include_read and "UNREAD" not in message.get("labelIds", ["UNREAD"]):
+            self._metrics.incr("skipped_read")
+            return False
+        with self._metrics.time("ingest"):
+            self.ingest(extract_email_data(message))
+        self._metrics.incr("messages_ingested")
+        with self._lock:
+            self._seen[message_id] = None
+            if len(self._seen) > self._seen_cache_size:
+                self._seen.popitem(last=False)
+        return True
+
+    def _recent_messages(self, service: Any, email_address: str) -> List[Dict[str, Any]]:
+        """Search the last ``fallback_minutes`` when there is no history to follow."""
+        self._metrics.incr("fallback_searches")
+        after = int((datetime.now() - timedelta(minutes=self.fallback_minutes)).timestamp())
+        query = f"(to:{email_address} OR from:{email_address}) after:{after}"
+        if not self.include_read:
+            query += " is:unread"
+        messages: List[Dict[str, Any]] = []
+        page_token = None
+        while True:
+            response = self.scheduler.execute(
+                service.users().messages().list(userId="me", q=query, pageToken=page_token), "messages.list"
+            )
+            messages.extend(response.get("messages", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                # Search results are newest first; ingest in arrival order
+                return messages[::-1]
+
+    def _service(self, email_address: str) -> Any:
+        with self._lock:
+            if email_address not in self._services:
+                self._services[email_address] = self._service_factory(email_address)
+            return self._services[email_address]
+
+    def _account_lock(self, email_address: str) -> threading.Lock:
+        with self._lock:
+            return self._account_locks.setdefault(email_address, threading.Lock())
+
+class _PushHandler(BaseHTTPRequestHandler):
+    server: "PushServer"
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != self.server.push_path:
+            self._reply(404)
+            return
+        if self.server.token and parse_qs(url.query).get("token", [None])[0] != self.server.token:
+            self._reply(403)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            notification = decode_notification(body)
+        except ValueError as e:
+            logger.warning("Rejected push request: %s", e)
+            self._reply(400)
+            return
+        # Acknowledge straight away so Pub/Sub does not redeliver while we
+        # fetch; if processing fails the cursor stays put and the next
+        # notification picks the messages up
+        self.server.ingestor.submit(notification["email_address"], notification["history_id"], notification["publish_time"])
+        self._reply(204)
+
+    def do_GET(self):
+        self._reply(200 if urlparse(self.path).path == "/healthz" else 404)
+
+    def _reply(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+class PushServer(ThreadingHTTPServer):
+    """HTTP endpoint for Gmail Pub/Sub push subscriptions.
+
+    Args:
+        address: ``(host, port)`` to listen on; port 0 picks a free port
+        ingestor: Processes the decoded notifications
+        push_path: URL path the subscription pushes to
+        token: If set, pushes must carry it as a ``?token=`` query parameter
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        ingestor: PushIngestor,
+        push_path: str = "/gmail/push",
+        token: Optional[str] = None,
+    ):
+        super().__init__(address, _PushHandler)
+        self.ingestor = ingestor
+        self.push_path = push_path
+        self.token = token
+
+    def server_close(self) -> None:
+        """Stop listening, then let the ingestor finish (and sweep stale runs)."""
+        super().server_close()
+        self.ingestor.close()
+
+def start_watch(service: Any, topic_name: str, label_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Ask Gmail to publish mailbox changes to ``topic_name``.
+
+    The watch expires after 7 days, so call this at least weekly (daily is
+    recommended). The returned ``historyId`` is a good starting cursor.
+    """
+    return get_request_scheduler("gmail").execute(
+        service.users().watch(userId="me", body={
+            "topicName": topic_name,
+            "labelIds": label_ids or ["INBOX"],
+            "labelFilterBehavior": "include",
+        }),
+        "watch",
+    )
+
+class LangGraphIngest:
+    """``ingest`` callable that creates a LangGraph run per email.
+
+    One LangGraph client and one event loop, running on a background thread,
+    serve every email, so an email doesn't pay for a new loop and HTTP client.
+    Calls from several threads run concurrently on the loop. Superseded runs
+    are deleted in bulk once ``sweep_every`` threads have new runs, every
+    ``sweep_interval_s`` seconds, and on ``close``.
+
+    Args:
+        graph_name: Graph to run
+        url: URL of the LangGraph deployment
+        sweep_every: Threads with new runs that trigger a sweep
+        sweep_interval_s: Seconds between timed sweeps; None disables them
+        client: LangGraph client to use instead of one for ``url``
+    """
+
+    def __init__(
+        self,
+        graph_name: str,
+        url: Optional[str] = None,
+        sweep_every: int = 20,
+        sweep_interval_s: Optional[float] = 60.0,
+        client: Any = None,
+    ):
+        self.graph_name = graph_name
+        self.sweep_every = sweep_every
+        self.sweep_interval_s = sweep_interval_s
+        self.collector = StaleRunCollector()
+        self._owns_client = client is None
+        self.client = client if client is not None else get_client(url=url)
+        self._closed = False
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="langgraph-ingest", daemon=True)
+        self._thread.start()
+        self._sweeper = (
+            asyncio.run_coroutine_threadsafe(self._sweep_periodically(), self._loop)
+            if sweep_interval_s is not None else None
+        )
+
+    def __call__(self, email_data: Dict[str, Any]) -> Any:
+        if self._closed:
+            raise RuntimeError("LangGraphIngest is closed")
+        return asyncio.run_coroutine_threadsafe(self._ingest(email_data), self._loop).result()
+
+    def close(self) -> None:
+        """Sweep the remaining stale runs and stop the loop."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _ingest(self, email_data: Dict[str, Any]) -> Any:
+        result = await ingest_email_to_langgraph(email_data, self.graph_name, client=self.client, collector=self.collector)
+        if self.collector.pending >= self.sweep_every:
+            await self._sweep()
+        return result
+
+    async def _sweep(self) -> None:
+        try:
+            await self.collector.sweep(self.client)
+        except Exception as e:
+            logger.warning("Stale run sweep failed: %s", e)
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_s)
+            await self._sweep()
+
+    async def _shutdown(self) -> None:
+        await self._sweep()
+        if self._owns_client:
+            await self.client.http.client.aclose()
+
+def langgraph_ingest(graph_name: str, url: str, sweep_every: int = 20) -> LangGraphIngest:
+    """Return an ``ingest`` callable that creates a LangGraph run per email (see ``LangGraphIngest``)."""
+    return LangGraphIngest(graph_name, url, sweep_every=sweep_every)
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Ingest Gmail push notifications into LangGraph")
+    parser.add_argument("--host", type=str, default="0.0.0.0", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--path", type=str, default="/gmail/push", help="URL path of the push endpoint")
+    parser.add_argument(
+        "--token",
+        type=str,
+        default=os.getenv("GMAIL_PUSH_TOKEN"),
+        help="Shared secret the push subscription URL must carry as ?token= (default: GMAIL_PUSH_TOKEN)",
+    )
+    parser.add_argument("--graph-name", type=str, default="email_assistant_hitl_memory_gmail", help="Name of the LangGraph to use")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:2024", help="URL of the LangGraph deployment")
+    parser.add_argument(
+        "--state-file",
+        type=Path,
+        default=_SECRETS_DIR / "history_cursors.json",
+        help="Where to keep the last processed historyId per account",
+    )
+    parser.add_argument("--include-read", action="store_true", help="Include emails that have already been read")
+    parser.add_argument("--topic", type=str, help="Pub/Sub topic to (re)start the Gmail watch on before serving")
+    parser.add_argument("--email", type=str, help="Account the --topic watch is for (used to seed its cursor)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    credentials = load_gmail_credentials()
+    if not credentials:
+        print("Failed to load Gmail credentials")
+        return 1
+
+    from googleapiclient.discovery import build
+
+    cursors = HistoryCursorStore(args.state_file)
+    ingestor = PushIngestor(
+        lambda email_address: build("gmail", "v1", credentials=credentials),
+        langgraph_ingest(args.graph_name, args.url),
+        cursors=cursors,
+        include_read=args.include_read,
+    )
+    if args.topic:
+        watch = start_watch(build("gmail", "v1", credentials=credentials), args.topic)
+        if args.email and cursors.get(args.email) is None:
+            cursors.set(args.email, int(watch["historyId"]))
+        print(f"Watching mailbox via {args.topic} until {watch.get('expiration')}")
+
+    server = PushServer((args.host, args.port), ingestor, push_path=args.path, token=args.token)
+    print(f"Listening for Gmail push notifications on http://{args.host}:{server.server_address[1]}{args.path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        get_metrics("gmail.push").log_summary(logger)
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    exit(main())
@@ -0,0 +1,336 @@
+"""
+Rate-limit-aware scheduler for Gmail and Calendar API requests.
+
+Gmail meters usage in quota units per user (``messages.get`` costs 5 units,
+``messages.send`` 100, ...) and answers with 429 or 403 ``rateLimitExceeded``
+once a user goes over. ``RequestScheduler`` charges each request's cost to a
+token bucket before sending it, retries rate-limited and failed requests with
+jittered exponential backoff, and halves its rate when the API pushes back,
+recovering gradually as requests succeed. Requests can be executed inline or
+submitted to a shared worker pool; pooled requests need an ``http_factory``
+(see ``authorized_http_factory``) so each worker has its own connection.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from email_assistant.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Quota units per Gmail method, see https://developers.google.com/gmail/api/reference/quota
+GMAIL_QUOTA_UNITS: Dict[str, int] = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "messages.modify": 5,
+    "messages.batchModify": 50,
+    "messages.send": 100,
+    "threads.list": 10,
+    "threads.get": 10,
+    "history.list": 2,
+    "watch": 100,
+    "labels.list": 1,
+    "drafts.create": 10,
+}
+
+# Default per-user limits: Gmail allows 250 quota units per user per second;
+# Calendar quotas count requests, roughly 10 per user per second
+DEFAULT_LIMITS: Dict[str, float] = {"gmail": 250.0, "calendar": 10.0}
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+def _status(error: Exception) -> Optional[int]:
+    status = getattr(getattr(error, "resp", None), "status", None)
+    return int(status) if status is not None else None
+
+def _reasons(error: Exception) -> List[str]:
+    """Extract the ``error.errors[].reason`` values from an ``HttpError`` body."""
+    try:
+        body = json.loads(getattr(error, "content", b"") or b"{}")
+        return [e.get("reason", "") for e in body.get("error", {}).get("errors", [])]
+    except (ValueError, AttributeError):
+        return []
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for a 429, or a 403 whose reason is a rate limit (not a permission problem)."""
+    status = _status(error)
+    return status == 429 or (status == 403 and bool(RATE_LIMIT_REASONS & set(_reasons(error))))
+
+def is_retryable_error(error: Exception) -> bool:
+    """True for rate limits, server errors and dropped connections."""
+    if is_rate_limit_error(error):
+        return True
+    status = _status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+def authorized_http_factory(credentials: Any) -> Callable[[], Any]:
+    """``http_factory`` that opens a connection authorized with ``credentials``.
+
+    ``googleapiclient`` services share one ``httplib2.Http``, which is not
+    thread-safe; requests executed on the worker pool use one of these per
+    worker instead.
+    """
+    import google_auth_httplib2
+    import httplib2
+
+    return lambda: google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+
+def method_name(request: Any) -> str:
+    """Short method name of a ``googleapiclient`` request, e.g. ``"messages.get"``."""
+    method_id = getattr(request, "methodId", None) or ""
+    for prefix in ("gmail.users.", "calendar."):
+        if method_id.startswith(prefix):
+            return method_id[len(prefix):]
+    return method_id
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second, holding up to ``capacity``.
+
+    ``acquire`` reserves tokens immediately, letting the balance go negative,
+    and sleeps until the reservation is covered, so concurrent callers are
+    served in arrival order.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens``, waiting if needed; return the seconds waited."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+class RequestScheduler:
+    """Throttles, retries and optionally parallelises API requests for one user.
+
+    Args:
+        units_per_second: Sustained quota units (Gmail) or requests (Calendar)
+            per second; None disables throttling (retries still apply)
+        burst: Bucket capacity; defaults to one second's worth of units
+        quota_units: Cost per short method name; unknown methods cost
+            ``default_cost``
+        max_retries: Retries after a retryable error before it is raised
+        backoff_s: Base delay for exponential backoff
+        max_backoff_s: Cap on a single backoff delay
+        max_workers: Size of the worker pool used by ``submit``
+        http_factory: Zero-argument callable returning an ``httplib2.Http``
+            (e.g. from ``authorized_http_factory``); when set, each worker
+            thread sends its requests over its own instance, since
+            ``httplib2.Http`` is not thread-safe. Can also be given per call
+        name: Metrics namespace suffix
+    """
+
+    def __init__(
+        self,
+        units_per_second: Optional[float] = DEFAULT_LIMITS["gmail"],
+        burst: Optional[float] = None,
+        quota_units: Optional[Dict[str, int]] = None,
+        default_cost: int = 1,
+        max_retries: int = 5,
+        backoff_s: float = 1.0,
+        max_backoff_s: float = 32.0,
+        max_workers: int = 8,
+        http_factory: Optional[Callable[[], Any]] = None,
+        name: str = "gmail",
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+    ):
+        self.max_rate = units_per_second
+        self.bucket = None
+        if units_per_second is not None:
+            self.min_rate = units_per_second / 16
+            self.bucket = TokenBucket(units_per_second, burst, clock=clock, sleep=sleep)
+        self.quota_units = GMAIL_QUOTA_UNITS if quota_units is None else quota_units
+        self.default_cost = default_cost
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.max_workers = max_workers
+        self.http_factory = http_factory
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._metrics = get_metrics(f"{name}.scheduler")
+
+    def cost(self, request: Any, method: Optional[str] = None) -> int:
+        return self.quota_units.get(method or method_name(request), self.default_cost)
+
+    def execute(
+        self,
+        request: Any,
+        method: Optional[str] = None,
+        idempotent: bool = True,
+        http_factory: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        """Send ``request`` once there is quota for it, retrying transient errors.
+
+        Args:
+            request: A ``googleapiclient`` request (anything with ``execute()``)
+            method: Short method name used to price the request, if the request
+                does not carry a ``methodId``
+            idempotent: Whether the request is safe to repeat. Non-idempotent
+                requests (e.g. ``messages.send``) are only retried after rate-limit
+                errors, which mean the request was rejected unprocessed
+            http_factory: Connection factory to send over instead of the
+                scheduler's (one connection per thread and factory)
+
+        Raises:
+            The last error if it is not retryable or retries are exhausted
+        """
+        cost = self.cost(request, method)
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire(cost) if self.bucket is not None else 0.0
+            if waited:
+                self._metrics.observe("throttled", waited)
+            try:
+                with self._metrics.time("request"):
+                    result = self._send(request, http_factory or self.http_factory)
+            except Exception as e:
+                retryable = is_retryable_error(e) if idempotent else is_rate_limit_error(e)
+                if attempt >= self.max_retries or not retryable:
+                    self._metrics.incr("failed")
+                    raise
+                if is_rate_limit_error(e):
+                    self._metrics.incr("rate_limited")
+                    self._slow_down()
+                delay = self._backoff(attempt, e)
+                self._metrics.incr("retries")
+                self._metrics.observe("backoff", delay)
+                logger.info("%s failed (%s), retrying in %.2fs", method or method_name(request) or "request", e, delay)
+                self._sleep(delay)
+                continue
+            self._metrics.incr("requests")
+            self._metrics.incr("quota_units", cost)
+            self._speed_up()
+            return result
+
+    def submit(
+        self,
+        request: Any,
+        method: Optional[str] = None,
+        idempotent: bool = True,
+        http_factory: Optional[Callable[[], Any]] = None,
+    ) -> Future:
+        """Execute ``request`` on the worker pool; returns a ``Future`` for its result.
+
+        Without an ``http_factory`` (here or on the scheduler) the request
+        would share its service's connection with other threads, so it is
+        executed inline instead and the returned future is already done.
+        """
+        http_factory = http_factory or self.http_factory
+        if http_factory is not None:
+            return self._pool().submit(self.execute, request, method, idempotent, http_factory)
+        future: Future = Future()
+        try:
+            future.set_result(self.execute(request, method, idempotent))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def execute_all(
+        self,
+        requests: Iterable[Any],
+        method: Optional[str] = None,
+        http_factory: Optional[Callable[[], Any]] = None,
+    ) -> List[Any]:
+        """Execute requests concurrently (see ``submit``) and return their results in order."""
+        futures = [self.submit(request, method, http_factory=http_factory) for request in requests]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _send(self, request: Any, http_factory: Optional[Callable[[], Any]]) -> Any:
+        if http_factory is None:
+            return request.execute()
+        # This thread's connection for each factory still in use
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = weakref.WeakKeyDictionary()
+        http = connections.get(http_factory)
+        if http is None:
+            http = connections[http_factory] = http_factory()
+        return request.execute(http=http)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="api-request")
+            return self._executor
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring ``Retry-After`` when the server sends it."""
+        retry_after = getattr(getattr(error, "resp", None), "get", lambda *_: None)("retry-after")
+        if retry_after:
+            try:
+                return min(self.max_backoff_s, float(retry_after))
+            except ValueError:
+                pass
+        return self._rng.uniform(0, min(self.max_backoff_s, self.backoff_s * 2 ** attempt))
+
+    def _slow_down(self) -> None:
+        # Multiplicative decrease when the API says we are going too fast...
+        if self.bucket is not None:
+            self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+
+    def _speed_up(self) -> None:
+        # ...and additive increase back towards the configured rate
+        if self.bucket is not None and self.bucket.rate < self.max_rate:
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 20)
+
+_schedulers: Dict[Tuple[str, str], RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+def get_request_scheduler(api: str = "gmail", user: str = "me") -> RequestScheduler:
+    """Return the process-wide scheduler for ``api`` ("gmail" or "calendar") and ``user``.
+
+    The rate can be tuned with ``GMAIL_QUOTA_UNITS_PER_SECOND`` and
+    ``CALENDAR_REQUESTS_PER_SECOND``.
+    """
+    key = (api, user)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            if api == "gmail":
+                rate = float(os.getenv("GMAIL_QUOTA_UNITS_PER_SECOND", DEFAULT_LIMITS["gmail"]))
+                scheduler = RequestScheduler(rate, name="gmail")
+            else:
+                rate = float(os.getenv("CALENDAR_REQUESTS_PER_SECOND", DEFAULT_LIMITS["calendar"]))
+                scheduler = RequestScheduler(rate, quota_units={}, name=api)
+            _schedulers[key] = scheduler
+        return scheduler
@@ -12,6 +12,7 @@ import uuid
 import hashlib
 import asyncio
 import argparse
+import logging
 import os
 from pathlib import Path
 from datetime import datetime
@@ -19,6 +20,12 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from langgraph_sdk import get_client
 
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail.request_scheduler import get_request_scheduler
+from email_assistant.tools.gmail.run_janitor import StaleRunCollector
+
+logger = logging.getLogger(__name__)
+
 # Setup paths
 _ROOT = Path(__file__).parent.absolute()
 _SECRETS_DIR = _ROOT / ".secrets"
@@ -130,74 +137,198 @@ def extract_email_data(message):
         "page_content": content,
         "id": message['id'],
         "thread_id": message['threadId'],
-        "send_time": date
+        "send_time": date,
+        "internal_date": int(message.get('internalDate', 0))
     }
     
     return email_data
 
-async def ingest_email_to_langgraph(email_data, graph_name, url="http://127.0.0.1:2024"):
-    """Ingest an email to LangGraph."""
+# Where --local runs keep their checkpoints and store
+LOCAL_DB = ".email_assistant.sqlite"
+# Run keys of the most recently ingested emails kept in each thread's metadata
+INGEST_KEYS_KEPT = 20
+# Stream modes kept for each run, so clients can join it with runs.join_stream
+RUN_STREAM_MODES = ["values", "messages-tuple"]
+
+def langgraph_thread_id(gmail_thread_id):
+    """Map a Gmail thread ID to a stable LangGraph thread ID."""
+    return str(uuid.UUID(hex=hashlib.md5(gmail_thread_id.encode("UTF-8")).hexdigest()))
+
+def ingest_run_key(thread_id, email_id):
+    """Deterministic key of the run that ingests ``email_id`` into ``thread_id``."""
+    return hashlib.md5(f"{thread_id}:{email_id}".encode("UTF-8")).hexdigest()
+
+def collapse_threads(emails):
+    """Keep only the newest email of each thread, carrying the others as context.
+    
+    When several new messages arrive in one thread between polls, ingesting
+    each one starts a run that the next one rolls back. Instead, the newest
+    email is ingested once with the earlier ones attached (oldest first) as
+    ``earlier_messages``, which ``build_run_input`` folds into the body.
+    
+    Returns:
+        The collapsed emails, in the order their threads first appear, and
+        how many runs were avoided
+    """
+    threads = {}
+    for index, email_data in enumerate(emails):
+        threads.setdefault(email_data["thread_id"], []).append((index, email_data))
+    
+    collapsed = []
+    for group in threads.values():
+        # Gmail lists newest first, which breaks ties when dates are missing
+        group.sort(key=lambda item: (item[1].get("internal_date", 0), -item[0]))
+        newest = dict(group[-1][1])
+        if len(group) > 1:
+            newest["earlier_messages"] = [email_data for _, email_data in group[:-1]]
+        collapsed.append(newest)
+    
+    avoided = len(emails) - len(collapsed)
+    if avoided:
+        get_metrics("gmail.ingest").incr("redundant_runs_avoided", avoided)
+        logger.debug("Collapsed %d emails into %d thread runs", len(emails), len(collapsed))
+    return collapsed, avoided
+
+def build_run_input(email_data):
+    """Build the graph input for an email.
+    
+    Earlier unread messages from the same thread (see ``collapse_threads``)
+    are appended to the body, and their IDs are passed along so they are
+    marked as read with the email.
+    """
+    body = email_data["page_content"]
+    earlier = email_data.get("earlier_messages") or []
+    if earlier:
+        body += "\n\n--- Earlier unread messages in this thread (oldest first) ---"
+        for message in earlier:
+            body += f"\n\nFrom: {message['from_email']}\nDate: {message['send_time']}\n\n{message['page_content']}"
+    email_input = {
+        "from": email_data["from_email"],
+        "to": email_data["to_email"],
+        "subject": email_data["subject"],
+        "body": body,
+        "id": email_data["id"]
+    }
+    if earlier:
+        email_input["earlier_ids"] = [message["id"] for message in earlier]
+    return {"email_input": email_input}
+
+async def ingest_email_to_langgraph(email_data, graph_name, url="http://127.0.0.1:2024", client=None, collector=None, rerun=False):
+    """Ingest an email to LangGraph.
+    
+    This is an idempotent upsert costing a constant number of SDK calls: the
+    thread is created if missing (or fetched if it exists) in one call, and
+    the email's run key, recorded in the thread metadata once its run has
+    been created, makes ingesting one of the thread's recent emails again a
+    no-op. Superseded
+    runs are not deleted here; the thread is marked on ``collector`` so they
+    can be swept in bulk later.
+    
+    Pass ``client`` to reuse one LangGraph client across many emails instead of
+    connecting to ``url`` for each one.
+    
+    Args:
+        email_data: Email fields as returned by ``extract_email_data``
+        graph_name: Graph to run
+        url: LangGraph server URL, used when ``client`` is not given
+        client: LangGraph client to reuse
+        collector: ``StaleRunCollector`` to mark the thread on
+        rerun: Create a run even if this email was already ingested
+    
+    Returns:
+        The LangGraph thread ID and the created run (``None`` if the email
+        had already been ingested)
+    """
     # Connect to LangGraph server
-    client = get_client(url=url)
+    client = client or get_client(url=url)
     
     # Create a consistent UUID for the thread
     raw_thread_id = email_data["thread_id"]
-    thread_id = str(
-        uuid.UUID(hex=hashlib.md5(raw_thread_id.encode("UTF-8")).hexdigest())
-    )
-    print(f"Gmail thread ID: {raw_thread_id} → LangGraph thread ID: {thread_id}")
-    
-    thread_exists = False
-    try:
-        # Try to get existing thread info
-        thread_info = await client.threads.get(thread_id)
-        thread_exists = True
-        print(f"Found existing thread: {thread_id}")
-    except Exception as e:
-        # If thread doesn't exist, create it
-        print(f"Creating new thread: {thread_id}")
-        thread_info = await client.threads.create(thread_id=thread_id)
-    
-    # If thread exists, clean up previous runs
-    if thread_exists:
-        try:
-            # List all runs for this thread
-            runs = await client.runs.list(thread_id)
-            
-            # Delete all previous runs to avoid state accumulation
-            for run_info in runs:
-                run_id = run_info.id
-                print(f"Deleting previous run {run_id} from thread {thread_id}")
-                try:
-                    await client.runs.delete(thread_id, run_id)
-                except Exception as e:
-                    print(f"Failed to delete run {run_id}: {str(e)}")
-        except Exception as e:
-            print(f"Error listing/deleting runs: {str(e)}")
+    thread_id = langgraph_thread_id(raw_thread_id)
+    run_key = ingest_run_key(thread_id, email_data["id"])
+    logger.debug("Gmail thread ID: %s → LangGraph thread ID: %s", raw_thread_id, thread_id)
+    metrics = get_metrics("gmail.ingest")
     
-    # Update thread metadata with current email ID
-    await client.threads.update(thread_id, metadata={"email_id": email_data["id"]})
+    # Create the thread, or get it back unchanged if it already exists
+    thread = await client.threads.create(
+        thread_id=thread_id,
+        if_exists="do_nothing",
+        metadata={"email_id": email_data["id"]},
+    )
+    ingest_keys = list((thread.get("metadata") or {}).get("ingest_keys") or [])
+    if not rerun and run_key in ingest_keys:
+        metrics.incr("duplicates_skipped")
+        logger.debug("Email %s already ingested into thread %s", email_data["id"], thread_id)
+        return thread_id, None
     
     # Create a fresh run for this email
-    print(f"Creating run for thread {thread_id} with graph {graph_name}")
-    
     run = await client.runs.create(
         thread_id,
         graph_name,
-        input={"email_input": {
-            "from": email_data["from_email"],
-            "to": email_data["to_email"],
-            "subject": email_data["subject"],
-            "body": email_data["page_content"],
-            "id": email_data["id"]
-        }},
+        input=build_run_input(email_data),
+        metadata={"ingest_key": run_key, "email_id": email_data["id"]},
         multitask_strategy="rollback",
+        # Let Agent Inbox (or any client) join the run and render llm_call's
+        # draft token by token instead of waiting for the interrupt
+        stream_mode=RUN_STREAM_MODES,
+        stream_subgraphs=True,
+        stream_resumable=True,
     )
+    metrics.incr("runs_created")
+    logger.debug("Run created for thread %s with graph %s", thread_id, graph_name)
     
-    print(f"Run created successfully with thread ID: {thread_id}")
+    # Record the email only once its run exists, so a failed create is retried
+    ingest_keys = [k for k in ingest_keys if k != run_key][-(INGEST_KEYS_KEPT - 1):] + [run_key]
+    await client.threads.update(thread_id, metadata={"email_id": email_data["id"], "ingest_keys": ingest_keys})
+    if collector is not None:
+        collector.mark(thread_id)
     
     return thread_id, run
 
+def build_search_query(email_address, minutes_since=0, include_read=False):
+    """Build the Gmail search query for emails to or from ``email_address``."""
+    query = f"to:{email_address} OR from:{email_address}"
+    
+    # Add time constraint if specified
+    if minutes_since > 0:
+        # Calculate timestamp for filtering
+        from datetime import timedelta
+        after = int((datetime.now() - timedelta(minutes=minutes_since)).timestamp())
+        query += f" after:{after}"
+        
+    # Only include unread emails unless include_read is True
+    if not include_read:
+        query += " is:unread"
+    return query
+
+def iter_message_pages(service, query, scheduler=None, page_token=None, page_size=500):
+    """Page through ``messages.list`` results for ``query``.
+    
+    Yields:
+        ``(messages, next_page_token, result_size_estimate)`` for each page;
+        ``next_page_token`` is ``None`` on the last page
+    """
+    scheduler = scheduler or get_request_scheduler("gmail")
+    while True:
+        kwargs = {"userId": "me", "q": query, "maxResults": page_size}
+        if page_token:
+            kwargs["pageToken"] = page_token
+        results = scheduler.execute(service.users().messages().list(**kwargs), "messages.list")
+        page_token = results.get("nextPageToken")
+        yield results.get("messages", []), page_token, results.get("resultSizeEstimate", 0)
+        if not page_token:
+            return
+
+def list_messages(service, query, scheduler=None):
+    """Return the ``{"id", "threadId"}`` entries of all messages matching ``query``."""
+    return [m for page, _, _ in iter_message_pages(service, query, scheduler) for m in page]
+
+def get_email_data(service, message_id, scheduler=None):
+    """Fetch a message and extract its email data."""
+    scheduler = scheduler or get_request_scheduler("gmail")
+    message = scheduler.execute(service.users().messages().get(userId="me", id=message_id), "messages.get")
+    return extract_email_data(message)
+
 async def fetch_and_process_emails(args):
     """Fetch emails from Gmail and process them through LangGraph."""
     # Load Gmail credentials
@@ -208,33 +339,23 @@ async def fetch_and_process_emails(args):
         
     # Build Gmail service
     service = build("gmail", "v1", credentials=credentials)
+    scheduler = get_request_scheduler("gmail")
     
     # Process emails
     processed_count = 0
+    client = get_client(url=args.url)
+    collector = StaleRunCollector()
     
     try:
         # Get messages from the specified email address
         email_address = args.email
         
         # Construct Gmail search query
-        query = f"to:{email_address} OR from:{email_address}"
-        
-        # Add time constraint if specified
-        if args.minutes_since > 0:
-            # Calculate timestamp for filtering
-            from datetime import timedelta
-            after = int((datetime.now() - timedelta(minutes=args.minutes_since)).timestamp())
-            query += f" after:{after}"
-            
-        # Only include unread emails unless include_read is True
-        if not args.include_read:
-            query += " is:unread"
-            
+        query = build_search_query(email_address, args.minutes_since, args.include_read)
         print(f"Gmail search query: {query}")
         
         # Execute the search
-        results = service.users().messages().list(userId="me", q=query).execute()
-        messages = results.get("messages", [])
+        messages = list_messages(service, query, scheduler)
         
         if not messages:
             print("No emails found matching the criteria")
@@ -242,44 +363,63 @@ async def fetch_and_process_emails(args):
             
         print(f"Found {len(messages)} emails")
         
+        if getattr(args, "local", False):
+            return run_local(service, messages, args, scheduler)
+        
+        # Fetch every message, then ingest only the newest one per thread
+        emails = [get_email_data(service, message_info["id"], scheduler) for message_info in messages]
+        emails, avoided = collapse_threads(emails)
+        if avoided:
+            print(f"Collapsed into {len(emails)} threads ({avoided} redundant runs avoided)")
+        
         # Process each email
-        for i, message_info in enumerate(messages):
+        for i, email_data in enumerate(emails):
             # Stop early if requested
             if args.early and i > 0:
                 print(f"Early stop after processing {i} emails")
                 break
-                
-            # Check if we should reprocess this email
-            if not args.rerun:
-                # TODO: Add check for already processed emails
-                pass
-                
-            # Get the full message
-            message = service.users().messages().get(userId="me", id=message_info["id"]).execute()
             
-            # Extract email data
-            email_data = extract_email_data(message)
-            
-            print(f"\nProcessing email {i+1}/{len(messages)}:")
-            print(f"From: {email_data['from_email']}")
-            print(f"Subject: {email_data['subject']}")
+            logger.debug(
+                "Processing email %d/%d from %s: %s",
+                i + 1, len(emails), email_data["from_email"], email_data["subject"],
+            )
             
             # Ingest to LangGraph
+            # Already-ingested emails are skipped unless --rerun is given
             thread_id, run = await ingest_email_to_langgraph(
                 email_data, 
                 args.graph_name,
-                url=args.url
+                client=client,
+                collector=collector,
+                rerun=args.rerun,
             )
             
             processed_count += 1
             
+        # Delete the runs superseded by this batch in one pass
+        await collector.sweep(client)
         print(f"\nProcessed {processed_count} emails successfully")
+        get_metrics("gmail.ingest").log_summary(logger)
         return 0
         
     except Exception as e:
         print(f"Error processing emails: {str(e)}")
         return 1
 
+def run_local(service, messages, args, scheduler=None):
+    """Run the emails through the graph in this process instead of a server."""
+    from email_assistant.tools.gmail.local_ingest import LocalIngestor
+    
+    emails, _ = collapse_threads([get_email_data(service, m["id"], scheduler) for m in messages])
+    if args.early:
+        emails = emails[:1]
+    with LocalIngestor(args.graph_name, max_workers=args.workers, db_path=args.db) as ingestor:
+        results = ingestor.ingest_all(emails, rerun=args.rerun)
+    failed = sum(1 for r in results if r is None)
+    print(f"\nProcessed {len(results) - failed} emails locally ({len(ingestor.interrupted)} waiting for review, {failed} failed)")
+    get_metrics("gmail.local_ingest").log_summary(logger)
+    return 1 if failed else 0
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="Simple Gmail ingestion for LangGraph with reliable tracing")
@@ -323,6 +463,23 @@ def parse_args():
         action="store_true",
         help="Process the same emails again even if already processed"
     )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Run the graph in this process (loaded from langgraph.json) instead of on the LangGraph server"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Email threads to process concurrently with --local"
+    )
+    parser.add_argument(
+        "--db",
+        type=str,
+        default=LOCAL_DB,
+        help="SQLite file keeping thread state and memory across --local runs"
+    )
     parser.add_argument(
         "--skip-filters",
         action="store_true",
@@ -331,6 +488,8 @@ def parse_args():
     return parser.parse_args()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
     # Get command line arguments
     args = parse_args()
     
@@ -0,0 +1,101 @@
+"""
+Bulk cleanup of stale LangGraph runs left behind by email ingestion.
+
+Every ingested email starts a new run on its Gmail thread's LangGraph thread,
+so busy threads accumulate finished runs. Rather than listing and deleting
+them while ingesting (one SDK call per old run, per email), ingestion marks
+the thread and a ``StaleRunCollector`` sweeps all marked threads at the end
+of a batch, concurrently and off the per-email path.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Set
+
+from email_assistant.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Runs in these states are still doing work and are never deleted
+ACTIVE_STATUSES = {"pending", "running"}
+
+class StaleRunCollector:
+    """Collects threads with superseded runs and deletes those runs in bulk.
+
+    Args:
+        keep: Newest runs to keep per thread (the one for the latest email)
+        page_size: Runs to list per ``runs.list`` call
+        max_concurrency: SDK calls in flight at once during a sweep
+    """
+
+    def __init__(self, keep: int = 1, page_size: int = 100, max_concurrency: int = 8):
+        self.keep = keep
+        self.page_size = page_size
+        self.max_concurrency = max_concurrency
+        self._threads: Set[str] = set()
+        self._lock = threading.Lock()
+        self._metrics = get_metrics("gmail.ingest")
+
+    def mark(self, thread_id: str) -> None:
+        """Record that ``thread_id`` got a new run and may have stale ones."""
+        with self._lock:
+            self._threads.add(thread_id)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._threads)
+
+    async def sweep(self, client: Any) -> int:
+        """Delete the stale runs of every marked thread.
+
+        Threads whose runs could not be listed stay marked for the next sweep.
+
+        Returns:
+            Number of runs deleted
+        """
+        with self._lock:
+            threads, self._threads = self._threads, set()
+        if not threads:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def limited(call):
+            async with semaphore:
+                return await call
+
+        async def stale_runs(thread_id: str) -> List[Dict[str, Any]]:
+            runs: List[Dict[str, Any]] = []
+            while True:
+                page = await limited(client.runs.list(thread_id, limit=self.page_size, offset=len(runs)))
+                runs.extend(page)
+                if len(page) < self.page_size:
+                    break
+            # Runs are listed newest first
+            return [r for r in runs[self.keep:] if r.get("status") not in ACTIVE_STATUSES]
+
+        listed = await asyncio.gather(*(stale_runs(t) for t in threads), return_exceptions=True)
+        deletes = []
+        for thread_id, runs in zip(threads, listed):
+            if isinstance(runs, Exception):
+                logger.warning("Could not list runs for thread %s: %s", thread_id, runs)
+                self.mark(thread_id)
+                continue
+            deletes.extend((thread_id, run["run_id"]) for run in runs)
+
+        results = await asyncio.gather(
+            *(limited(client.runs.delete(thread_id, run_id)) for thread_id, run_id in deletes),
+            return_exceptions=True,
+        )
+        deleted = 0
+        for (thread_id, run_id), result in zip(deletes, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to delete run %s on thread %s: %s", run_id, thread_id, result)
+            else:
+                deleted += 1
+        self._metrics.incr("runs_deleted", deleted)
+        self._metrics.incr("stale_sweeps")
+        logger.debug("Swept %d threads, deleted %d stale runs", len(threads), deleted)
+        return deleted
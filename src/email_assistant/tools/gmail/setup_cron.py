@@ -8,18 +8,24 @@ runs the email ingestion graph to process new emails.
 
 import argparse
 import asyncio
-from typing import Optional
+import json
+from typing import Any, Dict, List, Optional, Union
 from langgraph_sdk import get_client
 
 async def main(
-    email: str,
+    email: Optional[str] = None,
     url: Optional[str] = None,
     minutes_since: int = 60,
     schedule: str = "*/10 * * * *",
     graph_name: str = "email_assistant_hitl_memory_gmail",
     include_read: bool = False,
+    accounts: Optional[List[Union[str, Dict[str, Any]]]] = None,
 ):
-    """Set up a cron job for email ingestion"""
+    """Set up a cron job for email ingestion
+    
+    Pass ``accounts`` instead of ``email`` to serve several mailboxes from a
+    single cron.
+    """
     # Connect to LangGraph server
     if url is None:
         client = get_client(url="http://127.0.0.1:2024")
@@ -37,6 +43,9 @@ async def main(
         "early": False,
         "skip_filters": False
     }
+    if accounts:
+        cron_input["accounts"] = accounts
+        cron_input["schedule_minutes"] = _schedule_minutes(schedule)
     
     # Register the cron job
     cron = await client.crons.create(
@@ -46,21 +55,31 @@ async def main(
     )
     
     print(f"Cron job created successfully with schedule: {schedule}")
-    print(f"Email ingestion will run for: {email}")
+    print(f"Email ingestion will run for: {email or ', '.join(a if isinstance(a, str) else a['email'] for a in accounts)}")
     print(f"Processing emails from the past {minutes_since} minutes")
     print(f"Using graph: {graph_name}")
     
     return cron
 
+def _schedule_minutes(schedule: str) -> int:
+    """Minutes between runs for a "*/N * * * *" schedule (10 otherwise)."""
+    minute = schedule.split()[0]
+    return int(minute[2:]) if minute.startswith("*/") else 10
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Set up a cron job for email ingestion in LangGraph")
     
     parser.add_argument(
         "--email",
         type=str,
-        required=True,
         help="Email address to fetch messages for",
     )
+    parser.add_argument(
+        "--accounts",
+        type=str,
+        help="JSON file listing accounts to serve from one cron (email addresses or "
+             '{"email": ..., "token_env": ...} objects), instead of --email',
+    )
     parser.add_argument(
         "--url",
         type=str,
@@ -92,6 +111,12 @@ if __name__ == "__main__":
     )
     
     args = parser.parse_args()
+    if not args.email and not args.accounts:
+        parser.error("one of --email or --accounts is required")
+    accounts = None
+    if args.accounts:
+        with open(args.accounts) as f:
+            accounts = json.load(f)
     
     asyncio.run(
         main(
@@ -101,5 +126,6 @@ if __name__ == "__main__":
             schedule=args.schedule,
             graph_name=args.graph_name,
             include_read=args.include_read,
+            accounts=accounts,
         )
     )
\ No newline at end of file
@@ -1,7 +1,12 @@
 from typing import List, Any
 import json
+import logging
 import html2text
 
+from email_assistant.prompts import triage_system_prompt, triage_user_prompt, default_background, default_triage_instructions
+
+logger = logging.getLogger(__name__)
+
 def format_email_markdown(subject, author, to, email_thread, email_id=None):
     """Format email details into a nicely formatted markdown string for display
     
@@ -129,6 +134,25 @@ def parse_email(email_input: dict) -> dict:
         email_input["email_thread"],
     )
 
+def triage_messages(email_input: dict, background: str = default_background, triage_instructions: str = default_triage_instructions) -> List[dict]:
+    """Build the router's system and user messages for an email.
+
+    Args:
+        email_input: Email fields, as accepted by ``parse_email``
+        background: User background for the system prompt
+        triage_instructions: Triage rules for the system prompt
+
+    Returns:
+        List[dict]: ``[{"role": "system", ...}, {"role": "user", ...}]``
+    """
+    author, to, subject, email_thread = parse_email(email_input)
+    system_prompt = triage_system_prompt.format(background=background, triage_instructions=triage_instructions)
+    user_prompt = triage_user_prompt.format(author=author, to=to, subject=subject, email_thread=email_thread)
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
 def parse_gmail(email_input: dict) -> tuple[str, str, str, str, str]:
     """Parse an email input dictionary for Gmail, including the email ID.
     
@@ -153,8 +177,7 @@ def parse_gmail(email_input: dict) -> tuple[str, str, str, str, str]:
             - email_id: Email ID (or None if not available)
     """
 
-    print("!Email_input from Gmail!")
-    print(email_input)
+    logger.debug("Email input from Gmail: %s", email_input)
 
     # Gmail schema
     return (
@@ -1,8 +1,17 @@
+import uuid
+
 import streamlit as st
-from langchain_core.messages import HumanMessage, BaseMessage
+from langchain_core.messages import AIMessage, HumanMessage
+
+from email_assistant.history import ChatWindow
+from email_assistant.persistence import sqlite_persistence
+from email_assistant.streaming import TokenStream
 
 # Import the triage + recipe agent
-from email_assistant.recipe_maker import email_assistant as recipe_agent
+from email_assistant.recipe_maker import create_triage_agent, parse_plan
+
+# Conversations (checkpoints) and the food preference memory, in one file
+APP_DB = ".recipe_assistant.sqlite"
 
 st.set_page_config(page_title="Recipe Assistant", page_icon="🍳")
 st.title("🍳 Personal Grocery List Assistant")
@@ -95,26 +104,56 @@ with st.sidebar:
 # -----------------------------------------------------------------------------
 # Session-level state helpers
 # -----------------------------------------------------------------------------
-if "agent" not in st.session_state:
-    # Keep the compiled LangGraph agent alive across reruns so that its internal
-    # memory store (which tracks the user's food preferences) is preserved.
-    st.session_state.agent = recipe_agent
+@st.cache_resource(show_spinner=False)
+def load_agent():
+    """Compile the agent once per process; sessions share it, each on its own thread."""
+    checkpointer, store = sqlite_persistence(APP_DB)
+    return create_triage_agent(store, checkpointer=checkpointer)
+
+agent = load_agent()
+
+if "thread_id" not in st.session_state:
+    # The checkpointer keeps this session's conversation under its thread ID
+    st.session_state.thread_id = str(uuid.uuid4())
 
 if "chat_history" not in st.session_state:
-    # Initialize chat history list (annotation removed for compatibility with st.session_state)
-    st.session_state.chat_history = []
+    # Recent turns verbatim, older ones folded into a summary, so memory and
+    # the rerun cost stay bounded however long the session
+    st.session_state.chat_history = ChatWindow(max_messages=12, fold_batch=6)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def to_markdown(content: str) -> str:
+    """Format a message for display; grocery plans get headings per section."""
+    sections = parse_plan(content)
+    if not any(name for name, _ in sections):
+        return content
+    blocks = []
+    for name, subsections in sections:
+        lines = [f"#### {name}"] if name else []
+        for sub, text in subsections:
+            if sub:
+                lines.append(f"**{sub}**")
+            if text:
+                lines.append(text)
+        blocks.append("\n\n".join(lines))
+    return "\n\n".join(blocks)
 
 # -----------------------------------------------------------------------------
 # Display chat history so far
 # -----------------------------------------------------------------------------
-for msg in st.session_state.chat_history:
+history = st.session_state.chat_history
+if history.summary:
+    with st.expander(f"Earlier conversation ({history.folded} messages, summarized)"):
+        st.markdown(history.summary)
+
+for msg in history.messages:
     if isinstance(msg, HumanMessage):
         with st.chat_message("user"):
             st.markdown(msg.content)
     else:
         # Treat everything that is not a HumanMessage as coming from the agent
         with st.chat_message("assistant"):
-            st.markdown(msg.content)
+            st.markdown(to_markdown(str(msg.content)))
 
 # -----------------------------------------------------------------------------
 # Input box at the bottom of the chat
@@ -125,58 +164,58 @@ if user_input:
     # -------------------------------------------------------------------------
     # 1) Add the user message to the chat history
     # -------------------------------------------------------------------------
-    # Append the user's preferred grocery store to the message so the agent can
-    # take it into account when generating a grocery list and pricing.
-    store_info = st.session_state.get("grocery_store", "")
-
-    # Consolidate preference details
-    pref_parts = []
-    if st.session_state.get("likes"):
-        pref_parts.append(f"I like {st.session_state.likes}.")
-    if st.session_state.get("dislikes"):
-        pref_parts.append(f"I dislike {st.session_state.dislikes}.")
-    if st.session_state.get("dietary"):
-        pref_parts.append(f"My dietary restrictions: {st.session_state.dietary}.")
-    if st.session_state.get("caloric_goal", 0) > 0:
-        pref_parts.append(f"My daily caloric goal is {int(st.session_state.caloric_goal)} kcal.")
-    if st.session_state.get("price_goal", 0) > 0:
-        pref_parts.append(f"My weekly grocery budget is ${int(st.session_state.price_goal)}.")
-
-    pref_text = " ".join(pref_parts)
-
-    augmented_user_input = (
-        f"{user_input}\n\nMy preferred grocery store is {store_info}. {pref_text} Please use these preferences when generating recipes and estimating costs."
-    )
-
-    human_msg = HumanMessage(content=augmented_user_input)
-    st.session_state.chat_history.append(human_msg)
+    # Older turns are summarized after the answer, not before it
+    history.append(HumanMessage(content=user_input), fold=False)
 
     # Render the user message immediately so the interface feels responsive
     with st.chat_message("user"):
         st.markdown(user_input)
 
     # -------------------------------------------------------------------------
-    # 2) Invoke the LangGraph agent
+    # 2) Stream the agent's answer as it is generated
     # -------------------------------------------------------------------------
-    with st.spinner("Thinking…"):
-        result = st.session_state.agent.invoke({"messages": st.session_state.chat_history})
-
-    # The agent always returns its new messages under the "messages" key.
-    assistant_messages = result.get("messages", [])
-
-    # Safeguard for when a single BaseMessage is returned instead of a list
-    if isinstance(assistant_messages, BaseMessage):
-        assistant_messages = [assistant_messages]
+    # Only the answer nodes are streamed; triage and preference updates are
+    # internal model calls
+    # The sidebar settings go in as structured state rather than message text,
+    # so the agent can cache grocery plans on them and diff when they change
+    grocery_settings = {
+        "store": st.session_state.get("grocery_store", ""),
+        "budget": st.session_state.get("price_goal", 0),
+        "calories": st.session_state.get("caloric_goal", 0),
+        "likes": st.session_state.get("likes", ""),
+        "dislikes": st.session_state.get("dislikes", ""),
+        "dietary": st.session_state.get("dietary", ""),
+    }
+    # The thread already holds earlier turns, so only the new message is sent
+    stream = TokenStream(
+        agent,
+        {
+            "messages": [HumanMessage(content=user_input)],
+            "conversation_summary": history.summary,
+            "grocery_settings": grocery_settings,
+        },
+        config={"configurable": {"thread_id": st.session_state.thread_id}},
+        nodes={"generate_recipe", "acknowledge_preferences"},
+    )
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        with placeholder:
+            answer = st.write_stream(stream)
+        if not answer:
+            # Nothing to stream (e.g. not a grocery request): show the triage reply
+            last = stream.last_message
+            answer = str(last.content) if last is not None else ""
+        placeholder.markdown(to_markdown(answer))
 
     # -------------------------------------------------------------------------
-    # 3) Append assistant messages to history and render them
+    # 3) Append the answer to history
     # -------------------------------------------------------------------------
-    for a_msg in assistant_messages:
-        st.session_state.chat_history.append(a_msg)
-        with st.chat_message("assistant"):
-            st.markdown(a_msg.content)
+    history.append(AIMessage(content=answer))
+    if stream.time_to_first_token is not None:
+        st.caption(f"First token after {stream.time_to_first_token:.2f}s")
 
     # Optionally, show debug info such as classification / triage result
+    result = stream.final_state or {}
     if "classification" in result:
         with st.expander("Debug – Agent metadata", expanded=False):
             st.write({k: v for k, v in result.items() if k != "messages"}) 
\ No newline at end of file
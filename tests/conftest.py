@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import os
 import pytest
 import sys
 from pathlib import Path
@@ -16,8 +17,26 @@ def pytest_addoption(parser):
         default="email_assistant_hitl_memory",
         help="Specify which email assistant module to test"
     )
+    parser.addoption(
+        "--record-mode",
+        action="store",
+        default=os.environ.get("LLM_CASSETTE_MODE", "replay"),
+        choices=["replay", "record", "rerecord"],
+        help="Answer model calls from the cassettes (replay), record missing responses (record) or refresh them all (rerecord)"
+    )
+
+def pytest_configure(config):
+    """Replayed runs are offline: skip LangSmith test tracking unless asked for.
+    Set here because the langsmith marker reads it when test modules are imported."""
+    if config.getoption("--record-mode") == "replay":
+        os.environ.setdefault("LANGSMITH_TEST_TRACKING", "false")
 
 @pytest.fixture(scope="session")
 def agent_module_name(request):
     """Return the agent module name from command line."""
-    return request.config.getoption("--agent-module")
\ No newline at end of file
+    return request.config.getoption("--agent-module")
+
+@pytest.fixture(scope="session")
+def record_mode(request):
+    """Return the cassette mode from command line (or LLM_CASSETTE_MODE)."""
+    return request.config.getoption("--record-mode")
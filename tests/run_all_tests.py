@@ -15,12 +15,16 @@ def main():
     parser.add_argument("--experiment-name", help="Name for the LangSmith experiment")
     parser.add_argument("--implementation", help="Run tests for a specific implementation")
     parser.add_argument("--all", action="store_true", help="Run tests for all implementations")
+    parser.add_argument("--record-mode", choices=["replay", "record", "rerecord"], default="replay",
+                        help="Replay recorded model responses, record missing ones or re-record them all")
     args = parser.parse_args()
     
     # Base pytest options
-    base_pytest_options = ["-v", "--disable-warnings", "--langsmith-output"]
-    # The --langsmith-output flag is now enabled by default for all test runs
+    base_pytest_options = ["-v", "--disable-warnings"]
+    # Recording runs log to LangSmith (with --langsmith-output); replayed runs
+    # stay offline unless LANGSMITH_TEST_TRACKING=true is set
     # The --rich-output flag is kept for backward compatibility
+    langsmith_tracking = args.record_mode != "replay" or os.environ.get("LANGSMITH_TEST_TRACKING") == "true"
     
     # Define available implementations
     # Note: email_assistant_hitl and email_assistant_hitl_memory are not included because:
@@ -54,22 +58,30 @@ def main():
         os.environ["LANGSMITH_PROJECT"] = langsmith_project
         os.environ["LANGSMITH_TEST_SUITE"] = langsmith_project
         
-        # Ensure tracing is enabled
-        os.environ["LANGCHAIN_TRACING_V2"] = "true"
+        # Ensure tracing is enabled when results go to LangSmith
+        if langsmith_tracking:
+            os.environ["LANGCHAIN_TRACING_V2"] = "true"
+            os.environ["LANGSMITH_TEST_TRACKING"] = "true"
         
         # Create a fresh copy of the pytest options for this run
         pytest_options = base_pytest_options.copy()
+        if langsmith_tracking:
+            pytest_options.append("--langsmith-output")
         
         # Add the module parameter for this specific implementation
         module_param = f"--agent-module={implementation}"
         pytest_options.append(module_param)
+        pytest_options.append(f"--record-mode={args.record_mode}")
         
         # Determine which test files to run based on implementation
         test_files = ["test_response.py"]  # All implementations run response tests
                     
         # Run each test file
         print(f"   Project: {langsmith_project}")
-        print(f"\nℹ️ Test results for {implementation} are being logged to LangSmith")
+        if langsmith_tracking:
+            print(f"\nℹ️ Test results for {implementation} are being logged to LangSmith")
+        else:
+            print(f"\nℹ️ Replaying recorded model responses for {implementation} (not logged to LangSmith)")
         for test_file in test_files:
             print(f"\nRunning {test_file} for {implementation}...")
             experiment_name = f"Test: {test_file.split('/')[-1]} | Agent: {implementation}"
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from email_assistant.tools.gmail.backfill import Backfill, BackfillCheckpoint, date_shards
+from email_assistant.tools.gmail.fakes import FakeGmailService
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler
+
+USER_EMAIL = "me@example.com"
+END = datetime(2025, 6, 1, tzinfo=timezone.utc)
+START = END - timedelta(days=30)
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-backfill."""
+
+def mailbox(count=120):
+    service = FakeGmailService(page_size=10)
+    for i in range(count):
+        service.add_message(
+            f"thread-{i}",
+            sent_at=START + timedelta(hours=6 * i),
+            from_email="sender@example.com",
+            to_email=USER_EMAIL,
+            subject=f"Email {i}",
+            body="Hi",
+            label_ids=["INBOX"],
+        )
+    return service
+
+def backfill(service, ingest, **kwargs):
+    kwargs.setdefault("concurrency", 4)
+    return Backfill(
+        lambda: service, ingest, USER_EMAIL, START, END,
+        shard_days=7, scheduler=RequestScheduler(units_per_second=None), **kwargs,
+    )
+
+def test_date_shards_cover_the_range():
+    shards = date_shards(START, END, shard_days=7)
+    assert len(shards) == 5
+    assert shards[0][0] == START and shards[-1][1] == END
+    assert all(a[1] == b[0] for a, b in zip(shards, shards[1:]))
+
+def test_pages_through_every_shard():
+    service = mailbox()
+    ingested = []
+    summary = backfill(service, ingested.append).run()
+
+    assert sorted(e["id"] for e in ingested) == sorted(service.mailbox)
+    assert summary["ingested"] == 120 and summary["failed"] == 0
+    assert summary["shards_done"] == 5 and summary["estimated_total"] == 120
+    # 28 messages a week in pages of 10, and 8 in the last two days
+    assert service.calls["messages.list"] == 4 * 3 + 1
+
+def test_resumes_from_the_last_checkpointed_page(tmp_path):
+    service = mailbox()
+    path = tmp_path / "backfill.json"
+    ingested = []
+
+    def crash_after_45(email_data):
+        if len(ingested) == 45:
+            raise Crash()
+        ingested.append(email_data["id"])
+
+    with pytest.raises(Crash):
+        backfill(service, crash_after_45, concurrency=1, checkpoint=BackfillCheckpoint(path)).run()
+
+    summary = backfill(service, lambda e: ingested.append(e["id"]), checkpoint=BackfillCheckpoint(path)).run()
+
+    assert set(ingested) == set(service.mailbox)
+    # Only the page that was in flight is redone: the crash came 7 messages
+    # into the second page of the second shard (28 + 10 + 7 = 45)
+    assert len(ingested) - len(service.mailbox) == 7
+    assert summary["ingested"] == 120
+
+def test_failed_messages_are_retried_on_the_next_run(tmp_path):
+    service = mailbox(20)
+    path = tmp_path / "backfill.json"
+    flaky = set(list(service.mailbox)[:3])
+
+    def ingest(email_data):
+        if email_data["id"] in flaky:
+            raise RuntimeError("server unavailable")
+
+    assert backfill(service, ingest, checkpoint=BackfillCheckpoint(path)).run()["failed"] == 3
+
+    flaky.clear()
+    retried = []
+    summary = backfill(service, lambda e: retried.append(e["id"]), checkpoint=BackfillCheckpoint(path)).run()
+    assert sorted(retried) == sorted(list(service.mailbox)[:3])
+    assert summary["failed"] == 0 and summary["ingested"] == 20
+
+def test_threads_end_in_the_state_of_their_newest_message(tmp_path):
+    service = mailbox(40)
+    # One thread with two messages in the first shard and one in the last
+    thread = [
+        service.add_message("long-thread", sent_at=START + timedelta(days=day), from_email="sender@example.com",
+                            to_email=USER_EMAIL, subject="Plans", body=f"Day {day}", label_ids=["INBOX"])["id"]
+        for day in (1, 2, 29)
+    ]
+    runs = []
+    state = {}
+
+    def ingest(email_data):
+        runs.append((email_data["id"], [m["id"] for m in email_data.get("earlier_messages", [])]))
+        # Each run replaces the thread's state, as a rollback ingest does
+        state[email_data["thread_id"]] = email_data["id"]
+
+    summary = backfill(service, ingest, checkpoint=BackfillCheckpoint(tmp_path / "backfill.json")).run()
+
+    assert state["long-thread"] == thread[2]
+    assert summary["ingested"] == 43
+    # The first shard's two messages go in as one run, oldest attached first,
+    # unless the newer shard got to the thread before it
+    thread_runs = [run for run in runs if run[0] in thread]
+    assert thread_runs in ([(thread[1], [thread[0]]), (thread[2], [])], [(thread[2], [])])
+
+    # Backfilling again, oldest shard first, doesn't put an older message back on top
+    checkpoint = BackfillCheckpoint(tmp_path / "backfill.json")
+    checkpoint._data["shards"].clear()
+    runs.clear()
+    backfill(service, ingest, concurrency=1, checkpoint=checkpoint).run()
+    assert state["long-thread"] == thread[2]
+    assert (thread[1], [thread[0]]) not in runs
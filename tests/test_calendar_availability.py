@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import importlib
+import sys
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import langchain.chat_models
+from langchain_core.messages import AIMessage
+
+from email_assistant.fakes import ScriptedChatModel
+from email_assistant.tools.gmail.calendar_availability import (
+    WorkingHours,
+    get_availability,
+    merge_intervals,
+)
+from email_assistant.tools.gmail.fakes import FakeCalendarService
+from email_assistant.tools.gmail.gmail_tools import check_calendar, check_calendar_tool
+
+TZ = ZoneInfo("America/New_York")
+HOURS = WorkingHours(start=time(9), end=time(17), timezone="America/New_York")
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2025, 6, day, hour, minute, tzinfo=TZ)
+
+def test_merge_intervals_merges_overlapping_and_touching():
+    merged = merge_intervals([(at(2, 11), at(2, 12)), (at(2, 9), at(2, 10)), (at(2, 10), at(2, 10, 30)), (at(2, 11, 30), at(2, 13))])
+    assert merged == [(at(2, 9), at(2, 10, 30)), (at(2, 11), at(2, 13))]
+
+def test_availability_for_many_days_uses_one_freebusy_query():
+    service = FakeCalendarService()
+    service.add_event(at(2, 9), at(2, 10), "Standup")
+    service.add_event(at(2, 9, 30), at(2, 11), "Overlapping review")
+    service.add_event(at(3, 16), at(4, 10), "Overnight on-call")
+    dates = [(date(2025, 6, 2) + timedelta(days=i)).strftime("%d-%m-%Y") for i in range(30)]
+
+    availability = get_availability(service, dates, HOURS)
+
+    assert service.calls == {"freebusy.query": 1}
+    by_day = {d.day: d for d in availability.days}
+    assert by_day[date(2025, 6, 2)].free == [(at(2, 11), at(2, 17))]
+    assert by_day[date(2025, 6, 3)].free == [(at(3, 9), at(3, 16))]
+    assert by_day[date(2025, 6, 4)].free == [(at(4, 10), at(4, 17))]
+    # Busy time that spans midnight is clipped to each day it touches
+    assert by_day[date(2025, 6, 4)].busy == [(at(4, 0), at(4, 10))]
+    assert by_day[date(2025, 6, 10)].free == [(at(10, 9), at(10, 17))]
+
+def test_all_day_event_and_non_working_days():
+    service = FakeCalendarService(timezone="America/New_York")
+    service.add_all_day_event(date(2025, 6, 5))
+    weekdays_only = WorkingHours(timezone="America/New_York", weekdays=(0, 1, 2, 3, 4))
+
+    availability = get_availability(service, ["05-06-2025", "07-06-2025"], weekdays_only)
+
+    thursday, saturday = availability.days
+    assert thursday.free == []
+    assert not saturday.working_day and saturday.free == []
+    text = availability.to_text()
+    assert "No availability during working hours" in text
+    assert "Not a working day" in text
+
+def test_check_calendar_returns_text_and_structured_data():
+    service = FakeCalendarService()
+    service.add_event(at(2, 13), at(2, 14), "Lunch")
+
+    text, data = check_calendar(["02-06-2025"], HOURS, service=service)
+
+    assert "Busy 01:00 PM - 02:00 PM" in text
+    assert "Available: 09:00 AM - 01:00 PM, 02:00 PM - 05:00 PM" in text
+    assert data["days"][0]["free"][0]["start"] == at(2, 9).isoformat()
+
+def test_check_calendar_tool_attaches_artifact(monkeypatch):
+    service = FakeCalendarService()
+    monkeypatch.setattr(
+        "email_assistant.tools.gmail.gmail_tools.check_calendar",
+        lambda dates: check_calendar(dates, HOURS, service=service),
+    )
+
+    message = check_calendar_tool.invoke({"type": "tool_call", "id": "call-1", "name": "check_calendar_tool", "args": {"dates": ["02-06-2025"]}})
+
+    assert "Available: 09:00 AM - 05:00 PM" in message.content
+    assert message.artifact["timezone"] == "America/New_York"
+
+def no_model_calls(messages, schema):
+    raise AssertionError("running tools must not call the model")
+
+def test_hitl_gmail_graph_keeps_calendar_artifacts(monkeypatch):
+    service = FakeCalendarService()
+    monkeypatch.setattr(
+        "email_assistant.tools.gmail.gmail_tools.check_calendar",
+        lambda dates: check_calendar(dates, HOURS, service=service),
+    )
+    monkeypatch.setattr(langchain.chat_models, "init_chat_model", lambda *args, **kwargs: ScriptedChatModel(respond=no_model_calls))
+    sys.modules.pop("email_assistant.email_assistant_hitl_memory_gmail", None)
+    try:
+        graph = importlib.import_module("email_assistant.email_assistant_hitl_memory_gmail")
+        call = {"type": "tool_call", "id": "call-1", "name": "check_calendar_tool", "args": {"dates": ["02-06-2025"]}}
+        command = graph.interrupt_handler({"messages": [AIMessage(content="", tool_calls=[call])]}, store=None)
+    finally:
+        sys.modules.pop("email_assistant.email_assistant_hitl_memory_gmail", None)
+
+    [message] = command.update["messages"]
+    assert message.tool_call_id == "call-1"
+    assert "Available: 09:00 AM - 05:00 PM" in message.content
+    assert message.artifact["days"][0]["free"][0]["start"] == at(2, 9).isoformat()
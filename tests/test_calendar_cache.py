@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+
+from email_assistant.tools.gmail import calendar_cache
+from email_assistant.tools.gmail.calendar_availability import WorkingHours, get_availability
+from email_assistant.tools.gmail.calendar_cache import CalendarCache, get_calendar_cache
+from email_assistant.tools.gmail.fakes import FakeCalendarService
+from email_assistant.tools.gmail.gmail_tools import check_calendar, send_calendar_invite
+
+# Tomorrow may fall on a weekend
+HOURS = WorkingHours(start=time(9), end=time(17), timezone="UTC", weekdays=tuple(range(7)))
+TOMORROW = (datetime.now(timezone.utc) + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+DATES = [TOMORROW.strftime("%d-%m-%Y")]
+
+def at(hour: int) -> datetime:
+    return TOMORROW.replace(hour=hour)
+
+@pytest.fixture
+def service():
+    service = FakeCalendarService(page_size=2)
+    for hour in (9, 11, 13):
+        service.add_event(at(hour), at(hour + 1))
+    return service
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    calendar_cache._caches.clear()
+    yield
+    calendar_cache._caches.clear()
+
+def test_repeated_lookups_are_served_from_memory(service):
+    cache = CalendarCache(lambda: service, max_age_s=3600)
+
+    for _ in range(5):
+        text, data = check_calendar(DATES, HOURS, service=service, cache=cache)
+
+    # One paginated full sync, then nothing
+    assert service.calls == {"events.list": 2}
+    assert [slot["start"] for slot in data["days"][0]["free"]] == [at(10).isoformat(), at(12).isoformat(), at(14).isoformat()]
+
+def test_refresh_fetches_only_deltas(service):
+    cache = CalendarCache(lambda: service, max_age_s=0)
+    cache.busy_intervals(at(0), at(23))
+    event = service.add_event(at(15), at(16))
+    service.cancel_event(next(iter(service.events_by_calendar["primary"])))
+    service.calls.clear()
+
+    busy = cache.busy_intervals(at(0), at(23))
+
+    assert service.calls == {"events.list": 1}
+    assert sorted(busy) == [(at(11), at(12)), (at(13), at(14)), (at(15), at(16))]
+    assert event["id"] in cache._events
+
+def test_expired_sync_token_falls_back_to_full_sync(service):
+    cache = CalendarCache(lambda: service, max_age_s=0)
+    cache.busy_intervals(at(0), at(23))
+    service.expire_sync_tokens()
+
+    busy = cache.busy_intervals(at(0), at(23))
+
+    assert len(busy) == 3
+    assert cache._sync_token == str(service._version)
+
+def test_send_calendar_invite_invalidates_process_cache(service):
+    cache = get_calendar_cache(lambda: service)
+    cache.max_age_s = 3600
+    check_calendar(DATES, HOURS, cache=cache)
+
+    assert send_calendar_invite(
+        ["a@example.com"], "Sync", at(15).replace(tzinfo=None).isoformat(), at(16).replace(tzinfo=None).isoformat(),
+        "me@example.com", timezone="UTC", service=service,
+    )
+    service.calls.clear()
+    text, data = check_calendar(DATES, HOURS, cache=cache)
+
+    # The created event is visible and the cache did one incremental sync
+    assert service.calls == {"events.list": 1}
+    free = [(slot["start"], slot["end"]) for slot in data["days"][0]["free"]]
+    assert (at(14).isoformat(), at(15).isoformat()) in free
+    assert (at(16).isoformat(), at(17).isoformat()) in free
+    assert len(free) == 4
+
+def test_mirror_is_bounded_by_the_horizon(service):
+    cache = CalendarCache(lambda: service, max_age_s=0, horizon=timedelta(days=30))
+    # Past the horizon: the full sync doesn't fetch it and the delta sync drops it
+    service.add_event(at(9) + timedelta(days=40), at(10) + timedelta(days=40))
+    cache.busy_intervals(at(0), at(23))
+    assert len(cache._events) == 3
+    service.add_event(at(9) + timedelta(days=41), at(10) + timedelta(days=41))
+
+    assert len(cache.busy_intervals(at(0), at(23))) == 3
+    assert len(cache._events) == 3
+    assert cache.busy_intervals(at(0), at(0) + timedelta(days=40)) is None
+
+def test_window_moves_forward_with_a_full_sync(service, monkeypatch):
+    cache = CalendarCache(lambda: service, max_age_s=3600, horizon=timedelta(days=30))
+    cache.busy_intervals(at(0), at(23))
+    # 20 days later less than half the horizon is left
+    monkeypatch.setattr(cache, "_synced_until", cache._synced_until - timedelta(days=20))
+    service.calls.clear()
+
+    assert len(cache.busy_intervals(at(0), at(23))) == 3
+    assert service.calls == {"events.list": 2}
+    assert cache._synced_until > datetime.now(timezone.utc) + timedelta(days=29)
+
+def test_cache_and_freebusy_agree_on_declined_invitations(service):
+    declined = [{"email": "me@example.com", "self": True, "responseStatus": "declined"}]
+    accepted = [{"email": "me@example.com", "self": True, "responseStatus": "accepted"}]
+    service.add_event(at(15), at(16), summary="Declined", attendees=declined + [{"email": "a@example.com", "responseStatus": "accepted"}])
+    service.add_event(at(16), at(17), summary="Accepted", attendees=accepted)
+    cache = CalendarCache(lambda: service, max_age_s=3600)
+
+    cached = get_availability(service, DATES, HOURS, cache=cache)
+    direct = get_availability(service, DATES, HOURS)
+
+    assert service.calls["freebusy.query"] == 1
+    assert cached.to_dict() == direct.to_dict()
+    # The declined 15-16 invitation leaves that hour free
+    assert direct.days[0].busy == [(at(9), at(10)), (at(11), at(12)), (at(13), at(14)), (at(16), at(17))]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import importlib
+import sys
+
+import langchain.chat_models
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+
+from email_assistant.cassettes import Cassette, CassetteMiss
+from email_assistant.eval.email_dataset import email_inputs
+from email_assistant.fakes import ScriptedChatModel
+from email_assistant.schemas import RouterSchema
+from email_assistant.tools import get_tools
+from email_assistant.utils import extract_tool_calls
+
+def respond(messages, schema):
+    if schema is RouterSchema:
+        return {"reasoning": "Asks a question", "classification": "respond"}
+    args = {"to": "alice@company.com", "subject": "Re: API docs", "content": "Will check."}
+    return AIMessage(content="", tool_calls=[{"name": "write_email", "args": args, "id": "call_1"}])
+
+def run(cassette, date="2025-05-01"):
+    """The two kinds of call the email assistant makes."""
+    router = cassette.init_chat_model("openai:gpt-4.1", temperature=0.0).with_structured_output(RouterSchema)
+    agent = cassette.init_chat_model("openai:gpt-4.1", temperature=0.0).bind_tools(get_tools(), tool_choice="any")
+    decision = router.invoke([{"role": "user", "content": "Can you review the API docs?"}])
+    message = agent.invoke([
+        {"role": "system", "content": f"Today's date is {date}"},
+        {"role": "user", "content": "Can you   review\nthe API docs?"},
+    ])
+    return decision, message
+
+def test_record_then_replay_without_the_live_model(tmp_path):
+    path = tmp_path / "cassette.json"
+    live = ScriptedChatModel(respond=respond)
+    recorder = Cassette(path, mode="record", live_model=lambda *args, **kwargs: live)
+    recorded = run(recorder)
+    recorder.save()
+    assert live.calls == ["RouterSchema", "text"] and recorder.recorded == 2
+
+    def no_live_model(*args, **kwargs):
+        raise AssertionError("replay must not construct the live model")
+
+    # Another day's date in the prompt replays the same entries
+    replayed = run(Cassette(path, live_model=no_live_model), date="2026-01-31")
+    assert replayed[0] == recorded[0] == RouterSchema(reasoning="Asks a question", classification="respond")
+    # Tool calls replay as recorded, args in order (they end up in later prompts)
+    assert replayed[1].tool_calls == recorded[1].tool_calls
+    assert list(replayed[1].tool_calls[0]["args"]) == ["to", "subject", "content"]
+
+    # Recording again only calls the model for new requests; rerecord calls it for all
+    recorder = Cassette(path, mode="record", live_model=lambda *args, **kwargs: live)
+    run(recorder)
+    assert recorder.hits == 2 and len(live.calls) == 2
+    rerecorder = Cassette(path, mode="rerecord", live_model=lambda *args, **kwargs: live)
+    run(rerecorder)
+    assert rerecorder.recorded == 2 and len(live.calls) == 4
+
+def test_unrecorded_request_fails_in_replay(tmp_path):
+    cassette = Cassette(tmp_path / "empty.json")
+    with pytest.raises(CassetteMiss):
+        cassette.init_chat_model("openai:gpt-4o").invoke("Hello")
+    with pytest.raises(ValueError):
+        Cassette(tmp_path / "empty.json", mode="live")
+
+def agent_respond(messages, schema):
+    if schema is RouterSchema:
+        return {"reasoning": "Needs a reply", "classification": "respond"}
+    if isinstance(messages[-1], ToolMessage):
+        return AIMessage(content="", tool_calls=[{"name": "Done", "args": {"done": True}, "id": "call_done"}])
+    args = {"to": "alice.smith@company.com", "subject": "Re: API documentation", "content": "I'll look into it."}
+    return AIMessage(content="", tool_calls=[{"name": "write_email", "args": args, "id": "call_write"}])
+
+def run_agent(cassette, monkeypatch):
+    """Run the email_assistant graph the way test_response.py does, against ``cassette``."""
+    monkeypatch.setattr(langchain.chat_models, "init_chat_model", cassette.init_chat_model)
+    sys.modules.pop("email_assistant.email_assistant", None)
+    try:
+        agent = importlib.import_module("email_assistant.email_assistant")
+        return agent.email_assistant.invoke({"email_input": email_inputs[0]})
+    finally:
+        sys.modules.pop("email_assistant.email_assistant", None)
+
+def test_agent_graph_replays_offline(tmp_path, monkeypatch):
+    path = tmp_path / "test_response.json"
+    live = ScriptedChatModel(respond=agent_respond)
+    recorder = Cassette(path, mode="record", live_model=lambda *args, **kwargs: live)
+    recorded = run_agent(recorder, monkeypatch)
+    recorder.save()
+    assert live.calls == ["RouterSchema", "text", "text"]
+
+    def no_live_model(*args, **kwargs):
+        raise AssertionError("replay must not construct the live model")
+
+    replayed = run_agent(Cassette(path, live_model=no_live_model), monkeypatch)
+    assert extract_tool_calls(replayed["messages"]) == extract_tool_calls(recorded["messages"]) == ["write_email", "done"]
+    assert [m.content for m in replayed["messages"]] == [m.content for m in recorded["messages"]]
+
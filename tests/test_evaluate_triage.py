@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+import json
+
+import email_assistant.eval.evaluate_triage as evaluate_triage
+from email_assistant.eval.email_dataset import examples_triage
+from email_assistant.fakes import ScriptedChatModel
+from email_assistant.schemas import RouterSchema
+
+EXPECTED = {example["inputs"]["email_input"]["subject"]: example["outputs"]["classification"] for example in examples_triage}
+
+def router():
+    def respond(messages, schema):
+        subject = next(s for s in EXPECTED if f"Subject: {s}" in messages[-1].content)
+        return {"reasoning": "Looked at the subject", "classification": EXPECTED[subject]}
+
+    return ScriptedChatModel(respond=respond)
+
+def test_offline_run_is_cached_per_example_prompt_and_model(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "cache.jsonl")
+    model = router()
+    target = evaluate_triage.make_triage_target("fake", evaluate_triage.TriageCache(cache_path), model.with_structured_output(RouterSchema))
+
+    rows = evaluate_triage.run_offline(target, concurrency=8)
+    assert len(model.calls) == len(examples_triage) and not any(row["cached"] for row in rows)
+    assert all(row["correct"] for row in rows)
+    assert [row["example"] for row in rows] == [evaluate_triage.example_hash(e["inputs"]) for e in examples_triage]
+
+    # A new process reads the cache from disk: no model calls
+    target = evaluate_triage.make_triage_target("fake", evaluate_triage.TriageCache(cache_path), model.with_structured_output(RouterSchema))
+    assert all(row["cached"] for row in evaluate_triage.run_offline(target))
+    assert len(model.calls) == len(examples_triage)
+
+    # Another model, or an edited prompt, misses the cache
+    target = evaluate_triage.make_triage_target("other", evaluate_triage.TriageCache(cache_path), model.with_structured_output(RouterSchema))
+    target(examples_triage[0]["inputs"])
+    monkeypatch.setattr(evaluate_triage, "prompt_hash", lambda: "edited")
+    target = evaluate_triage.make_triage_target("fake", evaluate_triage.TriageCache(cache_path), model.with_structured_output(RouterSchema))
+    target(examples_triage[0]["inputs"])
+    assert len(model.calls) == len(examples_triage) + 2
+
+    output = evaluate_triage.write_results(rows, str(tmp_path / "out" / "triage.json"))
+    assert json.load(open(output))[0]["expected"] == examples_triage[0]["outputs"]["classification"]
+
+def test_failures_are_not_cached(tmp_path):
+    def respond(messages, schema):
+        raise RuntimeError("rate limited")
+
+    cache = evaluate_triage.TriageCache(None)
+    target = evaluate_triage.make_triage_target("fake", cache, ScriptedChatModel(respond=respond).with_structured_output(RouterSchema))
+    assert target(examples_triage[0]["inputs"]) == {"classification_decision": "unknown", "cached": False}
+    assert cache.get(evaluate_triage.TriageCache.key(evaluate_triage.example_hash(examples_triage[0]["inputs"]), evaluate_triage.prompt_hash(), "fake")) is None
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+import logging
+import threading
+
+from email_assistant.metrics import SampledLogger, get_metrics
+from email_assistant.tools.gmail.fakes import FakeGmailService
+from email_assistant.tools.gmail.gmail_tools import fetch_group_emails
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler
+
+USER_EMAIL = "me@example.com"
+
+def test_fetch_group_emails_yields_latest_message_per_thread():
+    service = FakeGmailService.with_mailbox(USER_EMAIL, threads=5, messages_per_thread=3)
+    metrics = get_metrics("gmail.fetch")
+    metrics.reset()
+
+    emails = list(fetch_group_emails(USER_EMAIL, minutes_since=60, service=service))
+
+    assert len(emails) == 5
+    assert {email["thread_id"] for email in emails} == {f"thread-{t:06d}" for t in range(5)}
+    assert all(email["page_content"].startswith("Message 2") for email in emails)
+    counters = metrics.snapshot()["counters"]
+    assert counters["messages_listed"] == 15
+    assert counters["emails_yielded"] == 5
+    assert counters["skipped_not_latest"] == 10
+
+def test_fetch_group_emails_fetches_concurrently_with_an_http_factory():
+    sequential = FakeGmailService.with_mailbox(USER_EMAIL, threads=5, messages_per_thread=3)
+    concurrent = FakeGmailService.with_mailbox(USER_EMAIL, threads=5, messages_per_thread=3)
+    scheduler = RequestScheduler(units_per_second=None, max_workers=4, sleep=lambda _: None)
+    connections = []
+    def http_factory():
+        connections.append(threading.get_ident())
+        return object()
+
+    expected = list(fetch_group_emails(USER_EMAIL, minutes_since=60, service=sequential, scheduler=scheduler))
+    emails = list(fetch_group_emails(
+        USER_EMAIL, minutes_since=60, service=concurrent, scheduler=scheduler, http_factory=http_factory
+    ))
+    scheduler.close()
+
+    assert emails == expected
+    assert concurrent.calls["messages.get"] == 15
+    # Each thread is fetched once rather than once per listed message
+    assert concurrent.calls["threads.get"] == 5
+    assert sequential.calls["threads.get"] == 15
+    # One connection per worker thread, never the caller's
+    assert 1 <= len(connections) <= 4
+    assert len(set(connections)) == len(connections)
+    assert threading.get_ident() not in connections
+
+def test_sampled_logger_emits_every_nth_record(caplog):
+    logger = logging.getLogger("test_sampled_logger")
+    sampled = SampledLogger(logger, sample_every=10)
+
+    with caplog.at_level(logging.DEBUG, logger="test_sampled_logger"):
+        for i in range(25):
+            sampled.debug("key", "record %d", i)
+
+    assert [r.getMessage() for r in caplog.records] == ["record 0", "record 10", "record 20"]
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.store.memory import InMemoryStore
+
+import email_assistant.recipe_maker as recipe_maker
+from email_assistant.fakes import ScriptedChatModel
+from email_assistant.history import ChatWindow
+
+def test_window_folds_old_turns_in_batches():
+    folds = []
+
+    def summarize(summary, messages):
+        folds.append([m.content for m in messages])
+        return f"{summary}+{len(messages)}"
+
+    window = ChatWindow(max_messages=6, fold_batch=4, summarize=summarize)
+    for turn in range(10):
+        window.append(HumanMessage(content=f"q{turn}"), fold=False)
+        window.append(AIMessage(content=f"a{turn}"))
+        assert len(window.messages) <= 6 and isinstance(window.messages[0], HumanMessage)
+
+    # One summarization call per three turns, each covering the oldest ones
+    assert folds[0] == ["q0", "a0", "q1", "a1", "q2", "a2"]
+    assert len(folds) == 3 and window.folded == 18
+    assert window.agent_input() == {"messages": window.messages, "conversation_summary": "+6+6+6"}
+
+def test_window_starts_at_a_user_turn():
+    window = ChatWindow(max_messages=3, fold_batch=1, summarize=lambda summary, messages: "s")
+    for message in [HumanMessage(content="q0"), AIMessage(content="a0"), AIMessage(content="a0 again"), HumanMessage(content="q1")]:
+        window.append(message)
+    assert [m.content for m in window.messages] == ["q1"]
+
+def test_agent_state_is_bounded(monkeypatch):
+    model = ScriptedChatModel(respond=lambda messages, schema: "=== Grocery List === Rice")
+    monkeypatch.setattr(recipe_maker, "init_chat_model", lambda *args, **kwargs: model)
+    history = [HumanMessage(content="What should I buy?") if i % 2 == 0 else AIMessage(content="Rice") for i in range(41)]
+
+    result = recipe_maker.create_triage_agent(InMemoryStore()).invoke({"messages": history})
+    assert len(result["messages"]) == recipe_maker.MAX_STATE_MESSAGES + 2
+    assert result["messages"][-1].content == "=== Grocery List === Rice"
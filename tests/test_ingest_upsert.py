@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail.fakes import FakeGmailService, FakeLangGraphClient
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler
+from email_assistant.tools.gmail.run_ingest import (
+    collapse_threads,
+    get_email_data,
+    ingest_email_to_langgraph,
+    langgraph_thread_id,
+    list_messages,
+)
+from email_assistant.tools.gmail.run_janitor import StaleRunCollector
+
+GRAPH = "email_assistant_hitl_memory_gmail"
+
+def email(message_id, thread_id="gmail-thread-1"):
+    return {
+        "id": message_id,
+        "thread_id": thread_id,
+        "from_email": "sender@example.com",
+        "to_email": "me@example.com",
+        "subject": "Hello",
+        "page_content": f"Body of {message_id}",
+        "send_time": "",
+    }
+
+def ingest(client, email_data, collector=None, **kwargs):
+    return asyncio.run(ingest_email_to_langgraph(email_data, GRAPH, client=client, collector=collector, **kwargs))
+
+def test_each_email_costs_a_constant_number_of_calls():
+    client = FakeLangGraphClient()
+    for i in range(5):
+        client.calls.clear()
+        thread_id, run = ingest(client, email(f"m{i}"))
+        assert run["metadata"]["email_id"] == f"m{i}"
+        assert client.calls == {"threads.create": 1, "runs.create": 1, "threads.update": 1}
+
+    assert thread_id == langgraph_thread_id("gmail-thread-1")
+    assert client.thread_store[thread_id]["metadata"]["email_id"] == "m4"
+    assert len(client.run_store[thread_id]) == 5
+
+def test_reingesting_an_email_is_a_no_op():
+    client = FakeLangGraphClient()
+    ingest(client, email("m1"))
+    ingest(client, email("m2"))
+    client.calls.clear()
+
+    # Both emails are still unread, so the next cron run finds them again
+    assert ingest(client, email("m1"))[1] is None
+    assert ingest(client, email("m2"))[1] is None
+    assert client.calls == {"threads.create": 2}
+
+    assert ingest(client, email("m2"), rerun=True)[1] is not None
+    assert len(client.run_store[langgraph_thread_id("gmail-thread-1")]) == 3
+
+def test_sweep_deletes_superseded_runs_in_bulk():
+    client = FakeLangGraphClient()
+    collector = StaleRunCollector(page_size=2)
+    for i in range(5):
+        ingest(client, email(f"a{i}", "gmail-thread-a"), collector)
+    ingest(client, email("b0", "gmail-thread-b"), collector)
+    thread_a = langgraph_thread_id("gmail-thread-a")
+    # A run still in progress is left alone
+    oldest = next(iter(client.run_store[thread_a].values()))
+    oldest["status"] = "running"
+    assert collector.pending == 2
+    client.calls.clear()
+
+    assert asyncio.run(collector.sweep(client)) == 3
+    assert [r["metadata"]["email_id"] for r in client.run_store[thread_a].values()] == ["a0", "a4"]
+    assert len(client.run_store[langgraph_thread_id("gmail-thread-b")]) == 1
+    # Three pages for the five runs on thread a, one for thread b
+    assert client.calls == {"runs.list": 4, "runs.delete": 3}
+    assert collector.pending == 0
+    assert asyncio.run(collector.sweep(client)) == 0
+
+def test_new_messages_in_a_thread_collapse_into_one_run():
+    service = FakeGmailService()
+    start = datetime.now(timezone.utc) - timedelta(minutes=30)
+    for i, (thread, sender) in enumerate([("t1", "alice"), ("t2", "bob"), ("t1", "carol"), ("t1", "alice")]):
+        service.add_message(
+            thread, sent_at=start + timedelta(minutes=i), from_email=f"{sender}@example.com",
+            to_email="me@example.com", subject=f"Re: {thread}", body=f"Message {i} from {sender}",
+        )
+    scheduler = RequestScheduler(units_per_second=None)
+    # Newest first, as Gmail lists them
+    emails = [get_email_data(service, m["id"], scheduler) for m in list_messages(service, "is:unread", scheduler)]
+    metrics = get_metrics("gmail.ingest")
+    metrics.reset()
+
+    collapsed, avoided = collapse_threads(emails)
+    assert avoided == 2 and metrics.get("redundant_runs_avoided") == 2
+    assert [e["page_content"] for e in collapsed] == ["Message 3 from alice", "Message 1 from bob"]
+
+    client = FakeLangGraphClient()
+    for email_data in collapsed:
+        ingest(client, email_data)
+    assert client.calls["runs.create"] == 2
+
+    run = next(iter(client.run_store[langgraph_thread_id("t1")].values()))
+    email_input = run["input"]["email_input"]
+    body = email_input["body"]
+    assert body.startswith("Message 3 from alice")
+    assert body.index("Message 0 from alice") < body.index("Message 2 from carol")
+    # Messages 0 and 2 are marked as read along with message 3
+    assert email_input["id"] == "msg-00000004"
+    assert email_input["earlier_ids"] == ["msg-00000001", "msg-00000003"]
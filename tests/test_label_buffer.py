@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+import threading
+
+from email_assistant.metrics import get_metrics
+from email_assistant.tools.gmail.fakes import FakeGmailService
+from email_assistant.tools.gmail.label_buffer import LabelMutationBuffer
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler
+
+def unthrottled(**kwargs):
+    return RequestScheduler(units_per_second=None, **kwargs)
+
+def unread(service):
+    return [i for i, message in service.mailbox.items() if "UNREAD" in message["labelIds"]]
+
+def test_marks_a_large_batch_read_in_chunks_of_1000():
+    service = FakeGmailService.with_mailbox("me@example.com", threads=2500)
+    metrics = get_metrics("gmail.labels")
+    metrics.reset()
+    builds = []
+    buffer = LabelMutationBuffer(
+        lambda: builds.append(1) or service, flush_interval_s=None, max_pending=10_000, scheduler=unthrottled()
+    )
+
+    for message_id in list(service.mailbox):
+        buffer.mark_as_read([message_id])
+    assert service.calls == {}
+
+    assert buffer.flush() == 3
+    assert service.calls == {"messages.batchModify": 3}
+    assert len(builds) == 1
+    assert unread(service) == []
+    assert metrics.get("requests_saved") == 2500 - 3
+
+def test_later_changes_override_earlier_ones_per_label():
+    service = FakeGmailService.with_mailbox("me@example.com", threads=3)
+    first, second, third = service.mailbox
+    buffer = LabelMutationBuffer(lambda: service, flush_interval_s=None, scheduler=unthrottled())
+
+    buffer.mark_as_read([first, second, third])
+    buffer.modify([second], add_label_ids=["UNREAD", "STARRED"])
+
+    assert buffer.flush() == 2
+    assert unread(service) == [second]
+    assert "STARRED" in service.mailbox[second]["labelIds"]
+
+def test_retries_transient_errors_and_keeps_failed_changes():
+    service = FakeGmailService.with_mailbox("me@example.com", threads=2)
+    delays = []
+    buffer = LabelMutationBuffer(
+        lambda: service, flush_interval_s=None, scheduler=unthrottled(max_retries=2, backoff_s=0.1, sleep=delays.append)
+    )
+
+    service.fail_next("messages.batchModify", status=429, times=2)
+    buffer.mark_as_read(service.mailbox)
+    assert buffer.flush() == 1
+    assert len(delays) == 2 and delays[0] <= 0.1 and delays[1] <= 0.2
+    assert unread(service) == []
+
+    # Transient errors that outlast the retries leave the changes queued for the next flush
+    service.add_message("thread-x", from_email="a@example.com", to_email="me@example.com", subject="s", body="b")
+    service.fail_next("messages.batchModify", status=503, times=3)
+    buffer.mark_as_read(unread(service))
+    assert buffer.flush() == 0
+    assert buffer.pending == 1
+    assert buffer.flush() == 1
+    assert unread(service) == []
+
+def test_permanent_errors_and_repeated_failures_drop_changes():
+    service = FakeGmailService.with_mailbox("me@example.com", threads=2)
+    first, second = service.mailbox
+    metrics = get_metrics("gmail.labels")
+    metrics.reset()
+    buffer = LabelMutationBuffer(
+        lambda: service, flush_interval_s=None, max_attempts=2, scheduler=unthrottled(max_retries=0)
+    )
+
+    # Invalid IDs or a permission error won't succeed on a later flush
+    service.fail_next("messages.batchModify", status=403)
+    buffer.mark_as_read([first])
+    assert buffer.flush() == 0 and buffer.pending == 0
+
+    # Transient failures are retried on later flushes, up to max_attempts
+    service.fail_next("messages.batchModify", status=503, times=2)
+    buffer.mark_as_read([second])
+    assert buffer.flush() == 0 and buffer.pending == 1
+    assert buffer.flush() == 0 and buffer.pending == 0
+    assert metrics.get("messages_dropped") == 2
+    assert unread(service) == [first, second]
+
+def test_changes_survive_a_failed_service_build():
+    service = FakeGmailService.with_mailbox("me@example.com", threads=2)
+    builds = []
+
+    def build():
+        builds.append(1)
+        if len(builds) == 1:
+            raise RuntimeError("credential refresh failed")
+        return service
+
+    buffer = LabelMutationBuffer(build, flush_interval_s=None, scheduler=unthrottled())
+    buffer.mark_as_read(service.mailbox)
+    assert buffer.flush() == 0 and buffer.pending == 2
+    assert buffer.flush() == 1
+    assert unread(service) == []
+
+def test_queueing_does_not_wait_for_a_flush_in_progress():
+    service = FakeGmailService.with_mailbox("me@example.com", threads=2)
+    first, second = service.mailbox
+    backing_off, resume = threading.Event(), threading.Event()
+    scheduler = unthrottled(max_retries=1, sleep=lambda delay: (backing_off.set(), resume.wait(5)))
+    buffer = LabelMutationBuffer(lambda: service, flush_interval_s=None, scheduler=scheduler)
+
+    service.fail_next("messages.batchModify", status=429)
+    buffer.mark_as_read([first])
+    flush = threading.Thread(target=buffer.flush)
+    flush.start()
+    assert backing_off.wait(5)
+    # The flush is sleeping between retries; queueing still goes through
+    buffer.mark_as_read([second])
+    assert buffer.pending == 1
+    resume.set()
+    flush.join(timeout=5)
+
+    assert unread(service) == [second]
+    assert buffer.flush() == 1
+    assert unread(service) == []
+
+def test_timer_flushes_in_the_background():
+    service = FakeGmailService.with_mailbox("me@example.com", threads=2)
+    buffer = LabelMutationBuffer(lambda: service, flush_interval_s=0.01, scheduler=unthrottled())
+
+    buffer.mark_as_read(service.mailbox)
+    buffer._timer.join(timeout=5)
+
+    assert service.calls == {"messages.batchModify": 1}
+    assert buffer.pending == 0
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+import json
+import textwrap
+
+import pytest
+
+import email_assistant.cron
+from email_assistant.tools.gmail import label_buffer
+from email_assistant.tools.gmail.fakes import FakeGmailService
+from email_assistant.tools.gmail.label_buffer import LabelMutationBuffer
+from email_assistant.tools.gmail.local_ingest import INGESTED_NAMESPACE, LocalIngestor, load_graph
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler
+from email_assistant.tools.gmail.run_ingest import ingest_run_key, langgraph_thread_id
+
+TOY_GRAPH = textwrap.dedent('''
+    import operator
+    from typing import Annotated, List, TypedDict
+
+    from langgraph.graph import END, START, StateGraph
+    from langgraph.store.base import BaseStore
+    from langgraph.types import interrupt
+
+    from email_assistant.tools.gmail.gmail_tools import queue_mark_as_read
+
+    class State(TypedDict):
+        email_input: dict
+        seen: Annotated[List[str], operator.add]
+
+    def triage(state: State, store: BaseStore):
+        email = state["email_input"]
+        if email["subject"] == "boom":
+            raise RuntimeError("boom")
+        if email["subject"] == "review":
+            interrupt({"email_id": email["id"]})
+        if email["subject"] == "done":
+            queue_mark_as_read(email["id"])
+        store.put(("senders",), email["from"], {"last_subject": email["subject"]})
+        return {"seen": [email["id"]]}
+
+    graph = StateGraph(State).add_node(triage).add_edge(START, "triage").add_edge("triage", END).compile()
+''')
+
+def email(message_id, thread_id, subject="Hello"):
+    return {
+        "id": message_id,
+        "thread_id": thread_id,
+        "from_email": f"{thread_id}@example.com",
+        "to_email": "me@example.com",
+        "subject": subject,
+        "page_content": "Hi",
+        "send_time": "",
+    }
+
+@pytest.fixture
+def config(tmp_path):
+    (tmp_path / "toy_graph.py").write_text(TOY_GRAPH)
+    path = tmp_path / "langgraph.json"
+    path.write_text(json.dumps({"graphs": {"toy": "./toy_graph.py:graph"}}))
+    return path
+
+def test_runs_emails_in_process_with_server_thread_ids(config):
+    emails = [email(f"m{i}", f"thread-{i % 3}") for i in range(9)]
+    with LocalIngestor("toy", max_workers=4, config_path=config) as ingestor:
+        results = ingestor.ingest_all(emails)
+
+        assert [thread_id for thread_id, _ in results] == [langgraph_thread_id(e["thread_id"]) for e in emails]
+        # Emails in a thread ran in order, accumulating state in the checkpointer
+        state = ingestor.graph.get_state({"configurable": {"thread_id": langgraph_thread_id("thread-1")}})
+        assert state.values["seen"] == ["m1", "m4", "m7"]
+        assert ingestor.store.get(("senders",), "thread-2@example.com").value == {"last_subject": "Hello"}
+
+def test_skips_ingested_emails_and_isolates_failures(config):
+    with LocalIngestor("toy", config_path=config) as ingestor:
+        ingestor.ingest(email("m1", "thread-a"))
+        results = ingestor.ingest_all([email("m1", "thread-a"), email("m2", "thread-a", "boom"), email("m3", "thread-b")])
+
+        assert results[0][1] is None
+        assert results[1] is None
+        assert results[2][1]["seen"] == ["m3"]
+        assert ingestor.ingest(email("m1", "thread-a"), rerun=True)[1]["seen"] == ["m1", "m1"]
+
+def test_loads_package_graphs_by_module_name():
+    assert load_graph("cron") is email_assistant.cron.graph
+    with pytest.raises(ValueError):
+        load_graph("no_such_graph")
+
+def test_sqlite_state_survives_a_restart(config, tmp_path):
+    db = tmp_path / "ingest.sqlite"
+    with LocalIngestor("toy", config_path=config, db_path=db) as ingestor:
+        ingestor.ingest(email("m1", "thread-a"))
+
+    with LocalIngestor("toy", config_path=config, db_path=db) as ingestor:
+        assert ingestor.ingest(email("m1", "thread-a"))[1] is None
+        assert ingestor.ingest(email("m2", "thread-a"))[1]["seen"] == ["m1", "m2"]
+
+def test_runs_stopped_at_an_interrupt_are_reported_separately(config):
+    with LocalIngestor("toy", config_path=config) as ingestor:
+        done_thread, _ = ingestor.ingest(email("m1", "thread-a"))
+        waiting_thread, result = ingestor.ingest(email("m2", "thread-b", subject="review"))
+
+        assert "__interrupt__" in result
+        assert ingestor.interrupted == [(waiting_thread, "m2")]
+        statuses = {
+            email_id: ingestor.store.get(INGESTED_NAMESPACE, ingest_run_key(thread_id, email_id)).value["status"]
+            for thread_id, email_id in [(done_thread, "m1"), (waiting_thread, "m2")]
+        }
+        assert statuses == {"m1": "completed", "m2": "interrupted"}
+
+def test_label_changes_are_flushed_at_the_end_of_a_batch(config, monkeypatch):
+    service = FakeGmailService.with_mailbox("me@example.com", threads=3)
+    ids = list(service.mailbox)
+    buffer = LabelMutationBuffer(lambda: service, flush_interval_s=None, scheduler=RequestScheduler(units_per_second=None))
+    monkeypatch.setattr(label_buffer, "_buffer", buffer)
+
+    with LocalIngestor("toy", config_path=config) as ingestor:
+        ingestor.ingest_all([email(message_id, f"thread-{message_id}", subject="done") for message_id in ids[:2]])
+        assert service.calls == {"messages.batchModify": 1}
+        ingestor.ingest(email(ids[2], "thread-last", subject="done"))
+    # And whatever single runs queued when the ingestor closes
+    assert service.calls == {"messages.batchModify": 2}
+    assert all("UNREAD" not in message["labelIds"] for message in service.mailbox.values())
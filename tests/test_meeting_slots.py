@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from email_assistant.tools.gmail.calendar_availability import WorkingHours
+from email_assistant.tools.gmail.fakes import FakeCalendarService
+from email_assistant.tools.gmail.gmail_tools import find_meeting_times
+from email_assistant.tools.gmail.meeting_slots import find_meeting_slots
+
+TZ = ZoneInfo("America/New_York")
+HOURS = WorkingHours(start=time(9), end=time(17), timezone="America/New_York", weekdays=(0, 1, 2, 3, 4))
+ALICE, BOB = "alice@example.com", "bob@example.com"
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2025, 6, day, hour, minute, tzinfo=TZ)
+
+def calendar() -> FakeCalendarService:
+    service = FakeCalendarService()
+    # Monday 2 June: organizer 9-12, Alice 12-15, Bob 15:30-17
+    service.add_event(at(2, 9), at(2, 12))
+    service.add_event(at(2, 12), at(2, 15), calendar_id=ALICE)
+    service.add_event(at(2, 15, 30), at(2, 17), calendar_id=BOB)
+    # Tuesday 3 June: Bob 9-10
+    service.add_event(at(3, 9), at(3, 10), calendar_id=BOB)
+    return service
+
+def slots(search):
+    return [(slot.start, slot.end) for slot in search.slots]
+
+def test_intersects_every_attendee_in_one_query():
+    service = calendar()
+
+    search = find_meeting_slots(service, [ALICE, BOB], timedelta(minutes=30), "02-06-2025", "06-06-2025", HOURS)
+
+    assert service.calls == {"freebusy.query": 1}
+    # Monday's only common gap is 15:00-15:30; Tuesday prefers slots not right after Bob's 9-10
+    assert slots(search) == [
+        (at(2, 15), at(2, 15, 30)),
+        (at(3, 10, 30), at(3, 11)),
+        (at(3, 11), at(3, 11, 30)),
+        (at(4, 9), at(4, 9, 30)),
+        (at(4, 9, 30), at(4, 10)),
+    ]
+    assert search.slots[0].back_to_back and not search.slots[1].back_to_back
+
+def test_longer_meetings_buffers_and_weekends():
+    service = calendar()
+
+    search = find_meeting_slots(
+        service, [ALICE, BOB], timedelta(hours=2), "02-06-2025", "08-06-2025", HOURS,
+        buffer=timedelta(minutes=15), max_results=10, max_per_day=1,
+    )
+
+    # Nothing fits on Monday, Tuesday starts after Bob's meeting plus the buffer,
+    # and the weekend is skipped
+    assert slots(search) == [
+        (at(3, 10, 30), at(3, 12, 30)),
+        (at(4, 9), at(4, 11)),
+        (at(5, 9), at(5, 11)),
+        (at(6, 9), at(6, 11)),
+    ]
+
+def test_unknown_calendars_are_reported_and_past_slots_skipped():
+    service = calendar()
+
+    search = find_meeting_slots(
+        service, ["stranger@example.com"], timedelta(minutes=60), "02-06-2025", "02-06-2025", HOURS,
+        not_before=at(2, 12, 10), max_per_day=3,
+    )
+
+    assert search.unchecked == ["stranger@example.com"]
+    assert slots(search) == [(at(2, 12, 30), at(2, 13, 30)), (at(2, 13, 30), at(2, 14, 30)), (at(2, 14, 30), at(2, 15, 30))]
+    assert search.to_dict()["unchecked"] == ["stranger@example.com"]
+    assert "Could not check free/busy for: stranger@example.com. These slots may conflict" in search.to_text()
+
+def test_find_meeting_times_formats_slots_for_scheduling():
+    text, data = find_meeting_times(
+        [ALICE, BOB], 30, "02-06-2025", "02-06-2025", working_hours=HOURS, service=calendar(), not_before=at(2, 0),
+    )
+
+    assert "1. Mon 02-06-2025 03:00 PM - 03:30 PM (start_time=2025-06-02T15:00:00, end_time=2025-06-02T15:30:00)" in text
+    assert data["slots"] == [{"start": at(2, 15).isoformat(), "end": at(2, 15, 30).isoformat(), "back_to_back": True}]
+
+def test_weekends_are_not_working_days_by_default(monkeypatch):
+    monkeypatch.setenv("CALENDAR_TIMEZONE", "America/New_York")
+    monkeypatch.delenv("CALENDAR_WORKDAYS", raising=False)
+
+    # Saturday 7 and Sunday 8 June
+    weekend = find_meeting_slots(FakeCalendarService(), [ALICE], timedelta(minutes=30), "07-06-2025", "08-06-2025")
+    assert weekend.slots == []
+
+    monkeypatch.setenv("CALENDAR_WORKDAYS", "sat, 6")
+    assert WorkingHours.from_env().weekdays == (5, 6)
+    weekend = find_meeting_slots(FakeCalendarService(), [ALICE], timedelta(minutes=30), "07-06-2025", "08-06-2025")
+    assert [slot.start for slot in weekend.slots] == [at(7, 9), at(7, 9, 30), at(8, 9), at(8, 9, 30)]
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+
+import logging
+
+from email_assistant.metrics import StageMetrics
+
+def test_summary_reports_each_batch_not_the_running_total(caplog):
+    logger = logging.getLogger("test_metrics")
+    metrics = StageMetrics("test.batch")
+
+    with caplog.at_level(logging.INFO, logger="test_metrics"):
+        metrics.incr("fetched", 3)
+        metrics.observe("fetch", 0.5)
+        metrics.log_summary(logger)
+        metrics.incr("fetched", 2)
+        metrics.incr("failed")
+        metrics.log_summary(logger)
+
+    assert [r.getMessage() for r in caplog.records] == [
+        "test.batch metrics since last summary: counters={'fetched': 3} timings={'fetch': '1x/500.0ms'}",
+        "test.batch metrics since last summary: counters={'fetched': 2, 'failed': 1} timings={}",
+    ]
+    # The counters themselves stay cumulative
+    assert metrics.get("fetched") == 5
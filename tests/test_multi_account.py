@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import asyncio
+
+import pytest
+from langgraph.store.memory import InMemoryStore
+
+from email_assistant.tools.gmail.fakes import FakeGmailService, FakeLangGraphClient
+from email_assistant.tools.gmail.multi_account import (
+    AccountStateStore,
+    MissingCredentialsError,
+    MultiAccountIngestor,
+    PollPolicy,
+)
+
+GRAPH = "email_assistant_hitl_memory_gmail"
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def add_emails(service, email, count, prefix):
+    for i in range(count):
+        service.add_message(f"{prefix}-{i}", from_email="sender@example.com", to_email=email, subject=f"{prefix} {i}", body="Hi")
+
+def make_ingestor(services, client, store, clock):
+    def service_factory(account):
+        if account.email not in services:
+            raise MissingCredentialsError(f"No Gmail token found for {account.email}")
+        return services[account.email]
+    return MultiAccountIngestor(
+        ["busy@example.com", "quiet@example.com", "nokey@example.com"],
+        GRAPH,
+        client=client,
+        service_factory=service_factory,
+        state_store=AccountStateStore(store),
+        policy=PollPolicy(min_interval_s=600, max_interval_s=3600),
+        max_workers=4,
+        clock=clock,
+    )
+
+def test_busy_accounts_are_polled_every_run_and_quiet_ones_back_off():
+    services = {"busy@example.com": FakeGmailService(), "quiet@example.com": FakeGmailService()}
+    client = FakeLangGraphClient()
+    store = InMemoryStore()
+    clock = Clock()
+    ingestor = make_ingestor(services, client, store, clock)
+
+    add_emails(services["busy@example.com"], "busy@example.com", 3, "first")
+    summary = asyncio.run(ingestor.run_once())
+    assert summary == {"polled": 3, "skipped": 0, "failed": 1, "emails": 3}
+    assert client.calls["runs.create"] == 3
+
+    # Ten minutes later only the busy account (and the failed one, retrying) is due
+    clock.now += 600
+    services["busy@example.com"].mailbox.clear()
+    add_emails(services["busy@example.com"], "busy@example.com", 2, "second")
+    summary = asyncio.run(ingestor.run_once())
+    assert summary == {"polled": 2, "skipped": 1, "failed": 1, "emails": 2}
+    assert services["quiet@example.com"].calls == {"messages.list": 1}
+    ingestor.close()
+
+    states = AccountStateStore(store)
+    quiet = asyncio.run(states.load("quiet@example.com"))
+    assert quiet.credentials == "ok" and quiet.interval_s == 3600
+    busy = asyncio.run(states.load("busy@example.com"))
+    assert busy.volume == pytest.approx(0.3 * 2 + 0.7 * 3) and busy.interval_s == 600
+
+def test_missing_credentials_are_recorded_and_backed_off():
+    client = FakeLangGraphClient()
+    store = InMemoryStore()
+    clock = Clock()
+    ingestor = make_ingestor({}, client, store, clock)
+
+    for _ in range(3):
+        asyncio.run(ingestor.run_once())
+        clock.now += 3600
+    ingestor.close()
+
+    state = asyncio.run(AccountStateStore(store).load("nokey@example.com"))
+    assert state.credentials == "missing"
+    assert state.failures == 3
+    # 600s, 1200s, then 2400s
+    assert state.interval_s == 2400
+    assert "No Gmail token" in state.last_error
+    assert client.calls == {}
+
+def test_state_survives_between_jobs():
+    services = {"busy@example.com": FakeGmailService(), "quiet@example.com": FakeGmailService()}
+    store = InMemoryStore()
+    clock = Clock()
+    first = make_ingestor(services, FakeLangGraphClient(), store, clock)
+    asyncio.run(first.run_once())
+    first.close()
+
+    # A fresh job (as the cron starts one each run) sees the saved schedule
+    clock.now += 600
+    second = make_ingestor(services, FakeLangGraphClient(), store, clock)
+    summary = asyncio.run(second.run_once())
+    second.close()
+    # Neither mailbox had mail, so only the failed account is retried
+    assert summary == {"polled": 1, "skipped": 2, "failed": 1, "emails": 0}
+    assert services["quiet@example.com"].calls == {"messages.list": 1}
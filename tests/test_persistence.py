@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+import operator
+import threading
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from langgraph.store.memory import InMemoryStore
+from langgraph.types import Command, Send, interrupt
+
+from email_assistant.persistence import SqliteStore, sqlite_persistence
+
+class State(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+def build_graph():
+    def draft(state: State):
+        return {"steps": ["draft"]}
+
+    def review(state: State):
+        return {"steps": [interrupt("Send it?")]}
+
+    def fan_out(state: State):
+        return [Send("send", {"steps": [f"to-{i}"]}) for i in range(3)]
+
+    def send(state: State):
+        return {"steps": ["sent"]}
+
+    return (
+        StateGraph(State)
+        .add_node(draft).add_node(review).add_node(send)
+        .add_edge(START, "draft").add_edge("draft", "review")
+        .add_conditional_edges("review", fan_out)
+        .add_edge("send", END)
+    )
+
+def test_interrupted_thread_resumes_after_reopening(tmp_path):
+    path = tmp_path / "state.sqlite"
+    config = {"configurable": {"thread_id": "t1"}}
+    checkpointer, store = sqlite_persistence(path)
+    with checkpointer, store:
+        result = build_graph().compile(checkpointer=checkpointer, store=store).invoke({"steps": []}, config)
+        assert result["__interrupt__"][0].value == "Send it?"
+
+    checkpointer, store = sqlite_persistence(path)
+    with checkpointer, store:
+        graph = build_graph().compile(checkpointer=checkpointer, store=store)
+        assert graph.get_state(config).next == ("review",)
+        assert graph.invoke(Command(resume="approved"), config) == {"steps": ["draft", "approved", "sent", "sent", "sent"]}
+        history = list(graph.get_state_history(config))
+        assert [c.metadata["step"] for c in checkpointer.list(config, filter={"source": "loop"}, limit=2)] == [3, 2]
+        assert len(list(checkpointer.list(config, before=history[1].config))) == len(history) - 2
+        checkpointer.delete_thread("t1")
+        assert checkpointer.get_tuple(config) is None
+
+def test_checkpoint_listing_does_not_hold_the_connection(tmp_path):
+    config = {"configurable": {"thread_id": "t1"}}
+    checkpointer, store = sqlite_persistence(tmp_path / "state.sqlite")
+    with checkpointer, store:
+        graph = build_graph().compile(checkpointer=checkpointer, store=store)
+        graph.invoke({"steps": []}, config)
+
+        # A consumer that stops after the first entry and never closes the iterator
+        history = checkpointer.list(config)
+        next(history)
+        other = threading.Thread(target=checkpointer.get_tuple, args=(config,))
+        other.start()
+        other.join(timeout=5)
+        assert not other.is_alive()
+        history.close()
+
+@pytest.fixture
+def stores(tmp_path):
+    sqlite = SqliteStore(tmp_path / "store.sqlite")
+    yield sqlite, InMemoryStore()
+    sqlite.close()
+
+def test_store_matches_in_memory_store(stores):
+    for store in stores:
+        store.put(("users", "1", "prefs"), "food", {"diet": "vegan", "spice": {"level": 3}})
+        store.put(("users", "2", "prefs"), "food", {"diet": "none"})
+        store.put(("users", "1"), "profile", {"diet": "vegan"})
+        store.put(("usersx",), "other", {"diet": "vegan"})
+        store.put(("users", "2", "prefs"), "drink", {"diet": "vegan"})
+        store.delete(("users", "2", "prefs"), "drink")
+    sqlite, memory = stores
+
+    def keys(items):
+        return sorted((tuple(item.namespace), item.key) for item in items)
+
+    for prefix, kwargs in [
+        (("users",), {}),
+        (("users", "1"), {"filter": {"diet": "vegan"}}),
+        ((), {"filter": {"spice": {"level": {"$gte": 2}}}}),
+        (("users", "1"), {"limit": 1, "offset": 1}),
+    ]:
+        assert len(sqlite.search(prefix, **kwargs)) == len(memory.search(prefix, **kwargs))
+        if "limit" not in kwargs:
+            assert keys(sqlite.search(prefix, **kwargs)) == keys(memory.search(prefix, **kwargs))
+    for kwargs in [{}, {"prefix": ("users",)}, {"suffix": ("prefs",)}, {"max_depth": 2}, {"prefix": ("users", "*", "prefs")}]:
+        assert sqlite.list_namespaces(**kwargs) == memory.list_namespaces(**kwargs)
+    assert sqlite.get(("users", "1", "prefs"), "food").value == memory.get(("users", "1", "prefs"), "food").value
+    assert sqlite.get(("users", "2", "prefs"), "drink") is None
+
+def test_mget_and_mset_are_batched(stores):
+    sqlite, _ = stores
+    sqlite.mset(("cache",), {f"k{i}": {"i": i} for i in range(2000)})
+    items = sqlite.mget(("cache",), ["k1999", "missing", "k0"])
+    assert [item and item.value for item in items] == [{"i": 1999}, None, {"i": 0}]
+
+    sqlite.mset(("cache",), {"k0": None, "k1": {"i": -1}})
+    assert [item and item.value for item in sqlite.mget(("cache",), ["k0", "k1"])] == [None, {"i": -1}]
+    assert len(sqlite.search(("cache",), limit=5000)) == 1999
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httplib2
+import pytest
+
+from email_assistant.tools.gmail.fakes import FakeGmailService, FakeLangGraphClient
+from email_assistant.tools.gmail.push_ingest import (
+    HistoryCursorStore,
+    LangGraphIngest,
+    PushIngestor,
+    PushServer,
+    decode_notification,
+    start_watch,
+)
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler
+
+USER_EMAIL = "me@example.com"
+NOTIFICATIONS = json.loads((Path(__file__).parent / "fixtures" / "gmail_push_notifications.json").read_text())
+
+def add_email(service, thread_id, subject, **fields):
+    fields.setdefault("from_email", "sender@example.com")
+    return service.add_message(thread_id, to_email=USER_EMAIL, subject=subject, body=f"Body of {subject}", **fields)
+
+@pytest.fixture
+def mailbox():
+    service = FakeGmailService()
+    scheduler = RequestScheduler(units_per_second=None)
+    ingested = []
+    ingestor = PushIngestor(lambda email: service, ingested.append, scheduler=scheduler)
+    # Seed the cursor the way the server does after users.watch
+    ingestor.cursors.set(USER_EMAIL, int(start_watch(service, "projects/email-assistant/topics/gmail")["historyId"]))
+    service.calls.clear()
+    yield service, ingestor, ingested
+    ingestor.close()
+
+@pytest.fixture
+def server(mailbox):
+    _, ingestor, _ = mailbox
+    server = PushServer(("127.0.0.1", 0), ingestor, token="s3cret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def post(server, body, token="s3cret"):
+    host, port = server.server_address
+    response, _ = httplib2.Http().request(
+        f"http://{host}:{port}/gmail/push?token={token}", "POST", body=body, headers={"Content-Type": "application/json"}
+    )
+    return response.status
+
+def test_decodes_recorded_notification():
+    notification = decode_notification(json.dumps(NOTIFICATIONS[0]).encode())
+    assert notification == {
+        "email_address": USER_EMAIL,
+        "history_id": 1003,
+        "message_id": "11982046152731640",
+        "publish_time": "2025-06-02T16:00:01.412Z",
+    }
+    with pytest.raises(ValueError):
+        decode_notification(b'{"message": {"data": "bm90IGpzb24="}}')
+
+def test_replays_recorded_notifications_through_the_endpoint(mailbox, server):
+    service, ingestor, ingested = mailbox
+    for i in range(3):
+        add_email(service, f"thread-{i}", f"Hello {i}")
+
+    # First delivery and a Pub/Sub redelivery of the same notification
+    assert post(server, json.dumps(NOTIFICATIONS[0])) == 204
+    assert post(server, json.dumps(NOTIFICATIONS[1])) == 204
+    ingestor.join(timeout=5)
+
+    assert [email["subject"] for email in ingested] == ["Hello 0", "Hello 1", "Hello 2"]
+    assert service.calls == {"history.list": 1, "messages.get": 3}
+
+    # Our own reply shows up in history too but is not ingested
+    add_email(service, "thread-0", "Re: Hello 0", from_email=USER_EMAIL, label_ids=["SENT", "INBOX"])
+    add_email(service, "thread-3", "Lunch?")
+    assert post(server, json.dumps(NOTIFICATIONS[2])) == 204
+    ingestor.join(timeout=5)
+
+    assert [email["subject"] for email in ingested][3:] == ["Lunch?"]
+    assert ingestor.cursors.get(USER_EMAIL) == 1005
+    assert service.calls["messages.list"] == 0
+
+def test_rejects_bad_tokens_and_malformed_pushes(server):
+    assert post(server, json.dumps(NOTIFICATIONS[0]), token="wrong") == 403
+    assert post(server, b"{}") == 400
+
+def test_expired_history_falls_back_to_recent_search(mailbox):
+    service, ingestor, ingested = mailbox
+    now = datetime.now(timezone.utc)
+    add_email(service, "thread-0", "Before expiry", sent_at=now - timedelta(minutes=2))
+    service.expire_history()
+    add_email(service, "thread-1", "After expiry", sent_at=now - timedelta(minutes=1))
+
+    assert ingestor.handle(USER_EMAIL, service.history_id) == 2
+    assert service.calls["history.list"] == 1 and service.calls["messages.list"] == 1
+    assert [email["subject"] for email in ingested] == ["Before expiry", "After expiry"]
+
+def test_cursor_store_persists_and_only_moves_forward(tmp_path):
+    path = tmp_path / "cursors.json"
+    store = HistoryCursorStore(path)
+    store.set(USER_EMAIL, 1005)
+    store.set(USER_EMAIL, 1003)
+
+    assert HistoryCursorStore(path).get(USER_EMAIL) == 1005
+
+def runs_per_thread(client):
+    return sorted(len(runs) for runs in client.run_store.values())
+
+class LoopRecordingClient(FakeLangGraphClient):
+    """Records the event loop of every call."""
+
+    def __init__(self):
+        super().__init__()
+        self.loops = set()
+
+    async def _call(self, name):
+        self.loops.add(id(asyncio.get_running_loop()))
+        await super()._call(name)
+
+def test_langgraph_ingest_reuses_one_loop_and_sweeps_on_shutdown():
+    service = FakeGmailService()
+    client = LoopRecordingClient()
+    ingest = LangGraphIngest("email_assistant_hitl_memory_gmail", client=client, sweep_interval_s=None)
+    ingestor = PushIngestor(lambda email: service, ingest, scheduler=RequestScheduler(units_per_second=None))
+    ingestor.cursors.set(USER_EMAIL, int(start_watch(service, "projects/email-assistant/topics/gmail")["historyId"]))
+    server = PushServer(("127.0.0.1", 0), ingestor)
+
+    # Three emails on one Gmail thread: two superseded runs, below sweep_every
+    for i in range(3):
+        add_email(service, "thread-1", f"Update {i}")
+        ingestor.handle(USER_EMAIL, service.history_id)
+    assert runs_per_thread(client) == [3]
+
+    server.server_close()
+    assert runs_per_thread(client) == [1]
+    assert len(client.loops) == 1
+
+def test_langgraph_ingest_sweeps_on_a_timer():
+    client = FakeLangGraphClient()
+    ingest = LangGraphIngest("email_assistant_hitl_memory_gmail", client=client, sweep_interval_s=0.05)
+    try:
+        for i in range(2):
+            ingest({
+                "id": f"m{i}", "thread_id": "gmail-thread-1", "from_email": "sender@example.com",
+                "to_email": USER_EMAIL, "subject": "Hello", "page_content": "Hi", "send_time": "",
+            })
+        deadline = time.monotonic() + 5
+        while runs_per_thread(client) != [1] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert runs_per_thread(client) == [1]
+    finally:
+        ingest.close()
+
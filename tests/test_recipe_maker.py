@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.store.memory import InMemoryStore
+
+import email_assistant.recipe_maker as recipe_maker
+from email_assistant.fakes import ScriptedChatModel
+from email_assistant.persistence import sqlite_persistence
+from email_assistant.streaming import TokenStream
+
+def respond(messages, schema):
+    if schema is recipe_maker.TriageDecision:
+        prompt = messages[-1].content
+        user_input = prompt.split("User Input:")[1].split("User's Food Preferences")[0]
+        return {
+            "category": "grocery_list_request" if "store" in user_input else "preference_update",
+            "analysis": "Looks like groceries",
+            "food_preferences": "Loves lemons" if "lemons" in user_input.lower() else None,
+        }
+    if schema is recipe_maker.FoodPreferences:
+        return {"chain_of_thought": "Mentions lemons", "food_preferences": "Loves lemons"}
+    return "=== Grocery List === Tofu, rice"
+
+@pytest.fixture
+def model(monkeypatch):
+    model = ScriptedChatModel(respond=respond)
+    monkeypatch.setattr(recipe_maker, "init_chat_model", lambda *args, **kwargs: model)
+    return model
+
+def test_ambiguous_request_makes_one_call_before_the_answer(model):
+    store = InMemoryStore()
+    agent = recipe_maker.create_triage_agent(store)
+    stream = TokenStream(agent, {"messages": [("user", "Lemons are nice. Can you plan what I pick up at the store?")]}, nodes={"generate_recipe"})
+
+    assert "".join(stream) == "=== Grocery List === Tofu, rice"
+    assert model.calls == ["TriageDecision", "text"]
+    assert stream.final_state["classification"] == "grocery_list_request"
+    assert stream.final_state["triage_provenance"]["source"] == "model"
+    assert stream.final_state["food_preferences"] == "Loves lemons"
+
+    # The profile is written in the background
+    recipe_maker.preference_store(store).flush()
+    assert store.get(recipe_maker.PREFERENCES_NAMESPACE, "food_preferences").value == {"content": "Loves lemons"}
+
+def test_keyword_match_skips_the_triage_call(model):
+    result = recipe_maker.create_triage_agent(InMemoryStore()).invoke(
+        {"messages": [("user", "What should I buy this week?")]}
+    )
+
+    assert result["classification"] == "grocery_list_request"
+    assert result["triage_provenance"]["source"] == "rules"
+    assert model.calls == ["text"]
+
+def test_preference_cues_are_extracted_before_planning(model):
+    store = InMemoryStore()
+    result = recipe_maker.create_triage_agent(store).invoke(
+        {"messages": [("user", "I love lemons, what should I buy this week?")]}
+    )
+
+    # The keywords decide the route, but the plan waits for the new preferences
+    assert result["classification"] == "grocery_list_request"
+    assert result["triage_provenance"] == {
+        "source": "rules",
+        "reason": "Matched grocery keywords: buy",
+        "recipe_terms": ["buy"],
+        "preference_terms": ["i love"],
+    }
+    assert model.calls == ["TriageDecision", "text"]
+    assert result["food_preferences"] == "Loves lemons"
+    assert recipe_maker.get_food_preferences(store) == "Loves lemons"
+
+def test_rules_match_the_old_substring_checks():
+    for message in ["Weekly groceries please", "I'm vegan!", "What's the weather?", "I can't eat eggs", "GLUTEN-FREE breakfast ideas"]:
+        lower = message.lower()
+        decision = recipe_maker.route_by_rules(message)
+        assert (decision.category is not None) == any(k in lower for k in recipe_maker.RECIPE_KEYWORDS)
+        assert bool(decision.preference_terms) == any(p in lower for p in recipe_maker.PREFERENCE_UPDATE_PHRASES)
+
+def test_preference_update_is_acknowledged_without_another_call(model):
+    store = InMemoryStore()
+    result = recipe_maker.create_triage_agent(store).invoke({"messages": [("user", "I love lemons")]})
+
+    assert model.calls == ["TriageDecision"]
+    assert result["messages"][-1].content.endswith("Loves lemons")
+    # Reads see the new profile whether or not the write has landed yet
+    assert recipe_maker.get_food_preferences(store) == "Loves lemons"
+
+PLAN = """=== Grocery List ===
+Produce:
+- Kale $3
+Proteins:
+- Tofu $4
+
+=== Estimated Cost Summary ===
+Total estimated cost: $7
+
+=== Meal Ideas ===
+• Tofu bowl"""
+
+def plan_respond(messages, schema):
+    prompt = messages[-1].content
+    if "Return ONLY the parts that change" in prompt:
+        return "Here you go:\n=== Grocery List ===\nProteins:\n- Salmon $9\n\n=== Estimated Cost Summary ===\nTotal estimated cost: $12"
+    return PLAN
+
+def test_plans_are_cached_and_changes_regenerate_only_affected_sections(monkeypatch):
+    model = ScriptedChatModel(respond=plan_respond)
+    monkeypatch.setattr(recipe_maker, "init_chat_model", lambda *args, **kwargs: model)
+    agent = recipe_maker.create_triage_agent(InMemoryStore())
+
+    def ask(message, **settings):
+        stream = TokenStream(
+            agent,
+            {"messages": [("user", message)], "grocery_settings": {"store": "Trader Joe's", "budget": 80, **settings}},
+            nodes={"generate_recipe"},
+        )
+        return "".join(stream), stream.final_state["plan_source"]
+
+    assert ask("What should I buy this week?") == (PLAN, "full")
+    # Same preferences and settings, written differently: no model call
+    assert ask("Grocery list please", store="trader joes ", budget=80.0) == (PLAN, "cache")
+    assert model.calls == ["text"]
+
+    plan, source = ask("What should I buy this week?", budget=120)
+    assert source == "diff" and model.calls == ["text", "text"]
+    assert recipe_maker.parse_plan(plan) == [
+        ("Grocery List", [("Produce", "- Kale $3"), ("Proteins", "- Salmon $9")]),
+        ("Estimated Cost Summary", [("", "Total estimated cost: $12")]),
+        ("Meal Ideas", [("", "• Tofu bowl")]),
+    ]
+    assert ask("Give me a different grocery list", budget=120)[1] == "full"
+
+def test_requests_with_new_information_are_not_served_from_the_cache(monkeypatch):
+    def respond(messages, schema):
+        if schema is recipe_maker.TriageDecision:
+            return {"category": "grocery_list_request", "analysis": "Allergy", "food_preferences": "Allergic to peanuts"}
+        if "Return ONLY the parts that change" in messages[-1].content:
+            return "=== Grocery List ===\nProteins:\n- Tofu $4"
+        return PLAN.replace("- Tofu $4", "- Tofu $4\n- Peanut butter $3")
+
+    model = ScriptedChatModel(respond=respond)
+    monkeypatch.setattr(recipe_maker, "init_chat_model", lambda *args, **kwargs: model)
+    agent = recipe_maker.create_triage_agent(InMemoryStore())
+
+    def ask(message):
+        stream = TokenStream(agent, {"messages": [("user", message)]}, nodes={"generate_recipe"})
+        return "".join(stream), stream.final_state["plan_source"]
+
+    assert ask("Make me a grocery list")[1] == "full"
+    assert ask("Make me a grocery list please") == (PLAN.replace("- Tofu $4", "- Tofu $4\n- Peanut butter $3"), "cache")
+
+    # Same preferences and settings, but the message asks for more
+    assert ask("Make me a grocery list with more protein")[1] == "diff"
+    # A preference cue updates the profile before planning
+    plan, source = ask("Make me a grocery list, I am allergic to peanuts")
+    assert source == "diff" and "Peanut butter" not in plan
+    assert model.calls == ["text", "text", "TriageDecision", "text"]
+
+def test_each_thread_diffs_against_its_own_latest_plan(monkeypatch):
+    prompts = []
+
+    def respond(messages, schema):
+        prompts.append(messages[-1].content)
+        return plan_respond(messages, schema)
+
+    model = ScriptedChatModel(respond=respond)
+    monkeypatch.setattr(recipe_maker, "init_chat_model", lambda *args, **kwargs: model)
+    agent = recipe_maker.create_triage_agent(InMemoryStore(), checkpointer=MemorySaver())
+
+    def ask(thread_id, message, **settings):
+        config = {"configurable": {"thread_id": thread_id}}
+        state = agent.invoke({"messages": [("user", message)], "grocery_settings": settings}, config)
+        return state["messages"][-1].content, state["plan_source"]
+
+    assert ask("alice", "What should I buy this week?", store="Costco", budget=200) == (PLAN, "full")
+    # Bob's first plan is his own, not a diff of Alice's
+    assert ask("bob", "What should I buy this week?", store="Aldi", budget=50) == (PLAN, "full")
+    assert ask("alice", "What should I buy this week?", store="Costco", budget=250)[1] == "diff"
+    assert model.calls == ["text", "text", "text"]
+    assert "Costco" in prompts[-1] and "Aldi" not in prompts[-1]
+
+def test_preference_normalization():
+    assert recipe_maker.normalize_preferences("Likes: Tofu,  kale\n\nDislikes: cilantro.") == recipe_maker.normalize_preferences(
+        "dislikes: cilantro\nlikes: kale, tofu"
+    )
+    assert recipe_maker.normalize_settings({"budget": 0, "calories": "2000"})["budget"] is None
+
+def test_sessions_share_one_agent_on_separate_threads(model, tmp_path):
+    checkpointer, store = sqlite_persistence(tmp_path / "app.sqlite")
+    with checkpointer, store:
+        agent = recipe_maker.create_triage_agent(store, checkpointer=checkpointer)
+        for turn in range(8):
+            for thread_id in ["alice", "bob"]:
+                config = {"configurable": {"thread_id": thread_id}}
+                agent.invoke({"messages": [("user", f"{thread_id}: what should I buy at the store? ({turn})")]}, config)
+
+        alice = agent.get_state({"configurable": {"thread_id": "alice"}}).values["messages"]
+        assert all("bob" not in str(m.content) for m in alice)
+        # Three messages per turn (request, triage note, answer), trimmed in the graph
+        assert len(alice) == recipe_maker.MAX_STATE_MESSAGES + 2
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+import pytest
+from langgraph.store.memory import InMemoryStore
+
+from email_assistant.metrics import get_metrics
+from email_assistant.recipe_maker import (
+    DEFAULT_FOOD_PREFERENCES,
+    PREFERENCES_NAMESPACE,
+    PreferenceStore,
+    get_food_preferences,
+    preference_store,
+)
+
+class CountingStore(InMemoryStore):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.fail = False
+
+    def batch(self, ops):
+        ops = list(ops)
+        if self.fail:
+            raise OSError("disk full")
+        self.batches.append(ops)
+        return super().batch(ops)
+
+@pytest.fixture
+def metrics():
+    metrics = get_metrics("recipe.preferences")
+    metrics.reset()
+    return metrics
+
+def test_reads_are_cached_and_writes_go_through(metrics):
+    store = CountingStore()
+    store.put(PREFERENCES_NAMESPACE, "food_preferences", {"content": "Vegan"})
+    store.batches.clear()
+    preferences = preference_store(store)
+
+    # triage, generate_recipe and acknowledge_preferences all read the profile
+    assert [get_food_preferences(store) for _ in range(3)] == ["Vegan"] * 3
+    assert len(store.batches) == 1
+    assert preference_store(store) is preferences
+
+    preferences.put("Vegan, loves lemons")
+    assert store.get(PREFERENCES_NAMESPACE, "food_preferences").value == {"content": "Vegan, loves lemons"}
+    assert preferences.get() == "Vegan, loves lemons"
+    assert metrics.get("cache_hits") == 3 and metrics.get("cache_misses") == 1 and metrics.get("writes") == 1
+
+def test_missing_profiles_are_read_in_one_batch():
+    store = CountingStore()
+    preferences = PreferenceStore(store, default="none yet")
+    store.put(PREFERENCES_NAMESPACE, "alice", {"content": "Thai"})
+    store.batches.clear()
+
+    assert preferences.get_many(["alice", "bob", "alice"]) == {"alice": "Thai", "bob": "none yet"}
+    assert len(store.batches) == 1 and len(store.batches[0]) == 2
+    assert get_food_preferences(None, default_content="x") == "x"
+    assert get_food_preferences(InMemoryStore()) == DEFAULT_FOOD_PREFERENCES
+
+def test_backend_failures_are_counted(metrics):
+    store = CountingStore()
+    preferences = PreferenceStore(store, default="default")
+    store.fail = True
+
+    assert preferences.get() == "default"
+    with pytest.raises(OSError):
+        preferences.put("Vegan")
+    assert metrics.get("read_errors") == 1 and metrics.get("write_errors") == 1
+
+    # Neither the failed read nor the failed write was cached
+    store.fail = False
+    store.put(PREFERENCES_NAMESPACE, "food_preferences", {"content": "Pescatarian"})
+    assert preferences.get() == "Pescatarian"
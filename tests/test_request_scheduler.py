@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from email_assistant.tools.gmail.fakes import FakeGmailService
+from email_assistant.tools.gmail.gmail_tools import fetch_group_emails
+from email_assistant.tools.gmail.request_scheduler import RequestScheduler, TokenBucket
+
+class RateLimitedGmail(BaseHTTPRequestHandler):
+    """Answers ``messages.get`` with 429 until a path has been rejected ``reject_first`` times."""
+
+    reject_first = 0
+    error_body = {"error": {"code": 429, "message": "Too many requests", "errors": [{"reason": "rateLimitExceeded"}]}}
+    error_status = 429
+    seen: Counter = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.seen[self.path.split("?")[0]] += 1
+            attempt = self.seen[self.path.split("?")[0]]
+        if attempt <= self.reject_first:
+            self._reply(self.error_status, self.error_body)
+        else:
+            message_id = self.path.split("?")[0].rsplit("/", 1)[-1]
+            self._reply(200, {"id": message_id, "threadId": f"thread-{message_id}"})
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def gmail_server():
+    RateLimitedGmail.seen = Counter()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedGmail)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def gmail_service(server):
+    host, port = server.server_address
+    return build("gmail", "v1", http=httplib2.Http(), client_options={"api_endpoint": f"http://{host}:{port}/"})
+
+def test_retries_429_with_backoff_and_slows_down(gmail_server, monkeypatch):
+    monkeypatch.setattr(RateLimitedGmail, "reject_first", 2)
+    delays = []
+    scheduler = RequestScheduler(units_per_second=100, max_retries=3, backoff_s=0.5, sleep=delays.append)
+
+    message = scheduler.execute(gmail_service(gmail_server).users().messages().get(userId="me", id="m1"))
+
+    assert message["id"] == "m1"
+    assert RateLimitedGmail.seen["/gmail/v1/users/me/messages/m1"] == 3
+    # Full jitter keeps each delay within the exponential cap
+    assert len(delays) == 2 and delays[0] <= 0.5 and delays[1] <= 1.0
+    # Halved twice, then one additive step back up
+    assert scheduler.bucket.rate == pytest.approx(100 / 4 + 5)
+
+def test_gives_up_after_max_retries_and_skips_permission_errors(gmail_server, monkeypatch):
+    monkeypatch.setattr(RateLimitedGmail, "reject_first", 10)
+    service = gmail_service(gmail_server)
+    scheduler = RequestScheduler(units_per_second=None, max_retries=2, sleep=lambda _: None)
+
+    with pytest.raises(HttpError) as error:
+        scheduler.execute(service.users().messages().get(userId="me", id="m2"))
+    assert error.value.resp.status == 429
+    assert RateLimitedGmail.seen["/gmail/v1/users/me/messages/m2"] == 3
+
+    # A 403 that is not a rate limit is not retried
+    monkeypatch.setattr(RateLimitedGmail, "error_status", 403)
+    monkeypatch.setattr(RateLimitedGmail, "error_body", {"error": {"code": 403, "errors": [{"reason": "insufficientPermissions"}]}})
+    with pytest.raises(HttpError):
+        scheduler.execute(service.users().messages().get(userId="me", id="m3"))
+    assert RateLimitedGmail.seen["/gmail/v1/users/me/messages/m3"] == 1
+
+def test_concurrent_submissions_use_one_connection_per_worker(gmail_server, monkeypatch):
+    monkeypatch.setattr(RateLimitedGmail, "reject_first", 1)
+    service = gmail_service(gmail_server)
+    created = []
+    def http_factory():
+        created.append(threading.get_ident())
+        return httplib2.Http()
+    scheduler = RequestScheduler(units_per_second=None, max_workers=4, http_factory=http_factory, sleep=lambda _: None)
+
+    requests = [service.users().messages().get(userId="me", id=f"c{i}") for i in range(20)]
+    results = scheduler.execute_all(requests)
+    workers = set(scheduler._executor._threads)
+    scheduler.close()
+
+    assert [r["id"] for r in results] == [f"c{i}" for i in range(20)]
+    assert sum(RateLimitedGmail.seen.values()) == 40
+    assert len(created) == len(set(created)) == len(workers)
+    assert set(created) == {worker.ident for worker in workers}
+
+def test_submit_without_http_factory_executes_inline():
+    scheduler = RequestScheduler(units_per_second=None, sleep=lambda _: None)
+    callers = []
+    request = type("Request", (), {"execute": lambda self: callers.append(threading.get_ident()) or "ok"})()
+
+    future = scheduler.submit(request, "messages.get")
+
+    assert future.done() and future.result() == "ok"
+    assert callers == [threading.get_ident()]
+    assert scheduler._executor is None
+
+def test_token_bucket_charges_quota_units():
+    now = [0.0]
+    waits = []
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+    scheduler = RequestScheduler(units_per_second=250, clock=lambda: now[0], sleep=sleep)
+    request = type("Request", (), {"methodId": "gmail.users.messages.send", "execute": lambda self: "ok"})()
+
+    for _ in range(5):
+        scheduler.execute(request)
+
+    # messages.send costs 100 units: two fit in the burst, the rest wait 0.4s each
+    assert scheduler.cost(request) == 100
+    assert waits == pytest.approx([0.2, 0.4, 0.4])
+
+def test_token_bucket_serves_reservations_in_order():
+    now = [0.0]
+    bucket = TokenBucket(rate=10, capacity=10, clock=lambda: now[0], sleep=lambda _: None)
+    assert bucket.acquire(10) == 0
+    assert bucket.acquire(5) == pytest.approx(0.5)
+    assert bucket.acquire(5) == pytest.approx(1.0)
+
+def test_fetch_raises_instead_of_returning_mock_email_when_rate_limited():
+    service = FakeGmailService.with_mailbox("me@example.com", threads=1)
+    service.fail_next("messages.list", status=429, times=5)
+    scheduler = RequestScheduler(units_per_second=None, max_retries=2, sleep=lambda _: None)
+
+    with pytest.raises(HttpError):
+        list(fetch_group_emails("me@example.com", service=service, scheduler=scheduler))
+    assert service.calls == {"messages.list": 3}
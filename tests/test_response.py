@@ -1,12 +1,14 @@
 #!/usr/bin/env python
 
+import os
 import uuid
 import importlib
 import sys
 import pytest
+from pathlib import Path
 from typing import Dict, List, Any, Tuple
 from pydantic import BaseModel, Field
-from langchain.chat_models import init_chat_model
+import langchain.chat_models
 
 from langsmith import testing as t
 
@@ -14,6 +16,7 @@ from langgraph.checkpoint.memory import MemorySaver
 from langgraph.store.memory import InMemoryStore
 from langgraph.types import Command
 
+from email_assistant.cassettes import Cassette
 from email_assistant.utils import extract_tool_calls, format_messages_string
 from email_assistant.eval.prompts import RESPONSE_CRITERIA_SYSTEM_PROMPT
 
@@ -24,34 +27,63 @@ load_dotenv(".env", override=True)
 if "email_assistant.eval.email_dataset" in sys.modules:
     importlib.reload(sys.modules["email_assistant.eval.email_dataset"])
 from email_assistant.eval.email_dataset import email_inputs, email_names, response_criteria_list, triage_outputs_list, expected_tool_calls
-    
+
+# Recorded responses for every model call in this module (agent and judge).
+# Refresh with: pytest tests/test_response.py --agent-module=email_assistant --record-mode=rerecord
+CASSETTE_PATH = Path(__file__).parent / "fixtures" / "cassettes" / "test_response.json"
+
 class CriteriaGrade(BaseModel):
     """Score the response against specific criteria."""
     grade: bool = Field(description="Does the response meet the provided criteria?")
     justification: str = Field(description="The justification for the grade and score, including specific examples from the response.")
 
-# Create a global LLM for evaluation to avoid recreating it for each test
-criteria_eval_llm = init_chat_model("openai:gpt-4o")
-criteria_eval_structured_llm = criteria_eval_llm.with_structured_output(CriteriaGrade)
-
 # Global variables for module name and imported module
 AGENT_MODULE = None
 agent_module = None
 
-@pytest.fixture(autouse=True, scope="function")
-def set_agent_module(agent_module_name):
-    """Set the global AGENT_MODULE for each test function.
-    Using scope="function" ensures we get a fresh import for each test."""
+@pytest.fixture(scope="module")
+def llm_cassette(record_mode):
+    """Answer every chat model created in this module from the cassette.
+
+    Records to the cassette instead with --record-mode=record/rerecord
+    (requires OPENAI_API_KEY). A replayed run with no cassette yet records
+    one if OPENAI_API_KEY is set, so the tests run against the live model
+    rather than being skipped."""
+    cassette = Cassette(CASSETTE_PATH, mode=record_mode)
+    if record_mode == "replay" and not len(cassette):
+        if not os.environ.get("OPENAI_API_KEY"):
+            pytest.skip(f"No recorded responses in {CASSETTE_PATH} and no OPENAI_API_KEY to record them")
+        print(f"No recorded responses in {CASSETTE_PATH}; recording them with the live model")
+        cassette = Cassette(CASSETTE_PATH, mode="record")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(langchain.chat_models, "init_chat_model", cassette.init_chat_model)
+        yield cassette
+    if cassette.recorded:
+        cassette.save()
+
+@pytest.fixture(scope="module")
+def criteria_eval_structured_llm(llm_cassette):
+    """LLM judge shared by all tests in this module."""
+    return llm_cassette.init_chat_model("openai:gpt-4o").with_structured_output(CriteriaGrade)
+
+@pytest.fixture(autouse=True, scope="module")
+def set_agent_module(agent_module_name, llm_cassette):
+    """Set the global AGENT_MODULE and import it once for this module.
+    The import happens with the cassette installed, so the module's LLMs
+    answer from recorded responses."""
     global AGENT_MODULE, agent_module
     AGENT_MODULE = agent_module_name
     print(f"Using agent module: {AGENT_MODULE}")
-    
-    # Force reload the module to ensure we get the latest code
-    if f"email_assistant.{AGENT_MODULE}" in sys.modules:
-        importlib.reload(sys.modules[f"email_assistant.{AGENT_MODULE}"])
-    
-    agent_module = importlib.import_module(f"email_assistant.{AGENT_MODULE}")
-    return AGENT_MODULE
+
+    module_name = f"email_assistant.{AGENT_MODULE}"
+    if module_name in sys.modules:
+        # Imported earlier with live models: rebuild them from the cassette
+        agent_module = importlib.reload(sys.modules[module_name])
+    else:
+        agent_module = importlib.import_module(module_name)
+    yield AGENT_MODULE
+    # Don't leave cassette-backed models behind for other test modules
+    sys.modules.pop(module_name, None)
 
 def setup_assistant() -> Tuple[Any, Dict[str, Any], InMemoryStore]:
     """
@@ -179,7 +211,7 @@ def test_email_dataset_tool_calls(email_input, email_name, criteria, expected_ca
 # Variable names and a list of tuples with the test cases
 # Each test case is (email_input, email_name, criteria, expected_calls)
 @pytest.mark.parametrize("email_input,email_name,criteria,expected_calls",create_response_test_cases())
-def test_response_criteria_evaluation(email_input, email_name, criteria, expected_calls):
+def test_response_criteria_evaluation(email_input, email_name, criteria, expected_calls, criteria_eval_structured_llm):
     """Test if a response meets the specified criteria.
     Only runs on emails that require a response.
     """
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+from typing import Annotated, List, TypedDict
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AnyMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from email_assistant.metrics import get_metrics
+from email_assistant.streaming import STREAM_METRICS, TokenStream
+
+class State(TypedDict):
+    messages: Annotated[List[AnyMessage], add_messages]
+    route: str
+
+def build_graph():
+    router = GenericFakeChatModel(messages=iter([AIMessage(content="recipe")])).with_config(tags=["nostream"])
+    writer = GenericFakeChatModel(messages=iter([AIMessage(content="Pasta with tomato sauce")]))
+
+    def triage(state: State):
+        return {"route": router.invoke(state["messages"]).content}
+
+    def answer(state: State):
+        response = writer.invoke(state["messages"])
+        return {"messages": [AIMessage(content=response.content, id=response.id)]}
+
+    def outer_answer(state: State):
+        return {"messages": [AIMessage(content="Enjoy!")]}
+
+    inner = StateGraph(State).add_node(answer).add_edge(START, "answer").add_edge("answer", END).compile()
+    return (
+        StateGraph(State)
+        .add_node(triage)
+        .add_node("response_agent", inner)
+        .add_node(outer_answer)
+        .add_edge(START, "triage")
+        .add_edge("triage", "response_agent")
+        .add_edge("response_agent", "outer_answer")
+        .add_edge("outer_answer", END)
+        .compile()
+    )
+
+def test_streams_tokens_from_selected_nodes_only():
+    metrics = get_metrics(STREAM_METRICS)
+    metrics.reset()
+    stream = TokenStream(build_graph(), {"messages": [("user", "dinner?")]}, nodes={"answer"}, subgraphs=True)
+
+    tokens = list(stream)
+
+    # The nostream router and the outer node's message are not captured
+    assert "".join(tokens) == "Pasta with tomato sauce" == stream.text
+    assert len(tokens) > 1
+    assert stream.final_state["route"] == "recipe"
+    assert stream.last_message.content == "Enjoy!"
+    assert stream.time_to_first_token is not None
+    assert metrics.get("chunks") == len(tokens)
+    assert metrics.snapshot()["timings"]["time_to_first_token"]["count"] == 1
+
+def test_node_outputs_are_not_emitted_twice():
+    stream = TokenStream(build_graph(), {"messages": [("user", "dinner?")]})
+
+    # The streamed answer is returned with its ID, so it is not re-emitted
+    # when the node finishes; the outer node's message arrives whole
+    assert stream.text == "" and list(stream)[-1] == "Enjoy!"
+    assert stream.text == "Pasta with tomato sauceEnjoy!"
+    assert stream.final_state["messages"][-2].content == "Pasta with tomato sauce"